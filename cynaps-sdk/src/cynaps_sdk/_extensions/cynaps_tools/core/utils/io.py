@@ -5,7 +5,7 @@ import os
 import shutil
 import base64
 from contextlib import contextmanager
-from tempfile import mkdtemp
+from tempfile import mkdtemp, mkstemp
 from urllib.parse import urlparse
 import jwt
 
@@ -247,9 +247,16 @@ def download_and_cache(
                     f"Try to set VERIFY_SSL=False in environment variables to bypass SSL verification."
                 )
                 raise e
-            with io.open(filepath, mode="wb") as fout:
-                fout.write(r.content)
-                logger.info(f"File downloaded to {filepath}")
+            # write under a temporary name, so an interrupted download is not taken for a cached file
+            fd, part_path = mkstemp(dir=cache_dir, suffix=".part")
+            try:
+                with io.open(fd, mode="wb") as fout:
+                    fout.write(r.content)
+                os.replace(part_path, filepath)
+            except BaseException:
+                os.remove(part_path)
+                raise
+            logger.info(f"File downloaded to {filepath}")
     return filepath
 
 
@@ -0,0 +1,399 @@
+"""Sharded, resumable conversion for the image export formats (COCO, YOLO, VOC).
+
+Converter.convert reads one JSON file in one process and, for the
+*_WITH_IMAGES formats, downloads every image one after another through
+get_local_path, so a large image export takes hours and starts from zero
+when the job dies.
+
+ShardedConverter splits the tasks into shards of ``shard_size`` tasks and
+keeps all intermediate state in ``work_dir``::
+
+    manifest.json       input checksum and options, written once the split is complete
+    shards/00000.json   tasks of each shard
+    images/             downloaded images, shared by all shards
+    out/00000/          converted shard, renamed from out/00000.tmp when complete
+
+- Before a shard is converted, ``download_workers`` threads fetch its images
+  into images/ under get_local_path's names, so the converter finds them
+  there instead of downloading them itself. Each file is written under a
+  temporary name and renamed, so an interrupted download is never taken
+  for a cached image.
+- Shards are converted by ``workers`` processes. Each shard directory links
+  images/, so the image paths the converter writes stay ``images/<name>``.
+- ``run`` can be repeated with the same work_dir: a retried job skips the
+  split, the images already downloaded and the shards already converted.
+- Shards are merged in order. COCO image and annotation ids are offset by
+  the counts of the previous shards, which gives the ids of a single
+  process run, and categories first seen in a shard are appended with the
+  next id. YOLO label files are rewritten when a shard numbered a class
+  differently. As in a sequential run, a later task's label file replaces
+  an earlier one of the same image name.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import ijson
+import ujson as json
+
+from cynaps_sdk._extensions.cynaps_tools.core.utils.io import get_local_path
+from cynaps_sdk.converter.converter import Converter, Format
+
+logger = logging.getLogger(__name__)
+
+COCO_FORMATS = (Format.COCO, Format.COCO_WITH_IMAGES)
+YOLO_FORMATS = (
+    Format.YOLO,
+    Format.YOLO_OBB,
+    Format.YOLO_WITH_IMAGES,
+    Format.YOLO_OBB_WITH_IMAGES,
+)
+SHARDED_FORMATS = COCO_FORMATS + YOLO_FORMATS + (Format.VOC,)
+# Formats whose images are fetched with get_local_path (VOC uses its own download helper)
+PREFETCH_FORMATS = (
+    Format.COCO_WITH_IMAGES,
+    Format.YOLO_WITH_IMAGES,
+    Format.YOLO_OBB_WITH_IMAGES,
+)
+
+MANIFEST = "manifest.json"
+IMAGES = "images"
+
+
+def is_sharded_format(format):
+    try:
+        return _format(format) in SHARDED_FORMATS
+    except ValueError:
+        return False
+
+
+def _format(format):
+    return Format.from_string(format) if isinstance(format, str) else format
+
+
+def _file_md5(path):
+    md5 = hashlib.md5()  # nosec
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _write_json(path, data, **kwargs):
+    tmp_path = path + ".tmp"
+    with io.open(tmp_path, mode="w", encoding="utf8") as fout:
+        json.dump(data, fout, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def _convert_shard(converter_kwargs, format_name, shard_path, shard_dir, images_dir):
+    """Convert one shard in a worker process, publishing shard_dir only when complete"""
+    tmp_dir = shard_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    os.symlink(images_dir, os.path.join(tmp_dir, IMAGES))
+    Converter(**converter_kwargs).convert(shard_path, tmp_dir, format_name, is_dir=False)
+    os.replace(tmp_dir, shard_dir)
+    return shard_dir
+
+
+class ShardedConverter:
+    def __init__(
+        self,
+        converter_kwargs,
+        work_dir,
+        shard_size=1000,
+        workers=4,
+        download_workers=8,
+    ):
+        """Sharded version of Converter.convert
+
+        :param converter_kwargs: keyword arguments of Converter, passed to each worker process
+        :param work_dir: directory for shards, images and checkpoints, reused by a retried run
+        :param shard_size: number of tasks per shard
+        :param workers: processes converting shards, 1 converts them in this process
+        :param download_workers: threads downloading images
+        """
+        self.converter_kwargs = converter_kwargs
+        self.converter = Converter(**converter_kwargs)
+        self.work_dir = os.path.abspath(work_dir)
+        self.shard_size = shard_size
+        self.workers = workers
+        self.download_workers = download_workers
+        self.images_dir = os.path.join(self.work_dir, IMAGES)
+
+    def run(self, input_json, output_dir, format):
+        """Convert a JSON file with a list of tasks to output_dir, like Converter.convert(..., is_dir=False)"""
+        format = _format(format)
+        if format not in SHARDED_FORMATS:
+            raise ValueError(f"{format} can't be converted in shards")
+
+        shard_names = self._split(input_json, format)
+        os.makedirs(self.images_dir, exist_ok=True)
+        out_dir = os.path.join(self.work_dir, "out")
+        os.makedirs(out_dir, exist_ok=True)
+        shard_dirs = [os.path.join(out_dir, name) for name in shard_names]
+        pending = [
+            (os.path.join(self.work_dir, "shards", name + ".json"), shard_dir)
+            for name, shard_dir in zip(shard_names, shard_dirs)
+            if not os.path.isdir(shard_dir)
+        ]
+        logger.info(
+            f"Converting {len(pending)} of {len(shard_names)} shards to {format.name} in {self.work_dir}"
+        )
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as downloads:
+            if self.workers <= 1:
+                for shard_path, shard_dir in pending:
+                    self._prefetch(downloads, shard_path, format)
+                    _convert_shard(
+                        self.converter_kwargs, format.name, shard_path, shard_dir, self.images_dir
+                    )
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    futures = []
+                    for shard_path, shard_dir in pending:
+                        # shards already submitted are converted while the next one downloads
+                        self._prefetch(downloads, shard_path, format)
+                        futures.append(
+                            pool.submit(
+                                _convert_shard,
+                                self.converter_kwargs,
+                                format.name,
+                                shard_path,
+                                shard_dir,
+                                self.images_dir,
+                            )
+                        )
+                    for future in futures:
+                        future.result()
+
+        self._merge(shard_dirs, output_dir, format)
+
+    def _split(self, input_json, format):
+        """Write the shard files once per input and options, return the shard names"""
+        fingerprint = {
+            "md5": _file_md5(input_json),
+            "format": format.name,
+            "shard_size": self.shard_size,
+            "download_resources": self.converter_kwargs.get("download_resources", True),
+        }
+        manifest_path = os.path.join(self.work_dir, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["fingerprint"] == fingerprint:
+                return manifest["shards"]
+            logger.info(f"Input or options changed, restarting conversion in {self.work_dir}")
+
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        shards_dir = os.path.join(self.work_dir, "shards")
+        os.makedirs(shards_dir)
+        names = []
+
+        def write_shard(tasks):
+            name = f"{len(names):05d}"
+            _write_json(os.path.join(shards_dir, name + ".json"), tasks)
+            names.append(name)
+
+        with io.open(input_json, "rb") as f:
+            tasks = []
+            for task in ijson.items(f, "item", use_float=True):
+                tasks.append(task)
+                if len(tasks) == self.shard_size:
+                    write_shard(tasks)
+                    tasks = []
+            # an empty input still gets one shard, for the categories of the labeling config
+            if tasks or not names:
+                write_shard(tasks)
+
+        _write_json(manifest_path, {"fingerprint": fingerprint, "shards": names})
+        return names
+
+    def _prefetch(self, downloads, shard_path, format):
+        if format not in PREFETCH_FORMATS or not self.converter._data_keys:
+            return
+        data_key = self.converter._data_keys[0]
+        urls = {}
+        with io.open(shard_path, "rb") as f:
+            for task in ijson.items(f, "item", use_float=True):
+                paths = task.get("data", {}).get(data_key)
+                for path in [paths] if isinstance(paths, str) else paths or []:
+                    if isinstance(path, str) and not os.path.exists(path):
+                        urls.setdefault(path, task["id"])
+        list(downloads.map(lambda args: self._download(*args), urls.items()))
+
+    def _download(self, url, task_id):
+        try:
+            get_local_path(
+                url=url,
+                hostname=self.converter.hostname,
+                project_dir=self.converter.project_dir,
+                image_dir=self.converter.upload_dir,
+                cache_dir=self.images_dir,
+                download_resources=True,
+                access_token=self.converter.access_token,
+                task_id=task_id,
+            )
+        except Exception:
+            # the converter retries it and logs the task it skips
+            logger.info(f"Unable to prefetch {url}", exc_info=True)
+
+    def _merge(self, shard_dirs, output_dir, format):
+        os.makedirs(output_dir, exist_ok=True)
+        output_images_dir = os.path.join(output_dir, IMAGES)
+        os.makedirs(output_images_dir, exist_ok=True)
+        for name in sorted(os.listdir(self.images_dir)):
+            if not name.endswith(".part"):
+                _link_or_copy(
+                    os.path.join(self.images_dir, name),
+                    os.path.join(output_images_dir, name),
+                )
+
+        if format in COCO_FORMATS:
+            merge_coco(shard_dirs, output_dir)
+        elif format in YOLO_FORMATS:
+            merge_yolo(shard_dirs, output_dir)
+        else:
+            merge_files(shard_dirs, output_dir, "Annotations")
+
+
+def _link_or_copy(source, target):
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _merge_categories(categories, category_ids, shard_categories):
+    """Add a shard's categories to the merged ones, return {shard id: merged id}"""
+    remap = {}
+    for category in shard_categories:
+        if category["name"] not in category_ids:
+            category_ids[category["name"]] = len(categories)
+            categories.append({**category, "id": len(categories)})
+        remap[category["id"]] = category_ids[category["name"]]
+    return remap
+
+
+def merge_coco(shard_dirs, output_dir):
+    images, annotations, categories, category_ids = [], [], [], {}
+    for shard_dir in shard_dirs:
+        with io.open(os.path.join(shard_dir, "result.json"), encoding="utf8") as f:
+            coco = json.load(f)
+        if not categories:
+            # the first shard keeps its ids, including the ones set in the labeling config
+            categories = coco["categories"]
+            category_ids = {category["name"]: category["id"] for category in categories}
+            remap = {category["id"]: category["id"] for category in categories}
+        else:
+            remap = _merge_categories(categories, category_ids, coco["categories"])
+
+        image_offset, annotation_offset = len(images), len(annotations)
+        for image in coco["images"]:
+            images.append({**image, "id": image["id"] + image_offset})
+        for annotation in coco["annotations"]:
+            annotation = {
+                **annotation,
+                "id": annotation["id"] + annotation_offset,
+                "image_id": annotation["image_id"] + image_offset,
+            }
+            annotation["category_id"] = remap.get(annotation["category_id"], annotation["category_id"])
+            annotations.append(annotation)
+
+    with io.open(os.path.join(output_dir, "result.json"), mode="w", encoding="utf8") as fout:
+        json.dump(
+            {
+                "images": images,
+                "categories": categories,
+                "annotations": annotations,
+                "info": {
+                    "year": datetime.now().year,
+                    "version": "1.0",
+                    "description": "",
+                    "contributor": "Cynaps",
+                    "url": "",
+                    "date_created": str(datetime.now()),
+                },
+            },
+            fout,
+            indent=2,
+        )
+
+
+def merge_yolo(shard_dirs, output_dir):
+    categories, category_ids = [], {}
+    label_dir = os.path.join(output_dir, "labels")
+    os.makedirs(label_dir, exist_ok=True)
+    for shard_dir in shard_dirs:
+        with io.open(os.path.join(shard_dir, "notes.json"), encoding="utf8") as f:
+            shard_categories = json.load(f)["categories"]
+        if not categories:
+            categories = shard_categories
+            category_ids = {category["name"]: category["id"] for category in categories}
+            remap = {}
+        else:
+            remap = _merge_categories(categories, category_ids, shard_categories)
+            remap = {old: new for old, new in remap.items() if old != new}
+        _merge_label_files(os.path.join(shard_dir, "labels"), label_dir, remap)
+
+    with open(os.path.join(output_dir, "classes.txt"), "w", encoding="utf8") as f:
+        for category in categories:
+            f.write(category["name"] + "\n")
+    with io.open(os.path.join(output_dir, "notes.json"), mode="w", encoding="utf8") as fout:
+        json.dump(
+            {
+                "categories": categories,
+                "info": {
+                    "year": datetime.now().year,
+                    "version": "1.0",
+                    "contributor": "Cynaps",
+                },
+            },
+            fout,
+            indent=2,
+        )
+
+
+def _merge_label_files(shard_label_dir, label_dir, remap):
+    for root, _, names in os.walk(shard_label_dir):
+        target_dir = os.path.join(label_dir, os.path.relpath(root, shard_label_dir))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in sorted(names):
+            source, target = os.path.join(root, name), os.path.join(target_dir, name)
+            # the converter leaves an existing label file alone for a task without labels
+            if os.path.getsize(source) == 0 and os.path.exists(target):
+                continue
+            if remap:
+                with open(source, encoding="utf8") as f:
+                    lines = [_remap_label_line(line, remap) for line in f]
+                with open(target, "w", encoding="utf8") as f:
+                    f.writelines(lines)
+            else:
+                shutil.copyfile(source, target)
+
+
+def _remap_label_line(line, remap):
+    class_id, _, rest = line.partition(" ")
+    if class_id.isdigit() and int(class_id) in remap:
+        return f"{remap[int(class_id)]} {rest}"
+    return line
+
+
+def merge_files(shard_dirs, output_dir, subdir):
+    """Merge per-image files (VOC annotations), later shards replacing earlier ones"""
+    target_dir = os.path.join(output_dir, subdir)
+    for shard_dir in shard_dirs:
+        source_dir = os.path.join(shard_dir, subdir)
+        if not os.path.isdir(source_dir):
+            continue
+        os.makedirs(target_dir, exist_ok=True)
+        for name in sorted(os.listdir(source_dir)):
+            shutil.copyfile(os.path.join(source_dir, name), os.path.join(target_dir, name))
@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+
+from cynaps_sdk.converter import Converter
+from cynaps_sdk.converter import sharded
+from cynaps_sdk.converter.sharded import ShardedConverter, is_sharded_format
+
+BASE_DIR = os.path.dirname(__file__)
+TEST_IMAGE = os.path.join(BASE_DIR, "test.png")
+LABEL_CONFIG = """
+<View>
+  <Image name="image" value="$image"/>
+  <RectangleLabels name="label" toName="image">
+    <Label value="cat"/>
+    <Label value="dog"/>
+  </RectangleLabels>
+</View>
+"""
+# bird and fish are not in the config: the converters add them as they first see them
+LABELS = ["cat", "bird", "dog", "fish", "cat", "fish", "bird"]
+
+
+def make_tasks(image_url="http://images.test/{}.png"):
+    return [
+        {
+            "id": i + 1,
+            "data": {"image": image_url.format(i % 5)},
+            "annotations": [
+                {
+                    "id": i + 1,
+                    "result": [
+                        {
+                            "from_name": "label",
+                            "to_name": "image",
+                            "type": "rectanglelabels",
+                            "original_width": 100,
+                            "original_height": 50,
+                            "value": {
+                                "x": 10,
+                                "y": 20,
+                                "width": 30,
+                                "height": 40,
+                                "rectanglelabels": [label],
+                            },
+                        }
+                    ],
+                }
+            ],
+        }
+        for i, label in enumerate(LABELS)
+    ]
+
+
+@pytest.fixture
+def tmp_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path)
+
+
+@pytest.fixture
+def input_json(tmp_dir):
+    path = os.path.join(tmp_dir, "input.json")
+    with open(path, "w") as f:
+        json.dump(make_tasks(), f)
+    return path
+
+
+@pytest.fixture
+def images():
+    with open(TEST_IMAGE, "rb") as f:
+        content = f.read()
+    with requests_mock.Mocker() as m:
+        m.get(requests_mock.ANY, content=content)
+        yield m
+
+
+def convert(tmp_dir, input_json, format, name, workers=1, shard_size=2):
+    kwargs = {"config": LABEL_CONFIG, "project_dir": None, "download_resources": False}
+    output_dir = os.path.join(tmp_dir, name)
+    if workers:
+        ShardedConverter(
+            kwargs, os.path.join(tmp_dir, "work-" + name), shard_size=shard_size, workers=workers
+        ).run(input_json, output_dir, format)
+    else:
+        Converter(**kwargs).convert(input_json, output_dir, format, is_dir=False)
+    return output_dir
+
+
+def read_coco(output_dir):
+    with open(os.path.join(output_dir, "result.json")) as f:
+        coco = json.load(f)
+    del coco["info"]
+    return coco
+
+
+def read_dir(path):
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            with open(os.path.join(root, name), "rb") as f:
+                files[os.path.relpath(os.path.join(root, name), path)] = f.read()
+    return files
+
+
+def test_is_sharded_format():
+    assert is_sharded_format("COCO") and is_sharded_format("YOLO_OBB_WITH_IMAGES")
+    assert not is_sharded_format("CSV") and not is_sharded_format("UNKNOWN")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_coco_matches_single_run(tmp_dir, input_json, workers):
+    expected = read_coco(convert(tmp_dir, input_json, "COCO", "single", workers=0))
+    coco = read_coco(convert(tmp_dir, input_json, "COCO", "sharded", workers=workers))
+    assert coco == expected
+    assert [c["name"] for c in coco["categories"]] == ["cat", "dog", "bird", "fish"]
+
+
+@pytest.mark.parametrize("format", ["YOLO", "VOC"])
+def test_files_match_single_run(tmp_dir, input_json, format):
+    expected = read_dir(convert(tmp_dir, input_json, format, "single", workers=0))
+    files = read_dir(convert(tmp_dir, input_json, format, "sharded", workers=2))
+    if format == "YOLO":
+        # the shards number bird and fish differently, their labels are remapped
+        assert files["classes.txt"] == b"cat\ndog\nbird\nfish\n"
+    assert files == expected
+
+
+def test_images_are_prefetched(tmp_dir, input_json, images):
+    output_dir = convert(tmp_dir, input_json, "COCO_WITH_IMAGES", "sharded", workers=2)
+    coco = read_coco(output_dir)
+
+    # 5 distinct images downloaded once each, by the prefetch in this process
+    assert images.call_count == 5
+    assert len(os.listdir(os.path.join(output_dir, "images"))) == 5
+    for image in coco["images"]:
+        assert image["width"] and os.path.exists(os.path.join(output_dir, image["file_name"]))
+
+
+def test_resume(tmp_dir, input_json, images):
+    work_dir = os.path.join(tmp_dir, "work-sharded")
+    convert_shard = sharded._convert_shard
+    calls = []
+
+    def dies_on_second_shard(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("worker died")
+        return convert_shard(*args)
+
+    with patch.object(sharded, "_convert_shard", dies_on_second_shard):
+        with pytest.raises(RuntimeError):
+            convert(tmp_dir, input_json, "YOLO_WITH_IMAGES", "sharded")
+    assert os.listdir(os.path.join(work_dir, "out")) == ["00000"]
+    # images of the first two shards
+    assert images.call_count == 4
+
+    with patch.object(sharded, "_convert_shard", wraps=convert_shard) as resumed:
+        output_dir = convert(tmp_dir, input_json, "YOLO_WITH_IMAGES", "sharded")
+    # only the unfinished shards are converted, and only the missing image is downloaded
+    assert resumed.call_count == 3
+    assert images.call_count == 5
+    expected = read_dir(convert(tmp_dir, input_json, "YOLO_WITH_IMAGES", "single", workers=0))
+    assert read_dir(output_dir) == expected
+
+    # a changed input starts over
+    with open(input_json, "w") as f:
+        json.dump(make_tasks()[:3], f)
+    with patch.object(sharded, "_convert_shard", wraps=convert_shard) as restarted:
+        convert(tmp_dir, input_json, "YOLO_WITH_IMAGES", "sharded")
+    assert restarted.call_count == 2
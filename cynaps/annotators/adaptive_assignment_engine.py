@@ -99,7 +99,7 @@ class AdaptiveAssignmentEngine:
         """
         Check if annotator has capacity for more assignments
         """
-        from annotators.models import TaskAssignment
+        from annotators.capacity_ledger import CapacityLedger
 
         # Get trust level capacity limit
         try:
@@ -108,12 +108,8 @@ class AdaptiveAssignmentEngine:
             trust_level = "novice"
         max_capacity = AdaptiveAssignmentEngine.CAPACITY_LIMITS.get(trust_level, 5)
 
-        # Count current active assignments (assigned or in_progress)
-        current_load = TaskAssignment.objects.filter(
-            annotator=annotator,
-            task__project=project,
-            status__in=["assigned", "in_progress"],
-        ).count()
+        # Current active assignments (assigned or in_progress) in this project
+        current_load = CapacityLedger.get_annotator(annotator.id)["projects"].get(project.id, 0)
 
         has_space = current_load < max_capacity
 
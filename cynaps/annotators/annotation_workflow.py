@@ -505,15 +505,13 @@ class AnnotationWorkflowService:
         6. Auto-finalize if agreement is high, or create expert review if low
         """
         from .models import (
-            AnnotatorAgreement,
             ExpertReviewTask,
             ExpertProfile,
             TaskAssignment,
             ConsensusQualityScore,
         )
-        from .consensus_service import ConsensusService
+        from .consensus_service import AgreementMatrix, ConsensusService
         from tasks.models import Annotation
-        from itertools import combinations
 
         logger.info(f"Starting consolidation for task {task.id}")
 
@@ -580,90 +578,26 @@ class AnnotationWorkflowService:
             # ================================================================
             # STEP 1: Calculate pairwise agreement scores
             # ================================================================
-            agreement_scores = []
-            for ann1, ann2 in combinations(annotations, 2):
-                agreement = strategy.calculate_agreement(ann1["result"], ann2["result"])
-
-                # Store pairwise agreement record
-                # Note: Field constraints - agreement_score (max_digits=5, decimal_places=2)
-                # Other scores (max_digits=5, decimal_places=4) - can only hold -9.9999 to 9.9999
-                # Need to convert percentages (0-100) to fractions (0-1) for fields with 4 decimal places
-
-                try:
-                    agreement_score_val = float(agreement["overall"])
-                    agreement_score_rounded = Decimal(
-                        str(agreement_score_val)
-                    ).quantize(Decimal("0.01"))
-
-                    # Convert percentage values (0-100) to fractions (0-1) for decimal fields
-                    # that can't hold values > 9.9999
-                    iou_val = agreement.get("iou")
-                    iou_score = (
-                        Decimal(str(float(iou_val))).quantize(Decimal("0.0001"))
-                        if iou_val is not None
-                        else None
-                    )
-
-                    label_val = agreement.get("label")
-                    # label is in percentage (0-100), convert to fraction (0-1)
-                    label_agreement = (
-                        Decimal(str(float(label_val) / 100.0)).quantize(
-                            Decimal("0.0001")
-                        )
-                        if label_val is not None
-                        else None
-                    )
-
-                    position_val = agreement.get("position")
-                    # position is in percentage (0-100), convert to fraction (0-1)
-                    position_agreement = (
-                        Decimal(str(float(position_val) / 100.0)).quantize(
-                            Decimal("0.0001")
-                        )
-                        if position_val is not None
-                        else None
-                    )
-
-                    logger.debug(
-                        f"Task {task.id}: Agreement={agreement_score_rounded}, "
-                        f"IOU={iou_score}, Label={label_agreement}, Position={position_agreement}"
-                    )
-
-                    AnnotatorAgreement.objects.update_or_create(
-                        task_consensus=consensus,
-                        annotator_1=ann1["assignment"].annotator,
-                        annotator_2=ann2["assignment"].annotator,
-                        defaults={
-                            "assignment_1": ann1["assignment"],
-                            "assignment_2": ann2["assignment"],
-                            "agreement_score": agreement_score_rounded,
-                            "iou_score": iou_score,
-                            "label_agreement": label_agreement,
-                            "position_agreement": position_agreement,
-                            "annotation_type": annotation_type,
-                            "comparison_details": agreement,
-                        },
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Error creating AnnotatorAgreement: {e}\n"
-                        f"Values: overall={agreement.get('overall')}, iou={agreement.get('iou')}, "
-                        f"label={agreement.get('label')}, position={agreement.get('position')}"
-                    )
-                    raise
-
-                agreement_scores.append(agreement["overall"])
+            matrix = AgreementMatrix(strategy, annotations)
+            for i, j, agreement in matrix.pairs:
                 logger.info(
-                    f"Task {task.id}: Agreement between {ann1['assignment'].annotator.user.email} "
-                    f"and {ann2['assignment'].annotator.user.email}: {agreement['overall']:.2f}%"
+                    f"Task {task.id}: Agreement between {annotations[i]['assignment'].annotator.user.email} "
+                    f"and {annotations[j]['assignment'].annotator.user.email}: {agreement['overall']:.2f}%"
+                )
+
+            # Store all pairwise agreement records in one upsert
+            try:
+                matrix.save(
+                    consensus,
+                    annotation_type,
+                    AnnotationWorkflowService._agreement_fields,
                 )
+            except Exception as e:
+                logger.error(f"Error creating AnnotatorAgreement records for task {task.id}: {e}")
+                raise
 
             # Calculate overall agreement metrics
-            avg_agreement = (
-                sum(agreement_scores) / len(agreement_scores) if agreement_scores else 0
-            )
-            min_agreement = min(agreement_scores) if agreement_scores else 0
-            max_agreement = max(agreement_scores) if agreement_scores else 0
+            avg_agreement, min_agreement, max_agreement = matrix.summary()
 
             consensus.average_agreement = Decimal(str(avg_agreement))
             consensus.min_agreement = Decimal(str(min_agreement))
@@ -690,27 +624,14 @@ class AnnotationWorkflowService:
             # ================================================================
             # STEP 3: Calculate individual annotator quality scores
             # ================================================================
-            for ann in annotations:
+            individual_agreements = matrix.individual_agreements(consolidated)
+            for index, ann in enumerate(annotations):
                 # Compare individual annotation to consolidated result
-                individual_agreement = strategy.calculate_agreement(
-                    ann["result"], consolidated
-                )
+                individual_agreement = individual_agreements[index]
                 quality_score = Decimal(str(individual_agreement["overall"]))
 
-                # Calculate average peer agreement (agreement with other annotators)
-                peer_agreements = []
-                for other in annotations:
-                    if other["assignment"].id != ann["assignment"].id:
-                        peer_agreement = strategy.calculate_agreement(
-                            ann["result"], other["result"]
-                        )
-                        peer_agreements.append(peer_agreement["overall"])
-
-                avg_peer = (
-                    Decimal(str(sum(peer_agreements) / len(peer_agreements)))
-                    if peer_agreements
-                    else Decimal("0")
-                )
+                # Average peer agreement, reusing the pairwise matrix
+                avg_peer = matrix.peer_average(index)
 
                 # Create quality score record
                 ConsensusService._create_quality_score(
@@ -789,6 +710,49 @@ class AnnotationWorkflowService:
                 task, consensus, "error", Decimal("0")
             )
 
+    @staticmethod
+    def _agreement_fields(agreement):
+        """
+        AnnotatorAgreement score fields for an agreement dict.
+
+        Note: Field constraints - agreement_score (max_digits=5, decimal_places=2)
+        Other scores (max_digits=7, decimal_places=4), so percentages (0-100) are
+        stored as fractions (0-1)
+        """
+        agreement_score = Decimal(str(float(agreement["overall"]))).quantize(
+            Decimal("0.01")
+        )
+
+        iou_val = agreement.get("iou")
+        iou_score = (
+            Decimal(str(float(iou_val))).quantize(Decimal("0.0001"))
+            if iou_val is not None
+            else None
+        )
+
+        # label is in percentage (0-100), convert to fraction (0-1)
+        label_val = agreement.get("label")
+        label_agreement = (
+            Decimal(str(float(label_val) / 100.0)).quantize(Decimal("0.0001"))
+            if label_val is not None
+            else None
+        )
+
+        # position is in percentage (0-100), convert to fraction (0-1)
+        position_val = agreement.get("position")
+        position_agreement = (
+            Decimal(str(float(position_val) / 100.0)).quantize(Decimal("0.0001"))
+            if position_val is not None
+            else None
+        )
+
+        return {
+            "agreement_score": agreement_score,
+            "iou_score": iou_score,
+            "label_agreement": label_agreement,
+            "position_agreement": position_agreement,
+        }
+
     @staticmethod
     def _create_expert_review(task, consensus, reason, disagreement_score):
         """Create an expert review task"""
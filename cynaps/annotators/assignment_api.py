@@ -13,11 +13,13 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
 from projects.models import Project
 from annotators.models import AnnotatorProfile, ProjectAssignment, TaskAssignment
 from annotators.assignment_engine import AssignmentEngine
+from annotators.capacity_ledger import ANNOTATOR, CapacityLedger
 
 logger = logging.getLogger(__name__)
 
@@ -360,10 +362,15 @@ class ProjectReassignTasksAPI(APIView):
 
                 if to_annotator_id:
                     # Reassign to specific annotator
-                    tasks_reassigned.update(
+                    count = tasks_reassigned.update(
                         annotator_id=to_annotator_id, status="assigned"
                     )
-                    count = tasks_reassigned.count()
+                    # .update() bypasses the ledger signals; rebuild both entries from the database
+                    transaction.on_commit(
+                        lambda: CapacityLedger.invalidate(
+                            ANNOTATOR, [from_annotator_id, to_annotator_id]
+                        )
+                    )
                 else:
                     # Remove assignments (tasks will be unassigned)
                     count = tasks_reassigned.count()
@@ -9,11 +9,16 @@ import random
 from datetime import timedelta
 from decimal import Decimal
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
 MAX_TASKS_IN_PROGRESS = getattr(settings, "ANNOTATOR_MAX_ACTIVE_TASKS", 10)
 
+# Score all candidates with one aggregate query instead of per-annotator lookups
+BATCH_ASSIGNMENT_SCORING = getattr(settings, "ANNOTATOR_BATCH_ASSIGNMENT_SCORING", True)
+
 # Capacity limits based on trust level (increased for better testing and real-world usage)
 CAPACITY_LIMITS = {
     "new": 50,
@@ -77,6 +82,207 @@ class AssignmentEngine:
 
         return total_score
 
+    @staticmethod
+    def calculate_assignment_scores(annotators, project):
+        """
+        Batch version of calculate_assignment_score for a whole candidate set
+
+        All per-annotator aggregates (active, completed and total task
+        assignments) are fetched with one annotated query and the weighted
+        35/25/20/15/5 formula is evaluated on NumPy arrays, so scoring N
+        annotators costs a single round-trip instead of ~4N.
+
+        Args:
+            annotators: AnnotatorProfile queryset
+            project: Project instance
+
+        Returns:
+            List of (annotator, score) tuples for annotators with score > 0,
+            sorted by score (highest first, ties keep queryset order)
+        """
+        if not annotators.ordered:
+            annotators = annotators.order_by("id")
+
+        annotators = list(
+            annotators.select_related("user", "trust_level").annotate(
+                active_tasks_count=Count(
+                    "task_assignments",
+                    filter=Q(task_assignments__status__in=["assigned", "in_progress"]),
+                ),
+                completed_tasks_count=Count(
+                    "task_assignments",
+                    filter=Q(task_assignments__status="completed"),
+                ),
+                total_tasks_count=Count("task_assignments"),
+            )
+        )
+        if not annotators:
+            return []
+
+        scores = (
+            0
+            + AssignmentEngine._batch_skill_match(annotators, project) * 0.35
+            + AssignmentEngine._batch_trust_score(annotators, project) * 0.25
+            + AssignmentEngine._batch_availability_score(annotators) * 0.20
+            + AssignmentEngine._batch_performance_score(annotators) * 0.15
+            + AssignmentEngine._batch_cost_efficiency(annotators) * 0.05
+        )
+
+        ranked = np.argsort(-scores, kind="stable")
+        return [
+            (annotators[i], float(scores[i])) for i in ranked if scores[i] > 0
+        ]
+
+    @staticmethod
+    def _get_loaded_trust_level(annotator):
+        """Return the select_related trust level or None without querying"""
+        try:
+            return annotator.trust_level
+        except TrustLevel.DoesNotExist:
+            return None
+
+    @staticmethod
+    def _batch_skill_match(annotators, project):
+        """Vectorised _calculate_skill_match (0-100)"""
+        required_skills = getattr(project, "required_skills", []) or []
+        if not required_skills:
+            return np.full(len(annotators), 100.0)
+
+        annotation_type = AssignmentEngine._extract_annotation_type(project)
+        scores = np.empty(len(annotators))
+        for i, annotator in enumerate(annotators):
+            try:
+                annotator_skills = annotator.skills or []
+                if annotation_type not in annotator_skills:
+                    scores[i] = 0
+                    continue
+                matched_skills = len(set(required_skills) & set(annotator_skills))
+                scores[i] = 40 + (matched_skills / len(required_skills)) * 60
+            except Exception as e:
+                logger.warning(f"Error calculating skill match: {e}")
+                scores[i] = 50
+
+        return np.minimum(scores, 100)
+
+    @staticmethod
+    def _batch_trust_score(annotators, project):
+        """Vectorised _calculate_trust_score (0-100)"""
+        levels_order = ["new", "junior", "regular", "senior", "expert"]
+        level_scores = {
+            "new": 60,
+            "junior": 70,
+            "regular": 80,
+            "senior": 90,
+            "expert": 100,
+        }
+
+        trust_levels = [
+            AssignmentEngine._get_loaded_trust_level(a) for a in annotators
+        ]
+        has_trust = np.array([t is not None for t in trust_levels])
+        level_names = [t.level if t is not None else "new" for t in trust_levels]
+        base = np.array([level_scores.get(level, 60) for level in level_names], dtype=float)
+        fraud_flags = np.array(
+            [t.fraud_flags if t is not None else 0 for t in trust_levels], dtype=float
+        )
+
+        scores = np.where(fraud_flags > 0, base - fraud_flags * 10, base)
+        scores = np.clip(scores, 0, 100)
+
+        min_trust = getattr(project, "min_trust_level", None)
+        if min_trust:
+            min_index = levels_order.index(min_trust)
+            level_index = np.array([levels_order.index(level) for level in level_names])
+            scores = np.where(level_index < min_index, 0, scores)
+
+        return np.where(has_trust, scores, 50.0)
+
+    @staticmethod
+    def _batch_availability_score(annotators):
+        """Vectorised _calculate_availability_score (0-100)"""
+        now = timezone.now()
+        count = len(annotators)
+
+        accepting = np.array(
+            [getattr(a, "is_accepting_work", True) for a in annotators], dtype=bool
+        )
+        active_tasks = np.array([a.active_tasks_count for a in annotators], dtype=float)
+        max_capacity = np.empty(count)
+        for i, annotator in enumerate(annotators):
+            trust_level = AssignmentEngine._get_loaded_trust_level(annotator)
+            max_capacity[i] = (
+                CAPACITY_LIMITS.get(trust_level.level, 10) if trust_level else 10
+            )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            capacity_score = np.where(
+                max_capacity > 0, (1 - active_tasks / max_capacity) * 50, 0
+            )
+        scores = 0 + np.maximum(0, capacity_score)
+
+        recency_score = np.full(count, 15.0)
+        for i, annotator in enumerate(annotators):
+            if annotator.last_active:
+                days_since_active = (now - annotator.last_active).days
+                recency_score[i] = max(0, (7 - days_since_active) / 7) * 30
+        scores = scores + recency_score
+
+        preferred_hours = np.array(
+            [getattr(a, "preferred_hours_per_week", 20) for a in annotators], dtype=float
+        )
+        scores = scores + np.where(
+            preferred_hours >= 20, 20, (preferred_hours / 20) * 20
+        )
+
+        return np.where(accepting, np.minimum(scores, 100), 0)
+
+    @staticmethod
+    def _batch_performance_score(annotators):
+        """Vectorised _calculate_performance_score (0-100)"""
+        accuracy = np.array(
+            [float(a.accuracy_score or 0) for a in annotators], dtype=float
+        )
+        completed = np.array([a.completed_tasks_count for a in annotators], dtype=float)
+        assigned = np.array([a.total_tasks_count for a in annotators], dtype=float)
+        rejection_rate = np.array(
+            [float(a.rejection_rate or 0) for a in annotators], dtype=float
+        )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            completion_rate = np.where(assigned > 0, completed / assigned * 100, 80)
+        consistency_score = np.maximum(0, 100 - rejection_rate * 2)
+
+        scores = (
+            0 + accuracy * 0.4 + completion_rate * 0.3 + consistency_score * 0.3
+        )
+        return np.minimum(scores, 100)
+
+    @staticmethod
+    def _batch_cost_efficiency(annotators):
+        """
+        Vectorised _calculate_cost_efficiency (0-100)
+
+        Annotators without a trust level are scored with the default TrustLevel
+        multiplier instead of creating the row, keeping the batch path read-only.
+        """
+        default_multiplier = float(TrustLevel._meta.get_field("multiplier").default)
+        multipliers = np.array(
+            [
+                float(t.multiplier) if t is not None else default_multiplier
+                for t in (AssignmentEngine._get_loaded_trust_level(a) for a in annotators)
+            ],
+            dtype=float,
+        )
+        accuracy = np.array(
+            [float(a.accuracy_score or 70) for a in annotators], dtype=float
+        )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            quality_per_cost = np.where(
+                multipliers > 0, accuracy / multipliers, accuracy
+            )
+        return np.minimum(quality_per_cost, 100)
+
     @staticmethod
     def _calculate_skill_match(annotator, project):
         """Calculate skill matching score (0-100)"""
@@ -310,16 +516,20 @@ class AssignmentEngine:
             f"[AssignmentEngine] After requirements filter: {available_annotators.count()}"
         )
 
-        # Calculate scores for each annotator
-        annotator_scores = []
-        for annotator in available_annotators:
-            score = AssignmentEngine.calculate_assignment_score(annotator, project)
-            print(f"[AssignmentEngine] Annotator {annotator.user.email} score: {score}")
-            if score > 0:  # Only include qualified annotators
-                annotator_scores.append((annotator, score))
-
-        # Sort by score (highest first)
-        annotator_scores.sort(key=lambda x: x[1], reverse=True)
+        # Calculate scores for each annotator (sorted highest first)
+        if BATCH_ASSIGNMENT_SCORING:
+            annotator_scores = AssignmentEngine.calculate_assignment_scores(
+                available_annotators, project
+            )
+        else:
+            annotator_scores = []
+            for annotator in available_annotators:
+                score = AssignmentEngine.calculate_assignment_score(annotator, project)
+                print(f"[AssignmentEngine] Annotator {annotator.user.email} score: {score}")
+                if score > 0:  # Only include qualified annotators
+                    annotator_scores.append((annotator, score))
+
+            annotator_scores.sort(key=lambda x: x[1], reverse=True)
         print(f"[AssignmentEngine] Annotators with score > 0: {len(annotator_scores)}")
 
         # Determine how many annotators to assign
@@ -775,8 +985,8 @@ class AssignmentEngine:
         return assignment
 
     @staticmethod
-    def check_annotator_capacity(annotator):
-        """Check annotator's current capacity"""
+    def get_capacity_limit(annotator):
+        """Maximum number of active tasks for an annotator"""
         try:
             trust_level = annotator.trust_level.level
             max_tasks = CAPACITY_LIMITS.get(trust_level, 10)
@@ -788,9 +998,16 @@ class AssignmentEngine:
         if custom_max:
             max_tasks = min(max_tasks, custom_max)
 
-        active_count = TaskAssignment.objects.filter(
-            annotator=annotator, status__in=["assigned", "in_progress"]
-        ).count()
+        return max_tasks
+
+    @staticmethod
+    def check_annotator_capacity(annotator):
+        """Check annotator's current capacity"""
+        from .capacity_ledger import CapacityLedger
+
+        max_tasks = AssignmentEngine.get_capacity_limit(annotator)
+
+        active_count = CapacityLedger.get_annotator(annotator.id)["active"]
 
         return {
             "current": active_count,
@@ -816,7 +1033,9 @@ class AssignmentEngine:
         return assignments
 
     @staticmethod
-    def distribute_tasks_intelligently(project, annotators, required_overlap=3):
+    def distribute_tasks_intelligently(
+        project, annotators, required_overlap=3, dry_run=False
+    ):
         """
         Intelligently distribute tasks with rotating assignment pattern.
 
@@ -832,14 +1051,22 @@ class AssignmentEngine:
         - Respects capacity limits: Skip annotators at capacity
         - If all annotators at capacity: Hold remaining tasks for later assignment
 
+        The distribution is planned in memory from bulk-loaded assignment pairs
+        and capacities, then written with chunked bulk_create
+        (see TaskDistributionPlanner).
+
         Args:
             project: Project instance
             annotators: List of AnnotatorProfile instances (already sorted by score)
             required_overlap: Number of annotators per task (default 3)
+            dry_run: If True, only compute the plan and return it under "plan"
+                as a list of (task_id, annotator_id) pairs without writing
 
         Returns:
             Dict with assignment statistics
         """
+        from .distribution_planner import TaskDistributionPlanner
+
         if not annotators:
             logger.warning(f"No annotators available for project {project.id}")
             return {"assigned_tasks": 0, "annotators_used": 0}
@@ -848,199 +1075,40 @@ class AssignmentEngine:
         if required_overlap == 1:  # Default parameter
             required_overlap = getattr(project, "required_overlap", 3)
 
+        annotators = list(annotators)
         logger.info(
             f"Distributing tasks with required_overlap={required_overlap} "
             f"across {len(annotators)} annotators: "
             f"{[a.user.email for a in annotators]}"
         )
 
-        # Get all tasks that need more assignments
-        all_tasks = list(
-            project.tasks.annotate(assignments_count=Count("annotator_assignments"))
-            .filter(assignments_count__lt=required_overlap)
-            .order_by("id")
+        plan = TaskDistributionPlanner.plan_intelligent_distribution(
+            project, annotators, required_overlap
         )
 
-        if not all_tasks:
+        if not plan["tasks"]:
             logger.info(f"No tasks to assign for project {project.id}")
             return {"assigned_tasks": 0, "annotators_used": 0}
 
-        logger.info(f"Found {len(all_tasks)} tasks needing assignment")
-
-        # Track annotator capacities
-        annotator_capacities = {}
-        for annotator in annotators:
-            capacity_info = AssignmentEngine.check_annotator_capacity(annotator)
-            annotator_capacities[annotator.id] = {
-                "annotator": annotator,
-                "current": capacity_info["current"],
-                "maximum": capacity_info["maximum"],
-                "available": capacity_info["available"],
-            }
-
-        total_assignments = 0
-        annotators_used = set()
-        tasks_fully_assigned = 0
-        tasks_partially_assigned = 0
-        tasks_waiting = 0
-
-        # Determine strategy based on annotator count
-        num_annotators = len(annotators)
-
-        if num_annotators <= required_overlap:
-            # Strategy 1: Assign ALL tasks to ALL annotators (e.g., 50-50-50)
-            logger.info(
-                f"Using ALL-TO-ALL strategy: {num_annotators} annotators <= {required_overlap} required"
-            )
-
-            with transaction.atomic():
-                for task in all_tasks:
-                    # Get already assigned annotators
-                    already_assigned = set(
-                        TaskAssignment.objects.filter(task=task).values_list(
-                            "annotator_id", flat=True
-                        )
-                    )
-
-                    assigned_to_task = len(already_assigned)
-                    needed = task.target_assignment_count - assigned_to_task
-
-                    if needed <= 0:
-                        continue
+        logger.info(
+            f"Found {plan['tasks']} tasks needing assignment, "
+            f"planned {len(plan['assignments'])} assignments "
+            f"({'ALL-TO-ALL' if len(annotators) <= required_overlap else 'ROTATING'} strategy)"
+        )
 
-                    # Try to assign to ALL available annotators
-                    for annotator in annotators:
-                        if annotator.id in already_assigned:
-                            continue
-
-                        capacity = annotator_capacities[annotator.id]
-                        if capacity["available"] <= 0:
-                            # Refresh capacity
-                            capacity_info = AssignmentEngine.check_annotator_capacity(
-                                annotator
-                            )
-                            capacity["available"] = capacity_info["available"]
-                            if capacity["available"] <= 0:
-                                continue
-
-                        # Create assignment
-                        try:
-                            assignment = AssignmentEngine._create_task_assignment(
-                                annotator, task, project
-                            )
-                            if assignment:
-                                total_assignments += 1
-                                assigned_to_task += 1
-                                annotators_used.add(annotator.id)
-                                capacity["available"] -= 1
-                                capacity["current"] += 1
-                        except Exception as e:
-                            logger.error(
-                                f"Error assigning task {task.id} to {annotator.user.email}: {e}"
-                            )
-
-                    if assigned_to_task >= task.target_assignment_count:
-                        tasks_fully_assigned += 1
+        if dry_run:
+            total_assignments = len(plan["assignments"])
         else:
-            # Strategy 2: Rotating assignment across annotators
-            logger.info(
-                f"Using ROTATING strategy: {num_annotators} annotators > {required_overlap} required"
-            )
-
-            # Start rotation from index 0
-            rotation_index = 0
-
-            with transaction.atomic():
-                for task_idx, task in enumerate(all_tasks):
-                    # Get already assigned annotators
-                    already_assigned = set(
-                        TaskAssignment.objects.filter(task=task).values_list(
-                            "annotator_id", flat=True
-                        )
-                    )
-
-                    assigned_to_task = len(already_assigned)
-                    needed = task.target_assignment_count - assigned_to_task
-
-                    if needed <= 0:
-                        tasks_fully_assigned += 1
-                        continue
-
-                    # Try to assign required_overlap annotators using rotation
-                    attempts = 0
-                    max_attempts = num_annotators * 2  # Prevent infinite loop
-
-                    while (
-                        assigned_to_task < task.target_assignment_count
-                        and attempts < max_attempts
-                    ):
-                        # Get next annotator in rotation
-                        annotator = annotators[rotation_index % num_annotators]
-                        rotation_index += 1
-                        attempts += 1
-
-                        # Skip if already assigned
-                        if annotator.id in already_assigned:
-                            continue
-
-                        # Check capacity
-                        capacity = annotator_capacities[annotator.id]
-                        if capacity["available"] <= 0:
-                            # Refresh capacity
-                            capacity_info = AssignmentEngine.check_annotator_capacity(
-                                annotator
-                            )
-                            capacity["available"] = capacity_info["available"]
-                            if capacity["available"] <= 0:
-                                continue
-
-                        # Create assignment
-                        try:
-                            assignment = AssignmentEngine._create_task_assignment(
-                                annotator, task, project
-                            )
-                            if assignment:
-                                total_assignments += 1
-                                assigned_to_task += 1
-                                annotators_used.add(annotator.id)
-                                already_assigned.add(annotator.id)
-                                capacity["available"] -= 1
-                                capacity["current"] += 1
-
-                                logger.debug(
-                                    f"Task {task.id}: Assigned to {annotator.user.email} "
-                                    f"({assigned_to_task}/{task.target_assignment_count})"
-                                )
-                        except Exception as e:
-                            logger.error(
-                                f"Error assigning task {task.id} to {annotator.user.email}: {e}"
-                            )
-
-                    if assigned_to_task >= task.target_assignment_count:
-                        tasks_fully_assigned += 1
-                        # TODO: Trigger consolidation check when ready
-                        # AssignmentEngine._trigger_consolidation_if_ready(task)
-                        logger.debug(
-                            f"✅ Task {task.id} FULLY assigned ({assigned_to_task}/{task.target_assignment_count})"
-                        )
-                    elif assigned_to_task > 0:
-                        tasks_partially_assigned += 1
-                        logger.warning(
-                            f"⚠️ Task {task.id} PARTIALLY assigned ({assigned_to_task}/{task.target_assignment_count}) - "
-                            f"waiting for more annotators or capacity"
-                        )
-                    else:
-                        tasks_waiting += 1
-                        logger.warning(
-                            f"⏸️ Task {task.id} NOT assigned (0/{task.target_assignment_count}) - "
-                            f"all annotators at capacity"
-                        )
+            total_assignments = TaskDistributionPlanner.apply_plan(project, plan["assignments"])
+        tasks_fully_assigned = plan["tasks_fully_assigned"]
+        tasks_partially_assigned = plan["tasks_partially_assigned"]
+        tasks_waiting = plan["tasks_waiting"]
 
         logger.info(
-            f"📈 Task distribution complete:\n"
-            f"  - Total tasks: {len(all_tasks)}\n"
+            f"📈 Task distribution {'planned' if dry_run else 'complete'}:\n"
+            f"  - Total tasks: {plan['tasks']}\n"
             f"  - Assignments created: {total_assignments}\n"
-            f"  - Annotators used: {len(annotators_used)}\n"
+            f"  - Annotators used: {len(plan['annotators_used'])}\n"
             f"  - Fully assigned (3/3): {tasks_fully_assigned}\n"
             f"  - Partially assigned (<3): {tasks_partially_assigned}\n"
             f"  - Waiting (0): {tasks_waiting}"
@@ -1054,15 +1122,19 @@ class AssignmentEngine:
                 f"Will auto-assign when new annotators become available."
             )
 
-        return {
-            "assigned_tasks": len(all_tasks),
+        result = {
+            "assigned_tasks": plan["tasks"],
             "total_assignments": total_assignments,
-            "annotators_used": len(annotators_used),
+            "annotators_used": len(plan["annotators_used"]),
             "tasks_fully_assigned": tasks_fully_assigned,
             "tasks_partially_assigned": tasks_partially_assigned,
             "tasks_waiting": tasks_waiting,
             "incomplete_tasks": incomplete_count,
         }
+        if dry_run:
+            result["plan"] = plan["assignments"]
+
+        return result
 
     @staticmethod
     def reassign_incomplete_tasks(project):
@@ -1633,7 +1705,7 @@ class DynamicAssignmentEngine:
         return assignments_created
     
     @classmethod
-    def _distribute_with_rotation(cls, project, annotators, effective_overlap):
+    def _distribute_with_rotation(cls, project, annotators, effective_overlap, dry_run=False):
         """
         Distribute tasks using priority-weighted rotation.
         
@@ -1650,97 +1722,36 @@ class DynamicAssignmentEngine:
         - Speed: Work is distributed across all annotators for faster completion
         - Balance: No single annotator gets overwhelmed
         
-        Returns count of new assignments created.
-        """
-        from tasks.models import Task
-        
-        assignments_created = 0
-        
-        # Get tasks needing assignment
-        tasks = list(
-            project.tasks.annotate(
-                active_count=Count(
-                    'annotator_assignments',
-                    filter=models.Q(annotator_assignments__status__in=['assigned', 'in_progress', 'completed'])
-                )
-            ).filter(
-                active_count__lt=models.F('target_assignment_count')
-            ).order_by('id')
-        )
+        The plan is computed in memory (TaskDistributionPlanner.plan_rotation)
+        and written with chunked bulk_create unless dry_run is set.
         
-        if not tasks:
-            return 0
+        Returns count of new assignments created (or planned, for dry_run).
+        """
+        from .distribution_planner import TaskDistributionPlanner
         
         # Build annotator list (already sorted by trust level)
         annotator_list = list(annotators)
-        num_annotators = len(annotator_list)
         
-        # Track current assignments per annotator for load balancing
-        annotator_load = {a.id: 0 for a in annotator_list}
+        plan = TaskDistributionPlanner.plan_rotation(project, annotator_list, effective_overlap)
+        if not plan["assignments"]:
+            return 0
         
-        for task in tasks:
-            # Get already assigned annotators for this task
-            already_assigned_ids = set(
-                TaskAssignment.objects.filter(task=task).values_list('annotator_id', flat=True)
-            )
-            
-            active_count = task.active_count
-            needed = task.target_assignment_count - active_count
-            
-            # Get candidates sorted by priority score
-            # Score = trust_priority * 10 - current_load (higher = better)
-            # This prioritizes high trust but balances workload
-            candidates = []
-            for annotator in annotator_list:
-                if annotator.id in already_assigned_ids:
-                    continue
-                
-                # Check if can work and has capacity
-                can_work, _ = cls._can_annotator_work_on_task(annotator, task)
-                if not can_work:
-                    continue
-                
-                capacity = AssignmentEngine.check_annotator_capacity(annotator)
-                if capacity['at_capacity']:
-                    continue
-                
-                # Calculate priority score
-                try:
-                    level = annotator.trust_level.level if annotator.trust_level else "new"
-                except:
-                    level = "new"
-                trust_priority = TRUST_LEVEL_PRIORITY.get(level, 1)
-                
-                # Score balances trust priority with workload
-                # Multiply trust by 10 to make it dominant, subtract load for balance
-                score = (trust_priority * 10) - annotator_load.get(annotator.id, 0)
-                
-                candidates.append((annotator, score))
-            
-            # Sort candidates by score (higher = better)
-            candidates.sort(key=lambda x: x[1], reverse=True)
-            
-            # Assign to top candidates
-            for annotator, score in candidates[:needed]:
-                try:
-                    assignment = cls._safe_create_assignment(annotator, task, project)
-                    if assignment:
-                        assignments_created += 1
-                        annotator_load[annotator.id] = annotator_load.get(annotator.id, 0) + 1
-                        needed -= 1
-                except Exception as e:
-                    logger.error(f"Error creating assignment: {e}")
+        if dry_run:
+            assignments_created = len(plan["assignments"])
+        else:
+            assignments_created = TaskDistributionPlanner.apply_plan(project, plan["assignments"])
+        
+        annotator_load = plan["load"]
         
         # Log distribution summary
-        if assignments_created > 0:
-            load_summary = {
-                a.user.email: annotator_load[a.id] 
-                for a in annotator_list if annotator_load[a.id] > 0
-            }
-            logger.info(
-                f"[DynamicAssignment] Distributed {assignments_created} assignments. "
-                f"Load distribution: {load_summary}"
-            )
+        load_summary = {
+            a.user.email: annotator_load[a.id] 
+            for a in annotator_list if annotator_load[a.id] > 0
+        }
+        logger.info(
+            f"[DynamicAssignment] Distributed {assignments_created} assignments. "
+            f"Load distribution: {load_summary}"
+        )
         
         return assignments_created
     
@@ -0,0 +1,343 @@
+"""
+Capacity ledger for annotators and experts.
+
+Capacity checks used to COUNT active TaskAssignment / ExpertReviewTask rows on
+every call, and the assignment loops call them repeatedly. The ledger keeps the
+counts in one Redis hash per annotator/expert instead:
+
+    capacity_ledger:annotator:<id> -> {active, in_progress, project:<id>..., _v}
+    capacity_ledger:expert:<id>    -> {active, in_progress, _v}
+
+The hashes are updated with HINCRBY from the TaskAssignment / ExpertReviewTask
+save and delete signals (see annotators.signals) and from bulk writers, so a
+capacity read is a single HGETALL.
+
+A hash is only trusted when its "_v" marker is present. Increments that hit a
+missing key create a partial hash without the marker, which is discarded and
+rebuilt from the database on the next read. Without Redis every read falls back
+to the database counts. The ledger does not PING Redis before each call: an
+unreachable Redis shows up as the exception of the call itself, which falls
+back the same way. Drift from bulk .update() calls that bypass signals is
+repaired by the reconcile_capacity_ledger management command.
+"""
+
+import logging
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django_rq import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+# Redis keys
+CAPACITY_LEDGER_KEY_PREFIX = getattr(settings, "CAPACITY_LEDGER_REDIS_KEY_PREFIX", "capacity_ledger")
+CAPACITY_LEDGER_TTL = getattr(settings, "CAPACITY_LEDGER_REDIS_TTL", 86400)  # 24 hours
+LEDGER_VERSION_FIELD = "_v"
+
+ANNOTATOR = "annotator"
+EXPERT = "expert"
+
+# Statuses that occupy capacity, and the subset that is actively being worked on
+ACTIVE_STATUSES = {
+    ANNOTATOR: ("assigned", "in_progress"),
+    EXPERT: ("pending", "in_review"),
+}
+IN_PROGRESS_STATUSES = {
+    ANNOTATOR: ("in_progress",),
+    EXPERT: ("in_review",),
+}
+
+
+def _connection():
+    """Redis connection for the ledger, or None when Redis is disabled"""
+    if not settings.REDIS_ENABLED:
+        return None
+    return get_connection()
+
+
+def _key(kind, owner_id):
+    return f"{CAPACITY_LEDGER_KEY_PREFIX}:{kind}:{owner_id}"
+
+
+def _project_field(project_id):
+    return f"project:{project_id}"
+
+
+def _empty_entry():
+    return {"active": 0, "in_progress": 0, "projects": {}}
+
+
+def status_deltas(kind, old_status, new_status):
+    """
+    Return the (active, in_progress) deltas for a status transition.
+
+    old_status is None for newly created rows, new_status is None for deleted rows.
+    """
+    active = ACTIVE_STATUSES[kind]
+    in_progress = IN_PROGRESS_STATUSES[kind]
+    return (
+        (new_status in active) - (old_status in active),
+        (new_status in in_progress) - (old_status in in_progress),
+    )
+
+
+class CapacityLedger:
+    """
+    O(1) capacity reads for annotators and experts, backed by Redis with a
+    database fallback.
+    """
+
+    # ------------------------------------------------------------------
+    # Database source of truth
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def compute_from_db(kind, owner_ids):
+        """
+        Count active work for many annotators/experts with one grouped query.
+
+        Returns:
+            {owner_id: {"active", "in_progress", "projects": {project_id: active}}}
+        """
+        entries = {owner_id: _empty_entry() for owner_id in owner_ids}
+        if not entries:
+            return entries
+
+        if kind == ANNOTATOR:
+            from .models import TaskAssignment
+
+            rows = (
+                TaskAssignment.objects.filter(
+                    annotator_id__in=list(entries), status__in=ACTIVE_STATUSES[ANNOTATOR]
+                )
+                .values("annotator_id", "task__project_id")
+                .annotate(
+                    active=Count("id"),
+                    in_progress=Count("id", filter=Q(status__in=IN_PROGRESS_STATUSES[ANNOTATOR])),
+                )
+                .values_list("annotator_id", "task__project_id", "active", "in_progress")
+            )
+            for owner_id, project_id, active, in_progress in rows:
+                entry = entries[owner_id]
+                entry["active"] += active
+                entry["in_progress"] += in_progress
+                entry["projects"][project_id] = active
+        else:
+            from .models import ExpertReviewTask
+
+            rows = (
+                ExpertReviewTask.objects.filter(
+                    expert_id__in=list(entries), status__in=ACTIVE_STATUSES[EXPERT]
+                )
+                .values("expert_id")
+                .annotate(
+                    active=Count("id"),
+                    in_progress=Count("id", filter=Q(status__in=IN_PROGRESS_STATUSES[EXPERT])),
+                )
+                .values_list("expert_id", "active", "in_progress")
+            )
+            for owner_id, active, in_progress in rows:
+                entries[owner_id]["active"] = active
+                entries[owner_id]["in_progress"] = in_progress
+
+        return entries
+
+    # ------------------------------------------------------------------
+    # Redis storage
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _decode(raw):
+        """Decode an HGETALL result, or return None if the hash is not initialized"""
+        if not raw:
+            return None
+        raw = {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in raw.items()
+        }
+        if LEDGER_VERSION_FIELD not in raw:
+            return None
+
+        entry = _empty_entry()
+        entry["active"] = raw.get("active", 0)
+        entry["in_progress"] = raw.get("in_progress", 0)
+        for field, value in raw.items():
+            if field.startswith("project:"):
+                entry["projects"][int(field.split(":", 1)[1])] = value
+        return entry
+
+    @staticmethod
+    def _write(redis_client, kind, entries):
+        """Overwrite ledger hashes with freshly computed entries"""
+        pipe = redis_client.pipeline(transaction=True)
+        for owner_id, entry in entries.items():
+            key = _key(kind, owner_id)
+            mapping = {
+                LEDGER_VERSION_FIELD: 1,
+                "active": entry["active"],
+                "in_progress": entry["in_progress"],
+            }
+            for project_id, active in entry["projects"].items():
+                mapping[_project_field(project_id)] = active
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, CAPACITY_LEDGER_TTL)
+        pipe.execute()
+
+    @classmethod
+    def get_many(cls, kind, owner_ids):
+        """
+        Read ledger entries for many annotators/experts.
+
+        Entries missing from Redis are rebuilt from the database with a single
+        grouped query and written back.
+        """
+        owner_ids = list(owner_ids)
+        redis_client = _connection()
+        if redis_client is None:
+            return cls.compute_from_db(kind, owner_ids)
+
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for owner_id in owner_ids:
+                pipe.hgetall(_key(kind, owner_id))
+            raw_entries = pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to read capacity ledger: {e}")
+            return cls.compute_from_db(kind, owner_ids)
+
+        entries = {}
+        missing = []
+        for owner_id, raw in zip(owner_ids, raw_entries):
+            entry = cls._decode(raw)
+            if entry is None:
+                missing.append(owner_id)
+            else:
+                entries[owner_id] = entry
+
+        if missing:
+            rebuilt = cls.compute_from_db(kind, missing)
+            try:
+                cls._write(redis_client, kind, rebuilt)
+            except Exception as e:
+                logger.error(f"Failed to rebuild capacity ledger: {e}")
+            entries.update(rebuilt)
+
+        return entries
+
+    @classmethod
+    def get(cls, kind, owner_id):
+        """Read one ledger entry: {"active", "in_progress", "projects"}"""
+        return cls.get_many(kind, [owner_id])[owner_id]
+
+    @classmethod
+    def get_annotator(cls, annotator_id):
+        return cls.get(ANNOTATOR, annotator_id)
+
+    @classmethod
+    def get_expert(cls, expert_id):
+        return cls.get(EXPERT, expert_id)
+
+    @classmethod
+    def adjust_many(cls, kind, changes):
+        """
+        Apply counter deltas atomically.
+
+        Args:
+            kind: ANNOTATOR or EXPERT
+            changes: iterable of (owner_id, project_id, active_delta, in_progress_delta);
+                project_id may be None for experts
+        """
+        redis_client = _connection()
+        if redis_client is None:
+            return
+
+        totals = defaultdict(Counter)
+        for owner_id, project_id, active_delta, in_progress_delta in changes:
+            if active_delta:
+                totals[owner_id]["active"] += active_delta
+                if project_id is not None:
+                    totals[owner_id][_project_field(project_id)] += active_delta
+            if in_progress_delta:
+                totals[owner_id]["in_progress"] += in_progress_delta
+
+        if not totals:
+            return
+
+        try:
+            pipe = redis_client.pipeline(transaction=True)
+            for owner_id, fields in totals.items():
+                key = _key(kind, owner_id)
+                for field, delta in fields.items():
+                    if delta:
+                        pipe.hincrby(key, field, delta)
+                pipe.expire(key, CAPACITY_LEDGER_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to update capacity ledger: {e}")
+
+    @classmethod
+    def record_transition(cls, kind, owner_id, old_status, new_status, project_id=None):
+        """Update the ledger for one row moving from old_status to new_status"""
+        active_delta, in_progress_delta = status_deltas(kind, old_status, new_status)
+        if active_delta or in_progress_delta:
+            cls.adjust_many(kind, [(owner_id, project_id, active_delta, in_progress_delta)])
+
+    @classmethod
+    def record_bulk_assignments(cls, project_id, assignments):
+        """Count freshly bulk-created (task_id, annotator_id) assignments as active"""
+        cls.adjust_many(
+            ANNOTATOR,
+            [(annotator_id, project_id, 1, 0) for _, annotator_id in assignments],
+        )
+
+    @classmethod
+    def invalidate(cls, kind, owner_ids):
+        """Drop ledger entries so they are rebuilt from the database on next read"""
+        owner_ids = list(owner_ids)
+        redis_client = _connection()
+        if not owner_ids or redis_client is None:
+            return
+        try:
+            redis_client.delete(*[_key(kind, owner_id) for owner_id in owner_ids])
+        except Exception as e:
+            logger.error(f"Failed to invalidate capacity ledger: {e}")
+
+    @classmethod
+    def reconcile(cls, kind, owner_ids, dry_run=False):
+        """
+        Compare ledger entries with database counts and repair drift.
+
+        Returns:
+            List of (owner_id, ledger_entry, db_entry) for entries that drifted
+        """
+        owner_ids = list(owner_ids)
+        redis_client = _connection()
+        if not owner_ids or redis_client is None:
+            return []
+
+        pipe = redis_client.pipeline(transaction=False)
+        for owner_id in owner_ids:
+            pipe.hgetall(_key(kind, owner_id))
+        ledger_entries = dict(zip(owner_ids, (cls._decode(raw) for raw in pipe.execute())))
+
+        db_entries = cls.compute_from_db(kind, owner_ids)
+        drifted = []
+        for owner_id, db_entry in db_entries.items():
+            ledger_entry = ledger_entries.get(owner_id)
+            if ledger_entry is None:
+                continue  # Not cached, will be built from the database on read
+            ledger_projects = {p: c for p, c in ledger_entry["projects"].items() if c}
+            if (
+                ledger_entry["active"] != db_entry["active"]
+                or ledger_entry["in_progress"] != db_entry["in_progress"]
+                or ledger_projects != db_entry["projects"]
+            ):
+                drifted.append((owner_id, ledger_entry, db_entry))
+
+        if drifted and not dry_run:
+            cls._write(redis_client, kind, {owner_id: db for owner_id, _, db in drifted})
+
+        return drifted
@@ -8,7 +8,9 @@ Handles:
 - Payment release based on consensus quality
 """
 
+from collections import defaultdict
 from decimal import Decimal
+from django.conf import settings
 from django.db import transaction
 from django.db.models import Avg, Count
 from django.utils import timezone
@@ -17,6 +19,28 @@ import json
 from typing import List, Dict, Any, Optional, Tuple
 from itertools import combinations
 
+import numpy as np
+
+from .geometry import (
+    BoxArray,
+    best_iou_matches,
+    center_distance_matrix,
+    iou_matrix,
+    linear_sum_assignment,
+    rect_results_to_array,
+)
+from .masks import (
+    brush_item_mask,
+    majority_vote,
+    mask_iou,
+    mask_iou_matrix,
+    mask_to_polygon,
+    mask_to_rle,
+    rasterize_polygon,
+    resize_mask,
+    shape_for_items,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -154,6 +178,11 @@ class BoundingBoxConsolidation(ConsolidationStrategy):
     IOU_THRESHOLD = 0.2  # Minimum IoU to consider boxes as same object
     SPATIAL_DISTANCE_THRESHOLD = 0.25  # 25% of image size for spatial proximity
     MIN_ANNOTATOR_AGREEMENT = 0.5  # At least 50% of annotators must agree on an object
+    CLUSTER_AVERAGE_IOU_FACTOR = 0.8  # Slightly lower threshold against the cluster average
+    CLUSTER_SCAN_WINDOW = 64  # Candidates tested per vectorised step in greedy clustering
+
+    # "greedy" (left-to-right seed clustering) or "hungarian" (optimal matching)
+    CLUSTERING_MODE = getattr(settings, "CONSENSUS_BOX_CLUSTERING_MODE", "greedy")
 
     @staticmethod
     def consolidate(annotations: List[Dict]) -> Tuple[Dict, float]:
@@ -230,7 +259,7 @@ class BoundingBoxConsolidation(ConsolidationStrategy):
 
     @staticmethod
     def _cluster_boxes(
-        labeled_boxes: List[Dict], num_annotators: int
+        labeled_boxes: List[Dict], num_annotators: int, mode: str = None
     ) -> List[List[Dict]]:
         """
         Cluster boxes that likely represent the same object.
@@ -240,111 +269,141 @@ class BoundingBoxConsolidation(ConsolidationStrategy):
         - Spatial distance (center-to-center)
         - One box per annotator per cluster (prevents duplicate counting)
 
+        Args:
+            mode: "greedy" or "hungarian", defaults to CLUSTERING_MODE
+
         Returns list of clusters, where each cluster is a list of box dicts with 'box' and 'annotator_idx'
         """
         if not labeled_boxes:
             return []
 
-        clusters = []
-        used_boxes = set()
+        mode = mode or BoundingBoxConsolidation.CLUSTERING_MODE
+        if mode == "hungarian":
+            return BoundingBoxConsolidation._cluster_boxes_hungarian(labeled_boxes)
+        return BoundingBoxConsolidation._cluster_boxes_greedy(labeled_boxes)
+
+    @staticmethod
+    def _cluster_boxes_greedy(labeled_boxes: List[Dict]) -> List[List[Dict]]:
+        """
+        Seed clustering: boxes are visited left to right, each unused box starts
+        a cluster and absorbs later boxes that match it by IoU or center
+        distance, or that match the running cluster average.
+
+        IoU and center distance from the seed to every candidate are computed
+        in one vectorised pass, and the cluster average is kept as a running sum
+        instead of being re-averaged for every comparison.
+        """
+        cls = BoundingBoxConsolidation
 
         # Sort boxes by x-coordinate for left-to-right processing
         labeled_boxes = sorted(
             labeled_boxes, key=lambda item: item["box"].get("value", {}).get("x", 0)
         )
+        boxes = BoxArray(rect_results_to_array(item["box"] for item in labeled_boxes))
+        annotator_ids = np.array([item["annotator_idx"] for item in labeled_boxes])
+
+        average_threshold = cls.IOU_THRESHOLD * cls.CLUSTER_AVERAGE_IOU_FACTOR
 
-        for i, item in enumerate(labeled_boxes):
-            if i in used_boxes:
+        clusters = []
+        used = np.zeros(len(labeled_boxes), dtype=bool)
+
+        for i in range(len(labeled_boxes)):
+            if used[i]:
                 continue
 
             # Start a new cluster with this box
-            cluster = [item]
-            used_boxes.add(i)
-            annotators_in_cluster = {item["annotator_idx"]}
+            used[i] = True
+            members = [i]
+            total = boxes.coords[i].copy()
+
+            # Candidates in scan order: unused boxes from annotators not yet in
+            # the cluster (every box before i is already used)
+            candidates = np.flatnonzero(~used & (annotator_ids != annotator_ids[i]))
+            direct_match = (
+                boxes.iou(boxes.coords[i], candidates) >= cls.IOU_THRESHOLD
+            ) | (
+                boxes.center_distance(boxes.coords[i], candidates)
+                < cls.SPATIAL_DISTANCE_THRESHOLD
+            )
 
-            # Find all boxes that match this one
-            for j, other_item in enumerate(labeled_boxes):
-                if j in used_boxes:
-                    continue
+            while candidates.size:
+                # Matches are usually close in scan order, so test a window of
+                # candidates at a time instead of everything that is left
+                window = candidates[: cls.CLUSTER_SCAN_WINDOW]
+                matches = direct_match[: cls.CLUSTER_SCAN_WINDOW]
+                if len(members) > 1:
+                    matches = matches | (
+                        boxes.iou(total / len(members), window) >= average_threshold
+                    )
 
-                # Don't add multiple boxes from same annotator to same cluster
-                if other_item["annotator_idx"] in annotators_in_cluster:
+                hit = int(np.argmax(matches))
+                if not matches[hit]:
+                    candidates = candidates[len(window) :]
+                    direct_match = direct_match[len(window) :]
                     continue
 
-                # Check if this box matches the cluster
-                if BoundingBoxConsolidation._boxes_match(
-                    item["box"], other_item["box"], cluster
-                ):
-                    cluster.append(other_item)
-                    used_boxes.add(j)
-                    annotators_in_cluster.add(other_item["annotator_idx"])
+                j = int(window[hit])
+                members.append(j)
+                used[j] = True
+                total += boxes.coords[j]
+
+                # Continue scanning after j, dropping j's annotator
+                keep = annotator_ids[candidates[hit + 1 :]] != annotator_ids[j]
+                candidates = candidates[hit + 1 :][keep]
+                direct_match = direct_match[hit + 1 :][keep]
 
-            clusters.append(cluster)
+            clusters.append([labeled_boxes[k] for k in members])
 
         return clusters
 
     @staticmethod
-    def _boxes_match(
-        box1: Dict, box2: Dict, existing_cluster: List[Dict] = None
-    ) -> bool:
+    def _cluster_boxes_hungarian(labeled_boxes: List[Dict]) -> List[List[Dict]]:
         """
-        Determine if two boxes represent the same object.
+        Optimal clustering: annotators are processed in turn and each
+        annotator's boxes are matched one-to-one against the current cluster
+        averages with the Hungarian algorithm, maximising total IoU.
 
-        Uses both IoU and spatial proximity for robust matching.
-        If existing_cluster provided, checks if box2 matches the cluster centroid.
+        A matched pair must still pass the IoU or center-distance test; boxes
+        left unmatched start new clusters.
         """
-        # Calculate IoU
-        iou = BoundingBoxConsolidation._calculate_iou(box1, box2)
-
-        if iou >= BoundingBoxConsolidation.IOU_THRESHOLD:
-            return True
-
-        # If IoU is low, check spatial proximity (centers are close)
-        distance = BoundingBoxConsolidation._calculate_center_distance(box1, box2)
-
-        if distance < BoundingBoxConsolidation.SPATIAL_DISTANCE_THRESHOLD:
-            # Centers are close - likely same object with different bounding styles
-            return True
-
-        # If we have an existing cluster, check if box2 matches cluster average
-        if existing_cluster and len(existing_cluster) > 1:
-            cluster_boxes = [item["box"] for item in existing_cluster]
-            cluster_avg = BoundingBoxConsolidation._average_boxes(cluster_boxes)
-
-            # Check IoU with cluster average
-            iou_with_avg = BoundingBoxConsolidation._calculate_iou(cluster_avg, box2)
-            if (
-                iou_with_avg >= BoundingBoxConsolidation.IOU_THRESHOLD * 0.8
-            ):  # Slightly lower threshold
-                return True
+        cls = BoundingBoxConsolidation
 
-        return False
+        boxes_by_annotator = defaultdict(list)
+        for item in labeled_boxes:
+            boxes_by_annotator[item["annotator_idx"]].append(item)
 
-    @staticmethod
-    def _calculate_center_distance(box1: Dict, box2: Dict) -> float:
-        """
-        Calculate normalized distance between box centers.
-        Returns value between 0 and ~1.4 (diagonal of unit square).
-        """
-        try:
-            v1 = box1.get("value", {})
-            v2 = box2.get("value", {})
+        clusters = []
+        totals = []
 
-            # Calculate centers
-            center1_x = v1.get("x", 0) + v1.get("width", 0) / 2
-            center1_y = v1.get("y", 0) + v1.get("height", 0) / 2
+        for annotator_idx in sorted(boxes_by_annotator):
+            items = boxes_by_annotator[annotator_idx]
+            coords = rect_results_to_array(item["box"] for item in items)
+            matched = set()
 
-            center2_x = v2.get("x", 0) + v2.get("width", 0) / 2
-            center2_y = v2.get("y", 0) + v2.get("height", 0) / 2
+            if clusters:
+                averages = np.array(
+                    [total / len(cluster) for total, cluster in zip(totals, clusters)]
+                )
+                iou = iou_matrix(averages, coords)
+                distance = center_distance_matrix(averages, coords)
+                acceptable = (iou >= cls.IOU_THRESHOLD) | (
+                    distance < cls.SPATIAL_DISTANCE_THRESHOLD
+                )
 
-            # Normalize to 0-100 coordinate space (percentage coordinates)
-            dx = (center1_x - center2_x) / 100.0
-            dy = (center1_y - center2_y) / 100.0
+                # Prefer high IoU, then close centers; forbid non-matching pairs
+                cost = np.where(acceptable, (1.0 - iou) + distance, len(items) + len(clusters) + 2.0)
+                for row, col in zip(*linear_sum_assignment(cost)):
+                    if acceptable[row, col]:
+                        clusters[row].append(items[col])
+                        totals[row] = totals[row] + coords[col]
+                        matched.add(col)
 
-            return (dx * dx + dy * dy) ** 0.5
+            for col, item in enumerate(items):
+                if col not in matched:
+                    clusters.append([item])
+                    totals.append(coords[col].copy())
 
-        except Exception:
-            return float("inf")
+        return clusters
 
     @staticmethod
     def _extract_boxes(annotation) -> List[Dict]:
@@ -356,42 +415,6 @@ class BoundingBoxConsolidation(ConsolidationStrategy):
                     boxes.append(item)
         return boxes
 
-    @staticmethod
-    def _calculate_iou(box1: Dict, box2: Dict) -> float:
-        """Calculate Intersection over Union for two boxes"""
-        try:
-            v1 = box1.get("value", {})
-            v2 = box2.get("value", {})
-
-            x1_1, y1_1 = v1.get("x", 0), v1.get("y", 0)
-            w1, h1 = v1.get("width", 0), v1.get("height", 0)
-            x2_1, y2_1 = x1_1 + w1, y1_1 + h1
-
-            x1_2, y1_2 = v2.get("x", 0), v2.get("y", 0)
-            w2, h2 = v2.get("width", 0), v2.get("height", 0)
-            x2_2, y2_2 = x1_2 + w2, y1_2 + h2
-
-            # Intersection
-            xi1 = max(x1_1, x1_2)
-            yi1 = max(y1_1, y1_2)
-            xi2 = min(x2_1, x2_2)
-            yi2 = min(y2_1, y2_2)
-
-            inter_width = max(0, xi2 - xi1)
-            inter_height = max(0, yi2 - yi1)
-            inter_area = inter_width * inter_height
-
-            # Union
-            area1 = w1 * h1
-            area2 = w2 * h2
-            union_area = area1 + area2 - inter_area
-
-            return inter_area / union_area if union_area > 0 else 0.0
-
-        except Exception as e:
-            logger.warning(f"Error calculating IoU: {e}")
-            return 0.0
-
     @staticmethod
     def _average_boxes(boxes: List[Dict]) -> Dict:
         """Average multiple boxes into one"""
@@ -426,27 +449,20 @@ class BoundingBoxConsolidation(ConsolidationStrategy):
         if not boxes1 or not boxes2:
             return {"overall": 0.0, "iou": 0.0, "label": 0.0}
 
-        # Calculate average IoU for matching boxes
-        total_iou = 0
-        matched_count = 0
-        label_matches = 0
-
-        for box1 in boxes1:
-            best_iou = 0
-            label_match = False
-
-            for box2 in boxes2:
-                iou = BoundingBoxConsolidation._calculate_iou(box1, box2)
-                if iou > best_iou:
-                    best_iou = iou
-                    label_match = box1.get("value", {}).get(
-                        "rectanglelabels"
-                    ) == box2.get("value", {}).get("rectanglelabels")
+        # Best-overlapping box in ann2 for every box in ann1
+        best, best_ious = best_iou_matches(
+            rect_results_to_array(boxes1), rect_results_to_array(boxes2)
+        )
 
-            total_iou += best_iou
-            matched_count += 1
-            if label_match:
-                label_matches += 1
+        total_iou = sum(best_ious.tolist())
+        matched_count = len(boxes1)
+        label_matches = sum(
+            1
+            for box1, j in zip(boxes1, best.tolist())
+            if j >= 0
+            and box1.get("value", {}).get("rectanglelabels")
+            == boxes2[j].get("value", {}).get("rectanglelabels")
+        )
 
         avg_iou = total_iou / matched_count if matched_count > 0 else 0
         label_agreement = (
@@ -467,32 +483,123 @@ class BoundingBoxConsolidation(ConsolidationStrategy):
 class PolygonConsolidation(ConsolidationStrategy):
     """
     Consolidation for polygon annotations.
-    Uses polygon overlap and weighted point averaging.
+
+    Polygons are rasterized onto a shared working grid, matched across
+    annotators by pixel IoU, majority-voted pixel by pixel and traced back
+    into a polygon.
     """
 
-    OVERLAP_THRESHOLD = 0.4
+    OVERLAP_THRESHOLD = 0.4  # Minimum mask IoU to consider polygons the same object
+    MIN_ANNOTATOR_AGREEMENT = 0.5  # At least 50% of annotators must draw the object
 
     @staticmethod
     def consolidate(annotations: List[Dict]) -> Tuple[Dict, float]:
-        """Consolidate polygons using overlap-based clustering"""
+        """
+        Consolidate polygons:
+        1. Group polygons by label
+        2. Match each annotator's polygons to clusters by mask IoU
+        3. Majority-vote the pixels of each cluster and trace the outline
+        """
         if not annotations:
             return {}, 0.0
 
-        # For now, use voting for labels and average for positions
-        all_polygons = []
-        for ann in annotations:
-            polygons = PolygonConsolidation._extract_polygons(ann)
-            all_polygons.append(polygons)
-
-        if not all_polygons or not all_polygons[0]:
+        all_polygons = [PolygonConsolidation._extract_polygons(ann) for ann in annotations]
+        if not any(all_polygons):
             return annotations[0] if annotations else {}, 0.5
 
-        # Use majority voting for which polygons exist
-        # Then average their positions
-        consolidated = all_polygons[0]  # Start with first annotator
-        confidence = 1.0 / len(annotations)
+        num_annotators = len(all_polygons)
+        shape = shape_for_items(poly for polygons in all_polygons for poly in polygons)
 
-        return consolidated, confidence
+        polygons_by_label = defaultdict(list)
+        for annotator_idx, polygons in enumerate(all_polygons):
+            for poly in polygons:
+                label = tuple(poly.get("value", {}).get("polygonlabels", []))
+                polygons_by_label[label].append(
+                    {
+                        "polygon": poly,
+                        "annotator_idx": annotator_idx,
+                        "mask": PolygonConsolidation._rasterize(poly, shape),
+                    }
+                )
+
+        consolidated_polygons = []
+        all_confidence_scores = []
+
+        for label, items in polygons_by_label.items():
+            for cluster in PolygonConsolidation._cluster_masks(items):
+                if (
+                    len(cluster)
+                    < num_annotators * PolygonConsolidation.MIN_ANNOTATOR_AGREEMENT
+                ):
+                    continue
+
+                masks = [item["mask"] for item in cluster]
+                voted = majority_vote(masks)
+                points = mask_to_polygon(voted)
+                if not points:
+                    continue
+
+                result = cluster[0]["polygon"].copy()
+                result["value"] = {**result.get("value", {}), "points": points}
+                consolidated_polygons.append(result)
+
+                # Confidence: share of annotators who drew it, scaled by how
+                # closely their shapes match the voted mask
+                mean_iou = float(np.mean(mask_iou_matrix(masks, [voted])))
+                all_confidence_scores.append(len(cluster) / num_annotators * mean_iou)
+
+        avg_confidence = (
+            sum(all_confidence_scores) / len(all_confidence_scores)
+            if all_confidence_scores
+            else 0.5
+        )
+
+        return consolidated_polygons, avg_confidence
+
+    @staticmethod
+    def _rasterize(polygon: Dict, shape: Tuple[int, int]) -> np.ndarray:
+        """Working-grid mask of a polygonlabels result item"""
+        return rasterize_polygon(polygon.get("value", {}).get("points", []) or [], shape)
+
+    @staticmethod
+    def _cluster_masks(items: List[Dict]) -> List[List[Dict]]:
+        """
+        Cluster polygons of one label, one polygon per annotator per cluster.
+
+        Annotators are processed in turn. Each annotator's polygons are matched
+        one-to-one to the existing clusters by IoU with the cluster's voted
+        mask; unmatched polygons start new clusters.
+        """
+        clusters: List[List[Dict]] = []
+        cluster_masks: List[np.ndarray] = []
+
+        by_annotator = defaultdict(list)
+        for item in items:
+            by_annotator[item["annotator_idx"]].append(item)
+
+        for annotator_idx in sorted(by_annotator):
+            polygons = by_annotator[annotator_idx]
+            matched = set()
+
+            if clusters:
+                iou = mask_iou_matrix([item["mask"] for item in polygons], cluster_masks)
+                rows, cols = linear_sum_assignment(1.0 - iou)
+                for row, col in zip(rows.tolist(), cols.tolist()):
+                    if iou[row, col] < PolygonConsolidation.OVERLAP_THRESHOLD:
+                        continue
+                    clusters[col].append(polygons[row])
+                    # Reference shape: pixels drawn by at least half the members
+                    cluster_masks[col] = (
+                        np.mean([item["mask"] for item in clusters[col]], axis=0) >= 0.5
+                    )
+                    matched.add(row)
+
+            for row, item in enumerate(polygons):
+                if row not in matched:
+                    clusters.append([item])
+                    cluster_masks.append(item["mask"])
+
+        return clusters
 
     @staticmethod
     def _extract_polygons(annotation) -> List[Dict]:
@@ -506,33 +613,47 @@ class PolygonConsolidation(ConsolidationStrategy):
 
     @staticmethod
     def calculate_agreement(ann1: Dict, ann2: Dict) -> Dict[str, float]:
-        """Calculate agreement for polygons"""
+        """
+        Calculate agreement for polygons.
+
+        Polygons are matched one-to-one by mask IoU; unmatched polygons on
+        either side count as zero overlap.
+        """
         polys1 = PolygonConsolidation._extract_polygons(ann1)
         polys2 = PolygonConsolidation._extract_polygons(ann2)
 
         if not polys1 and not polys2:
-            return {"overall": 100.0, "label": 100.0}
+            return {"overall": 100.0, "iou": 1.0, "label": 100.0}
 
         if not polys1 or not polys2:
-            return {"overall": 0.0, "label": 0.0}
-
-        # Simple label-based agreement for now
-        labels1 = set()
-        labels2 = set()
-
-        for p in polys1:
-            labels1.update(p.get("value", {}).get("polygonlabels", []))
-        for p in polys2:
-            labels2.update(p.get("value", {}).get("polygonlabels", []))
+            return {"overall": 0.0, "iou": 0.0, "label": 0.0}
 
-        if not labels1 and not labels2:
-            return {"overall": 100.0, "label": 100.0}
+        shape = shape_for_items(polys1 + polys2)
+        iou = mask_iou_matrix(
+            [PolygonConsolidation._rasterize(p, shape) for p in polys1],
+            [PolygonConsolidation._rasterize(p, shape) for p in polys2],
+        )
+        rows, cols = linear_sum_assignment(1.0 - iou)
+
+        total = max(len(polys1), len(polys2))
+        avg_iou = float(iou[rows, cols].sum()) / total
+        label_matches = sum(
+            1
+            for row, col in zip(rows.tolist(), cols.tolist())
+            if iou[row, col] > 0
+            and polys1[row].get("value", {}).get("polygonlabels")
+            == polys2[col].get("value", {}).get("polygonlabels")
+        )
+        label_agreement = label_matches / total * 100
 
-        intersection = len(labels1 & labels2)
-        union = len(labels1 | labels2)
-        label_agreement = (intersection / union * 100) if union > 0 else 0
+        overall = avg_iou * 100 * 0.6 + label_agreement * 0.4
 
-        return {"overall": label_agreement, "label": label_agreement}
+        return {
+            "overall": overall,
+            "iou": avg_iou,
+            "label": label_agreement,
+            "position": avg_iou * 100,
+        }
 
 
 class NERConsolidation(ConsolidationStrategy):
@@ -645,7 +766,9 @@ class NERConsolidation(ConsolidationStrategy):
 class SegmentationConsolidation(ConsolidationStrategy):
     """
     Consolidation for segmentation (brush) annotations.
-    Uses pixel-wise voting.
+
+    Brush RLE is decoded (through MaskCache) onto a shared working grid and
+    each label is consolidated by pixel-wise majority vote across annotators.
     """
 
     @staticmethod
@@ -654,37 +777,105 @@ class SegmentationConsolidation(ConsolidationStrategy):
         if not annotations:
             return {}, 0.0
 
-        # For brush/segmentation, we typically use union or intersection
-        # For simplicity, use the annotation with most coverage as base
-        return annotations[0] if annotations else {}, 0.5
+        all_items = [SegmentationConsolidation._extract_brushes(ann) for ann in annotations]
+        if not any(all_items):
+            return annotations[0] if annotations else {}, 0.5
+
+        num_annotators = len(all_items)
+        shape = shape_for_items(item for items in all_items for item in items)
+        label_masks = [
+            SegmentationConsolidation._label_masks(items, shape) for items in all_items
+        ]
+
+        # First decodable item per label supplies from_name/to_name and the image size
+        templates = {}
+        for items in all_items:
+            for item in items:
+                if not item.get("original_width") or not item.get("original_height"):
+                    continue
+                for label in item.get("value", {}).get("brushlabels", []):
+                    templates.setdefault(label, item)
+
+        empty = np.zeros(shape, dtype=bool)
+        consolidated_items = []
+        confidence_scores = []
+
+        for label, template in templates.items():
+            masks = [masks_by_label.get(label, empty) for masks_by_label in label_masks]
+            voted = majority_vote(masks, num_annotators)
+            if not voted.any():
+                continue
+
+            width = template.get("original_width")
+            height = template.get("original_height")
+            result = {
+                key: value for key, value in template.items() if key not in ("id", "rle")
+            }
+            result["value"] = {
+                "format": "rle",
+                "rle": mask_to_rle(resize_mask(voted, (height, width))),
+                "brushlabels": [label],
+            }
+            consolidated_items.append(result)
+            confidence_scores.append(float(np.mean(mask_iou_matrix(masks, [voted]))))
+
+        avg_confidence = (
+            sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0.5
+        )
+
+        return consolidated_items, avg_confidence
+
+    @staticmethod
+    def _extract_brushes(annotation) -> List[Dict]:
+        """Extract brush items from annotation"""
+        if not isinstance(annotation, list):
+            return []
+        return [item for item in annotation if item.get("type") == "brushlabels"]
+
+    @staticmethod
+    def _label_masks(items: List[Dict], shape: Tuple[int, int]) -> Dict[str, np.ndarray]:
+        """Union of one annotator's brush masks per label"""
+        masks = {}
+        for item in items:
+            mask = brush_item_mask(item, shape)
+            for label in item.get("value", {}).get("brushlabels", []):
+                masks[label] = masks[label] | mask if label in masks else mask
+        return masks
 
     @staticmethod
     def calculate_agreement(ann1: Dict, ann2: Dict) -> Dict[str, float]:
-        """Calculate agreement for segmentation"""
+        """Calculate agreement for segmentation as per-label pixel IoU"""
+        items1 = SegmentationConsolidation._extract_brushes(ann1)
+        items2 = SegmentationConsolidation._extract_brushes(ann2)
 
-        # Simplified - check if labels match
-        def extract_labels(ann):
-            labels = set()
-            if isinstance(ann, list):
-                for item in ann:
-                    if item.get("type") == "brushlabels":
-                        labels.update(item.get("value", {}).get("brushlabels", []))
-            return labels
+        if not items1 and not items2:
+            return {"overall": 100.0, "iou": 1.0, "label": 100.0}
 
-        labels1 = extract_labels(ann1)
-        labels2 = extract_labels(ann2)
+        if not items1 or not items2:
+            return {"overall": 0.0, "iou": 0.0, "label": 0.0}
 
-        if not labels1 and not labels2:
-            return {"overall": 100.0, "label": 100.0}
+        shape = shape_for_items(items1 + items2)
+        masks1 = SegmentationConsolidation._label_masks(items1, shape)
+        masks2 = SegmentationConsolidation._label_masks(items2, shape)
 
-        if not labels1 or not labels2:
-            return {"overall": 0.0, "label": 0.0}
+        labels = set(masks1) | set(masks2)
+        if not labels:
+            return {"overall": 100.0, "iou": 1.0, "label": 100.0}
 
-        intersection = len(labels1 & labels2)
-        union = len(labels1 | labels2)
-        label_agreement = (intersection / union * 100) if union > 0 else 0
+        empty = np.zeros(shape, dtype=bool)
+        avg_iou = sum(
+            mask_iou(masks1.get(label, empty), masks2.get(label, empty)) for label in labels
+        ) / len(labels)
+        label_agreement = len(set(masks1) & set(masks2)) / len(labels) * 100
 
-        return {"overall": label_agreement, "label": label_agreement}
+        overall = avg_iou * 100 * 0.6 + label_agreement * 0.4
+
+        return {
+            "overall": overall,
+            "iou": avg_iou,
+            "label": label_agreement,
+            "position": avg_iou * 100,
+        }
 
 
 class KeypointConsolidation(ConsolidationStrategy):
@@ -799,6 +990,119 @@ class KeypointConsolidation(ConsolidationStrategy):
         }
 
 
+# ============================================================================
+# AGREEMENT MATRIX
+# ============================================================================
+
+
+class AgreementMatrix:
+    """
+    Pairwise agreement for the annotations of one task, computed once.
+
+    Every unordered pair is compared a single time with
+    strategy.calculate_agreement. Summary metrics, per-annotator peer averages
+    and the AnnotatorAgreement records are all derived from the same matrix, and
+    each annotation is compared with the consolidated result at most once.
+
+    annotations is a list of {"assignment": TaskAssignment, "result": list}
+    dicts, as built by the consolidation code paths.
+    """
+
+    def __init__(self, strategy, annotations: List[Dict]):
+        self.strategy = strategy
+        self.annotations = annotations
+
+        size = len(annotations)
+        self.scores = [[None] * size for _ in range(size)]
+        self.pairs = []  # (i, j, agreement) with i < j
+        for i, j in combinations(range(size), 2):
+            agreement = strategy.calculate_agreement(
+                annotations[i]["result"], annotations[j]["result"]
+            )
+            self.pairs.append((i, j, agreement))
+            self.scores[i][j] = self.scores[j][i] = agreement["overall"]
+
+        self._individual = None
+
+    @property
+    def pair_scores(self) -> List[float]:
+        """Overall agreement of every pair, in combinations() order"""
+        return [agreement["overall"] for _, _, agreement in self.pairs]
+
+    def summary(self) -> Tuple[float, float, float]:
+        """Return (average, min, max) pairwise agreement"""
+        scores = self.pair_scores
+        if not scores:
+            return 0, 0, 0
+        return sum(scores) / len(scores), min(scores), max(scores)
+
+    def peer_average(self, index: int) -> Decimal:
+        """Average agreement of one annotation with all the others"""
+        peers = [score for j, score in enumerate(self.scores[index]) if j != index]
+        if not peers:
+            return Decimal("0")
+        return Decimal(str(sum(peers) / len(peers)))
+
+    def individual_agreements(self, consolidated) -> List[Dict[str, float]]:
+        """Agreement of each annotation with the consolidated result"""
+        if self._individual is None:
+            self._individual = [
+                self.strategy.calculate_agreement(ann["result"], consolidated)
+                for ann in self.annotations
+            ]
+        return self._individual
+
+    def save(self, consensus, annotation_type: str, agreement_fields) -> int:
+        """
+        Upsert one AnnotatorAgreement per pair with a single bulk query.
+
+        Args:
+            consensus: TaskConsensus the agreements belong to
+            annotation_type: Detected annotation type
+            agreement_fields: callable mapping an agreement dict to the
+                agreement_score/iou_score/label_agreement/position_agreement values
+
+        Returns:
+            Number of agreement records written
+        """
+        from .models import AnnotatorAgreement
+
+        records = []
+        for i, j, agreement in self.pairs:
+            assignment_1 = self.annotations[i]["assignment"]
+            assignment_2 = self.annotations[j]["assignment"]
+            records.append(
+                AnnotatorAgreement(
+                    task_consensus=consensus,
+                    annotator_1=assignment_1.annotator,
+                    annotator_2=assignment_2.annotator,
+                    assignment_1=assignment_1,
+                    assignment_2=assignment_2,
+                    annotation_type=annotation_type,
+                    comparison_details=agreement,
+                    **agreement_fields(agreement),
+                )
+            )
+
+        if records:
+            AnnotatorAgreement.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=["task_consensus", "annotator_1", "annotator_2"],
+                update_fields=[
+                    "assignment_1",
+                    "assignment_2",
+                    "agreement_score",
+                    "iou_score",
+                    "label_agreement",
+                    "position_agreement",
+                    "annotation_type",
+                    "comparison_details",
+                ],
+            )
+        return len(records)
+
+
 # ============================================================================
 # CONSENSUS SERVICE
 # ============================================================================
@@ -916,7 +1220,7 @@ class ConsensusService:
     @transaction.atomic
     def _process_consensus(cls, consensus, assignments) -> Dict:
         """Process consensus for a task with completed annotations"""
-        from .models import AnnotatorAgreement, ConsensusQualityScore
+        from .models import ConsensusQualityScore
 
         # Get all annotations
         annotations = []
@@ -954,43 +1258,10 @@ class ConsensusService:
         annotation_type = cls.detect_annotation_type(annotations[0]["result"])
         strategy = cls.get_strategy(annotation_type)
 
-        # Calculate pairwise agreements
-        agreement_scores = []
-        for ann1, ann2 in combinations(annotations, 2):
-            agreement = strategy.calculate_agreement(ann1["result"], ann2["result"])
-
-            # Store agreement record
-            AnnotatorAgreement.objects.update_or_create(
-                task_consensus=consensus,
-                annotator_1=ann1["assignment"].annotator,
-                annotator_2=ann2["assignment"].annotator,
-                defaults={
-                    "assignment_1": ann1["assignment"],
-                    "assignment_2": ann2["assignment"],
-                    "agreement_score": Decimal(str(agreement["overall"])),
-                    "iou_score": (
-                        Decimal(str(agreement.get("iou", 0)))
-                        if agreement.get("iou")
-                        else None
-                    ),
-                    "label_agreement": Decimal(str(agreement.get("label", 0))),
-                    "position_agreement": (
-                        Decimal(str(agreement.get("position", 0)))
-                        if agreement.get("position")
-                        else None
-                    ),
-                    "annotation_type": annotation_type,
-                    "comparison_details": agreement,
-                },
-            )
-            agreement_scores.append(agreement["overall"])
-
-        # Calculate consensus metrics
-        avg_agreement = (
-            sum(agreement_scores) / len(agreement_scores) if agreement_scores else 0
-        )
-        min_agreement = min(agreement_scores) if agreement_scores else 0
-        max_agreement = max(agreement_scores) if agreement_scores else 0
+        # Calculate pairwise agreements once and store them in one query
+        matrix = AgreementMatrix(strategy, annotations)
+        matrix.save(consensus, annotation_type, cls._agreement_fields)
+        avg_agreement, min_agreement, max_agreement = matrix.summary()
 
         consensus.average_agreement = Decimal(str(avg_agreement))
         consensus.min_agreement = Decimal(str(min_agreement))
@@ -1016,32 +1287,16 @@ class ConsensusService:
         consensus.save()
 
         # Calculate individual quality scores
-        for ann in annotations:
-            individual_agreement = strategy.calculate_agreement(
-                ann["result"], consolidated
-            )
+        individual_agreements = matrix.individual_agreements(consolidated)
+        for index, ann in enumerate(annotations):
+            individual_agreement = individual_agreements[index]
             quality_score = Decimal(str(individual_agreement["overall"]))
 
-            # Calculate average peer agreement
-            peer_agreements = []
-            for other in annotations:
-                if other["assignment"].id != ann["assignment"].id:
-                    peer_agreement = strategy.calculate_agreement(
-                        ann["result"], other["result"]
-                    )
-                    peer_agreements.append(peer_agreement["overall"])
-
-            avg_peer = (
-                Decimal(str(sum(peer_agreements) / len(peer_agreements)))
-                if peer_agreements
-                else Decimal("0")
-            )
-
             cls._create_quality_score(
                 consensus,
                 ann["assignment"],
                 quality_score,
-                avg_peer,
+                matrix.peer_average(index),
                 individual_agreement,
             )
 
@@ -1063,6 +1318,22 @@ class ConsensusService:
             "consensus": consensus,
         }
 
+    @staticmethod
+    def _agreement_fields(agreement: Dict) -> Dict:
+        """AnnotatorAgreement score fields for an agreement dict"""
+        return {
+            "agreement_score": Decimal(str(agreement["overall"])),
+            "iou_score": (
+                Decimal(str(agreement.get("iou", 0))) if agreement.get("iou") else None
+            ),
+            "label_agreement": Decimal(str(agreement.get("label", 0))),
+            "position_agreement": (
+                Decimal(str(agreement.get("position", 0)))
+                if agreement.get("position")
+                else None
+            ),
+        }
+
     @classmethod
     def _create_quality_score(
         cls,
@@ -1366,8 +1637,6 @@ class ConsensusService:
             - consolidated_result: dict
             - method: str
         """
-        from itertools import combinations
-
         if annotations.count() < 2:
             # Single annotation - return 100% agreement
             first_ann = annotations.first()
@@ -1404,18 +1673,10 @@ class ConsensusService:
         annotation_type = cls.detect_annotation_type(ann_list[0]["result"])
         strategy = cls.get_strategy(annotation_type)
 
-        # Calculate pairwise agreements
-        agreement_scores = []
-        for ann1, ann2 in combinations(ann_list, 2):
-            agreement = strategy.calculate_agreement(ann1["result"], ann2["result"])
-            agreement_scores.append(agreement["overall"])
-
         # Calculate metrics
-        avg_agreement = (
-            sum(agreement_scores) / len(agreement_scores) if agreement_scores else 0
-        )
-        min_agreement = min(agreement_scores) if agreement_scores else 0
-        max_agreement = max(agreement_scores) if agreement_scores else 0
+        avg_agreement, min_agreement, max_agreement = AgreementMatrix(
+            strategy, ann_list
+        ).summary()
 
         # Consolidate
         results = [ann["result"] for ann in ann_list]
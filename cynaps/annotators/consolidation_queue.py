@@ -0,0 +1,228 @@
+"""
+Durable consensus consolidation queue
+
+Consolidation (pairwise agreement, quality scores, payment release) used to run
+synchronously inside the Annotation post_save signal, so the annotator who
+submitted the last required annotation waited for all of it. The work is now
+queued through an outbox table:
+
+1. The signal records the task in ConsolidationOutbox (one row per task) and,
+   once the surrounding transaction commits, schedules the drain job.
+2. The drain job claims pending rows with a conditional UPDATE, so a row is only
+   ever processed by one worker, and runs the consolidation.
+
+Concurrent annotation saves on the same task collapse into the single outbox
+row. Without Redis (or with CONSOLIDATION_QUEUE_ASYNC disabled) the drain runs
+synchronously, which keeps tests and single-process setups deterministic.
+Rows left behind by a crashed worker are picked up again after
+CONSOLIDATION_QUEUE_STALE_SECONDS.
+"""
+
+import logging
+from datetime import timedelta
+
+from core.redis import start_job_async_or_sync
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ConsolidationOutbox
+
+logger = logging.getLogger(__name__)
+
+
+CONSOLIDATION_QUEUE_ASYNC = getattr(settings, "CONSOLIDATION_QUEUE_ASYNC", True)
+CONSOLIDATION_QUEUE_BATCH_SIZE = getattr(settings, "CONSOLIDATION_QUEUE_BATCH_SIZE", 100)
+CONSOLIDATION_QUEUE_MAX_ATTEMPTS = getattr(settings, "CONSOLIDATION_QUEUE_MAX_ATTEMPTS", 3)
+CONSOLIDATION_QUEUE_STALE_SECONDS = getattr(settings, "CONSOLIDATION_QUEUE_STALE_SECONDS", 600)
+
+# Consensus states in which consolidation has already happened
+CONSOLIDATED_STATUSES = ["review_required", "consensus_reached", "finalized"]
+
+
+class ConsolidationQueue:
+    """Outbox-backed queue for consensus consolidation"""
+
+    @staticmethod
+    def enqueue(task_id):
+        """
+        Record that a task needs consolidation.
+
+        Returns:
+            True if the task was queued, False if it was already pending or
+            being processed
+        """
+        entry, created = ConsolidationOutbox.objects.get_or_create(task_id=task_id)
+        if created:
+            return True
+
+        # Re-open finished rows; pending/processing rows already cover this save
+        reopened = ConsolidationOutbox.objects.filter(
+            id=entry.id, status__in=["done", "failed"]
+        ).update(status="pending", attempts=0, last_error="", updated_at=timezone.now())
+        return bool(reopened)
+
+    @classmethod
+    def schedule(cls, task_id):
+        """Queue a task and start the drain job once the transaction commits"""
+        if not cls.enqueue(task_id):
+            logger.debug(f"Task {task_id} already queued for consolidation")
+            return
+
+        transaction.on_commit(cls.start_drain)
+
+    @staticmethod
+    def start_drain():
+        """Run the drain job on rq, or synchronously when Redis is unavailable"""
+        from annotators.tasks import process_consolidation_outbox_job
+
+        try:
+            start_job_async_or_sync(
+                process_consolidation_outbox_job,
+                redis=CONSOLIDATION_QUEUE_ASYNC,
+            )
+        except Exception as e:
+            # The row stays pending and is picked up by the next drain
+            logger.error(f"Could not start consolidation drain: {e}", exc_info=True)
+
+    @staticmethod
+    def requeue_stale(stale_seconds=None):
+        """Return rows stuck in processing (e.g. after a worker crash) to pending"""
+        stale_seconds = stale_seconds or CONSOLIDATION_QUEUE_STALE_SECONDS
+        cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+        return ConsolidationOutbox.objects.filter(
+            status="processing", updated_at__lt=cutoff
+        ).update(status="pending", updated_at=timezone.now())
+
+    @staticmethod
+    def claim(entry_id):
+        """Atomically move a row from pending to processing; False if another worker won"""
+        return bool(
+            ConsolidationOutbox.objects.filter(id=entry_id, status="pending").update(
+                status="processing", attempts=F("attempts") + 1, updated_at=timezone.now()
+            )
+        )
+
+    @staticmethod
+    def consolidate_task(task_id):
+        """
+        Create or refresh the task's consensus record and run consolidation.
+
+        Re-checks the annotation count, so a stale outbox row never consolidates
+        a task that is not ready.
+
+        Returns:
+            True if consolidation ran, False if it was not needed
+        """
+        from tasks.models import Annotation, Task
+
+        from .adaptive_assignment_engine import AdaptiveAssignmentEngine
+        from .annotation_workflow import AnnotationWorkflowService
+        from .models import TaskConsensus
+
+        task = Task.objects.select_related("project").get(id=task_id)
+        annotation_count = Annotation.objects.filter(task=task, was_cancelled=False).count()
+        required_overlap, _, _ = AdaptiveAssignmentEngine.calculate_optimal_overlap(task.project)
+
+        if annotation_count < required_overlap:
+            logger.info(
+                f"⏳ Task {task.id} needs {required_overlap - annotation_count} more annotation(s) "
+                f"before consolidation"
+            )
+            return False
+
+        consensus, created = TaskConsensus.objects.get_or_create(
+            task=task,
+            defaults={
+                "required_annotations": required_overlap,
+                "current_annotations": annotation_count,
+                "status": "pending",
+            },
+        )
+        if created:
+            logger.info(f"📝 Created new consensus record for Task {task.id}")
+        elif consensus.status in CONSOLIDATED_STATUSES:
+            logger.info(f"✅ Task {task.id} already consolidated (status={consensus.status})")
+            return False
+        else:
+            # Consolidation started but not completed - update and retry
+            logger.info(
+                f"⚠️  Task {task.id} has consensus but status={consensus.status}, retriggering..."
+            )
+            consensus.required_annotations = required_overlap
+            consensus.current_annotations = annotation_count
+            consensus.status = "in_consensus"
+            consensus.save()
+
+        logger.info(f"🚀 Triggering consolidation for Task {task.id}...")
+        AnnotationWorkflowService.trigger_consolidation(task, consensus)
+        logger.info(f"✅ Consolidation completed for Task {task.id}")
+        return True
+
+    @classmethod
+    def process_entry(cls, entry):
+        """Run one claimed row and record the outcome"""
+        try:
+            cls.consolidate_task(entry.task_id)
+        except Exception as e:
+            logger.error(
+                f"❌ Error consolidating Task {entry.task_id}: {e}",
+                exc_info=True,
+            )
+            attempts = ConsolidationOutbox.objects.filter(id=entry.id).values_list(
+                "attempts", flat=True
+            ).first() or 0
+            status = "failed" if attempts >= CONSOLIDATION_QUEUE_MAX_ATTEMPTS else "pending"
+            ConsolidationOutbox.objects.filter(id=entry.id).update(
+                status=status, last_error=str(e)[:2000], updated_at=timezone.now()
+            )
+            return False
+
+        ConsolidationOutbox.objects.filter(id=entry.id).update(
+            status="done", last_error="", processed_at=timezone.now(), updated_at=timezone.now()
+        )
+        return True
+
+    @classmethod
+    def drain(cls, batch_size=None, max_batches=None):
+        """
+        Process pending rows until the outbox is empty.
+
+        Each row is attempted at most once per drain, so a failing task is
+        retried by a later drain rather than in a tight loop.
+
+        Returns:
+            dict with processed/failed/skipped counts
+        """
+        batch_size = batch_size or CONSOLIDATION_QUEUE_BATCH_SIZE
+        stats = {"processed": 0, "failed": 0, "skipped": 0, "requeued": cls.requeue_stale()}
+        seen = set()
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            entries = list(
+                ConsolidationOutbox.objects.filter(status="pending")
+                .exclude(id__in=seen)
+                .order_by("updated_at", "id")[:batch_size]
+            )
+            if not entries:
+                break
+            batches += 1
+
+            for entry in entries:
+                seen.add(entry.id)
+                if not cls.claim(entry.id):
+                    stats["skipped"] += 1
+                    continue
+                if cls.process_entry(entry):
+                    stats["processed"] += 1
+                else:
+                    stats["failed"] += 1
+
+        if stats["processed"] or stats["failed"]:
+            logger.info(
+                f"Consolidation outbox drained: {stats['processed']} processed, "
+                f"{stats['failed']} failed, {stats['skipped']} skipped"
+            )
+        return stats
@@ -0,0 +1,412 @@
+"""
+Bulk task distribution planner
+
+Task distribution used to walk every under-assigned task, query its existing
+assignments and create TaskAssignment rows one at a time inside a single long
+transaction. The planner splits this into two phases:
+
+1. Plan: existing (task, annotator) pairs, task targets and annotator
+   capacities are loaded with a handful of bulk queries and the full
+   assignment plan is computed in memory.
+2. Apply: the plan is written in chunks with INSERT ... ON CONFLICT DO NOTHING
+   RETURNING and counter updates grouped per chunk, so each transaction stays
+   short. Counters are incremented by the rows the database reports as
+   inserted: a pair inserted meanwhile by a concurrent run (e.g. the
+   task-created auto-assign signal) is skipped by the unique constraint and
+   counted by that run only.
+
+Plans are plain lists of (task_id, annotator_id) pairs, so callers can run the
+planner in dry-run mode and inspect the result without writing anything.
+"""
+
+import logging
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, F
+from projects.models import ProjectMember
+
+from .capacity_ledger import ANNOTATOR, CapacityLedger
+from .models import ProjectAssignment, TaskAssignment
+
+logger = logging.getLogger(__name__)
+
+
+BULK_ASSIGNMENT_CHUNK_SIZE = getattr(settings, "ANNOTATOR_BULK_ASSIGNMENT_CHUNK_SIZE", 1000)
+
+COUNTED_ASSIGNMENT_STATUSES = ["assigned", "in_progress", "completed"]
+
+
+class TaskDistributionPlanner:
+    """
+    Two-phase (plan, then bulk apply) task distribution.
+
+    Planning mirrors the per-row algorithms of
+    AssignmentEngine.distribute_tasks_intelligently and
+    DynamicAssignmentEngine._distribute_with_rotation exactly, only with all
+    lookups answered from in-memory maps instead of per-task queries.
+    """
+
+    # ------------------------------------------------------------------
+    # Bulk loaders
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def load_existing_pairs(project):
+        """Return {task_id: set(annotator_id)} for every assignment in the project"""
+        pairs = defaultdict(set)
+        rows = TaskAssignment.objects.filter(task__project=project).values_list(
+            "task_id", "annotator_id"
+        )
+        for task_id, annotator_id in rows.iterator(chunk_size=BULK_ASSIGNMENT_CHUNK_SIZE):
+            pairs[task_id].add(annotator_id)
+        return pairs
+
+    @staticmethod
+    def load_capacities(annotators):
+        """
+        Return {annotator_id: {"current", "maximum", "available"}} for all
+        annotators from the capacity ledger.
+        """
+        from .assignment_engine import AssignmentEngine
+
+        ledger = CapacityLedger.get_many(ANNOTATOR, [a.id for a in annotators])
+
+        capacities = {}
+        for annotator in annotators:
+            maximum = AssignmentEngine.get_capacity_limit(annotator)
+            current = ledger[annotator.id]["active"]
+            capacities[annotator.id] = {
+                "current": current,
+                "maximum": maximum,
+                "available": max(0, maximum - current),
+            }
+        return capacities
+
+    @staticmethod
+    def load_annotated_pairs(project, annotators):
+        """Return the set of (task_id, annotator_id) pairs that already have an annotation"""
+        from tasks.models import Annotation
+
+        annotator_by_user = {a.user_id: a.id for a in annotators}
+        rows = Annotation.objects.filter(
+            project=project, completed_by_id__in=list(annotator_by_user)
+        ).values_list("task_id", "completed_by_id")
+        return {
+            (task_id, annotator_by_user[user_id])
+            for task_id, user_id in rows.iterator(chunk_size=BULK_ASSIGNMENT_CHUNK_SIZE)
+        }
+
+    # ------------------------------------------------------------------
+    # Phase 1: planning
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def plan_intelligent_distribution(cls, project, annotators, required_overlap):
+        """
+        Plan for AssignmentEngine.distribute_tasks_intelligently.
+
+        Returns:
+            dict with "assignments" (list of (task_id, annotator_id)), "tasks"
+            (number of tasks considered) and the distribution counters.
+        """
+        tasks = list(
+            project.tasks.annotate(assignments_count=Count("annotator_assignments"))
+            .filter(assignments_count__lt=required_overlap)
+            .order_by("id")
+            .values_list("id", "target_assignment_count")
+        )
+
+        plan = {
+            "assignments": [],
+            "tasks": len(tasks),
+            "annotators_used": set(),
+            "tasks_fully_assigned": 0,
+            "tasks_partially_assigned": 0,
+            "tasks_waiting": 0,
+        }
+        if not tasks:
+            return plan
+
+        existing_pairs = cls.load_existing_pairs(project)
+        capacities = cls.load_capacities(annotators)
+        num_annotators = len(annotators)
+
+        def take(annotator_id, task_id):
+            plan["assignments"].append((task_id, annotator_id))
+            plan["annotators_used"].add(annotator_id)
+            capacities[annotator_id]["available"] -= 1
+            capacities[annotator_id]["current"] += 1
+
+        if num_annotators <= required_overlap:
+            # ALL-TO-ALL: every task goes to every annotator with capacity
+            for task_id, target in tasks:
+                already_assigned = existing_pairs.get(task_id, set())
+                assigned_to_task = len(already_assigned)
+                if target - assigned_to_task <= 0:
+                    continue
+
+                for annotator in annotators:
+                    if annotator.id in already_assigned:
+                        continue
+                    if capacities[annotator.id]["available"] <= 0:
+                        continue
+                    take(annotator.id, task_id)
+                    assigned_to_task += 1
+
+                if assigned_to_task >= target:
+                    plan["tasks_fully_assigned"] += 1
+        else:
+            # ROTATING: walk the annotator ring, carrying the index across tasks
+            rotation_index = 0
+            max_attempts = num_annotators * 2
+
+            for task_id, target in tasks:
+                already_assigned = set(existing_pairs.get(task_id, set()))
+                assigned_to_task = len(already_assigned)
+                if target - assigned_to_task <= 0:
+                    plan["tasks_fully_assigned"] += 1
+                    continue
+
+                attempts = 0
+                while assigned_to_task < target and attempts < max_attempts:
+                    annotator = annotators[rotation_index % num_annotators]
+                    rotation_index += 1
+                    attempts += 1
+
+                    if annotator.id in already_assigned:
+                        continue
+                    if capacities[annotator.id]["available"] <= 0:
+                        continue
+
+                    take(annotator.id, task_id)
+                    already_assigned.add(annotator.id)
+                    assigned_to_task += 1
+
+                if assigned_to_task >= target:
+                    plan["tasks_fully_assigned"] += 1
+                elif assigned_to_task > 0:
+                    plan["tasks_partially_assigned"] += 1
+                else:
+                    plan["tasks_waiting"] += 1
+
+        return plan
+
+    @classmethod
+    def plan_rotation(cls, project, annotators, effective_overlap):
+        """
+        Plan for DynamicAssignmentEngine._distribute_with_rotation.
+
+        Candidates for each task are ranked by trust_priority * 10 - load, as in
+        the per-row implementation.
+
+        Returns:
+            dict with "assignments" (list of (task_id, annotator_id)) and "load"
+            ({annotator_id: new assignments}).
+        """
+        from .assignment_engine import TRUST_LEVEL_PRIORITY
+
+        tasks = list(
+            project.tasks.annotate(
+                active_count=Count(
+                    "annotator_assignments",
+                    filter=models.Q(annotator_assignments__status__in=COUNTED_ASSIGNMENT_STATUSES),
+                )
+            )
+            .filter(active_count__lt=F("target_assignment_count"))
+            .order_by("id")
+            .values_list("id", "target_assignment_count", "active_count")
+        )
+
+        plan = {"assignments": [], "load": {a.id: 0 for a in annotators}}
+        if not tasks:
+            return plan
+
+        existing_pairs = cls.load_existing_pairs(project)
+        annotated_pairs = cls.load_annotated_pairs(project, annotators)
+        capacities = cls.load_capacities(annotators)
+
+        trust_priority = {}
+        for annotator in annotators:
+            try:
+                level = annotator.trust_level.level if annotator.trust_level else "new"
+            except Exception:
+                level = "new"
+            trust_priority[annotator.id] = TRUST_LEVEL_PRIORITY.get(level, 1)
+
+        for task_id, target, active_count in tasks:
+            already_assigned = existing_pairs.get(task_id, set())
+            needed = target - active_count
+
+            candidates = []
+            for annotator in annotators:
+                if annotator.id in already_assigned:
+                    continue
+                if (task_id, annotator.id) in annotated_pairs:
+                    continue
+                if capacities[annotator.id]["available"] <= 0:
+                    continue
+                score = trust_priority[annotator.id] * 10 - plan["load"][annotator.id]
+                candidates.append((annotator.id, score))
+
+            candidates.sort(key=lambda x: x[1], reverse=True)
+
+            for annotator_id, _ in candidates[: max(needed, 0)]:
+                plan["assignments"].append((task_id, annotator_id))
+                plan["load"][annotator_id] += 1
+                capacities[annotator_id]["available"] -= 1
+                capacities[annotator_id]["current"] += 1
+
+        return plan
+
+    # ------------------------------------------------------------------
+    # Phase 2: applying
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def apply_plan(project, assignments, chunk_size=None):
+        """
+        Write a plan with chunked bulk_create.
+
+        Performs the same side effects as AssignmentEngine._create_task_assignment
+        (project membership, auto-publish, task and project counters) and the
+        organization-membership safeguard from the TaskAssignment post_save
+        signal, but batched per chunk instead of per row.
+
+        Returns:
+            Number of assignments in the plan that were inserted
+        """
+        if not assignments:
+            return 0
+
+        from organizations.models import OrganizationMember
+        from tasks.models import Task
+
+        from .models import AnnotatorProfile
+
+        chunk_size = chunk_size or BULK_ASSIGNMENT_CHUNK_SIZE
+        annotator_ids = sorted({annotator_id for _, annotator_id in assignments})
+        user_ids = dict(
+            AnnotatorProfile.objects.filter(id__in=annotator_ids).values_list("id", "user_id")
+        )
+
+        # Annotators must be project members to see the project in the UI
+        for annotator_id in annotator_ids:
+            ProjectMember.objects.get_or_create(
+                user_id=user_ids[annotator_id], project=project, defaults={"enabled": True}
+            )
+
+        if not project.is_published:
+            project.is_published = True
+            project.save(update_fields=["is_published"])
+            logger.info(f"Auto-published project {project.id} for annotator visibility")
+
+        created = 0
+        for start in range(0, len(assignments), chunk_size):
+            chunk = assignments[start : start + chunk_size]
+            with transaction.atomic():
+                inserted = TaskDistributionPlanner._insert_chunk(chunk)
+
+                # Group tasks by increment so each distinct increment is one UPDATE
+                tasks_by_increment = defaultdict(list)
+                for task_id, increment in Counter(task_id for task_id, _ in inserted).items():
+                    tasks_by_increment[increment].append(task_id)
+                for increment, task_ids in tasks_by_increment.items():
+                    Task.objects.filter(id__in=task_ids).update(
+                        assignment_count=F("assignment_count") + increment
+                    )
+
+                for annotator_id, increment in Counter(a for _, a in inserted).items():
+                    ProjectAssignment.objects.filter(project=project, annotator_id=annotator_id).update(
+                        assigned_tasks=F("assigned_tasks") + increment
+                    )
+
+                transaction.on_commit(
+                    lambda inserted=inserted: CapacityLedger.record_bulk_assignments(project.id, inserted)
+                )
+            created += len(inserted)
+
+        # Safeguard: annotators must not be members of the client organization
+        if project.organization_id:
+            OrganizationMember.objects.filter(
+                user_id__in=list(user_ids.values()), organization_id=project.organization_id
+            ).delete()
+
+        logger.info(
+            f"Bulk-created {created} of {len(assignments)} planned task assignments for project {project.id}"
+        )
+
+        return created
+
+    @staticmethod
+    def _chunk_pairs(chunk):
+        """Return the (task_id, annotator_id) pairs of chunk that exist in the database"""
+        rows = TaskAssignment.objects.filter(
+            task_id__in={task_id for task_id, _ in chunk},
+            annotator_id__in={annotator_id for _, annotator_id in chunk},
+        ).values_list("task_id", "annotator_id")
+        return set(rows) & set(chunk)
+
+    @staticmethod
+    def _insert_chunk(chunk):
+        """Insert the chunk's missing pairs and return the ones this call inserted"""
+        existing = TaskDistributionPlanner._chunk_pairs(chunk)
+        pending = [pair for pair in chunk if pair not in existing]
+        if not pending:
+            return []
+        assignments = [
+            TaskAssignment(task_id=task_id, annotator_id=annotator_id, status="assigned")
+            for task_id, annotator_id in pending
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            inserted = set(TaskDistributionPlanner._insert_returning(assignments))
+        else:
+            inserted = set(TaskDistributionPlanner._insert_each(assignments))
+        return [pair for pair in pending if pair in inserted]
+
+    @staticmethod
+    def _insert_returning(assignments):
+        """
+        INSERT ... ON CONFLICT DO NOTHING RETURNING (task_id, annotator_id).
+
+        Unlike bulk_create(ignore_conflicts=True), the database reports which
+        rows it inserted, including when a concurrent transaction committed
+        the same pair after the existing pairs were selected.
+        """
+        fields = [field for field in TaskAssignment._meta.concrete_fields if not field.primary_key]
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(field.column) for field in fields)
+        row = "(" + ", ".join(["%s"] * len(fields)) + ")"
+        batch_size = connection.ops.bulk_batch_size(fields, assignments) or len(assignments)
+
+        inserted = []
+        with connection.cursor() as cursor:
+            for start in range(0, len(assignments), batch_size):
+                batch = assignments[start : start + batch_size]
+                params = [
+                    field.get_db_prep_save(field.pre_save(assignment, True), connection)
+                    for assignment in batch
+                    for field in fields
+                ]
+                cursor.execute(
+                    f"INSERT INTO {quote(TaskAssignment._meta.db_table)} ({columns}) "
+                    f"VALUES {', '.join([row] * len(batch))} "
+                    f"ON CONFLICT DO NOTHING RETURNING {quote('task_id')}, {quote('annotator_id')}",
+                    params,
+                )
+                inserted.extend(cursor.fetchall())
+        return inserted
+
+    @staticmethod
+    def _insert_each(assignments):
+        """Row-by-row fallback for databases that cannot return rows from a bulk insert"""
+        inserted = []
+        for assignment in assignments:
+            try:
+                with transaction.atomic():
+                    TaskAssignment.objects.bulk_create([assignment])
+            except IntegrityError:
+                continue
+            inserted.append((assignment.task_id, assignment.annotator_id))
+        return inserted
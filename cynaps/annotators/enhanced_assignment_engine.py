@@ -421,9 +421,9 @@ class EnhancedAssignmentEngine:
         if custom_max:
             max_tasks = min(max_tasks, custom_max)
 
-        active_count = TaskAssignment.objects.filter(
-            annotator=annotator, status__in=["assigned", "in_progress"]
-        ).count()
+        from .capacity_ledger import CapacityLedger
+
+        active_count = CapacityLedger.get_annotator(annotator.id)["active"]
 
         return {
             "current": active_count,
@@ -149,11 +149,10 @@ class ExpertAssignmentEngine:
         - available: Remaining capacity
         - at_capacity: Boolean if at max
         """
-        # Get actual pending count from database
-        active_count = ExpertReviewTask.objects.filter(
-            expert=expert,
-            status__in=['pending', 'in_review']
-        ).count()
+        from .capacity_ledger import CapacityLedger
+
+        # Pending + in-review count from the capacity ledger
+        active_count = CapacityLedger.get_expert(expert.id)["active"]
         
         max_reviews = expert.max_concurrent_reviews or DEFAULT_EXPERT_CAPACITY
         
@@ -508,16 +508,22 @@ class ExpertService:
     @classmethod
     def _send_back_for_rework(cls, task_consensus, rejection_reason, notes):
         """Send task back to annotators for rework"""
+        from .capacity_ledger import ANNOTATOR, CapacityLedger
         from .models import TaskAssignment
 
         # Reset all assignments for this task
-        TaskAssignment.objects.filter(
+        completed = TaskAssignment.objects.filter(
             task=task_consensus.task, status="completed"
-        ).update(
+        )
+        annotator_ids = list(completed.values_list("annotator_id", flat=True))
+        completed.update(
             status="assigned",
             flagged_for_review=True,
             flag_reason=f"Expert rejected: {rejection_reason}. {notes}",
         )
+        # Bulk update bypasses signals, so rebuild these ledgers from the DB once
+        # the reset is committed; earlier, a concurrent read would cache the old counts
+        transaction.on_commit(lambda: CapacityLedger.invalidate(ANNOTATOR, annotator_ids))
 
         logger.info(
             f"Task {task_consensus.task_id} sent back for rework: {rejection_reason}"
@@ -0,0 +1,249 @@
+"""
+Shared box geometry for consensus, honeypot evaluation and skill-test scoring
+
+Rectangle results are converted once into an (N, 4) float array of
+[x, y, width, height] in the percentage coordinates used by the labeling
+frontend. IoU and center-distance matrices are then computed for all pairs in
+one vectorised pass instead of reading dicts one pair at a time.
+
+Optimal one-to-one matching uses scipy's linear_sum_assignment when scipy is
+installed, and an equivalent NumPy implementation of the Hungarian algorithm
+otherwise.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment as _scipy_linear_sum_assignment
+except ImportError:  # pragma: no cover - scipy is optional
+    _scipy_linear_sum_assignment = None
+
+
+BOX_FIELDS = ("x", "y", "width", "height")
+
+
+# ============================================================================
+# CONVERSION
+# ============================================================================
+
+
+def boxes_to_array(boxes: Iterable[Dict]) -> np.ndarray:
+    """
+    Convert flat box dicts ({"x", "y", "width", "height"}) into an (N, 4) array.
+
+    Missing coordinates default to 0.
+    """
+    rows = [[float(box.get(field, 0) or 0) for field in BOX_FIELDS] for box in boxes]
+    if not rows:
+        return np.zeros((0, 4), dtype=float)
+    return np.asarray(rows, dtype=float)
+
+
+def rect_results_to_array(items: Iterable[Dict]) -> np.ndarray:
+    """Convert rectangle result items ({"value": {"x", ...}}) into an (N, 4) array"""
+    return boxes_to_array(item.get("value", {}) or {} for item in items)
+
+
+# ============================================================================
+# PAIRWISE METRICS
+# ============================================================================
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    IoU between every box in boxes_a and every box in boxes_b.
+
+    Returns:
+        (len(boxes_a), len(boxes_b)) array; pairs with an empty union score 0
+    """
+    boxes_a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+
+    ax1, ay1 = boxes_a[:, 0:1], boxes_a[:, 1:2]
+    aw, ah = boxes_a[:, 2:3], boxes_a[:, 3:4]
+    bx1, by1 = boxes_b[:, 0], boxes_b[:, 1]
+    bw, bh = boxes_b[:, 2], boxes_b[:, 3]
+
+    inter_width = np.maximum(0, np.minimum(ax1 + aw, bx1 + bw) - np.maximum(ax1, bx1))
+    inter_height = np.maximum(0, np.minimum(ay1 + ah, by1 + bh) - np.maximum(ay1, by1))
+    inter_area = inter_width * inter_height
+
+    union_area = aw * ah + bw * bh - inter_area
+    return np.divide(
+        inter_area, union_area, out=np.zeros_like(inter_area), where=union_area > 0
+    )
+
+
+def box_iou(box_a, box_b) -> float:
+    """IoU of two boxes given as [x, y, width, height]"""
+    return float(iou_matrix(np.asarray(box_a, dtype=float), np.asarray(box_b, dtype=float))[0, 0])
+
+
+def center_distance_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Distance between box centers, normalised from percentage coordinates to
+    the unit square (0 to ~1.4).
+    """
+    boxes_a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+
+    centers_a = boxes_a[:, :2] + boxes_a[:, 2:] / 2
+    centers_b = boxes_b[:, :2] + boxes_b[:, 2:] / 2
+    delta = (centers_a[:, None, :] - centers_b[None, :, :]) / 100.0
+    return np.sqrt((delta**2).sum(axis=2))
+
+
+class BoxArray:
+    """
+    Column view of an (N, 4) box array for repeated one-to-many queries.
+
+    Corners, areas and centers are computed once, so each query is a handful
+    of NumPy operations on the selected rows.
+    """
+
+    def __init__(self, coords: np.ndarray):
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 4)
+        self.x1 = self.coords[:, 0]
+        self.y1 = self.coords[:, 1]
+        self.x2 = self.x1 + self.coords[:, 2]
+        self.y2 = self.y1 + self.coords[:, 3]
+        self.area = self.coords[:, 2] * self.coords[:, 3]
+        self.cx = self.x1 + self.coords[:, 2] / 2
+        self.cy = self.y1 + self.coords[:, 3] / 2
+
+    def __len__(self):
+        return len(self.coords)
+
+    def iou(self, box, idx) -> np.ndarray:
+        """IoU of one [x, y, width, height] box with the boxes at idx"""
+        x, y, w, h = (float(v) for v in box)
+        inter_width = np.maximum(0, np.minimum(x + w, self.x2[idx]) - np.maximum(x, self.x1[idx]))
+        inter_height = np.maximum(0, np.minimum(y + h, self.y2[idx]) - np.maximum(y, self.y1[idx]))
+        inter_area = inter_width * inter_height
+        union_area = w * h + self.area[idx] - inter_area
+        return np.divide(
+            inter_area, union_area, out=np.zeros_like(inter_area), where=union_area > 0
+        )
+
+    def center_distance(self, box, idx) -> np.ndarray:
+        """Normalised center distance of one box to the boxes at idx"""
+        x, y, w, h = (float(v) for v in box)
+        dx = (x + w / 2 - self.cx[idx]) / 100.0
+        dy = (y + h / 2 - self.cy[idx]) / 100.0
+        return np.sqrt(dx * dx + dy * dy)
+
+
+# ============================================================================
+# MATCHING
+# ============================================================================
+
+
+def _hungarian(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-cost assignment for a cost matrix with rows <= columns.
+
+    Shortest augmenting path formulation of the Hungarian algorithm with row
+    and column potentials, O(rows^2 * columns) with the inner loop vectorised.
+    """
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    row_of_col = np.zeros(m + 1, dtype=int)  # 1-based row assigned to each column, 0 = free
+    way = np.zeros(m + 1, dtype=int)
+
+    for row in range(1, n + 1):
+        row_of_col[0] = row
+        col0 = 0
+        min_slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+
+        while True:
+            used[col0] = True
+            row0 = row_of_col[col0]
+            free = ~used[1:]
+
+            slack = cost[row0 - 1] - u[row0] - v[1:]
+            better = free & (slack < min_slack[1:])
+            min_slack[1:][better] = slack[better]
+            way[1:][better] = col0
+
+            candidates = np.where(free, min_slack[1:], np.inf)
+            col1 = int(np.argmin(candidates)) + 1
+            delta = candidates[col1 - 1]
+
+            u[row_of_col[used]] += delta
+            v[used] -= delta
+            min_slack[1:][free] -= delta
+
+            col0 = col1
+            if row_of_col[col0] == 0:
+                break
+
+        # Flip the augmenting path
+        while col0:
+            col1 = way[col0]
+            row_of_col[col0] = row_of_col[col1]
+            col0 = col1
+
+    cols = np.flatnonzero(row_of_col[1:])
+    rows = row_of_col[1:][cols] - 1
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def linear_sum_assignment(cost) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Solve the rectangular linear assignment problem (minimum total cost).
+
+    Returns:
+        (row_indices, col_indices) sorted by row, like scipy.optimize.linear_sum_assignment
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.ndim != 2:
+        raise ValueError("cost matrix must be two-dimensional")
+    if cost.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    if _scipy_linear_sum_assignment is not None:
+        rows, cols = _scipy_linear_sum_assignment(cost)
+        return np.asarray(rows, dtype=int), np.asarray(cols, dtype=int)
+
+    if cost.shape[0] > cost.shape[1]:
+        cols, rows = _hungarian(cost.T)
+        order = np.argsort(rows)
+        return rows[order], cols[order]
+    return _hungarian(cost)
+
+
+def best_iou_matches(boxes_a: np.ndarray, boxes_b: np.ndarray, iou=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every box in boxes_a, the index and IoU of its best-overlapping box in
+    boxes_b (first one on ties). Boxes with no overlap get index -1 and IoU 0.
+    """
+    if iou is None:
+        iou = iou_matrix(boxes_a, boxes_b)
+    if iou.shape[1] == 0:
+        return np.full(iou.shape[0], -1, dtype=int), np.zeros(iou.shape[0])
+
+    best = iou.argmax(axis=1)
+    best_iou = iou[np.arange(iou.shape[0]), best]
+    best = np.where(best_iou > 0, best, -1)
+    return best, best_iou
+
+
+def optimal_matches(boxes_a: np.ndarray, boxes_b: np.ndarray, min_iou: float = 0.0) -> List[Tuple[int, int, float]]:
+    """
+    One-to-one matching of boxes_a to boxes_b maximising total IoU.
+
+    Returns:
+        List of (index_a, index_b, iou) for matched pairs with IoU > min_iou
+    """
+    iou = iou_matrix(boxes_a, boxes_b)
+    rows, cols = linear_sum_assignment(1.0 - iou)
+    return [
+        (int(row), int(col), float(iou[row, col]))
+        for row, col in zip(rows, cols)
+        if iou[row, col] > min_iou
+    ]
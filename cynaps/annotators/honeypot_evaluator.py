@@ -9,14 +9,27 @@ The evaluator:
 2. Uses appropriate comparator for that type
 3. Calculates accuracy score (0-100%)
 4. Determines pass/fail based on tolerance
+
+Ground truth only changes when a golden standard is edited, so its
+comparison features (annotation type, box arrays, label sets, keypoints,
+normalized text) are extracted once and stored on
+GoldenStandardTask.ground_truth_features. Submissions are then compared
+against those features instead of re-parsing the golden JSON every time.
 """
 
 import logging
 from decimal import Decimal
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .geometry import boxes_to_array, iou_matrix
 
 logger = logging.getLogger(__name__)
 
+# Bump when a comparator's feature format changes so stored features are rebuilt
+FEATURES_VERSION = 1
+
 
 class HoneypotEvaluator:
     """
@@ -46,12 +59,60 @@ class HoneypotEvaluator:
             }
         """
         golden = honeypot_assignment.golden_standard
-        ground_truth = golden.ground_truth
-        tolerance = float(golden.tolerance)
-        
+        return cls.evaluate_features(
+            cls.get_features(golden), float(golden.tolerance), annotator_result
+        )
+
+    @classmethod
+    def evaluate_many(
+        cls,
+        submissions: Iterable[Tuple[Any, List[Dict]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluate a batch of submissions.
+
+        Args:
+            submissions: (honeypot_assignment, annotator_result) pairs. Load the
+                assignments with select_related('golden_standard') to avoid a
+                query per row.
+
+        Returns:
+            Evaluation dicts (same shape as evaluate()) in submission order.
+            Features are resolved once per golden standard.
+        """
+        features_by_golden = {}
+        results = []
+
+        for honeypot_assignment, annotator_result in submissions:
+            golden = honeypot_assignment.golden_standard
+            features = features_by_golden.get(golden.pk)
+            if features is None:
+                features = features_by_golden[golden.pk] = cls.get_features(golden)
+
+            results.append(
+                cls.evaluate_features(features, float(golden.tolerance), annotator_result)
+            )
+
+        return results
+
+    @classmethod
+    def evaluate_features(
+        cls,
+        features: Dict[str, Any],
+        tolerance: float,
+        annotator_result: List[Dict]
+    ) -> Dict[str, Any]:
+        """
+        Evaluate a result against precomputed ground-truth features.
+
+        Args:
+            features: Output of build_features() for the ground truth
+            tolerance: Required match (0-1)
+            annotator_result: The annotator's annotation result
+        """
         # Handle empty results
         if not annotator_result:
-            if not ground_truth:
+            if features.get('empty'):
                 return {
                     'passed': True,
                     'accuracy_score': 100.0,
@@ -69,8 +130,7 @@ class HoneypotEvaluator:
                 }
             }
         
-        # Detect annotation type from ground truth structure
-        annotation_type = cls._detect_annotation_type(ground_truth)
+        annotation_type = features['annotation_type']
         
         logger.debug(
             f"Evaluating honeypot: type={annotation_type}, "
@@ -81,7 +141,9 @@ class HoneypotEvaluator:
         comparator = cls._get_comparator(annotation_type)
         
         # Calculate accuracy
-        comparison_result = comparator.compare(annotator_result, ground_truth)
+        comparison_result = comparator.compare_features(
+            comparator.extract_features(annotator_result), features['comparator']
+        )
         overall_score = comparison_result.get('overall_score', 0)
         
         # Determine pass/fail based on tolerance
@@ -103,6 +165,34 @@ class HoneypotEvaluator:
                 **comparison_result
             }
         }
+
+    @classmethod
+    def build_features(cls, ground_truth: List[Dict]) -> Dict[str, Any]:
+        """
+        Extract comparison features from a ground-truth result.
+
+        The result is JSON-serializable and is stored on
+        GoldenStandardTask.ground_truth_features.
+        """
+        annotation_type = cls._detect_annotation_type(ground_truth)
+        comparator = cls._get_comparator(annotation_type)
+        return {
+            'version': FEATURES_VERSION,
+            'annotation_type': annotation_type,
+            'empty': not ground_truth,
+            'comparator': comparator.extract_features(ground_truth),
+        }
+
+    @classmethod
+    def get_features(cls, golden) -> Dict[str, Any]:
+        """
+        Stored features for a golden standard, rebuilt in memory when they are
+        missing or were produced by an older FEATURES_VERSION.
+        """
+        features = golden.ground_truth_features
+        if not features or features.get('version') != FEATURES_VERSION:
+            features = cls.build_features(golden.ground_truth)
+        return features
     
     @classmethod
     def _detect_annotation_type(cls, result: List[Dict]) -> str:
@@ -157,34 +247,39 @@ class HoneypotEvaluator:
     @classmethod
     def _get_comparator(cls, annotation_type: str):
         """Get the appropriate comparator for annotation type."""
-        comparators = {
-            'classification': ClassificationComparator(),
-            'bounding_box': BoundingBoxComparator(),
-            'polygon': PolygonComparator(),
-            'segmentation': SegmentationComparator(),
-            'text': TextComparator(),
-            'rating': RatingComparator(),
-            'keypoint': KeypointComparator(),
-            'generic': GenericComparator(),
-            'unknown': GenericComparator(),
-        }
-        return comparators.get(annotation_type, GenericComparator())
+        return COMPARATORS.get(annotation_type, COMPARATORS['generic'])
 
 
 class BaseComparator:
-    """Base class for annotation comparators."""
+    """
+    Base class for annotation comparators.
+
+    Comparators split into extract_features() (parse a result into
+    JSON-serializable features) and compare_features(), so ground-truth
+    features can be extracted once and reused.
+    """
     
     def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
+        return self.compare_features(
+            self.extract_features(annotator_result), self.extract_features(ground_truth)
+        )
+
+    def extract_features(self, result: List[Dict]) -> Dict:
+        raise NotImplementedError
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
         raise NotImplementedError
 
 
 class ClassificationComparator(BaseComparator):
     """Compare classification/labeling annotations."""
     
-    def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
-        # Extract labels from both results
-        annotator_labels = set(self._extract_labels(annotator_result))
-        ground_truth_labels = set(self._extract_labels(ground_truth))
+    def extract_features(self, result: List[Dict]) -> Dict:
+        return {'labels': sorted(set(self._extract_labels(result)), key=str)}
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
+        annotator_labels = set(annotator_features['labels'])
+        ground_truth_labels = set(ground_truth_features['labels'])
         
         if not ground_truth_labels:
             # If no ground truth labels, any answer is wrong
@@ -239,64 +334,67 @@ class BoundingBoxComparator(BaseComparator):
     
     IOU_THRESHOLD = 0.5  # Minimum IoU to consider a match
     
-    def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
-        annotator_boxes = self._extract_boxes(annotator_result)
-        ground_truth_boxes = self._extract_boxes(ground_truth)
+    def extract_features(self, result: List[Dict]) -> Dict:
+        boxes = self._extract_boxes(result)
+        return {
+            'boxes': boxes_to_array(boxes).tolist(),
+            'labels': [box['label'] for box in boxes],
+        }
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
+        annotator_labels = annotator_features['labels']
+        ground_truth_labels = ground_truth_features['labels']
         
-        if not ground_truth_boxes:
+        if not ground_truth_labels:
             return {
-                'overall_score': 100 if not annotator_boxes else 0,
+                'overall_score': 100 if not annotator_labels else 0,
                 'boxes_expected': 0,
-                'boxes_found': len(annotator_boxes),
+                'boxes_found': len(annotator_labels),
             }
         
-        if not annotator_boxes:
+        if not annotator_labels:
             return {
                 'overall_score': 0,
-                'boxes_expected': len(ground_truth_boxes),
+                'boxes_expected': len(ground_truth_labels),
                 'boxes_found': 0,
                 'message': 'No boxes annotated'
             }
         
-        # Match boxes and calculate IoU
+        # Match boxes and calculate IoU: all pairs at once, labels must match
+        iou = iou_matrix(
+            np.array(ground_truth_features['boxes'], dtype=float),
+            np.array(annotator_features['boxes'], dtype=float),
+        )
+        gt_labels = np.array(ground_truth_labels, dtype=object)
+        ann_labels = np.array(annotator_labels, dtype=object)
+        iou[gt_labels[:, None] != ann_labels[None, :]] = 0
+        best_ious = iou.max(axis=1).tolist()
+
         total_iou = 0
         matched_count = 0
-        matched_gt = set()
         box_results = []
         
-        for gt_idx, gt_box in enumerate(ground_truth_boxes):
-            best_iou = 0
-            best_ann_idx = -1
-            
-            for ann_idx, ann_box in enumerate(annotator_boxes):
-                # Labels must match for IoU consideration
-                if ann_box.get('label') == gt_box.get('label'):
-                    iou = self._calculate_iou(ann_box, gt_box)
-                    if iou > best_iou:
-                        best_iou = iou
-                        best_ann_idx = ann_idx
-            
+        for gt_idx, (gt_label, best_iou) in enumerate(zip(ground_truth_labels, best_ious)):
             total_iou += best_iou
             if best_iou >= self.IOU_THRESHOLD:
                 matched_count += 1
-                matched_gt.add(gt_idx)
             
             box_results.append({
                 'ground_truth_idx': gt_idx,
-                'label': gt_box.get('label'),
+                'label': gt_label,
                 'best_iou': round(best_iou, 3),
                 'matched': best_iou >= self.IOU_THRESHOLD,
             })
         
         # Calculate overall score as average IoU
-        overall_score = (total_iou / len(ground_truth_boxes)) * 100
+        overall_score = (total_iou / len(ground_truth_labels)) * 100
         
         return {
             'overall_score': overall_score,
-            'boxes_expected': len(ground_truth_boxes),
-            'boxes_found': len(annotator_boxes),
+            'boxes_expected': len(ground_truth_labels),
+            'boxes_found': len(annotator_labels),
             'boxes_matched': matched_count,
-            'average_iou': total_iou / len(ground_truth_boxes),
+            'average_iou': total_iou / len(ground_truth_labels),
             'iou_threshold': self.IOU_THRESHOLD,
             'box_details': box_results,
         }
@@ -336,57 +434,32 @@ class BoundingBoxComparator(BaseComparator):
             })
         
         return boxes
-    
-    def _calculate_iou(self, box1: Dict, box2: Dict) -> float:
-        """Calculate Intersection over Union for two boxes."""
-        # Box coordinates (x, y are percentages 0-100)
-        x1_1, y1_1 = box1['x'], box1['y']
-        x2_1, y2_1 = x1_1 + box1['width'], y1_1 + box1['height']
-        
-        x1_2, y1_2 = box2['x'], box2['y']
-        x2_2, y2_2 = x1_2 + box2['width'], y1_2 + box2['height']
-        
-        # Intersection coordinates
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
-        
-        # Intersection area
-        intersection = max(0, x2_i - x1_i) * max(0, y2_i - y1_i)
-        
-        # Union area
-        area1 = box1['width'] * box1['height']
-        area2 = box2['width'] * box2['height']
-        union = area1 + area2 - intersection
-        
-        if union <= 0:
-            return 0.0
-        
-        return intersection / union
 
 
 class PolygonComparator(BaseComparator):
     """Compare polygon annotations using simplified area overlap."""
     
-    def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
+    def extract_features(self, result: List[Dict]) -> Dict:
+        return {'labels': [p.get('label', '') for p in self._extract_polygons(result)]}
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
         # Simplified comparison - check if same number of polygons with matching labels
-        ann_polygons = self._extract_polygons(annotator_result)
-        gt_polygons = self._extract_polygons(ground_truth)
+        ann_count = len(annotator_features['labels'])
+        gt_count = len(ground_truth_features['labels'])
         
-        if not gt_polygons:
+        if not gt_count:
             return {
-                'overall_score': 100 if not ann_polygons else 0,
+                'overall_score': 100 if not ann_count else 0,
                 'polygons_expected': 0,
             }
         
         # Compare labels
-        ann_labels = set(p.get('label', '') for p in ann_polygons)
-        gt_labels = set(p.get('label', '') for p in gt_polygons)
+        ann_labels = set(annotator_features['labels'])
+        gt_labels = set(ground_truth_features['labels'])
         
         if ann_labels == gt_labels:
             # Same labels found - give partial credit based on count match
-            count_ratio = min(len(ann_polygons), len(gt_polygons)) / max(len(ann_polygons), len(gt_polygons))
+            count_ratio = min(ann_count, gt_count) / max(ann_count, gt_count)
             score = count_ratio * 100
         else:
             # Label mismatch
@@ -396,8 +469,8 @@ class PolygonComparator(BaseComparator):
         
         return {
             'overall_score': score,
-            'polygons_expected': len(gt_polygons),
-            'polygons_found': len(ann_polygons),
+            'polygons_expected': gt_count,
+            'polygons_found': ann_count,
             'labels_expected': list(gt_labels),
             'labels_found': list(ann_labels),
         }
@@ -432,10 +505,13 @@ class PolygonComparator(BaseComparator):
 class SegmentationComparator(BaseComparator):
     """Compare segmentation (brush) annotations."""
     
-    def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
+    def extract_features(self, result: List[Dict]) -> Dict:
+        return {'labels': self._extract_labels(result)}
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
         # For segmentation, compare labels as classification
-        ann_labels = self._extract_labels(annotator_result)
-        gt_labels = self._extract_labels(ground_truth)
+        ann_labels = annotator_features['labels']
+        gt_labels = ground_truth_features['labels']
         
         if not gt_labels:
             return {'overall_score': 100 if not ann_labels else 0}
@@ -469,9 +545,13 @@ class SegmentationComparator(BaseComparator):
 class TextComparator(BaseComparator):
     """Compare text annotations using string similarity."""
     
-    def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
-        ann_text = self._extract_text(annotator_result)
-        gt_text = self._extract_text(ground_truth)
+    def extract_features(self, result: List[Dict]) -> Dict:
+        text = self._extract_text(result)
+        return {'text': text, 'normalized': self._normalize(text)}
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
+        ann_text = annotator_features['text']
+        gt_text = ground_truth_features['text']
         
         if not gt_text:
             return {
@@ -486,7 +566,12 @@ class TextComparator(BaseComparator):
             }
         
         # Calculate similarity using normalized Levenshtein distance
-        similarity = self._calculate_similarity(ann_text, gt_text)
+        if ann_text == gt_text:
+            similarity = 1.0
+        else:
+            similarity = self._normalized_similarity(
+                annotator_features['normalized'], ground_truth_features['normalized']
+            )
         score = similarity * 100
         
         return {
@@ -514,15 +599,17 @@ class TextComparator(BaseComparator):
         
         return ' '.join(texts).strip()
     
+    def _normalize(self, text: str) -> str:
+        return text.lower().strip()
+
     def _calculate_similarity(self, s1: str, s2: str) -> float:
         """Calculate normalized string similarity (0-1)."""
         if s1 == s2:
             return 1.0
-        
-        # Normalize strings
-        s1 = s1.lower().strip()
-        s2 = s2.lower().strip()
-        
+        return self._normalized_similarity(self._normalize(s1), self._normalize(s2))
+
+    def _normalized_similarity(self, s1: str, s2: str) -> float:
+        """Similarity of two already-normalized strings (0-1)."""
         if s1 == s2:
             return 1.0
         
@@ -555,9 +642,12 @@ class TextComparator(BaseComparator):
 class RatingComparator(BaseComparator):
     """Compare rating annotations."""
     
-    def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
-        ann_rating = self._extract_rating(annotator_result)
-        gt_rating = self._extract_rating(ground_truth)
+    def extract_features(self, result: List[Dict]) -> Dict:
+        return {'rating': self._extract_rating(result)}
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
+        ann_rating = annotator_features['rating']
+        gt_rating = ground_truth_features['rating']
         
         if gt_rating is None:
             return {'overall_score': 0, 'message': 'No ground truth rating'}
@@ -601,42 +691,43 @@ class KeypointComparator(BaseComparator):
     
     DISTANCE_THRESHOLD = 5.0  # Percentage distance threshold
     
-    def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
-        ann_points = self._extract_keypoints(annotator_result)
-        gt_points = self._extract_keypoints(ground_truth)
+    def extract_features(self, result: List[Dict]) -> Dict:
+        points = self._extract_keypoints(result)
+        return {
+            'points': [[point['x'], point['y']] for point in points],
+            'labels': [point['label'] for point in points],
+        }
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
+        ann_labels = annotator_features['labels']
+        gt_labels = ground_truth_features['labels']
         
-        if not gt_points:
-            return {'overall_score': 100 if not ann_points else 0}
+        if not gt_labels:
+            return {'overall_score': 100 if not ann_labels else 0}
         
-        if not ann_points:
+        if not ann_labels:
             return {'overall_score': 0, 'message': 'No keypoints provided'}
         
-        # Match keypoints by label and calculate distance
-        total_score = 0
-        matched = 0
-        
-        for gt_point in gt_points:
-            gt_label = gt_point.get('label', '')
-            best_distance = float('inf')
-            
-            for ann_point in ann_points:
-                if ann_point.get('label', '') == gt_label:
-                    dist = self._calculate_distance(gt_point, ann_point)
-                    best_distance = min(best_distance, dist)
-            
-            if best_distance < float('inf'):
-                # Convert distance to score (closer = higher score)
-                point_score = max(0, 100 - (best_distance / self.DISTANCE_THRESHOLD) * 100)
-                total_score += min(100, point_score)
-                matched += 1
+        # Match keypoints by label: distance from every expected point to
+        # every provided point, other labels masked out
+        gt_points = np.array(ground_truth_features['points'], dtype=float)
+        ann_points = np.array(annotator_features['points'], dtype=float)
+        distances = np.sqrt(((gt_points[:, None, :] - ann_points[None, :, :]) ** 2).sum(axis=2))
+        same_label = (
+            np.array(gt_labels, dtype=object)[:, None] == np.array(ann_labels, dtype=object)[None, :]
+        )
+        best_distances = np.where(same_label, distances, np.inf).min(axis=1)
         
-        overall_score = total_score / len(gt_points) if gt_points else 0
+        found = np.isfinite(best_distances)
+        # Convert distance to score (closer = higher score)
+        point_scores = np.clip(100 - (best_distances[found] / self.DISTANCE_THRESHOLD) * 100, 0, 100)
+        overall_score = float(point_scores.sum()) / len(gt_labels)
         
         return {
             'overall_score': overall_score,
-            'keypoints_expected': len(gt_points),
-            'keypoints_found': len(ann_points),
-            'keypoints_matched': matched,
+            'keypoints_expected': len(gt_labels),
+            'keypoints_found': len(ann_labels),
+            'keypoints_matched': int(found.sum()),
         }
     
     def _extract_keypoints(self, result: List[Dict]) -> List[Dict]:
@@ -675,9 +766,12 @@ class KeypointComparator(BaseComparator):
 class GenericComparator(BaseComparator):
     """Fallback comparator for unknown annotation types."""
     
-    def compare(self, annotator_result: List[Dict], ground_truth: List[Dict]) -> Dict:
+    def extract_features(self, result: List[Dict]) -> Dict:
+        return {'result': result, 'values': self._extract_values(result)}
+
+    def compare_features(self, annotator_features: Dict, ground_truth_features: Dict) -> Dict:
         # Try to do a structural comparison
-        if annotator_result == ground_truth:
+        if annotator_features['result'] == ground_truth_features['result']:
             return {
                 'overall_score': 100,
                 'match': True,
@@ -685,8 +779,8 @@ class GenericComparator(BaseComparator):
             }
         
         # Try to extract and compare any 'value' fields
-        ann_values = self._extract_values(annotator_result)
-        gt_values = self._extract_values(ground_truth)
+        ann_values = annotator_features['values']
+        gt_values = ground_truth_features['values']
         
         if ann_values == gt_values:
             return {
@@ -722,3 +816,16 @@ class GenericComparator(BaseComparator):
                 values.append(item['value'])
         
         return values
+
+
+COMPARATORS = {
+    'classification': ClassificationComparator(),
+    'bounding_box': BoundingBoxComparator(),
+    'polygon': PolygonComparator(),
+    'segmentation': SegmentationComparator(),
+    'text': TextComparator(),
+    'rating': RatingComparator(),
+    'keypoint': KeypointComparator(),
+    'generic': GenericComparator(),
+    'unknown': GenericComparator(),
+}
@@ -22,6 +22,7 @@ from .models import (
     HoneypotAssignment,
     TaskAssignment,
 )
+from .honeypot_queue import HoneypotQueue
 from .honeypot_constants import (
     MIN_INTERVAL_TASKS,
     MAX_INTERVAL_TASKS,
@@ -69,6 +70,7 @@ class HoneypotInjector:
                 f"({len(available_golden)} available, need at least 3). "
                 f"Skipping honeypot injection."
             )
+            HoneypotQueue.give_back_golden_standards(annotator, project, available_golden)
             # Return tasks without honeypots
             return [(task, False, None) for task in task_list]
         
@@ -85,6 +87,7 @@ class HoneypotInjector:
         )
         
         if not injection_points:
+            HoneypotQueue.give_back_golden_standards(annotator, project, available_golden)
             return [(task, False, None) for task in task_list]
         
         # Build mixed queue
@@ -119,6 +122,11 @@ class HoneypotInjector:
             result.append((task_list[task_idx], False, None))
             task_idx += 1
         
+        # Unused golden standards stay at the front of the annotator's queue
+        HoneypotQueue.give_back_golden_standards(
+            annotator, project, available_golden[honeypot_idx:]
+        )
+        
         logger.info(
             f"Injected {honeypot_idx} honeypots into {len(task_list)} tasks "
             f"for {annotator.user.email} (project {project.id})"
@@ -166,25 +174,14 @@ class HoneypotInjector:
         annotator: AnnotatorProfile,
         project
     ) -> List[GoldenStandardTask]:
-        """Get golden standards this annotator hasn't seen yet in this project."""
-        # Get IDs of golden standards already shown to this annotator
-        seen_ids = HoneypotAssignment.objects.filter(
-            annotator=annotator,
-            golden_standard__project=project
-        ).values_list('golden_standard_id', flat=True)
-        
-        # Get active, non-retired golden standards not yet seen
-        available = list(
-            GoldenStandardTask.objects.filter(
-                project=project,
-                is_active=True,
-                is_retired=False
-            ).exclude(
-                id__in=seen_ids
-            ).order_by('?')[:10]  # Random selection, get up to 10
-        )
+        """
+        Get golden standards this annotator hasn't seen yet in this project.
         
-        return available
+        Taken from the annotator's pre-shuffled HoneypotQueue (up to 10), so
+        there is no ORDER BY random() over the project's golden standards.
+        Callers hand unused ones back with give_back_golden_standards().
+        """
+        return HoneypotQueue.take_golden_standards(annotator, project, count=10)
     
     @classmethod
     def _get_tasks_since_last_honeypot(
@@ -0,0 +1,268 @@
+"""
+Pre-shuffled honeypot queues per (annotator, project).
+
+Picking a honeypot used to run `.exclude(id__in=seen).order_by('?')` for every
+batch, which scans and sorts all golden standards of the project. Instead,
+each annotator gets a Redis list of unseen candidate ids in random order:
+
+    honeypot_queue:<source>:<project_id>:<generation>:<annotator_id> -> [id, id, ...]
+
+Taking the next honeypot pops from the front of the list. The list is built
+lazily on first use, with one query for the unseen ids shuffled in Python. A
+"built" marker then records that the list holds the whole cycle: once it is
+empty the annotator has nothing left to see, and no query is needed to find
+that out.
+
+Every id handed out is also recorded in a per-annotator set, which survives
+rebuilds:
+
+    honeypot_queue:<source>:<project_id>:handed:<annotator_id> -> {id, ...}
+
+A rebuilt queue therefore never repeats an id, even one that was taken but
+not yet recorded as a HoneypotAssignment. Ids that were taken but not used are
+pushed back, and removed from the set, with give_back().
+
+Each project has a generation counter (honeypot_queue:<source>:<project_id>:gen).
+The counter is bumped when a candidate is created, retired, deactivated or
+deleted (see annotators.signals). The bump switches every annotator's queue for
+that project to a fresh key, and the old lists expire. Popped ids are still
+checked against the database, so a candidate retired between bump and pop is
+never served.
+
+Without Redis every take falls back to one unseen-id query and a Python
+random.sample. Takes do not PING Redis first: an unreachable Redis shows up
+as the exception of the take itself, which falls back the same way.
+
+Sources:
+    golden_standard - GoldenStandardTask ids (HoneypotInjector)
+    honeypot_task   - Task ids of active HoneypotTask rows (HoneypotService)
+"""
+
+import logging
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django_rq import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+HONEYPOT_QUEUE_KEY_PREFIX = getattr(settings, "HONEYPOT_QUEUE_REDIS_KEY_PREFIX", "honeypot_queue")
+HONEYPOT_QUEUE_TTL = getattr(settings, "HONEYPOT_QUEUE_REDIS_TTL", 7 * 86400)  # 7 days
+
+GOLDEN_STANDARD = "golden_standard"
+HONEYPOT_TASK = "honeypot_task"
+
+# Field holding the candidate id on the candidate and "seen" querysets
+CANDIDATE_FIELDS = {GOLDEN_STANDARD: "id", HONEYPOT_TASK: "task_id"}
+SEEN_FIELDS = {GOLDEN_STANDARD: "golden_standard_id", HONEYPOT_TASK: "task_id"}
+
+# Popped ids failing validation (retired meanwhile) are replaced at most this often
+MAX_TAKE_ROUNDS = 3
+
+
+def _connection():
+    """Redis connection for the queues, or None when Redis is disabled"""
+    if not settings.REDIS_ENABLED:
+        return None
+    return get_connection()
+
+
+def _generation_key(source, project_id):
+    return f"{HONEYPOT_QUEUE_KEY_PREFIX}:{source}:{project_id}:gen"
+
+
+def _queue_key(source, project_id, generation, annotator_id):
+    return f"{HONEYPOT_QUEUE_KEY_PREFIX}:{source}:{project_id}:{generation}:{annotator_id}"
+
+
+def _built_key(queue_key):
+    return f"{queue_key}:built"
+
+
+def _handed_key(source, project_id, annotator_id):
+    return f"{HONEYPOT_QUEUE_KEY_PREFIX}:{source}:{project_id}:handed:{annotator_id}"
+
+
+class HoneypotQueue:
+    """
+    O(1) honeypot selection that never repeats a candidate for an annotator.
+    """
+
+    # ------------------------------------------------------------------
+    # Database candidates
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def candidates(source, project_id):
+        """Queryset of ids that may be served as honeypots in a project"""
+        if source == GOLDEN_STANDARD:
+            from .models import GoldenStandardTask
+
+            return GoldenStandardTask.objects.filter(
+                project_id=project_id, is_active=True, is_retired=False
+            ).values_list("id", flat=True)
+
+        from .models import HoneypotTask
+
+        return HoneypotTask.objects.filter(
+            task__project_id=project_id, is_active=True
+        ).values_list("task_id", flat=True)
+
+    @staticmethod
+    def seen(source, annotator_id, project_id):
+        """Queryset of candidate ids the annotator has already been given"""
+        if source == GOLDEN_STANDARD:
+            from .models import HoneypotAssignment
+
+            return HoneypotAssignment.objects.filter(
+                annotator_id=annotator_id, golden_standard__project_id=project_id
+            ).values_list("golden_standard_id", flat=True)
+
+        from .models import TaskAssignment
+
+        return TaskAssignment.objects.filter(
+            annotator_id=annotator_id, is_honeypot=True, task__project_id=project_id
+        ).values_list("task_id", flat=True)
+
+    @classmethod
+    def unseen_ids(cls, source, annotator_id, project_id):
+        """All unseen candidate ids, in database order"""
+        return list(
+            cls.candidates(source, project_id).exclude(
+                **{f"{CANDIDATE_FIELDS[source]}__in": cls.seen(source, annotator_id, project_id)}
+            )
+        )
+
+    @classmethod
+    def _validate(cls, source, annotator_id, project_id, ids):
+        """Keep ids that are still active and unseen, in the given order"""
+        if not ids:
+            return []
+        active = set(cls.candidates(source, project_id).filter(**{f"{CANDIDATE_FIELDS[source]}__in": ids}))
+        seen = set(cls.seen(source, annotator_id, project_id).filter(**{f"{SEEN_FIELDS[source]}__in": ids}))
+        return [id_ for id_ in ids if id_ in active and id_ not in seen]
+
+    # ------------------------------------------------------------------
+    # Queue operations
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def take(cls, source, annotator_id, project_id, count=1):
+        """
+        Take up to `count` unseen candidate ids in random order.
+
+        Returns fewer ids (possibly none) when the annotator has seen every
+        active candidate of the project.
+        """
+        redis_client = _connection()
+        if redis_client is None:
+            unseen = cls.unseen_ids(source, annotator_id, project_id)
+            return random.sample(unseen, min(count, len(unseen)))
+
+        try:
+            taken = []
+            for _ in range(MAX_TAKE_ROUNDS):
+                wanted = count - len(taken)
+                popped = cls._pop(redis_client, source, annotator_id, project_id, wanted)
+                taken.extend(cls._validate(source, annotator_id, project_id, popped))
+                if len(taken) >= count or len(popped) < wanted:
+                    # Done, or the queue is exhausted
+                    break
+            return taken
+        except Exception as e:
+            logger.error(f"Honeypot queue unavailable, falling back to database: {e}")
+            unseen = cls.unseen_ids(source, annotator_id, project_id)
+            return random.sample(unseen, min(count, len(unseen)))
+
+    @classmethod
+    def _pop(cls, redis_client, source, annotator_id, project_id, count):
+        """Pop up to count ids, building the queue first if this generation has none"""
+        generation = int(redis_client.get(_generation_key(source, project_id)) or 0)
+        key = _queue_key(source, project_id, generation, annotator_id)
+        handed_key = _handed_key(source, project_id, annotator_id)
+
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.lrange(key, 0, count - 1)
+        pipe.ltrim(key, count, -1)
+        pipe.exists(_built_key(key))
+        raw, _, built = pipe.execute()
+        popped = [int(value) for value in raw]
+
+        pipe = redis_client.pipeline(transaction=True)
+        if len(popped) < count and not built:
+            # Skip ids handed out before, even if not yet recorded as seen
+            excluded = {int(value) for value in redis_client.smembers(handed_key)} | set(popped)
+            queue = [
+                id_ for id_ in cls.unseen_ids(source, annotator_id, project_id) if id_ not in excluded
+            ]
+            random.shuffle(queue)
+
+            missing = count - len(popped)
+            popped.extend(queue[:missing])
+            if queue[missing:]:
+                pipe.rpush(key, *queue[missing:])
+                pipe.expire(key, HONEYPOT_QUEUE_TTL)
+            pipe.set(_built_key(key), 1, ex=HONEYPOT_QUEUE_TTL)
+
+        if popped:
+            pipe.sadd(handed_key, *popped)
+            pipe.expire(handed_key, HONEYPOT_QUEUE_TTL)
+        pipe.execute()
+        return popped
+
+    @classmethod
+    def give_back(cls, source, annotator_id, project_id, ids):
+        """Return taken-but-unused ids to the front of the queue, keeping their order"""
+        ids = list(ids)
+        redis_client = _connection()
+        if not ids or redis_client is None:
+            return
+        try:
+            generation = int(redis_client.get(_generation_key(source, project_id)) or 0)
+            key = _queue_key(source, project_id, generation, annotator_id)
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.lpush(key, *reversed(ids))
+            pipe.expire(key, HONEYPOT_QUEUE_TTL)
+            pipe.srem(_handed_key(source, project_id, annotator_id), *ids)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to return ids to honeypot queue: {e}")
+
+    @classmethod
+    def invalidate_project(cls, source, project_id):
+        """
+        Switch every annotator's queue for the project to a new generation,
+        after the current transaction commits.
+        """
+
+        def bump():
+            redis_client = _connection()
+            if redis_client is None:
+                return
+            try:
+                redis_client.incr(_generation_key(source, project_id))
+            except Exception as e:
+                logger.error(f"Failed to invalidate honeypot queues for project {project_id}: {e}")
+
+        transaction.on_commit(bump)
+
+    # ------------------------------------------------------------------
+    # Typed helpers
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def take_golden_standards(cls, annotator, project, count):
+        """Take up to `count` unseen GoldenStandardTask objects in random order"""
+        from .models import GoldenStandardTask
+
+        ids = cls.take(GOLDEN_STANDARD, annotator.id, project.id, count)
+        by_id = GoldenStandardTask.objects.select_related("task").in_bulk(ids)
+        return [by_id[id_] for id_ in ids if id_ in by_id]
+
+    @classmethod
+    def give_back_golden_standards(cls, annotator, project, golden_standards):
+        cls.give_back(
+            GOLDEN_STANDARD, annotator.id, project.id, [golden.id for golden in golden_standards]
+        )
@@ -131,36 +131,23 @@ class HoneypotService:
         Returns:
             A Task object if honeypot available, None otherwise
         """
-        from annotators.models import TaskAssignment, HoneypotTask
-
-        # Get honeypots the annotator has already been assigned
-        seen_honeypot_task_ids = TaskAssignment.objects.filter(
-            annotator=annotator_profile,
-            is_honeypot=True,
-            task__project=project,
-        ).values_list("task_id", flat=True)
-
-        # Get active unseen honeypots
-        unseen_honeypots = (
-            HoneypotTask.objects.filter(
-                task__project=project,
-                is_active=True,
-            )
-            .exclude(task_id__in=seen_honeypot_task_ids)
-            .select_related("task")
-        )
+        from annotators.honeypot_queue import HONEYPOT_TASK, HoneypotQueue
+        from tasks.models import Task
 
-        if not unseen_honeypots.exists():
+        # Next unseen honeypot from the annotator's pre-shuffled queue
+        task_ids = HoneypotQueue.take(HONEYPOT_TASK, annotator_profile.id, project.id)
+        if not task_ids:
             return None
 
-        # Select a random honeypot
-        honeypot = random.choice(list(unseen_honeypots))
+        task = Task.objects.filter(id=task_ids[0]).first()
+        if task is None:
+            return None
 
         logger.info(
-            f"Injecting honeypot task {honeypot.task.id} for {annotator_profile.user.email}"
+            f"Injecting honeypot task {task.id} for {annotator_profile.user.email}"
         )
 
-        return honeypot.task
+        return task
 
     @staticmethod
     @transaction.atomic
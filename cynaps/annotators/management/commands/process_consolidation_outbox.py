@@ -0,0 +1,57 @@
+"""
+Management command to drain the consensus consolidation outbox.
+
+Annotation saves queue ready tasks in the consolidation outbox and start an rq
+job to drain it. This command drains the outbox directly, which picks up rows
+whose job was never started (e.g. Redis was down) or whose worker crashed.
+Should be run periodically (e.g., every 10 minutes via cron).
+
+Usage:
+    python manage.py process_consolidation_outbox
+    python manage.py process_consolidation_outbox --batch-size 50
+    python manage.py process_consolidation_outbox --retry-failed
+"""
+
+import logging
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run pending consensus consolidations from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of outbox rows to fetch per batch',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Return failed rows to pending before draining',
+        )
+
+    def handle(self, *args, **options):
+        from annotators.consolidation_queue import ConsolidationQueue
+        from annotators.models import ConsolidationOutbox
+
+        if options.get('retry_failed'):
+            retried = ConsolidationOutbox.objects.filter(status='failed').update(
+                status='pending', attempts=0, updated_at=timezone.now()
+            )
+            self.stdout.write(f"Returned {retried} failed consolidation(s) to the queue")
+
+        stats = ConsolidationQueue.drain(batch_size=options['batch_size'])
+
+        style = self.style.WARNING if stats['failed'] else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f"Consolidation outbox: {stats['processed']} processed, {stats['failed']} failed, "
+                f"{stats['skipped']} skipped, {stats['requeued']} stale requeued"
+            )
+        )
@@ -0,0 +1,96 @@
+"""
+Management command to reconcile the capacity ledger with the database.
+
+Bulk updates that bypass model signals can make the Redis capacity ledger drift
+from the real TaskAssignment / ExpertReviewTask counts. This command recomputes
+the counts from the database and rewrites drifted ledger entries.
+Should be run periodically (e.g., every hour via cron).
+
+Usage:
+    python manage.py reconcile_capacity_ledger
+    python manage.py reconcile_capacity_ledger --annotators-only
+    python manage.py reconcile_capacity_ledger --experts-only
+    python manage.py reconcile_capacity_ledger --dry-run
+"""
+
+import logging
+
+from core.redis import redis_connected
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Repair drift between the capacity ledger and the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--annotators-only',
+            action='store_true',
+            help='Only reconcile annotator ledgers',
+        )
+        parser.add_argument(
+            '--experts-only',
+            action='store_true',
+            help='Only reconcile expert ledgers',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of ledger entries to reconcile per batch',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without repairing it',
+        )
+
+    def handle(self, *args, **options):
+        from annotators.capacity_ledger import ANNOTATOR, EXPERT
+        from annotators.models import AnnotatorProfile, ExpertProfile
+
+        if not redis_connected():
+            self.stdout.write(
+                self.style.WARNING("Redis is not connected - capacity is read from the database, nothing to do")
+            )
+            return
+
+        dry_run = options.get('dry_run')
+        if dry_run:
+            self.stdout.write(self.style.WARNING("DRY RUN - No changes will be made"))
+
+        targets = []
+        if not options.get('experts_only'):
+            targets.append((ANNOTATOR, AnnotatorProfile.objects.filter(status='approved')))
+        if not options.get('annotators_only'):
+            targets.append((EXPERT, ExpertProfile.objects.all()))
+
+        for kind, queryset in targets:
+            checked, drifted = self._reconcile(kind, queryset, options['batch_size'], dry_run)
+            style = self.style.WARNING if drifted else self.style.SUCCESS
+            self.stdout.write(
+                style(
+                    f"{kind.capitalize()} ledgers: {checked} checked, {drifted} "
+                    f"{'drifted' if dry_run else 'repaired'}"
+                )
+            )
+
+    def _reconcile(self, kind, queryset, batch_size, dry_run):
+        from annotators.capacity_ledger import CapacityLedger
+
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+        drifted_total = 0
+
+        for start in range(0, len(ids), batch_size):
+            drifted = CapacityLedger.reconcile(kind, ids[start:start + batch_size], dry_run=dry_run)
+            drifted_total += len(drifted)
+            for owner_id, ledger_entry, db_entry in drifted:
+                logger.warning(
+                    f"[CapacityLedger] {kind} {owner_id} drifted: "
+                    f"ledger active={ledger_entry['active']} in_progress={ledger_entry['in_progress']}, "
+                    f"db active={db_entry['active']} in_progress={db_entry['in_progress']}"
+                )
+
+        return len(ids), drifted_total
@@ -0,0 +1,165 @@
+"""
+Management command to re-score evaluated honeypots.
+
+Run after a honeypot comparator changes. Stored annotator results are
+re-evaluated in batches with HoneypotEvaluator.evaluate_many. Only rows whose
+score or pass/fail changed are written, with bulk_update. Golden standard
+pass/fail statistics are then recomputed from the assignments.
+
+Usage:
+    python manage.py rescore_honeypots
+    python manage.py rescore_honeypots --project 12 --batch-size 1000
+    python manage.py rescore_honeypots --refresh-features
+    python manage.py rescore_honeypots --dry-run
+"""
+
+import logging
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Re-score evaluated honeypot assignments against their golden standards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of honeypot assignments to evaluate per batch',
+        )
+        parser.add_argument(
+            '--project',
+            type=int,
+            help='Only re-score honeypots of this project',
+        )
+        parser.add_argument(
+            '--refresh-features',
+            action='store_true',
+            help='Rebuild stored ground-truth features first (after a feature format change)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing',
+        )
+
+    def handle(self, *args, **options):
+        from annotators.models import GoldenStandardTask
+
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        goldens = GoldenStandardTask.objects.only(
+            'id', 'ground_truth', 'ground_truth_features', 'tolerance'
+        )
+        if options.get('project'):
+            goldens = goldens.filter(project_id=options['project'])
+        goldens = {golden.id: golden for golden in goldens}
+
+        if options.get('refresh_features'):
+            for golden in goldens.values():
+                golden.refresh_features()
+            if not dry_run:
+                GoldenStandardTask.objects.bulk_update(
+                    goldens.values(), ['ground_truth_features'], batch_size=batch_size
+                )
+            self.stdout.write(f"Rebuilt features for {len(goldens)} golden standard(s)")
+
+        stats = self._rescore(goldens, batch_size, dry_run)
+
+        if not dry_run and stats['changed']:
+            self._update_golden_statistics(goldens)
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}Re-scored {stats['evaluated']} honeypot(s): {stats['changed']} changed, "
+                f"{stats['flipped']} changed pass/fail"
+            )
+        )
+
+    def _rescore(self, goldens, batch_size, dry_run):
+        from annotators.honeypot_evaluator import HoneypotEvaluator
+        from annotators.models import HoneypotAssignment
+
+        stats = {'evaluated': 0, 'changed': 0, 'flipped': 0}
+        queryset = HoneypotAssignment.objects.filter(
+            status='evaluated', golden_standard_id__in=list(goldens)
+        ).only(
+            'id', 'golden_standard_id', 'annotator_result', 'accuracy_score', 'passed'
+        ).order_by('id')
+
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            for assignment in batch:
+                # Share the preloaded golden standard instead of a query per row
+                assignment.golden_standard = goldens[assignment.golden_standard_id]
+
+            evaluations = HoneypotEvaluator.evaluate_many(
+                (assignment, assignment.annotator_result or []) for assignment in batch
+            )
+
+            changed = []
+            for assignment, evaluation in zip(batch, evaluations):
+                score = Decimal(str(round(evaluation['accuracy_score'], 2)))
+                if score == assignment.accuracy_score and evaluation['passed'] == assignment.passed:
+                    continue
+                if evaluation['passed'] != assignment.passed:
+                    stats['flipped'] += 1
+                assignment.accuracy_score = score
+                assignment.passed = evaluation['passed']
+                assignment.evaluation_details = evaluation['details']
+                changed.append(assignment)
+
+            stats['evaluated'] += len(batch)
+            stats['changed'] += len(changed)
+
+            if changed and not dry_run:
+                HoneypotAssignment.objects.bulk_update(
+                    changed, ['accuracy_score', 'passed', 'evaluation_details']
+                )
+            logger.info(
+                f"Re-scored honeypots up to id {last_id}: {len(changed)} of {len(batch)} changed"
+            )
+
+        return stats
+
+    @transaction.atomic
+    def _update_golden_statistics(self, goldens):
+        """Recompute pass/fail counts and average score from the assignments"""
+        from annotators.models import GoldenStandardTask, HoneypotAssignment
+
+        rows = (
+            HoneypotAssignment.objects.filter(
+                status='evaluated', golden_standard_id__in=list(goldens)
+            )
+            .values('golden_standard_id')
+            .annotate(
+                passed_count=Count('id', filter=Q(passed=True)),
+                failed_count=Count('id', filter=Q(passed=False)),
+                avg_score=Avg('accuracy_score'),
+            )
+        )
+
+        updated = []
+        for row in rows:
+            golden = goldens[row['golden_standard_id']]
+            golden.times_passed = row['passed_count']
+            golden.times_failed = row['failed_count']
+            golden.average_score = Decimal(str(round(float(row['avg_score'] or 0), 2)))
+            updated.append(golden)
+
+        GoldenStandardTask.objects.bulk_update(
+            updated, ['times_passed', 'times_failed', 'average_score']
+        )
@@ -0,0 +1,431 @@
+"""
+Mask geometry for polygon and brush consolidation
+
+Polygons and brush strokes are compared as boolean masks on a shared working
+grid. The grid keeps the image aspect ratio, and its longer side is
+CONSENSUS_MASK_RESOLUTION pixels. Pixel IoU, majority voting and contour
+extraction all run on that grid. Consolidated brush masks are scaled back to
+the original image size and re-encoded in the labeling frontend's RLE format.
+
+Brush RLE decoding is the expensive step. Decoded masks are therefore cached
+by content: an in-process LRU serves the repeated pairwise comparisons
+within one consolidation, and the Django cache serves later re-consolidations
+of the same task, for example after an expert edit.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image, ImageDraw
+
+logger = logging.getLogger(__name__)
+
+MASK_RESOLUTION = getattr(settings, "CONSENSUS_MASK_RESOLUTION", 256)
+MASK_CACHE_SIZE = getattr(settings, "CONSENSUS_MASK_CACHE_SIZE", 256)
+MASK_CACHE_TTL = getattr(settings, "CONSENSUS_MASK_CACHE_TTL", 60 * 60)
+
+# Matches the frontend brush encoder: 8-bit words, run-length field sizes 3/4/8/16 bits
+RLE_WORD_SIZE = 8
+RLE_SIZES = (3, 4, 8, 16)
+RLE_CHANNELS = 4
+
+_POWERS = 1 << np.arange(31, -1, -1, dtype=np.int64)
+
+
+# ============================================================================
+# RLE CODEC
+# ============================================================================
+
+
+def decode_rle(rle: Sequence[int]) -> np.ndarray:
+    """
+    Decode frontend brush RLE into a flat uint8 array (RGBA, row-major).
+
+    Same bit format as cynaps_sdk.converter.brush.decode_rle. The stream is
+    unpacked with NumPy and literal blocks are read in one step instead of
+    building a bit string.
+    """
+    bits = np.unpackbits(np.asarray(rle, dtype=np.uint8)).astype(np.int64)
+    pos = 0
+
+    def read(size):
+        nonlocal pos
+        value = int(bits[pos : pos + size] @ _POWERS[32 - size :])
+        pos += size
+        return value
+
+    num = read(32)
+    word_size = read(5) + 1
+    rle_sizes = [read(4) + 1 for _ in range(4)]
+    word_powers = _POWERS[32 - word_size :]
+
+    out = np.zeros(num, dtype=np.uint8)
+    i = 0
+    while i < num:
+        is_run = read(1)
+        j = min(i + 1 + read(rle_sizes[read(2)]), num)
+        if is_run:
+            out[i:j] = read(word_size)
+        else:
+            count = j - i
+            words = bits[pos : pos + count * word_size].reshape(count, word_size)
+            out[i:j] = words @ word_powers
+            pos += count * word_size
+        i = j
+    return out
+
+
+def encode_rle(values: np.ndarray) -> List[int]:
+    """
+    Encode a flat uint8 array as frontend brush RLE.
+
+    Every run of equal values becomes one run record, split at 2**16 entries.
+    The bit stream is assembled with NumPy from (value, width) fields.
+    """
+    values = np.asarray(values, dtype=np.uint8).ravel()
+    fields = [(len(values), 32), (RLE_WORD_SIZE - 1, 5)]
+    fields.extend((size - 1, 4) for size in RLE_SIZES)
+
+    if len(values):
+        ends = np.append(np.flatnonzero(values[1:] != values[:-1]), len(values) - 1)
+        lengths = np.diff(np.append(-1, ends))
+        for length, value in zip(lengths.tolist(), values[ends].tolist()):
+            while length > 0:
+                chunk = min(length, 1 << RLE_SIZES[-1])
+                size_index = next(
+                    index for index, size in enumerate(RLE_SIZES) if chunk <= 1 << size
+                )
+                fields.append((1, 1))
+                fields.append((size_index, 2))
+                fields.append((chunk - 1, RLE_SIZES[size_index]))
+                fields.append((value, RLE_WORD_SIZE))
+                length -= chunk
+
+    field_values = np.array([value for value, _ in fields], dtype=np.int64)
+    widths = np.array([width for _, width in fields], dtype=np.int64)
+    owner = np.repeat(np.arange(len(fields)), widths)
+    offset = np.arange(widths.sum()) - np.repeat(np.cumsum(widths) - widths, widths)
+    bits = (field_values[owner] >> (widths[owner] - 1 - offset)) & 1
+    return np.packbits(bits.astype(np.uint8)).tolist()
+
+
+def rle_to_mask(rle: Sequence[int], width: int, height: int) -> np.ndarray:
+    """Decode brush RLE into a (height, width) boolean mask from the alpha channel"""
+    values = decode_rle(rle)
+    expected = width * height * RLE_CHANNELS
+    if len(values) != expected:
+        values = np.resize(values, expected) if len(values) else np.zeros(expected, dtype=np.uint8)
+    return values.reshape(height, width, RLE_CHANNELS)[:, :, 3] > 0
+
+
+def mask_to_rle(mask: np.ndarray) -> List[int]:
+    """Encode a boolean mask as brush RLE with all four channels set to 255"""
+    values = np.where(np.asarray(mask, dtype=bool), 255, 0).astype(np.uint8)
+    return encode_rle(np.repeat(values.ravel(), RLE_CHANNELS))
+
+
+# ============================================================================
+# WORKING GRID
+# ============================================================================
+
+
+def working_shape(
+    original_width: Optional[int] = None,
+    original_height: Optional[int] = None,
+    resolution: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    (height, width) of the working grid for an image, keeping its aspect
+    ratio. Unknown image sizes use a square grid.
+    """
+    resolution = resolution or MASK_RESOLUTION
+    if not original_width or not original_height:
+        return resolution, resolution
+
+    scale = resolution / max(original_width, original_height)
+    return (
+        max(1, min(original_height, round(original_height * scale))),
+        max(1, min(original_width, round(original_width * scale))),
+    )
+
+
+def shape_for_items(items: Iterable[Dict], resolution: Optional[int] = None) -> Tuple[int, int]:
+    """Working grid for the first result item that carries the image size"""
+    for item in items:
+        if item.get("original_width") and item.get("original_height"):
+            return working_shape(item["original_width"], item["original_height"], resolution)
+    return working_shape(resolution=resolution)
+
+
+def resize_mask(mask: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Nearest-neighbour resize of a boolean mask to (height, width)"""
+    mask = np.asarray(mask, dtype=bool)
+    if mask.shape == tuple(shape):
+        return mask
+    rows = (np.arange(shape[0]) * mask.shape[0] // shape[0]).clip(0, mask.shape[0] - 1)
+    cols = (np.arange(shape[1]) * mask.shape[1] // shape[1]).clip(0, mask.shape[1] - 1)
+    return mask[rows[:, None], cols[None, :]]
+
+
+def rasterize_polygon(points: Sequence[Sequence[float]], shape: Tuple[int, int]) -> np.ndarray:
+    """Rasterize polygon points in percentage coordinates onto the working grid"""
+    height, width = shape
+    image = Image.new("1", (width, height), 0)
+    vertices = [(float(x) * width / 100.0, float(y) * height / 100.0) for x, y in points]
+    if len(vertices) >= 3:
+        ImageDraw.Draw(image).polygon(vertices, fill=1, outline=1)
+    return np.array(image, dtype=bool)
+
+
+# Moore neighbourhood, clockwise from west (row, col offsets)
+_NEIGHBOURS = [(0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1)]
+
+
+def _largest_component(mask: np.ndarray) -> np.ndarray:
+    """Largest 8-connected component of a boolean mask"""
+    height, width = mask.shape
+    labels = np.zeros(mask.shape, dtype=np.int32)
+    best_label, best_size = 0, 0
+    current = 0
+
+    for start_row, start_col in np.argwhere(mask):
+        if labels[start_row, start_col]:
+            continue
+        current += 1
+        labels[start_row, start_col] = current
+        stack = [(start_row, start_col)]
+        size = 0
+        while stack:
+            row, col = stack.pop()
+            size += 1
+            for d_row, d_col in _NEIGHBOURS:
+                r, c = row + d_row, col + d_col
+                if 0 <= r < height and 0 <= c < width and mask[r, c] and not labels[r, c]:
+                    labels[r, c] = current
+                    stack.append((r, c))
+        if size > best_size:
+            best_label, best_size = current, size
+
+    return labels == best_label if best_label else np.zeros(mask.shape, dtype=bool)
+
+
+def _trace_boundary(mask: np.ndarray) -> np.ndarray:
+    """Moore-neighbour trace of the outer boundary, as (row, col) pixel coordinates"""
+    padded = np.pad(mask, 1)
+    start = tuple(np.argwhere(padded)[0])
+    boundary = [start]
+    current = start
+    backtrack = 0  # entered the start pixel from the west
+
+    while True:
+        for step in range(8):
+            direction = (backtrack + step) % 8
+            d_row, d_col = _NEIGHBOURS[direction]
+            candidate = (current[0] + d_row, current[1] + d_col)
+            if padded[candidate]:
+                # Continue the search from the neighbour preceding the hit
+                backtrack = (direction + 5) % 8
+                current = candidate
+                break
+        else:
+            break  # isolated pixel
+
+        if current == start:
+            break
+        boundary.append(current)
+        if len(boundary) > padded.size:
+            break
+
+    return np.array(boundary, dtype=float) - 1
+
+
+def _simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Ramer-Douglas-Peucker simplification of an open polyline"""
+    if len(points) < 3:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[last] - points[first]
+        offsets = points[first + 1 : last] - points[first]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+
+def mask_to_polygon(mask: np.ndarray, tolerance: float = 1.0) -> List[List[float]]:
+    """
+    Outer contour of the largest region of a mask as polygon points in
+    percentage coordinates, simplified to within `tolerance` grid pixels.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return []
+
+    boundary = _trace_boundary(_largest_component(mask))
+    if len(boundary) < 3:
+        return []
+
+    # Simplify as a closed ring: split at the point furthest from the start
+    far = int(np.argmax(np.hypot(*(boundary - boundary[0]).T)))
+    ring = np.concatenate(
+        [_simplify(boundary[: far + 1], tolerance)[:-1], _simplify(np.vstack([boundary[far:], boundary[:1]]), tolerance)[:-1]]
+    )
+
+    height, width = mask.shape
+    return [
+        [float((col + 0.5) * 100.0 / width), float((row + 0.5) * 100.0 / height)]
+        for row, col in ring
+    ]
+
+
+# ============================================================================
+# MASK METRICS
+# ============================================================================
+
+
+def mask_iou_matrix(masks_a: Sequence[np.ndarray], masks_b: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Pixel IoU between every mask in masks_a and every mask in masks_b.
+
+    Masks are flattened and intersections computed with one matrix product.
+    Pairs of empty masks score 0.
+    """
+    if not len(masks_a) or not len(masks_b):
+        return np.zeros((len(masks_a), len(masks_b)))
+
+    flat_a = np.stack([np.asarray(m, dtype=bool).ravel() for m in masks_a]).astype(np.float32)
+    flat_b = np.stack([np.asarray(m, dtype=bool).ravel() for m in masks_b]).astype(np.float32)
+
+    intersection = flat_a @ flat_b.T
+    union = flat_a.sum(axis=1)[:, None] + flat_b.sum(axis=1)[None, :] - intersection
+    return np.divide(
+        intersection, union, out=np.zeros_like(intersection), where=union > 0
+    ).astype(float)
+
+
+def mask_iou(mask_a: np.ndarray, mask_b: np.ndarray) -> float:
+    """Pixel IoU of two masks on the same grid"""
+    union = np.logical_or(mask_a, mask_b).sum()
+    if not union:
+        return 0.0
+    return float(np.logical_and(mask_a, mask_b).sum() / union)
+
+
+def majority_vote(masks: Sequence[np.ndarray], voters: Optional[int] = None) -> np.ndarray:
+    """Pixels marked by more than half of the voters (defaults to len(masks))"""
+    voters = voters or len(masks)
+    votes = np.sum([np.asarray(m, dtype=np.uint16) for m in masks], axis=0)
+    return votes * 2 > voters
+
+
+# ============================================================================
+# DECODE CACHE
+# ============================================================================
+
+
+class MaskCache:
+    """
+    Content-addressed cache of decoded brush masks on the working grid.
+
+    Keys are a digest of the RLE bytes, the image size and the grid shape,
+    so an unchanged annotation hits the cache whichever task or consolidation
+    run asks for it. The in-process LRU is shared by the worker's threads,
+    so it is only touched under _lock.
+    """
+
+    _local: "OrderedDict[str, np.ndarray]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def key(rle: Sequence[int], original_shape: Tuple[int, int], shape: Tuple[int, int]) -> str:
+        digest = hashlib.sha1(bytes(np.asarray(rle, dtype=np.uint8))).hexdigest()
+        return (
+            f"consensus_mask:{digest}:"
+            f"{original_shape[0]}x{original_shape[1]}:{shape[0]}x{shape[1]}"
+        )
+
+    @classmethod
+    def get(cls, key: str) -> Optional[np.ndarray]:
+        with cls._lock:
+            mask = cls._local.get(key)
+            if mask is not None:
+                cls._local.move_to_end(key)
+                return mask
+
+        try:
+            packed = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Mask cache read failed: {e}")
+            packed = None
+        if packed is None:
+            return None
+
+        shape, data = packed
+        mask = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=shape[0] * shape[1])
+        mask = mask.reshape(shape).astype(bool)
+        cls._remember(key, mask)
+        return mask
+
+    @classmethod
+    def set(cls, key: str, mask: np.ndarray):
+        cls._remember(key, mask)
+        try:
+            cache.set(key, (mask.shape, np.packbits(mask).tobytes()), MASK_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Mask cache write failed: {e}")
+
+    @classmethod
+    def _remember(cls, key: str, mask: np.ndarray):
+        with cls._lock:
+            cls._local[key] = mask
+            cls._local.move_to_end(key)
+            while len(cls._local) > MASK_CACHE_SIZE:
+                cls._local.popitem(last=False)
+
+    @classmethod
+    def clear(cls):
+        """Drop the in-process cache (the Django cache entries expire by TTL)"""
+        with cls._lock:
+            cls._local.clear()
+
+
+def brush_item_mask(item: Dict, shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Working-grid mask of a brushlabels result item, decoded through MaskCache.
+
+    Items without RLE data or image size give an empty mask.
+    """
+    value = item.get("value", {}) or {}
+    rle = value.get("rle") or item.get("rle")
+    width = item.get("original_width")
+    height = item.get("original_height")
+    if not rle or not width or not height:
+        return np.zeros(shape, dtype=bool)
+
+    key = MaskCache.key(rle, (height, width), shape)
+    mask = MaskCache.get(key)
+    if mask is None:
+        mask = resize_mask(rle_to_mask(rle, width, height), shape)
+        MaskCache.set(key, mask)
+    return mask
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotators', '0022_remove_annotatorexpertise_annotator_e_badge_e_idx_and_more'),
+        ('tasks', '0063_remove_failedprediction_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsolidationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='consolidation_outbox', to='tasks.task')),
+            ],
+            options={
+                'verbose_name': 'Consolidation Outbox Entry',
+                'verbose_name_plural': 'Consolidation Outbox',
+                'db_table': 'consolidation_outbox',
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='consolidati_status_0bcdb8_idx')],
+            },
+        ),
+    ]
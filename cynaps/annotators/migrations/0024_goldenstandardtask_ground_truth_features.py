@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotators', '0023_consolidationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goldenstandardtask',
+            name='ground_truth_features',
+            field=models.JSONField(blank=True, help_text='Precomputed ground-truth features used by the honeypot evaluator', null=True),
+        ),
+    ]
@@ -1561,6 +1561,44 @@ class ConsensusQualityScore(models.Model):
         return f"{self.annotator.user.email} - Task {self.task_consensus.task_id}: {self.quality_score}%"
 
 
+class ConsolidationOutbox(models.Model):
+    """
+    Durable queue of tasks waiting for consensus consolidation.
+    One row per task, so concurrent annotation saves on the same task collapse
+    into a single pending consolidation. Drained by the consolidation rq job.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),  # Waiting for a worker
+        ("processing", "Processing"),  # Claimed by a worker
+        ("done", "Done"),  # Consolidation ran (or was not needed)
+        ("failed", "Failed"),  # Gave up after max attempts
+    ]
+
+    task = models.OneToOneField(
+        Task, on_delete=models.CASCADE, related_name="consolidation_outbox"
+    )
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "consolidation_outbox"
+        verbose_name = "Consolidation Outbox Entry"
+        verbose_name_plural = "Consolidation Outbox"
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"Consolidation for Task {self.task_id}: {self.status}"
+
+
 # ============================================================================
 # EXPERT REVIEW MODELS
 # ============================================================================
@@ -2192,6 +2230,13 @@ class GoldenStandardTask(models.Model):
     ground_truth = models.JSONField(
         help_text="Verified correct annotation result"
     )
+    # Comparison features extracted from ground_truth on save
+    # (see HoneypotEvaluator.build_features)
+    ground_truth_features = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Precomputed ground-truth features used by the honeypot evaluator"
+    )
     
     # Source tracking
     source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
@@ -2248,6 +2293,12 @@ class GoldenStandardTask(models.Model):
     def __str__(self):
         return f"Golden Standard for Task {self.task.id} ({self.source})"
     
+    def refresh_features(self):
+        """Rebuild ground_truth_features from ground_truth (does not save)"""
+        from .honeypot_evaluator import HoneypotEvaluator
+
+        self.ground_truth_features = HoneypotEvaluator.build_features(self.ground_truth)
+
     def retire_if_needed(self):
         """Retire golden standard if used too many times"""
         if self.times_shown >= self.max_uses and not self.is_retired:
@@ -1,22 +1,11 @@
 """Scoring utilities for annotator tests"""
 
+from .geometry import box_iou, boxes_to_array
+
 
 def calculate_iou(bbox1, bbox2):
     """Calculate Intersection over Union for bounding boxes"""
-    x1 = max(bbox1['x'], bbox2['x'])
-    y1 = max(bbox1['y'], bbox2['y'])
-    x2 = min(bbox1['x'] + bbox1['width'], bbox2['x'] + bbox2['width'])
-    y2 = min(bbox1['y'] + bbox1['height'], bbox2['y'] + bbox2['height'])
-    
-    if x2 < x1 or y2 < y1:
-        return 0.0
-    
-    intersection = (x2 - x1) * (y2 - y1)
-    area1 = bbox1['width'] * bbox1['height']
-    area2 = bbox2['width'] * bbox2['height']
-    union = area1 + area2 - intersection
-    
-    return intersection / union if union > 0 else 0.0
+    return box_iou(boxes_to_array([bbox1])[0], boxes_to_array([bbox2])[0])
 
 
 def score_ner_annotations(user_annotations, ground_truth, tolerance=5):
@@ -14,9 +14,9 @@ The workflow is fully automatic with FIXED OVERLAP=3:
 """
 
 import logging
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Count
 
 logger = logging.getLogger(__name__)
@@ -530,53 +530,14 @@ def check_consolidation_on_annotation_save(sender, instance, created, **kwargs):
             f"🔔 Task {task.id} ready for consolidation with {annotation_count} annotations!"
         )
 
-        # Check if already has consensus
-        from annotators.models import TaskConsensus
-
-        try:
-            consensus = TaskConsensus.objects.get(task=task)
-
-            # Check if consolidation already completed
-            if consensus.status in [
-                "review_required",
-                "consensus_reached",
-                "finalized",
-            ]:
-                logger.info(
-                    f"✅ Task {task.id} already consolidated (status={consensus.status})"
-                )
-                return
-
-            # Consolidation started but not completed - update and retry
-            logger.info(
-                f"⚠️  Task {task.id} has consensus but status={consensus.status}, retriggering..."
-            )
-            consensus.required_annotations = required_overlap
-            consensus.current_annotations = annotation_count
-            consensus.status = "in_consensus"
-            consensus.save()
-
-        except TaskConsensus.DoesNotExist:
-            # Create new consensus object
-            consensus = TaskConsensus.objects.create(
-                task=task,
-                required_annotations=required_overlap,
-                current_annotations=annotation_count,
-                status="pending",
-            )
-            logger.info(f"📝 Created new consensus record for Task {task.id}")
-
-        # Trigger consolidation directly (not through background job to avoid Redis auth issues)
+        # Consolidation runs off the request path through the outbox queue
         try:
-            from annotators.annotation_workflow import AnnotationWorkflowService
-
-            logger.info(f"🚀 Triggering consolidation for Task {task.id}...")
-            AnnotationWorkflowService.trigger_consolidation(task, consensus)
-            logger.info(f"✅ Consolidation completed for Task {task.id}")
+            from annotators.consolidation_queue import ConsolidationQueue
 
+            ConsolidationQueue.schedule(task.id)
         except Exception as e:
             logger.error(
-                f"❌ Error triggering consolidation for Task {task.id}: {e}",
+                f"❌ Error queueing consolidation for Task {task.id}: {e}",
                 exc_info=True,
             )
     else:
@@ -992,3 +953,190 @@ def trigger_expert_assignment_after_consolidation(task_consensus):
         return {'success': False, 'error': str(e)}
 
 
+
+
+# ====================================================================================
+# CAPACITY LEDGER SIGNALS
+# ====================================================================================
+# Keep the per-annotator / per-expert capacity ledger (annotators.capacity_ledger)
+# in step with assignment create, complete and release. Redis is only touched
+# once the transaction commits, so a rollback leaves no phantom counts behind.
+# ====================================================================================
+
+_LEDGER_STATUS_UNKNOWN = object()
+
+
+def _update_ledger_on_save(kind, owner_id, project_id_getter, instance, created, update_fields):
+    from .capacity_ledger import CapacityLedger, status_deltas
+
+    if update_fields is not None and "status" not in update_fields:
+        return
+
+    old_status = None if created else getattr(instance, "_ledger_status", _LEDGER_STATUS_UNKNOWN)
+    instance._ledger_status = instance.status
+
+    if old_status is _LEDGER_STATUS_UNKNOWN:
+        transaction.on_commit(lambda: CapacityLedger.invalidate(kind, [owner_id]))
+        return
+
+    active_delta, in_progress_delta = status_deltas(kind, old_status, instance.status)
+    if active_delta or in_progress_delta:
+        change = (owner_id, project_id_getter(), active_delta, in_progress_delta)
+        transaction.on_commit(lambda: CapacityLedger.adjust_many(kind, [change]))
+
+
+@receiver(post_init, sender="annotators.TaskAssignment", dispatch_uid="capacity_ledger_task_assignment_init")
+@receiver(post_init, sender="annotators.ExpertReviewTask", dispatch_uid="capacity_ledger_expert_review_init")
+def remember_status_for_capacity_ledger(sender, instance, **kwargs):
+    """Remember the loaded status so post_save can compute the ledger delta"""
+    if instance.pk is None:
+        instance._ledger_status = None
+    else:
+        # Read from __dict__ so deferred fields don't trigger a query
+        instance._ledger_status = instance.__dict__.get("status", _LEDGER_STATUS_UNKNOWN)
+
+
+@receiver(post_save, sender="annotators.TaskAssignment", dispatch_uid="capacity_ledger_task_assignment_save")
+def update_capacity_ledger_on_task_assignment_save(sender, instance, created, **kwargs):
+    """Count assignment create, completion and release in the annotator's ledger"""
+    from .capacity_ledger import ANNOTATOR
+
+    try:
+        _update_ledger_on_save(
+            ANNOTATOR,
+            instance.annotator_id,
+            lambda: instance.task.project_id,
+            instance,
+            created,
+            kwargs.get("update_fields"),
+        )
+    except Exception as e:
+        logger.error(f"Error updating capacity ledger for assignment {instance.pk}: {e}")
+
+
+@receiver(post_save, sender="annotators.ExpertReviewTask", dispatch_uid="capacity_ledger_expert_review_save")
+def update_capacity_ledger_on_expert_review_save(sender, instance, created, **kwargs):
+    """Count review create, completion and release in the expert's ledger"""
+    from .capacity_ledger import EXPERT
+
+    try:
+        _update_ledger_on_save(
+            EXPERT, instance.expert_id, lambda: None, instance, created, kwargs.get("update_fields")
+        )
+    except Exception as e:
+        logger.error(f"Error updating capacity ledger for expert review {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender="annotators.TaskAssignment", dispatch_uid="capacity_ledger_task_assignment_delete")
+def update_capacity_ledger_on_task_assignment_delete(sender, instance, **kwargs):
+    from tasks.models import Task
+
+    from .capacity_ledger import ACTIVE_STATUSES, ANNOTATOR, CapacityLedger
+    from .models import TaskAssignment
+
+    if instance.status not in ACTIVE_STATUSES[ANNOTATOR]:
+        return
+
+    try:
+        annotator_id, status = instance.annotator_id, instance.status
+        if TaskAssignment.task.is_cached(instance):
+            project_id = instance.task.project_id
+        else:
+            # Cascades delete assignments without their task loaded; fetch only the project id
+            project_id = (
+                Task.objects.filter(id=instance.task_id).values_list("project_id", flat=True).first()
+            )
+        if project_id is None:
+            transaction.on_commit(lambda: CapacityLedger.invalidate(ANNOTATOR, [annotator_id]))
+        else:
+            transaction.on_commit(
+                lambda: CapacityLedger.record_transition(ANNOTATOR, annotator_id, status, None, project_id)
+            )
+    except Exception as e:
+        logger.error(f"Error updating capacity ledger for assignment {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender="annotators.ExpertReviewTask", dispatch_uid="capacity_ledger_expert_review_delete")
+def update_capacity_ledger_on_expert_review_delete(sender, instance, **kwargs):
+    from .capacity_ledger import EXPERT, CapacityLedger
+
+    try:
+        expert_id, status = instance.expert_id, instance.status
+        transaction.on_commit(lambda: CapacityLedger.record_transition(EXPERT, expert_id, status, None))
+    except Exception as e:
+        logger.error(f"Error updating capacity ledger for expert review {instance.pk}: {e}")
+
+
+# ====================================================================================
+# HONEYPOT GROUND-TRUTH FEATURES
+# ====================================================================================
+# Extract the golden standard's comparison features whenever its ground truth is
+# written, so honeypot evaluation does not re-parse the golden JSON per submission.
+# ====================================================================================
+
+
+@receiver(pre_save, sender="annotators.GoldenStandardTask", dispatch_uid="golden_standard_features")
+def refresh_golden_standard_features(sender, instance, update_fields=None, **kwargs):
+    """Rebuild ground_truth_features when ground_truth may have changed"""
+    if update_fields is not None and "ground_truth" not in update_fields:
+        return
+
+    try:
+        instance.refresh_features()
+    except Exception as e:
+        # Evaluation falls back to extracting features on the fly
+        logger.error(f"Failed to build features for golden standard {instance.pk}: {e}")
+        instance.ground_truth_features = None
+
+
+@receiver(post_save, sender="annotators.GoldenStandardTask", dispatch_uid="golden_standard_features_saved")
+def persist_golden_standard_features(sender, instance, created, update_fields=None, **kwargs):
+    """save(update_fields=["ground_truth"]) does not write the rebuilt features; write them here"""
+    if update_fields is None or "ground_truth" not in update_fields:
+        return
+    if "ground_truth_features" in update_fields:
+        return
+
+    sender.objects.filter(pk=instance.pk).update(
+        ground_truth_features=instance.ground_truth_features
+    )
+
+
+# ====================================================================================
+# HONEYPOT QUEUE INVALIDATION
+# ====================================================================================
+# Annotators' pre-shuffled honeypot queues (annotators.honeypot_queue) are rebuilt
+# when the set of servable honeypots of a project changes.
+# ====================================================================================
+
+_HONEYPOT_QUEUE_FIELDS = {"is_active", "is_retired", "project"}
+
+
+@receiver(post_save, sender="annotators.GoldenStandardTask", dispatch_uid="honeypot_queue_golden_save")
+def invalidate_honeypot_queue_on_golden_save(sender, instance, created, update_fields=None, **kwargs):
+    from .honeypot_queue import GOLDEN_STANDARD, HoneypotQueue
+
+    if created or update_fields is None or _HONEYPOT_QUEUE_FIELDS & set(update_fields):
+        HoneypotQueue.invalidate_project(GOLDEN_STANDARD, instance.project_id)
+
+
+@receiver(post_delete, sender="annotators.GoldenStandardTask", dispatch_uid="honeypot_queue_golden_delete")
+def invalidate_honeypot_queue_on_golden_delete(sender, instance, **kwargs):
+    from .honeypot_queue import GOLDEN_STANDARD, HoneypotQueue
+
+    HoneypotQueue.invalidate_project(GOLDEN_STANDARD, instance.project_id)
+
+
+@receiver(post_save, sender="annotators.HoneypotTask", dispatch_uid="honeypot_queue_task_save")
+@receiver(post_delete, sender="annotators.HoneypotTask", dispatch_uid="honeypot_queue_task_delete")
+def invalidate_honeypot_queue_on_honeypot_task_change(sender, instance, update_fields=None, **kwargs):
+    from tasks.models import Task
+
+    from .honeypot_queue import HONEYPOT_TASK, HoneypotQueue
+
+    if update_fields is not None and "is_active" not in update_fields:
+        return  # statistics only
+
+    project_id = Task.objects.filter(id=instance.task_id).values_list("project_id", flat=True).first()
+    if project_id is not None:
+        HoneypotQueue.invalidate_project(HONEYPOT_TASK, project_id)
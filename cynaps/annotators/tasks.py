@@ -6,6 +6,7 @@ These tasks handle:
 - Bulk task assignment
 - Periodic reassignment of stale tasks
 - Workload balancing
+- Consensus consolidation outbox draining
 """
 
 import logging
@@ -398,6 +399,27 @@ def process_task_completion_gamification(task_assignment_id):
         return {"success": False, "error": str(e)}
 
 
+@job("default", timeout=900)
+def process_consolidation_outbox_job(batch_size=None):
+    """
+    Drain the consensus consolidation outbox.
+
+    Scheduled after an annotation save queues a task for consolidation, and
+    safe to run concurrently: each outbox row is claimed by exactly one worker.
+
+    Args:
+        batch_size: Outbox rows fetched per batch
+    """
+    from annotators.consolidation_queue import ConsolidationQueue
+
+    try:
+        stats = ConsolidationQueue.drain(batch_size=batch_size)
+        return {"success": True, **stats}
+    except Exception as e:
+        logger.exception(f"Error draining consolidation outbox: {e}")
+        return {"success": False, "error": str(e)}
+
+
 # ============================================================================
 # EXPERT ASSIGNMENT TASKS
 # ============================================================================
@@ -0,0 +1,102 @@
+"""
+Tests for the pairwise agreement matrix used by consensus consolidation
+
+Tests cover:
+- Each pair is compared once and reused for peer averages
+- Individual-vs-consolidated agreement is computed once per annotation
+- Agreement records are upserted with a single query
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+User = get_user_model()
+
+
+class FixedStrategy:
+    """Strategy returning agreement from a lookup table, counting calls"""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.calls = 0
+
+    def calculate_agreement(self, ann1, ann2):
+        self.calls += 1
+        key = tuple(sorted((ann1[0], ann2[0])))
+        overall = self.scores.get(key, 100.0)
+        return {"overall": overall, "label": overall}
+
+
+class AgreementMatrixTests(TestCase):
+    """Tests for AgreementMatrix"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from annotators.models import AnnotatorProfile, TaskAssignment, TaskConsensus
+        from organizations.models import Organization
+        from projects.models import Project
+        from tasks.models import Task
+
+        org = Organization.objects.create(title="Matrix Org")
+        project = Project.objects.create(title="Matrix Project", organization=org)
+        task = Task.objects.create(project=project, data={"text": "matrix"})
+
+        annotators = []
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f"matrix{i}", email=f"matrix{i}@test.com", password="testpass123"
+            )
+            annotators.append(AnnotatorProfile.objects.create(user=user, status="approved"))
+
+        TaskAssignment.objects.all().delete()
+        cls.assignments = [
+            TaskAssignment.objects.create(annotator=annotator, task=task, status="completed")
+            for annotator in annotators
+        ]
+        cls.consensus = TaskConsensus.objects.create(task=task)
+
+    def _annotations(self):
+        return [
+            {"assignment": assignment, "result": [name]}
+            for assignment, name in zip(self.assignments, ["a", "b", "c"])
+        ]
+
+    def test_pairs_are_computed_once_and_reused(self):
+        from annotators.consensus_service import AgreementMatrix
+
+        strategy = FixedStrategy({("a", "b"): 90.0, ("a", "c"): 60.0, ("b", "c"): 30.0})
+        matrix = AgreementMatrix(strategy, self._annotations())
+        self.assertEqual(strategy.calls, 3)
+
+        self.assertEqual(matrix.pair_scores, [90.0, 60.0, 30.0])
+        self.assertEqual(matrix.summary(), (60.0, 30.0, 90.0))
+        self.assertEqual(matrix.peer_average(0), Decimal("75.0"))
+        self.assertEqual(matrix.peer_average(1), Decimal("60.0"))
+        self.assertEqual(matrix.peer_average(2), Decimal("45.0"))
+
+        individual = matrix.individual_agreements(["a"])
+        self.assertEqual([a["overall"] for a in individual], [100.0, 90.0, 60.0])
+        self.assertIs(matrix.individual_agreements(["a"]), individual)
+        self.assertEqual(strategy.calls, 6)
+
+    def test_save_upserts_agreements_in_one_query(self):
+        from annotators.consensus_service import AgreementMatrix, ConsensusService
+        from annotators.models import AnnotatorAgreement
+
+        matrix = AgreementMatrix(FixedStrategy({("a", "b"): 90.0}), self._annotations())
+        with self.assertNumQueries(1):
+            matrix.save(self.consensus, "classification", ConsensusService._agreement_fields)
+        self.assertEqual(AnnotatorAgreement.objects.filter(task_consensus=self.consensus).count(), 3)
+
+        # Re-running consolidation updates the existing rows
+        matrix = AgreementMatrix(FixedStrategy({("a", "b"): 40.0}), self._annotations())
+        matrix.save(self.consensus, "classification", ConsensusService._agreement_fields)
+
+        agreements = AnnotatorAgreement.objects.filter(task_consensus=self.consensus)
+        self.assertEqual(agreements.count(), 3)
+        first_pair = agreements.get(
+            annotator_1=self.assignments[0].annotator, annotator_2=self.assignments[1].annotator
+        )
+        self.assertEqual(first_pair.agreement_score, Decimal("40.00"))
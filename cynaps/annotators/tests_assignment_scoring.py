@@ -0,0 +1,137 @@
+"""
+Tests for batch assignment scoring
+
+Tests cover:
+- Parity between AssignmentEngine.calculate_assignment_score (per-row) and
+  AssignmentEngine.calculate_assignment_scores (batch)
+- Query count of the batch path
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class BatchAssignmentScoringTests(TestCase):
+    """Batch scoring must rank annotators exactly like the per-row path"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from annotators.models import AnnotatorProfile, TaskAssignment, TrustLevel
+        from organizations.models import Organization
+        from projects.models import Project
+        from tasks.models import Task
+
+        cls.org = Organization.objects.create(title="Scoring Org")
+        cls.project = Project.objects.create(
+            title="Scoring Project",
+            organization=cls.org,
+            label_config='<View><Image name="image" value="$image"/>'
+            '<RectangleLabels name="label" toName="image"><Label value="Car"/></RectangleLabels></View>',
+        )
+        tasks = [
+            Task.objects.create(project=cls.project, data={"image": f"img_{i}.jpg"})
+            for i in range(6)
+        ]
+
+        now = timezone.now()
+        specs = [
+            # (level, accuracy, rejection, fraud_flags, days_inactive, active, completed)
+            ("expert", "96.50", "1.00", 0, 0, 1, 4),
+            ("senior", "91.00", "3.50", 0, 2, 0, 2),
+            ("regular", "82.25", "8.00", 1, 5, 3, 1),
+            ("junior", "71.00", "12.00", 0, None, 2, 0),
+            ("new", "0.00", "0.00", 0, 10, 0, 0),
+            (None, "65.00", "5.00", 0, 1, 1, 1),
+        ]
+        cls.annotators = []
+        for i, (level, accuracy, rejection, fraud, days, _, _) in enumerate(specs):
+            user = User.objects.create_user(
+                username=f"scorer{i}", email=f"scorer{i}@test.com", password="testpass123"
+            )
+            annotator = AnnotatorProfile.objects.create(
+                user=user,
+                status="approved",
+                accuracy_score=Decimal(accuracy),
+                rejection_rate=Decimal(rejection),
+                last_active=now - timedelta(days=days) if days is not None else None,
+            )
+            if level:
+                TrustLevel.objects.update_or_create(
+                    annotator=annotator,
+                    defaults={
+                        "level": level,
+                        "multiplier": TrustLevel.LEVEL_MULTIPLIERS[level],
+                        "fraud_flags": fraud,
+                    },
+                )
+            else:
+                TrustLevel.objects.filter(annotator=annotator).delete()
+
+            cls.annotators.append(annotator)
+
+        # Replace whatever the approval signals assigned with a known workload
+        TaskAssignment.objects.all().delete()
+        for annotator, spec in zip(cls.annotators, specs):
+            active, completed = spec[5], spec[6]
+            statuses = ["assigned"] * active + ["completed"] * completed
+            for task, status in zip(tasks, statuses):
+                TaskAssignment.objects.create(annotator=annotator, task=task, status=status)
+
+    def _queryset(self):
+        from annotators.models import AnnotatorProfile
+
+        return AnnotatorProfile.objects.filter(
+            id__in=[a.id for a in self.annotators]
+        ).order_by("id")
+
+    def _per_row_ranking(self):
+        from annotators.assignment_engine import AssignmentEngine
+
+        scores = []
+        for annotator in self._queryset().select_related("user", "trust_level"):
+            score = AssignmentEngine.calculate_assignment_score(annotator, self.project)
+            if score > 0:
+                scores.append((annotator.id, score))
+        scores.sort(key=lambda x: x[1], reverse=True)
+        return scores
+
+    def _assert_parity(self):
+        from annotators.assignment_engine import AssignmentEngine
+
+        batch = AssignmentEngine.calculate_assignment_scores(self._queryset(), self.project)
+        per_row = self._per_row_ranking()
+
+        self.assertEqual([a.id for a, _ in batch], [a_id for a_id, _ in per_row])
+        for (_, batch_score), (_, row_score) in zip(batch, per_row):
+            self.assertAlmostEqual(batch_score, row_score, places=9)
+
+    def test_batch_matches_per_row_ranking(self):
+        self._assert_parity()
+
+    def test_batch_matches_with_required_skills_and_min_trust(self):
+        self.project.required_skills = ["Object Detection", "Bounding Box"]
+        self.project.min_trust_level = "regular"
+        self.annotators[0].skills = ["Object Detection", "Bounding Box"]
+        self.annotators[0].save(update_fields=["skills"])
+        self.annotators[1].skills = ["Object Detection"]
+        self.annotators[1].save(update_fields=["skills"])
+        self.annotators[2].skills = ["Object Detection"]
+        self.annotators[2].save(update_fields=["skills"])
+
+        self._assert_parity()
+
+    def test_batch_scoring_uses_single_query(self):
+        from annotators.assignment_engine import AssignmentEngine
+
+        with CaptureQueriesContext(connection) as ctx:
+            AssignmentEngine.calculate_assignment_scores(self._queryset(), self.project)
+
+        self.assertEqual(len(ctx.captured_queries), 1)
@@ -0,0 +1,167 @@
+"""
+Tests for the annotator/expert capacity ledger
+
+Tests cover:
+- Ledger is rebuilt from the database on a cold read
+- Assignment create, complete and release update the ledger via signals
+- Rolled-back writes leave the ledger untouched
+- Capacity checks read the ledger without touching the database
+- Partial hashes and drift are repaired
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from fakeredis import FakeRedis
+
+User = get_user_model()
+
+
+class CapacityLedgerTests(TestCase):
+    """Tests for CapacityLedger backed by a fake Redis"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from annotators.models import AnnotatorProfile, TaskAssignment, TrustLevel
+        from organizations.models import Organization
+        from projects.models import Project
+        from tasks.models import Task
+
+        cls.org = Organization.objects.create(title="Ledger Org")
+        cls.project = Project.objects.create(title="Ledger Project", organization=cls.org)
+        Project.objects.filter(id=cls.project.id).update(is_published=True)
+
+        user = User.objects.create_user(
+            username="ledger", email="ledger@test.com", password="testpass123"
+        )
+        cls.annotator = AnnotatorProfile.objects.create(user=user, status="approved")
+        TrustLevel.objects.update_or_create(annotator=cls.annotator, defaults={"level": "new"})
+
+        cls.tasks = [
+            Task.objects.create(project=cls.project, data={"text": f"task {i}"}) for i in range(4)
+        ]
+        TaskAssignment.objects.all().delete()
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch("annotators.capacity_ledger._connection", lambda: self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _ledger(self):
+        from annotators.capacity_ledger import CapacityLedger
+
+        return CapacityLedger.get_annotator(self.annotator.id)
+
+    def _db_entry(self):
+        from annotators.capacity_ledger import ANNOTATOR, CapacityLedger
+
+        return CapacityLedger.compute_from_db(ANNOTATOR, [self.annotator.id])[self.annotator.id]
+
+    def test_cold_read_rebuilds_from_database(self):
+        from annotators.models import TaskAssignment
+
+        TaskAssignment.objects.bulk_create(
+            [
+                TaskAssignment(annotator=self.annotator, task=self.tasks[0], status="assigned"),
+                TaskAssignment(annotator=self.annotator, task=self.tasks[1], status="in_progress"),
+                TaskAssignment(annotator=self.annotator, task=self.tasks[2], status="completed"),
+            ]
+        )
+
+        entry = self._ledger()
+        self.assertEqual(entry["active"], 2)
+        self.assertEqual(entry["in_progress"], 1)
+        self.assertEqual(entry["projects"], {self.project.id: 2})
+
+        # Second read is served from Redis
+        with self.assertNumQueries(0):
+            self.assertEqual(self._ledger(), entry)
+
+    def test_signals_track_create_complete_and_release(self):
+        from annotators.models import TaskAssignment
+
+        self._ledger()  # warm
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = TaskAssignment.objects.create(annotator=self.annotator, task=self.tasks[0])
+            second = TaskAssignment.objects.create(annotator=self.annotator, task=self.tasks[1])
+        self.assertEqual(self._ledger()["active"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.status = "in_progress"
+            second.save(update_fields=["status"])
+        self.assertEqual(self._ledger()["in_progress"], 1)
+
+        # Completion may hand out new work through the reassignment signals,
+        # so compare against the database rather than fixed numbers
+        with self.captureOnCommitCallbacks(execute=True):
+            second.status = "completed"
+            second.save(update_fields=["status"])
+        self.assertEqual(self._ledger(), self._db_entry())
+        self.assertEqual(self._ledger()["in_progress"], 0)
+
+        active_before = self._ledger()["active"]
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskAssignment.objects.filter(id=first.id).delete()  # task not loaded, as in a cascade
+        self.assertEqual(self._ledger()["active"], active_before - 1)
+        self.assertEqual(self._ledger(), self._db_entry())
+
+    def test_rolled_back_writes_are_not_counted(self):
+        from annotators.models import TaskAssignment
+        from django.db import transaction
+
+        self._ledger()  # warm
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    TaskAssignment.objects.create(annotator=self.annotator, task=self.tasks[0])
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+        self.assertEqual(self._ledger()["active"], 0)
+        self.assertEqual(self._ledger(), self._db_entry())
+
+    def test_check_annotator_capacity_reads_ledger(self):
+        from annotators.assignment_engine import AssignmentEngine
+        from annotators.models import AnnotatorProfile, TaskAssignment
+
+        TaskAssignment.objects.create(annotator=self.annotator, task=self.tasks[0])
+        annotator = AnnotatorProfile.objects.select_related("trust_level").get(id=self.annotator.id)
+        self._ledger()  # warm
+
+        with self.assertNumQueries(0):
+            capacity = AssignmentEngine.check_annotator_capacity(annotator)
+
+        self.assertEqual(capacity["current"], 1)
+        self.assertEqual(capacity["maximum"], 50)
+        self.assertFalse(capacity["at_capacity"])
+
+    def test_partial_hash_is_discarded(self):
+        from annotators.capacity_ledger import ANNOTATOR, CapacityLedger
+
+        # An increment that lands on a cold key must not be trusted
+        CapacityLedger.adjust_many(ANNOTATOR, [(self.annotator.id, self.project.id, 5, 0)])
+        self.assertEqual(self._ledger()["active"], 0)
+
+    def test_reconcile_repairs_drift_from_bulk_updates(self):
+        from annotators.capacity_ledger import ANNOTATOR, CapacityLedger
+        from annotators.models import TaskAssignment
+
+        TaskAssignment.objects.create(annotator=self.annotator, task=self.tasks[0])
+        TaskAssignment.objects.create(annotator=self.annotator, task=self.tasks[1])
+        self._ledger()  # warm
+
+        # Bulk update bypasses the signals
+        TaskAssignment.objects.filter(annotator=self.annotator).update(status="completed")
+        self.assertEqual(self._ledger()["active"], 2)
+
+        drifted = CapacityLedger.reconcile(ANNOTATOR, [self.annotator.id], dry_run=True)
+        self.assertEqual(len(drifted), 1)
+        self.assertEqual(self._ledger()["active"], 2)
+
+        CapacityLedger.reconcile(ANNOTATOR, [self.annotator.id])
+        self.assertEqual(self._ledger()["active"], 0)
+        self.assertEqual(CapacityLedger.reconcile(ANNOTATOR, [self.annotator.id]), [])
@@ -0,0 +1,145 @@
+"""
+Tests for the consensus consolidation outbox
+
+Tests cover:
+- Annotation saves queue consolidation instead of running it inline
+- The drain runs synchronously after commit when Redis is unavailable
+- Repeated saves on the same task collapse into one outbox row
+- Failed consolidations are retried and eventually marked failed
+- Stale processing rows are returned to the queue
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+User = get_user_model()
+
+OVERLAP_PATH = "annotators.adaptive_assignment_engine.AdaptiveAssignmentEngine.calculate_optimal_overlap"
+TRIGGER_PATH = "annotators.annotation_workflow.AnnotationWorkflowService.trigger_consolidation"
+
+
+class ConsolidationOutboxTests(TestCase):
+    """Tests for ConsolidationQueue and the annotation save signal"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from organizations.models import Organization
+        from projects.models import Project
+        from tasks.models import Task
+
+        cls.org = Organization.objects.create(title="Outbox Org")
+        cls.project = Project.objects.create(title="Outbox Project", organization=cls.org)
+        cls.task = Task.objects.create(project=cls.project, data={"text": "outbox"})
+        cls.users = [
+            User.objects.create_user(
+                username=f"outbox{i}", email=f"outbox{i}@test.com", password="testpass123"
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        patcher = patch(OVERLAP_PATH, return_value=(2, 2, "test"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _annotate(self, user):
+        from tasks.models import Annotation
+
+        return Annotation.objects.create(
+            task=self.task, project=self.project, completed_by=user, result=[]
+        )
+
+    def test_annotation_save_queues_and_drains_after_commit(self):
+        from annotators.models import ConsolidationOutbox, TaskConsensus
+
+        with patch(TRIGGER_PATH) as trigger:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                self._annotate(self.users[0])
+            self.assertEqual(callbacks, [])
+            self.assertFalse(ConsolidationOutbox.objects.exists())
+
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                self._annotate(self.users[1])
+            # Nothing runs until the transaction commits
+            trigger.assert_not_called()
+            self.assertEqual(ConsolidationOutbox.objects.get(task=self.task).status, "pending")
+
+            for callback in callbacks:
+                callback()
+
+        trigger.assert_called_once()
+        entry = ConsolidationOutbox.objects.get(task=self.task)
+        self.assertEqual(entry.status, "done")
+        self.assertEqual(entry.attempts, 1)
+        self.assertIsNotNone(entry.processed_at)
+        self.assertEqual(TaskConsensus.objects.get(task=self.task).current_annotations, 2)
+
+    def test_repeated_saves_collapse_into_one_row(self):
+        from annotators.consolidation_queue import ConsolidationQueue
+        from annotators.models import ConsolidationOutbox
+
+        self.assertTrue(ConsolidationQueue.enqueue(self.task.id))
+        self.assertFalse(ConsolidationQueue.enqueue(self.task.id))
+        self.assertEqual(ConsolidationOutbox.objects.filter(task=self.task).count(), 1)
+
+        entry = ConsolidationOutbox.objects.get(task=self.task)
+        self.assertTrue(ConsolidationQueue.claim(entry.id))
+        # A second worker cannot claim the same row
+        self.assertFalse(ConsolidationQueue.claim(entry.id))
+        self.assertFalse(ConsolidationQueue.enqueue(self.task.id))
+
+    def test_consolidated_task_is_not_run_again(self):
+        from annotators.consolidation_queue import ConsolidationQueue
+        from annotators.models import ConsolidationOutbox, TaskConsensus
+
+        self._annotate(self.users[0])
+        with self.captureOnCommitCallbacks(execute=False):
+            self._annotate(self.users[1])
+        TaskConsensus.objects.create(task=self.task, status="finalized")
+
+        with patch(TRIGGER_PATH) as trigger:
+            stats = ConsolidationQueue.drain()
+
+        trigger.assert_not_called()
+        self.assertEqual(stats["processed"], 1)
+        self.assertEqual(ConsolidationOutbox.objects.get(task=self.task).status, "done")
+
+    def test_failures_are_retried_then_marked_failed(self):
+        from annotators.consolidation_queue import CONSOLIDATION_QUEUE_MAX_ATTEMPTS, ConsolidationQueue
+        from annotators.models import ConsolidationOutbox
+
+        self._annotate(self.users[0])
+        with self.captureOnCommitCallbacks(execute=False):
+            self._annotate(self.users[1])
+
+        with patch(TRIGGER_PATH, side_effect=RuntimeError("boom")) as trigger:
+            for attempt in range(1, CONSOLIDATION_QUEUE_MAX_ATTEMPTS + 1):
+                stats = ConsolidationQueue.drain()
+                self.assertEqual(stats["failed"], 1)
+                entry = ConsolidationOutbox.objects.get(task=self.task)
+                self.assertEqual(entry.attempts, attempt)
+                self.assertEqual(entry.last_error, "boom")
+
+            self.assertEqual(entry.status, "failed")
+            self.assertEqual(ConsolidationQueue.drain()["failed"], 0)
+            self.assertEqual(trigger.call_count, CONSOLIDATION_QUEUE_MAX_ATTEMPTS)
+
+        # A new annotation re-opens the failed row
+        self.assertTrue(ConsolidationQueue.enqueue(self.task.id))
+        self.assertEqual(ConsolidationOutbox.objects.get(task=self.task).attempts, 0)
+
+    def test_stale_processing_rows_are_requeued(self):
+        from annotators.consolidation_queue import ConsolidationQueue
+        from annotators.models import ConsolidationOutbox
+
+        entry = ConsolidationOutbox.objects.create(task=self.task, status="processing")
+        ConsolidationOutbox.objects.filter(id=entry.id).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(ConsolidationQueue.requeue_stale(), 1)
+        self.assertEqual(ConsolidationOutbox.objects.get(id=entry.id).status, "pending")
@@ -0,0 +1,221 @@
+"""
+Tests for the bulk task distribution planner
+
+Tests cover:
+- Rotation plan produced by AssignmentEngine.distribute_tasks_intelligently
+- Dry-run mode returns the plan without writing
+- Applying the plan writes assignments and counters in bulk
+- Capacity limits and existing assignments are respected
+- Counters only count the rows a chunk actually inserted, including when
+  a concurrent run inserts a planned pair between the select and the insert
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+User = get_user_model()
+
+
+class TaskDistributionPlannerTests(TestCase):
+    """Tests for TaskDistributionPlanner and the engines that use it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from annotators.models import AnnotatorProfile, ProjectAssignment, TaskAssignment, TrustLevel
+        from organizations.models import Organization
+        from projects.models import Project
+        from tasks.models import Task
+
+        cls.org = Organization.objects.create(title="Planner Org")
+        cls.project = Project.objects.create(title="Planner Project", organization=cls.org)
+        # Publishing fires the auto-assignment signal; keep it out of these tests
+        Project.objects.filter(id=cls.project.id).update(is_published=True)
+        cls.project.is_published = True
+
+        cls.annotators = []
+        for i in range(5):
+            user = User.objects.create_user(
+                username=f"planner{i}", email=f"planner{i}@test.com", password="testpass123"
+            )
+            annotator = AnnotatorProfile.objects.create(user=user, status="approved")
+            TrustLevel.objects.update_or_create(annotator=annotator, defaults={"level": "regular"})
+            cls.annotators.append(annotator)
+
+        cls.tasks = [
+            Task.objects.create(project=cls.project, data={"text": f"task {i}"}) for i in range(6)
+        ]
+
+        for annotator in cls.annotators:
+            ProjectAssignment.objects.get_or_create(project=cls.project, annotator=annotator)
+
+        # Start from a clean slate regardless of what the auto-assignment signals did
+        TaskAssignment.objects.all().delete()
+        Task.objects.filter(project=cls.project).update(target_assignment_count=3, assignment_count=0)
+        ProjectAssignment.objects.filter(project=cls.project).update(assigned_tasks=0)
+
+    def _annotators(self):
+        from annotators.models import AnnotatorProfile
+
+        return list(
+            AnnotatorProfile.objects.filter(id__in=[a.id for a in self.annotators])
+            .select_related("user", "trust_level")
+            .order_by("id")
+        )
+
+    def test_dry_run_returns_rotation_plan_without_writing(self):
+        from annotators.assignment_engine import AssignmentEngine
+        from annotators.models import TaskAssignment
+
+        annotators = self._annotators()
+        stats = AssignmentEngine.distribute_tasks_intelligently(
+            self.project, annotators, required_overlap=3, dry_run=True
+        )
+
+        ids = [a.id for a in annotators]
+        expected = []
+        rotation = 0
+        for task in self.tasks:
+            for _ in range(3):
+                expected.append((task.id, ids[rotation % len(ids)]))
+                rotation += 1
+
+        self.assertEqual(stats["plan"], expected)
+        self.assertEqual(stats["total_assignments"], 18)
+        self.assertEqual(stats["tasks_fully_assigned"], 6)
+        self.assertEqual(stats["tasks_partially_assigned"], 0)
+        self.assertEqual(stats["tasks_waiting"], 0)
+        self.assertEqual(stats["annotators_used"], 5)
+        self.assertFalse(TaskAssignment.objects.filter(task__project=self.project).exists())
+
+    def test_apply_writes_plan_and_counters(self):
+        from annotators.assignment_engine import AssignmentEngine
+        from annotators.models import ProjectAssignment, TaskAssignment
+        from projects.models import ProjectMember
+
+        annotators = self._annotators()
+        planned = AssignmentEngine.distribute_tasks_intelligently(
+            self.project, annotators, required_overlap=3, dry_run=True
+        )
+        stats = AssignmentEngine.distribute_tasks_intelligently(
+            self.project, annotators, required_overlap=3
+        )
+
+        self.assertNotIn("plan", stats)
+        self.assertEqual(stats["total_assignments"], len(planned["plan"]))
+        self.assertEqual(
+            set(
+                TaskAssignment.objects.filter(task__project=self.project).values_list(
+                    "task_id", "annotator_id"
+                )
+            ),
+            set(planned["plan"]),
+        )
+        for task in self.tasks:
+            task.refresh_from_db()
+            self.assertEqual(task.assignment_count, 3)
+        self.assertEqual(
+            sum(ProjectAssignment.objects.filter(project=self.project).values_list("assigned_tasks", flat=True)),
+            18,
+        )
+        self.assertEqual(ProjectMember.objects.filter(project=self.project).values("user").distinct().count(), 5)
+
+        # Everything is assigned now, so a second run has nothing to do
+        again = AssignmentEngine.distribute_tasks_intelligently(self.project, annotators, required_overlap=3)
+        self.assertEqual(again["assigned_tasks"], 0)
+
+    def test_apply_counts_only_inserted_rows(self):
+        from annotators.distribution_planner import TaskDistributionPlanner
+        from annotators.models import ProjectAssignment, TaskAssignment
+
+        annotator = self._annotators()[0]
+        plan = [(task.id, annotator.id) for task in self.tasks[:3]]
+        # A concurrent run inserted one of the planned pairs after planning
+        TaskAssignment.objects.bulk_create([TaskAssignment(task=self.tasks[1], annotator=annotator)])
+
+        created = TaskDistributionPlanner.apply_plan(self.project, plan, chunk_size=2)
+
+        self.assertEqual(created, 2)
+        counts = []
+        for task in self.tasks[:3]:
+            task.refresh_from_db()
+            counts.append(task.assignment_count)
+        self.assertEqual(counts, [1, 0, 1])
+        self.assertEqual(
+            ProjectAssignment.objects.get(project=self.project, annotator=annotator).assigned_tasks, 2
+        )
+
+    def test_pair_inserted_concurrently_is_not_counted(self):
+        from annotators.distribution_planner import TaskDistributionPlanner
+        from annotators.models import ProjectAssignment, TaskAssignment
+
+        annotator = self._annotators()[0]
+        plan = [(task.id, annotator.id) for task in self.tasks[:3]]
+        chunk_pairs = TaskDistributionPlanner._chunk_pairs
+
+        def concurrent_insert_after_select(chunk):
+            existing = chunk_pairs(chunk)
+            # Another run commits one of the pairs between the select and the insert
+            TaskAssignment.objects.bulk_create([TaskAssignment(task=self.tasks[1], annotator=annotator)])
+            return existing
+
+        with patch.object(TaskDistributionPlanner, "_chunk_pairs", concurrent_insert_after_select), patch(
+            "annotators.distribution_planner.CapacityLedger.record_bulk_assignments"
+        ) as record, self.captureOnCommitCallbacks(execute=True):
+            created = TaskDistributionPlanner.apply_plan(self.project, plan)
+
+        self.assertEqual(created, 2)
+        counts = []
+        for task in self.tasks[:3]:
+            task.refresh_from_db()
+            counts.append(task.assignment_count)
+        self.assertEqual(counts, [1, 0, 1])
+        self.assertEqual(
+            ProjectAssignment.objects.get(project=self.project, annotator=annotator).assigned_tasks, 2
+        )
+        record.assert_called_once_with(self.project.id, [plan[0], plan[2]])
+        self.assertEqual(TaskAssignment.objects.filter(annotator=annotator).count(), 3)
+
+    def test_capacity_and_existing_assignments_are_respected(self):
+        from annotators.assignment_engine import AssignmentEngine
+        from annotators.models import TaskAssignment
+
+        annotators = self._annotators()
+        first, second, third = annotators[:3]
+        TaskAssignment.objects.create(annotator=first, task=self.tasks[0], status="assigned")
+
+        for annotator in annotators[:3]:
+            annotator.max_concurrent_tasks = 2
+
+        stats = AssignmentEngine.distribute_tasks_intelligently(
+            self.project, [first, second, third], required_overlap=3, dry_run=True
+        )
+
+        # ALL-TO-ALL: nobody exceeds two active tasks, first keeps its existing one
+        per_annotator = {}
+        for task_id, annotator_id in stats["plan"]:
+            per_annotator[annotator_id] = per_annotator.get(annotator_id, 0) + 1
+        self.assertEqual(per_annotator, {first.id: 1, second.id: 2, third.id: 2})
+        self.assertNotIn((self.tasks[0].id, first.id), stats["plan"])
+
+    def test_dynamic_rotation_uses_planner(self):
+        from annotators.assignment_engine import DynamicAssignmentEngine
+        from annotators.models import TaskAssignment
+
+        annotators = self._annotators()
+        planned = DynamicAssignmentEngine._distribute_with_rotation(
+            self.project, annotators, 3, dry_run=True
+        )
+        self.assertEqual(planned, 18)
+        self.assertFalse(TaskAssignment.objects.filter(task__project=self.project).exists())
+
+        created = DynamicAssignmentEngine._distribute_with_rotation(self.project, annotators, 3)
+        self.assertEqual(created, 18)
+        counts = {}
+        for annotator_id in TaskAssignment.objects.filter(task__project=self.project).values_list(
+            "annotator_id", flat=True
+        ):
+            counts[annotator_id] = counts.get(annotator_id, 0) + 1
+        # Equal trust, so load balancing spreads 18 assignments across 5 annotators
+        self.assertLessEqual(max(counts.values()) - min(counts.values()), 1)
@@ -0,0 +1,150 @@
+"""
+Tests for the shared box geometry module
+
+Tests cover:
+- Vectorised IoU and center-distance matrices
+- Hungarian matching against brute force
+- Greedy and Hungarian bounding-box clustering in consensus
+- Honeypot and skill-test scoring use the shared IoU
+"""
+
+import random
+from itertools import permutations
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase
+
+
+def _rect(x, y, width, height, label="car"):
+    return {
+        "type": "rectanglelabels",
+        "value": {"x": x, "y": y, "width": width, "height": height, "rectanglelabels": [label]},
+    }
+
+
+class GeometryTests(SimpleTestCase):
+    """Tests for annotators.geometry"""
+
+    def test_iou_matrix_matches_pairwise_formula(self):
+        from annotators.geometry import boxes_to_array, iou_matrix
+        from annotators.scoring import calculate_iou
+
+        a = boxes_to_array([{"x": 0, "y": 0, "width": 10, "height": 10}, {"x": 50, "y": 50, "width": 0, "height": 0}])
+        b = boxes_to_array([{"x": 5, "y": 5, "width": 10, "height": 10}, {"x": 20, "y": 20, "width": 5, "height": 5}])
+
+        iou = iou_matrix(a, b)
+        self.assertEqual(iou.shape, (2, 2))
+        self.assertAlmostEqual(iou[0, 0], 25 / 175)
+        self.assertEqual(iou[0, 1], 0.0)
+        self.assertEqual(iou[1].tolist(), [0.0, 0.0])  # empty box
+
+        self.assertAlmostEqual(
+            calculate_iou({"x": 0, "y": 0, "width": 10, "height": 10}, {"x": 5, "y": 5, "width": 10, "height": 10}),
+            25 / 175,
+        )
+
+    def test_center_distance_is_normalised(self):
+        from annotators.geometry import center_distance_matrix
+
+        distance = center_distance_matrix(np.array([[0, 0, 10, 10]]), np.array([[30, 40, 10, 10]]))
+        self.assertAlmostEqual(distance[0, 0], 0.5)
+
+    def test_hungarian_matches_brute_force(self):
+        from annotators.geometry import _hungarian, linear_sum_assignment
+
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            rows, cols = (int(size) for size in rng.integers(1, 6, size=2))
+            cost = rng.random((rows, cols)).round(1)
+
+            best = min(
+                sum(cost[i, j] for i, j in (zip(range(rows), p) if rows <= cols else zip(p, range(cols))))
+                for p in permutations(range(max(rows, cols)), min(rows, cols))
+            )
+            r, c = linear_sum_assignment(cost)
+            self.assertAlmostEqual(cost[r, c].sum(), best)
+            self.assertEqual(len(r), min(rows, cols))
+
+            if rows <= cols:
+                r, c = _hungarian(cost)
+                self.assertAlmostEqual(cost[r, c].sum(), best)
+
+
+class BoundingBoxClusteringTests(SimpleTestCase):
+    """Tests for BoundingBoxConsolidation clustering modes"""
+
+    def _annotations(self, seed=3, objects=30, annotators=4):
+        rng = random.Random(seed)
+        base = [
+            (rng.uniform(0, 300), rng.uniform(0, 300), rng.uniform(2, 6), rng.uniform(2, 6))
+            for _ in range(objects)
+        ]
+        return [
+            [_rect(x + rng.uniform(-0.5, 0.5), y, w, h) for x, y, w, h in base if rng.random() < 0.9]
+            for _ in range(annotators)
+        ]
+
+    def test_greedy_keeps_one_box_per_annotator_per_cluster(self):
+        from annotators.consensus_service import BoundingBoxConsolidation
+
+        annotations = self._annotations()
+        labeled = [
+            {"box": box, "annotator_idx": idx}
+            for idx, boxes in enumerate(annotations)
+            for box in boxes
+        ]
+        clusters = BoundingBoxConsolidation._cluster_boxes(labeled, len(annotations), mode="greedy")
+
+        self.assertEqual(sum(len(c) for c in clusters), len(labeled))
+        for cluster in clusters:
+            annotator_ids = [item["annotator_idx"] for item in cluster]
+            self.assertEqual(len(annotator_ids), len(set(annotator_ids)))
+
+    def test_hungarian_mode_recovers_objects(self):
+        from annotators.consensus_service import BoundingBoxConsolidation
+
+        annotations = self._annotations()
+        labeled = [
+            {"box": box, "annotator_idx": idx}
+            for idx, boxes in enumerate(annotations)
+            for box in boxes
+        ]
+        clusters = BoundingBoxConsolidation._cluster_boxes(labeled, len(annotations), mode="hungarian")
+
+        # Well separated objects: every object forms exactly one cluster
+        self.assertEqual(len(clusters), 30)
+        for cluster in clusters:
+            annotator_ids = [item["annotator_idx"] for item in cluster]
+            self.assertEqual(len(annotator_ids), len(set(annotator_ids)))
+
+        with patch.object(BoundingBoxConsolidation, "CLUSTERING_MODE", "hungarian"):
+            consolidated, confidence = BoundingBoxConsolidation.consolidate(annotations)
+        self.assertEqual(len(consolidated), 30)
+        self.assertGreater(confidence, 0.5)
+
+    def test_agreement_uses_best_overlap(self):
+        from annotators.consensus_service import BoundingBoxConsolidation
+
+        ann1 = [_rect(0, 0, 10, 10), _rect(50, 50, 10, 10, "person")]
+        ann2 = [_rect(0, 0, 10, 10), _rect(50, 50, 10, 10, "car")]
+
+        agreement = BoundingBoxConsolidation.calculate_agreement(ann1, ann2)
+        self.assertEqual(agreement["iou"], 1.0)
+        self.assertEqual(agreement["label"], 50.0)
+        self.assertEqual(agreement["overall"], 80.0)
+
+
+class HoneypotBoundingBoxTests(SimpleTestCase):
+    """BoundingBoxComparator uses the vectorised IoU"""
+
+    def test_labels_must_match(self):
+        from annotators.honeypot_evaluator import BoundingBoxComparator
+
+        ground_truth = [_rect(0, 0, 10, 10, "car"), _rect(40, 40, 10, 10, "person")]
+        submitted = [_rect(0, 0, 10, 10, "car"), _rect(40, 40, 10, 10, "car")]
+
+        result = BoundingBoxComparator().compare(submitted, ground_truth)
+        self.assertEqual(result["boxes_matched"], 1)
+        self.assertEqual(result["overall_score"], 50.0)
+        self.assertEqual([d["best_iou"] for d in result["box_details"]], [1.0, 0.0])
@@ -0,0 +1,149 @@
+"""
+Tests for precomputed honeypot ground-truth features
+
+Tests cover:
+- Golden standards store features when created or when ground truth changes
+- evaluate_many scores a batch against the stored features
+- rescore_honeypots re-evaluates stored results in bulk
+"""
+
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+User = get_user_model()
+
+
+def _box(x, label="car"):
+    return {
+        "type": "rectanglelabels",
+        "value": {"x": x, "y": 10, "width": 20, "height": 20, "rectanglelabels": [label]},
+    }
+
+
+class HoneypotFeatureTests(TestCase):
+    """Tests for GoldenStandardTask features and HoneypotEvaluator batching"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from annotators.models import AnnotatorProfile, GoldenStandardTask, TaskAssignment
+        from organizations.models import Organization
+        from projects.models import Project
+        from tasks.models import Task
+
+        org = Organization.objects.create(title="Honeypot Org")
+        cls.project = Project.objects.create(title="Honeypot Project", organization=org)
+        tasks = [Task.objects.create(project=cls.project, data={"i": i}) for i in range(3)]
+
+        user = User.objects.create_user(
+            username="honeyfeat", email="honeyfeat@test.com", password="testpass123"
+        )
+        cls.profile = AnnotatorProfile.objects.create(user=user, status="approved")
+
+        cls.golden = GoldenStandardTask.objects.create(
+            task=tasks[0],
+            project=cls.project,
+            ground_truth=[_box(10), _box(50, "person")],
+            source="admin",
+            tolerance=Decimal("0.80"),
+        )
+
+        TaskAssignment.objects.all().delete()
+        cls.task_assignments = [
+            TaskAssignment.objects.create(annotator=cls.profile, task=task, status="completed")
+            for task in tasks
+        ]
+
+    def _honeypot(self, task_assignment, result, score, passed):
+        from annotators.models import HoneypotAssignment
+
+        return HoneypotAssignment.objects.create(
+            annotator=self.profile,
+            golden_standard=self.golden,
+            task_assignment=task_assignment,
+            annotator_result=result,
+            accuracy_score=Decimal(score),
+            passed=passed,
+            status="evaluated",
+        )
+
+    def test_features_are_stored_on_save(self):
+        from annotators.honeypot_evaluator import FEATURES_VERSION
+        from annotators.models import GoldenStandardTask
+
+        features = self.golden.ground_truth_features
+        self.assertEqual(features["version"], FEATURES_VERSION)
+        self.assertEqual(features["annotation_type"], "bounding_box")
+        self.assertEqual(features["comparator"]["labels"], ["car", "person"])
+
+        # Statistics updates do not rebuild features
+        self.golden.ground_truth = [{"type": "choices", "value": {"choices": ["A"]}}]
+        self.golden.save(update_fields=["times_shown"])
+        self.golden.refresh_from_db()
+        self.assertEqual(self.golden.ground_truth_features["annotation_type"], "bounding_box")
+
+        self.golden.ground_truth = [{"type": "choices", "value": {"choices": ["A"]}}]
+        self.golden.save(update_fields=["ground_truth"])
+        stored = GoldenStandardTask.objects.get(id=self.golden.id).ground_truth_features
+        self.assertEqual(stored["annotation_type"], "classification")
+        self.assertEqual(stored["comparator"], {"labels": ["A"]})
+
+    def test_evaluate_many_matches_evaluate(self):
+        from annotators.honeypot_evaluator import HoneypotEvaluator
+        from annotators.models import HoneypotAssignment
+
+        results = [[_box(10), _box(50, "person")], [_box(12)], []]
+        for task_assignment, result in zip(self.task_assignments, results):
+            self._honeypot(task_assignment, result, "0", False)
+
+        assignments = list(
+            HoneypotAssignment.objects.select_related("golden_standard").order_by("id")
+        )
+        with self.assertNumQueries(0):
+            batch = HoneypotEvaluator.evaluate_many(
+                (assignment, assignment.annotator_result) for assignment in assignments
+            )
+
+        self.assertEqual([r["passed"] for r in batch], [True, False, False])
+        for assignment, evaluation in zip(assignments, batch):
+            self.assertEqual(
+                evaluation, HoneypotEvaluator.evaluate(assignment, assignment.annotator_result)
+            )
+
+    def test_evaluate_rebuilds_outdated_features(self):
+        from annotators.honeypot_evaluator import HoneypotEvaluator
+        from annotators.models import GoldenStandardTask
+
+        GoldenStandardTask.objects.filter(id=self.golden.id).update(
+            ground_truth_features={"version": 0}
+        )
+        golden = GoldenStandardTask.objects.get(id=self.golden.id)
+        self.assertEqual(HoneypotEvaluator.get_features(golden)["annotation_type"], "bounding_box")
+
+    def test_rescore_command_updates_changed_rows(self):
+        from annotators.models import GoldenStandardTask, HoneypotAssignment
+
+        perfect = [_box(10), _box(50, "person")]
+        stale = self._honeypot(self.task_assignments[0], perfect, "40.00", False)
+        current = self._honeypot(self.task_assignments[1], [], "0.00", False)
+
+        out = StringIO()
+        call_command("rescore_honeypots", "--dry-run", stdout=out)
+        self.assertIn("1 changed", out.getvalue())
+        self.assertFalse(HoneypotAssignment.objects.get(id=stale.id).passed)
+
+        call_command("rescore_honeypots", "--batch-size", "1", stdout=StringIO())
+
+        stale.refresh_from_db()
+        self.assertTrue(stale.passed)
+        self.assertEqual(stale.accuracy_score, Decimal("100.00"))
+        self.assertEqual(stale.evaluation_details["boxes_matched"], 2)
+        current.refresh_from_db()
+        self.assertFalse(current.passed)
+
+        golden = GoldenStandardTask.objects.get(id=self.golden.id)
+        self.assertEqual((golden.times_passed, golden.times_failed), (1, 1))
+        self.assertEqual(golden.average_score, Decimal("50.00"))
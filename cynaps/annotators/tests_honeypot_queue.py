@@ -0,0 +1,144 @@
+"""
+Tests for the pre-shuffled honeypot queue
+
+Tests cover:
+- Taking honeypots never repeats and never sorts randomly in SQL
+- Unused golden standards can be handed back
+- Retiring a golden standard invalidates the project's queues
+- The database fallback without Redis
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from fakeredis import FakeRedis
+
+User = get_user_model()
+
+
+class HoneypotQueueTests(TestCase):
+    """Tests for HoneypotQueue backed by a fake Redis"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from annotators.models import AnnotatorProfile, GoldenStandardTask, TaskAssignment
+        from organizations.models import Organization
+        from projects.models import Project
+        from tasks.models import Task
+
+        org = Organization.objects.create(title="Queue Org")
+        cls.project = Project.objects.create(title="Queue Project", organization=org)
+        tasks = [Task.objects.create(project=cls.project, data={"i": i}) for i in range(7)]
+
+        user = User.objects.create_user(
+            username="hpqueue", email="hpqueue@test.com", password="testpass123"
+        )
+        cls.annotator = AnnotatorProfile.objects.create(user=user, status="approved")
+        TaskAssignment.objects.all().delete()
+
+        cls.goldens = [
+            GoldenStandardTask.objects.create(
+                task=task, project=cls.project, ground_truth=[], source="admin"
+            )
+            for task in tasks[:6]
+        ]
+        cls.extra_task = tasks[6]
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch("annotators.honeypot_queue._connection", lambda: self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _take(self, count=1):
+        from annotators.honeypot_queue import GOLDEN_STANDARD, HoneypotQueue
+
+        return HoneypotQueue.take(GOLDEN_STANDARD, self.annotator.id, self.project.id, count)
+
+    def test_take_never_repeats(self):
+        with CaptureQueriesContext(connection) as queries:
+            taken = self._take(2) + self._take(3) + self._take(3)
+
+        self.assertEqual(sorted(taken), sorted(g.id for g in self.goldens))
+        self.assertEqual(self._take(), [])
+        self.assertFalse(any("RANDOM()" in q["sql"].upper() for q in queries.captured_queries))
+
+    def test_seen_golden_standards_are_skipped(self):
+        from annotators.models import HoneypotAssignment, TaskAssignment
+
+        first = self._take(1)[0]
+        seen = next(g for g in self.goldens if g.id != first)
+        HoneypotAssignment.objects.create(
+            annotator=self.annotator,
+            golden_standard=seen,
+            task_assignment=TaskAssignment.objects.create(
+                annotator=self.annotator, task=seen.task, status="assigned"
+            ),
+        )
+
+        rest = self._take(10)
+        self.assertEqual(len(rest), 4)
+        self.assertNotIn(seen.id, rest)
+        self.assertNotIn(first, rest)
+
+    def test_give_back_keeps_order_at_front(self):
+        from annotators.honeypot_queue import HoneypotQueue
+
+        taken = HoneypotQueue.take_golden_standards(self.annotator, self.project, 3)
+        HoneypotQueue.give_back_golden_standards(self.annotator, self.project, taken[1:])
+
+        self.assertEqual(self._take(2), [g.id for g in taken[1:]])
+
+    def test_retiring_invalidates_queue(self):
+        from annotators.models import GoldenStandardTask
+
+        first = self._take(1)[0]
+        retired = next(g for g in self.goldens if g.id != first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            extra = GoldenStandardTask.objects.create(
+                task=self.extra_task, project=self.project, ground_truth=[], source="admin"
+            )
+        retired.is_retired = True
+        with self.captureOnCommitCallbacks(execute=True):
+            retired.save(update_fields=["is_retired"])
+
+        # Rebuilt queue: new golden standard in, retired one out, no repeat of the first
+        rest = self._take(10)
+        self.assertEqual(len(rest), 5)
+        self.assertIn(extra.id, rest)
+        self.assertNotIn(retired.id, rest)
+        self.assertNotIn(first, rest)
+
+    def test_database_fallback_without_redis(self):
+        with patch("annotators.honeypot_queue._connection", lambda: None):
+            taken = self._take(10)
+        self.assertEqual(sorted(taken), sorted(g.id for g in self.goldens))
+        self.assertEqual(self.redis.keys(), [])
+
+    def test_database_fallback_when_redis_is_unreachable(self):
+        from redis.exceptions import ConnectionError
+
+        with patch.object(self.redis, "get", side_effect=ConnectionError("down")), patch.object(
+            self.redis, "ping"
+        ) as ping:
+            taken = self._take(10)
+        self.assertEqual(sorted(taken), sorted(g.id for g in self.goldens))
+        ping.assert_not_called()
+
+    def test_injector_hands_back_unused(self):
+        from annotators.honeypot_injector import HoneypotInjector
+
+        tasks = [self.extra_task] * 3
+        with patch.object(HoneypotInjector, "_calculate_injection_points", return_value=[1]):
+            result = HoneypotInjector.inject_honeypots(self.annotator, self.project, tasks)
+
+        injected = [golden.id for _, is_honeypot, golden in result if is_honeypot]
+        self.assertEqual(len(injected), 1)
+        # The other five were handed back; the injected one is not served again
+        remaining = self._take(10)
+        self.assertEqual(len(remaining), 5)
+        self.assertNotIn(injected[0], remaining)
@@ -0,0 +1,174 @@
+"""
+Tests for mask-based polygon and brush consolidation
+
+Tests cover:
+- Brush RLE decode/encode compatibility with the SDK converter
+- Polygon rasterization and contour tracing
+- Polygon clustering, majority voting and agreement by pixel IoU
+- Brush consolidation re-encodes the voted mask and caches decodes
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase
+
+
+def _polygon(points, label="road", width=400, height=200):
+    return {
+        "type": "polygonlabels",
+        "from_name": "label",
+        "to_name": "image",
+        "original_width": width,
+        "original_height": height,
+        "value": {"points": points, "polygonlabels": [label]},
+    }
+
+
+def _brush(mask, label="sky"):
+    from annotators.masks import mask_to_rle
+
+    return {
+        "type": "brushlabels",
+        "from_name": "brush",
+        "to_name": "image",
+        "original_width": mask.shape[1],
+        "original_height": mask.shape[0],
+        "value": {"format": "rle", "rle": mask_to_rle(mask), "brushlabels": [label]},
+    }
+
+
+def _square(x, y, size=20, label="road"):
+    return _polygon([[x, y], [x + size, y], [x + size, y + size], [x, y + size]], label)
+
+
+class MaskCodecTests(SimpleTestCase):
+    """Tests for annotators.masks"""
+
+    def test_rle_round_trip_and_sdk_compatibility(self):
+        from annotators.masks import decode_rle, mask_to_rle, rle_to_mask
+        from cynaps_sdk.converter import brush
+
+        rng = np.random.default_rng(1)
+        mask = rng.random((31, 47)) > 0.7
+        mask[5:25, 10:40] = True
+
+        rle = mask_to_rle(mask)
+        np.testing.assert_array_equal(rle_to_mask(rle, 47, 31), mask)
+        np.testing.assert_array_equal(decode_rle(rle), brush.decode_rle(rle))
+
+        sdk_rle = brush.mask2rle(mask.astype(np.uint8) * 255)
+        np.testing.assert_array_equal(decode_rle(sdk_rle), brush.decode_rle(sdk_rle))
+
+    def test_polygon_round_trip(self):
+        from annotators.masks import mask_iou, mask_to_polygon, rasterize_polygon, working_shape
+
+        self.assertEqual(working_shape(1000, 500, 256), (128, 256))
+        self.assertEqual(working_shape(resolution=64), (64, 64))
+
+        points = [[10, 10], [40, 10], [40, 60], [80, 60], [80, 90], [10, 90]]
+        mask = rasterize_polygon(points, (128, 256))
+        traced = mask_to_polygon(mask)
+
+        self.assertEqual(len(traced), 6)
+        self.assertGreater(mask_iou(mask, rasterize_polygon(traced, (128, 256))), 0.99)
+
+
+class PolygonConsolidationTests(SimpleTestCase):
+    """Tests for PolygonConsolidation"""
+
+    def test_consolidate_votes_matching_polygons(self):
+        from annotators.consensus_service import PolygonConsolidation
+        from annotators.masks import mask_iou, rasterize_polygon
+
+        annotations = [
+            [_square(10, 10), _square(60, 60, label="car")],
+            [_square(12, 10), _square(61, 60, label="car")],
+            [_square(10, 12), _square(5, 70)],  # third polygon matches nothing
+        ]
+
+        consolidated, confidence = PolygonConsolidation.consolidate(annotations)
+
+        self.assertEqual(len(consolidated), 2)
+        road = next(p for p in consolidated if p["value"]["polygonlabels"] == ["road"])
+        self.assertEqual(road["from_name"], "label")
+        voted = rasterize_polygon(road["value"]["points"], (128, 256))
+        expected = rasterize_polygon(_square(11, 11, 19)["value"]["points"], (128, 256))
+        self.assertGreater(mask_iou(voted, expected), 0.85)
+        self.assertGreater(confidence, 0.6)
+        self.assertLess(confidence, 1.0)
+
+    def test_agreement_uses_pixel_iou(self):
+        from annotators.consensus_service import PolygonConsolidation
+
+        same = PolygonConsolidation.calculate_agreement([_square(10, 10)], [_square(10, 10)])
+        self.assertAlmostEqual(same["overall"], 100.0)
+
+        shifted = PolygonConsolidation.calculate_agreement([_square(10, 10)], [_square(20, 10)])
+        self.assertAlmostEqual(shifted["iou"], 1 / 3, delta=0.05)
+        self.assertEqual(shifted["label"], 100.0)
+
+        # An extra polygon on one side lowers agreement
+        extra = PolygonConsolidation.calculate_agreement(
+            [_square(10, 10)], [_square(10, 10), _square(60, 60)]
+        )
+        self.assertAlmostEqual(extra["iou"], 0.5)
+
+
+class SegmentationConsolidationTests(SimpleTestCase):
+    """Tests for SegmentationConsolidation"""
+
+    def setUp(self):
+        from annotators.masks import MaskCache
+
+        MaskCache.clear()
+        self.addCleanup(MaskCache.clear)
+
+    def _masks(self):
+        masks = []
+        for offset in (0, 2, 4):
+            mask = np.zeros((60, 90), dtype=bool)
+            mask[10 + offset : 40 + offset, 20:70] = True
+            masks.append(mask)
+        return masks
+
+    def test_consolidate_majority_votes_pixels(self):
+        from annotators.consensus_service import SegmentationConsolidation
+        from annotators.masks import rle_to_mask
+
+        masks = self._masks()
+        consolidated, confidence = SegmentationConsolidation.consolidate(
+            [[_brush(mask)] for mask in masks]
+        )
+
+        self.assertEqual(len(consolidated), 1)
+        item = consolidated[0]
+        self.assertEqual(item["value"]["brushlabels"], ["sky"])
+        self.assertEqual(item["from_name"], "brush")
+
+        voted = rle_to_mask(item["value"]["rle"], 90, 60)
+        expected = np.zeros((60, 90), dtype=bool)
+        expected[12:42, 20:70] = True
+        np.testing.assert_array_equal(voted, expected)
+        self.assertGreater(confidence, 0.8)
+
+    def test_agreement_and_decode_cache(self):
+        from annotators import masks as mask_utils
+        from annotators.consensus_service import SegmentationConsolidation
+
+        masks = self._masks()
+        ann1, ann2 = [_brush(masks[0])], [_brush(masks[2])]
+
+        with patch.object(mask_utils, "rle_to_mask", wraps=mask_utils.rle_to_mask) as decode:
+            agreement = SegmentationConsolidation.calculate_agreement(ann1, ann2)
+            SegmentationConsolidation.calculate_agreement(ann1, ann2)
+            SegmentationConsolidation.consolidate([ann1, ann2])
+
+        # Each distinct RLE is decoded once
+        self.assertEqual(decode.call_count, 2)
+        self.assertAlmostEqual(agreement["iou"], 26 / 34)
+        self.assertEqual(agreement["label"], 100.0)
+
+        different = SegmentationConsolidation.calculate_agreement(ann1, [_brush(masks[0], "sea")])
+        self.assertEqual(different["iou"], 0.0)
+        self.assertEqual(different["label"], 0.0)
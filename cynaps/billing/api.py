@@ -52,6 +52,7 @@ from .services import (
     SecurityDepositError,
 )
 from .cost_estimation import CostEstimationService
+from .usage_counters import APIUsageCounters
 from organizations.models import Organization
 from projects.models import Project
 
@@ -1660,6 +1661,8 @@ class APIUsageViewSet(viewsets.ViewSet):
             usage, _ = APIUsageTracking.objects.get_or_create(
                 organization=org, date=today
             )
+            # Include requests not flushed from the usage counters yet
+            usage.set_requests(**APIUsageCounters.totals(org.id, today))
 
             return Response(
                 {
@@ -176,7 +176,8 @@ class BlockingAPIRateLimitMiddleware(APIRateLimitMiddleware):
         try:
             from billing.services import APIRateLimitService
 
-            status = APIRateLimitService.check_rate_limit(organization, request_type)
+            # Counts may be a few seconds old; blocking doesn't need them exact
+            status = APIRateLimitService.check_rate_limit(organization, request_type, cached=True)
 
             # Calculate hard limit
             hard_limit = status["limit"] * self.HARD_LIMIT_MULTIPLIER
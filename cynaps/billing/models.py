@@ -1163,6 +1163,25 @@ class APIUsageTracking(models.Model):
     def __str__(self):
         return f"{self.organization.title} - {self.date} (R:{self.read_requests}/W:{self.write_requests}/E:{self.export_requests})"
 
+    LIMIT_FIELDS = ["free_read_limit", "free_write_limit", "free_export_limit"]
+    COUNTER_FIELDS = [
+        "read_requests",
+        "write_requests",
+        "export_requests",
+        "read_overage",
+        "write_overage",
+        "export_overage",
+    ]
+
+    def set_requests(self, read, write, export):
+        """Set day totals (e.g. flushed from the usage counters) and their overage"""
+        self.read_requests = read
+        self.write_requests = write
+        self.export_requests = export
+        self.read_overage = max(0, read - self.free_read_limit)
+        self.write_overage = max(0, write - self.free_write_limit)
+        self.export_overage = max(0, export - self.free_export_limit)
+
     def increment_read(self, count=1):
         """Increment read request count"""
         self.read_requests += count
@@ -2150,31 +2150,27 @@ class APIRateLimitService:
     }
 
     @classmethod
-    def check_rate_limit(cls, organization, request_type="read"):
+    def check_rate_limit(cls, organization, request_type="read", cached=False):
         """
         Check if organization has exceeded rate limit.
 
         Args:
             organization: Organization instance
             request_type: Type of request (read, write, export)
+            cached: Accept counts up to API_USAGE_DECISION_CACHE_SECONDS old
 
         Returns:
             dict: Rate limit status
         """
-        today = timezone.now().date()
+        from billing.usage_counters import APIUsageCounters
 
-        usage, _ = APIUsageTracking.objects.get_or_create(
-            organization=organization, date=today
-        )
+        if cached:
+            totals = APIUsageCounters.cached_totals(organization.id)
+        else:
+            totals = APIUsageCounters.totals(organization.id)
 
         limit = cls.FREE_LIMITS.get(request_type, 10000)
-
-        if request_type == "read":
-            current = usage.read_requests
-        elif request_type == "write":
-            current = usage.write_requests
-        else:
-            current = usage.export_requests
+        current = totals.get(request_type, totals["export"])
 
         remaining = max(0, limit - current)
         is_over_limit = current > limit
@@ -2193,6 +2189,9 @@ class APIRateLimitService:
         """
         Track an API request.
 
+        Counted in the usage counters (billing.usage_counters) and flushed
+        to APIUsageTracking in the background.
+
         Args:
             organization: Organization instance
             request_type: Type of request
@@ -2200,23 +2199,13 @@ class APIRateLimitService:
         Returns:
             bool: True if within free limit, False if overage
         """
-        today = timezone.now().date()
+        from billing.usage_counters import APIUsageCounters
 
-        usage, _ = APIUsageTracking.objects.get_or_create(
-            organization=organization, date=today
-        )
-
-        if request_type == "read":
-            usage.increment_read()
-            return usage.read_requests <= cls.FREE_LIMITS["read"]
-        elif request_type == "write":
-            usage.increment_write()
-            return usage.write_requests <= cls.FREE_LIMITS["write"]
-        elif request_type == "export":
-            usage.increment_export()
-            return usage.export_requests <= cls.FREE_LIMITS["export"]
+        if request_type not in cls.FREE_LIMITS:
+            return True
 
-        return True
+        used = APIUsageCounters.increment(organization.id, request_type)
+        return used <= cls.FREE_LIMITS[request_type]
 
     @classmethod
     @transaction.atomic
@@ -5,6 +5,7 @@ These should be scheduled via Celery, RQ, or cron.
 Recommended schedule:
 - process_project_lifecycle: Daily at 00:30 UTC
 - charge_api_overage: Daily at 00:15 UTC
+- flush_api_usage_counters: Every few minutes (also self-scheduled by API requests)
 - charge_storage_billing: Monthly on 1st at 01:00 UTC
 - expire_credits: Daily at 00:45 UTC
 - cleanup_unpublished_projects: Hourly (fallback for abandoned project creation)
@@ -61,10 +62,15 @@ def charge_api_overage():
     from billing.models import APIUsageTracking
     from organizations.models import Organization
 
+    from billing.usage_counters import APIUsageCounters
+
     logger.info("Starting API overage billing...")
 
     yesterday = (timezone.now() - timedelta(days=1)).date()
 
+    # Yesterday's last requests may still be in the usage counters
+    APIUsageCounters.flush(date=yesterday)
+
     summary = {
         "date": str(yesterday),
         "organizations_processed": 0,
@@ -99,6 +105,27 @@ def charge_api_overage():
     return summary
 
 
+@job("low", timeout=300)
+def flush_api_usage_counters(date=None):
+    """
+    Write the API usage counters to APIUsageTracking.
+
+    Args:
+        date: Day to flush (defaults to today)
+
+    Returns:
+        dict: Flush summary
+    """
+    from billing.usage_counters import APIUsageCounters
+
+    try:
+        flushed = APIUsageCounters.flush(date=date)
+        return {"success": True, "organizations": flushed}
+    except Exception as e:
+        logger.error(f"Error flushing API usage counters: {e}", exc_info=True)
+        return {"success": False, "error": str(e)}
+
+
 @job("default", timeout=1800)
 def charge_storage_billing():
     """
@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+from billing.models import APIUsageTracking
+from billing.services import APIRateLimitService
+from billing.usage_counters import APIUsageCounters, local_buffer
+from django.test import TestCase
+from django.utils import timezone
+from fakeredis import FakeRedis
+from organizations.tests.factories import OrganizationFactory
+
+
+class APIUsageCountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = OrganizationFactory()
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.jobs = []
+        for name, value in (
+            ('redis_connected', lambda: True),
+            ('get_connection', lambda: self.redis),
+            ('start_job_async_or_sync', lambda job, **kwargs: self.jobs.append(job)),
+        ):
+            patcher = patch(f'billing.usage_counters.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        local_buffer.clear()
+        self.addCleanup(APIUsageCounters._cached.clear)
+        self.addCleanup(local_buffer.clear)
+
+    def test_counts_in_redis_and_flushes_totals(self):
+        today = timezone.now().date()
+        APIUsageTracking.objects.create(
+            organization=self.organization, date=today, read_requests=10, free_read_limit=12
+        )
+
+        # The hash is seeded from the flushed row once, then requests cost no queries
+        with self.assertNumQueries(1):
+            self.assertTrue(APIRateLimitService.track_request(self.organization, 'read'))
+        with self.assertNumQueries(0):
+            self.assertTrue(APIRateLimitService.track_request(self.organization, 'read'))
+            APIRateLimitService.track_request(self.organization, 'read')
+            APIRateLimitService.track_request(self.organization, 'export')
+            status = APIRateLimitService.check_rate_limit(self.organization, 'read')
+        self.assertEqual((status['used'], status['limit']), (13, 10000))
+        self.assertEqual(len(self.jobs), 1)
+
+        self.assertEqual(APIUsageCounters.flush(), 1)
+        usage = APIUsageTracking.objects.get(organization=self.organization, date=today)
+        self.assertEqual((usage.read_requests, usage.read_overage, usage.export_requests), (13, 1, 1))
+        self.assertEqual(usage.free_read_limit, 12)
+
+        # Nothing counted since the last flush
+        self.assertEqual(APIUsageCounters.flush(), 0)
+
+        # Counts survive losing Redis up to the last flush
+        self.redis.flushall()
+        APIRateLimitService.track_request(self.organization, 'read')
+        self.assertEqual(APIUsageCounters.totals(self.organization.id)['read'], 14)
+
+    def test_blocking_decision_is_cached(self):
+        APIRateLimitService.track_request(self.organization, 'write')
+        self.assertEqual(APIRateLimitService.check_rate_limit(self.organization, 'write', cached=True)['used'], 1)
+        APIRateLimitService.track_request(self.organization, 'write')
+        self.assertEqual(APIRateLimitService.check_rate_limit(self.organization, 'write', cached=True)['used'], 1)
+        self.assertEqual(APIRateLimitService.check_rate_limit(self.organization, 'write')['used'], 2)
+
+        with patch.dict(APIRateLimitService.FREE_LIMITS, write=3):
+            self.assertTrue(APIRateLimitService.track_request(self.organization, 'write'))
+            self.assertFalse(APIRateLimitService.track_request(self.organization, 'write'))
+
+    def test_batches_in_process_without_redis(self):
+        with patch('billing.usage_counters.redis_connected', lambda: False), patch(
+            'billing.usage_counters.API_USAGE_LOCAL_BATCH_SIZE', 3
+        ):
+            for _ in range(2):
+                APIRateLimitService.track_request(self.organization, 'write')
+            self.assertFalse(APIUsageTracking.objects.exists())
+            self.assertEqual(APIUsageCounters.totals(self.organization.id)['write'], 2)
+
+            APIRateLimitService.track_request(self.organization, 'write')
+            usage = APIUsageTracking.objects.get(organization=self.organization)
+            self.assertEqual(usage.write_requests, 3)
+        self.assertEqual(self.jobs, [])
+
+    def test_replays_in_process_counts_when_redis_returns(self):
+        today = timezone.now().date()
+        APIRateLimitService.track_request(self.organization, 'read')
+        self.assertEqual(APIUsageCounters.flush(), 1)
+
+        # Redis is configured but unreachable: the counts wait in the process
+        with self.settings(REDIS_ENABLED=True), patch(
+            'billing.usage_counters.redis_connected', lambda: False
+        ), patch('billing.usage_counters.API_USAGE_LOCAL_BATCH_SIZE', 2):
+            for _ in range(3):
+                APIRateLimitService.track_request(self.organization, 'read')
+            self.assertEqual(APIUsageCounters.flush(), 0)
+            usage = APIUsageTracking.objects.get(organization=self.organization, date=today)
+            self.assertEqual(usage.read_requests, 1)
+
+        # Back online: replayed before the absolute totals are flushed
+        with self.settings(REDIS_ENABLED=True):
+            self.assertEqual(APIUsageCounters.increment(self.organization.id, 'read'), 5)
+            self.assertEqual(APIUsageCounters.flush(), 1)
+        usage.refresh_from_db()
+        self.assertEqual(usage.read_requests, 5)
+        self.assertFalse(local_buffer.has_pending())
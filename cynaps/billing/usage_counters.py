@@ -0,0 +1,361 @@
+"""
+API usage counters for rate limiting and overage billing.
+
+APIRateLimitService used to get_or_create the organization's APIUsageTracking
+row and save an incremented copy on every API request, so every request paid
+2-3 queries and all requests of an organization contended for one row per day.
+The counters now live in one Redis hash per organization and day:
+
+    api_usage:<org_id>:<YYYY-MM-DD> -> {read, write, export, _v}
+    api_usage:dirty:<YYYY-MM-DD>    -> {org_id, ...} counters changed since the last flush
+
+Requests are counted with HINCRBY. A hash is seeded from the day's
+APIUsageTracking row the first time it is read ("_v" marks a seeded hash),
+so counts survive a Redis restart up to the last flush. The middleware's
+blocked/unblocked decision reads the counters at most once per
+API_USAGE_DECISION_CACHE_SECONDS per process.
+
+flush_api_usage_counters (billing.tasks) writes the totals of the dirty
+organizations to APIUsageTracking, which charge_daily_overage bills from. The
+flush is scheduled at most once per API_USAGE_FLUSH_INTERVAL seconds by the
+requests themselves, and charge_api_overage flushes the previous day before
+charging it.
+
+Without Redis every process keeps its own pending increments and writes them
+with F() updates once API_USAGE_LOCAL_BATCH_SIZE requests or
+API_USAGE_FLUSH_INTERVAL seconds have accumulated; a process that exits loses
+at most one batch. When Redis is enabled but unreachable, the increments stay
+pending instead: the flush writes the Redis totals as absolute values and
+would overwrite increments written to the database meanwhile. The first
+request or flush that reaches Redis again replays them into the hashes with
+HINCRBY.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from core.redis import redis_connected, start_job_async_or_sync
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django_rq import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+API_USAGE_KEY_PREFIX = getattr(settings, "API_USAGE_REDIS_KEY_PREFIX", "api_usage")
+API_USAGE_TTL = getattr(settings, "API_USAGE_REDIS_TTL", 3 * 86400)  # keep yesterday until it is charged
+API_USAGE_FLUSH_INTERVAL = getattr(settings, "API_USAGE_FLUSH_INTERVAL", 60)  # seconds
+API_USAGE_DECISION_CACHE_SECONDS = getattr(settings, "API_USAGE_DECISION_CACHE_SECONDS", 5)
+API_USAGE_LOCAL_BATCH_SIZE = getattr(settings, "API_USAGE_LOCAL_BATCH_SIZE", 100)
+SEEDED_FIELD = "_v"
+
+REQUEST_TYPES = ("read", "write", "export")
+
+
+def _key(organization_id, date):
+    return f"{API_USAGE_KEY_PREFIX}:{organization_id}:{date.isoformat()}"
+
+
+def _dirty_key(date):
+    return f"{API_USAGE_KEY_PREFIX}:dirty:{date.isoformat()}"
+
+
+def _flush_key():
+    return f"{API_USAGE_KEY_PREFIX}:flush_scheduled"
+
+
+def _empty_totals():
+    return dict.fromkeys(REQUEST_TYPES, 0)
+
+
+def _db_totals(organization_ids, date):
+    """{org_id: {read, write, export}} from APIUsageTracking, with one query"""
+    from .models import APIUsageTracking
+
+    totals = {organization_id: _empty_totals() for organization_id in organization_ids}
+    rows = APIUsageTracking.objects.filter(organization_id__in=list(totals), date=date).values_list(
+        "organization_id", "read_requests", "write_requests", "export_requests"
+    )
+    for organization_id, read, write, export in rows:
+        totals[organization_id] = {"read": read, "write": write, "export": export}
+    return totals
+
+
+class LocalUsageBuffer:
+    """Per-process pending increments, used when Redis is unavailable"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(Counter)  # {(org_id, date): {request_type: count}}
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, organization_id, date, request_type, count):
+        with self._lock:
+            self._pending[(organization_id, date)][request_type] += count
+            self._size += count
+            due = (
+                self._size >= API_USAGE_LOCAL_BATCH_SIZE
+                or time.monotonic() - self._last_flush >= API_USAGE_FLUSH_INTERVAL
+            )
+        # With Redis enabled the increments wait for Redis (see the module docstring)
+        if due and not settings.REDIS_ENABLED:
+            self.flush()
+
+    def pending(self, organization_id, date):
+        with self._lock:
+            return dict(self._pending.get((organization_id, date), {}))
+
+    def has_pending(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def flush(self, redis_client=None):
+        """
+        Write the pending increments: with HINCRBY into the Redis hashes when
+        redis_client is given, with F() updates to APIUsageTracking when Redis
+        is disabled. Otherwise they stay pending.
+
+        Returns:
+            Number of (organization, date) counters written
+        """
+        if redis_client is None and settings.REDIS_ENABLED:
+            return 0
+
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(Counter)
+            self._size = 0
+            self._last_flush = time.monotonic()
+
+        written = 0
+        for (organization_id, date), counts in pending.items():
+            try:
+                if redis_client is None:
+                    APIUsageCounters.write_increments(organization_id, date, counts)
+                else:
+                    APIUsageCounters.replay_increments(redis_client, organization_id, date, counts)
+                written += 1
+            except Exception as e:
+                logger.error(f"Error writing API usage for organization {organization_id}: {e}")
+                if redis_client is not None:
+                    self._restore(organization_id, date, counts)
+        return written
+
+    def _restore(self, organization_id, date, counts):
+        with self._lock:
+            self._pending[(organization_id, date)].update(counts)
+            self._size += sum(counts.values())
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._size = 0
+            self._last_flush = time.monotonic()
+
+
+local_buffer = LocalUsageBuffer()
+
+
+class APIUsageCounters:
+    """Daily API request counters per organization"""
+
+    # {org_id: (expires_at, totals)}, per process
+    _cached = {}
+
+    @classmethod
+    def increment(cls, organization_id, request_type, count=1):
+        """
+        Count today's requests of a type.
+
+        Returns:
+            Day total for the request type (from the decision cache without Redis)
+        """
+        date = timezone.now().date()
+
+        if redis_connected():
+            try:
+                redis_client = get_connection()
+                key = _key(organization_id, date)
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.hincrby(key, request_type, count)
+                pipe.hexists(key, SEEDED_FIELD)
+                pipe.expire(key, API_USAGE_TTL)
+                pipe.sadd(_dirty_key(date), organization_id)
+                total, seeded, _, _ = pipe.execute()
+                if local_buffer.has_pending():
+                    # Counted in process while Redis was unreachable
+                    local_buffer.flush(redis_client)
+                    total = int(redis_client.hget(key, request_type) or 0)
+                if not seeded:
+                    total = cls._seed(redis_client, organization_id, date)[request_type]
+                cls.schedule_flush(redis_client)
+                return total
+            except Exception as e:
+                logger.error(f"API usage counters unavailable, counting in process: {e}")
+
+        local_buffer.add(organization_id, date, request_type, count)
+        return cls.cached_totals(organization_id)[request_type]
+
+    @classmethod
+    def totals(cls, organization_id, date=None):
+        """Day totals {read, write, export} for an organization"""
+        date = date or timezone.now().date()
+
+        if redis_connected():
+            try:
+                redis_client = get_connection()
+                totals = cls._redis_totals(redis_client, organization_id, date)
+                if totals is None:
+                    totals = cls._seed(redis_client, organization_id, date)
+                return totals
+            except Exception as e:
+                logger.error(f"API usage counters unavailable, reading the database: {e}")
+
+        totals = _db_totals([organization_id], date)[organization_id]
+        for request_type, count in local_buffer.pending(organization_id, date).items():
+            totals[request_type] += count
+        return totals
+
+    @classmethod
+    def cached_totals(cls, organization_id):
+        """
+        Today's totals, read at most once per API_USAGE_DECISION_CACHE_SECONDS
+        in this process. Used for blocking decisions, which may lag by that much.
+        """
+        now = time.monotonic()
+        cached = cls._cached.get(organization_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        totals = cls.totals(organization_id)
+        cls._cached[organization_id] = (now + API_USAGE_DECISION_CACHE_SECONDS, totals)
+        return totals
+
+    @staticmethod
+    def _redis_totals(redis_client, organization_id, date):
+        """Totals from a seeded hash, or None when the hash needs seeding"""
+        data = redis_client.hgetall(_key(organization_id, date))
+        if SEEDED_FIELD.encode() not in data:
+            return None
+        return {request_type: int(data.get(request_type.encode(), 0)) for request_type in REQUEST_TYPES}
+
+    @staticmethod
+    def _seed(redis_client, organization_id, date):
+        """Add the flushed database totals to the hash, exactly once per hash"""
+        key = _key(organization_id, date)
+        if redis_client.hsetnx(key, SEEDED_FIELD, 1):
+            db_totals = _db_totals([organization_id], date)[organization_id]
+            pipe = redis_client.pipeline(transaction=False)
+            for request_type, count in db_totals.items():
+                pipe.hincrby(key, request_type, count)
+            pipe.expire(key, API_USAGE_TTL)
+            pipe.execute()
+        data = redis_client.hgetall(key)
+        return {request_type: int(data.get(request_type.encode(), 0)) for request_type in REQUEST_TYPES}
+
+    @staticmethod
+    def schedule_flush(redis_client):
+        """Start the flush job unless one is already scheduled"""
+        from .tasks import flush_api_usage_counters
+
+        if redis_client.set(_flush_key(), 1, nx=True, ex=API_USAGE_FLUSH_INTERVAL + 60):
+            start_job_async_or_sync(flush_api_usage_counters, in_seconds=API_USAGE_FLUSH_INTERVAL, queue_name="low")
+
+    @classmethod
+    def flush(cls, date=None):
+        """
+        Write the totals of organizations counted since the last flush to
+        APIUsageTracking.
+
+        Returns:
+            Number of organizations written
+        """
+        date = date or timezone.now().date()
+        if not redis_connected():
+            return local_buffer.flush()
+
+        redis_client = get_connection()
+        if date == timezone.now().date():
+            # Requests from now on schedule another flush
+            redis_client.delete(_flush_key())
+        # Increments counted in this process while Redis was unreachable
+        local_buffer.flush(redis_client)
+
+        # Take the dirty set atomically; organizations counted meanwhile are re-added
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.smembers(_dirty_key(date))
+        pipe.delete(_dirty_key(date))
+        members, _ = pipe.execute()
+
+        totals = {}
+        for organization_id in sorted(int(member) for member in members):
+            org_totals = cls._redis_totals(redis_client, organization_id, date)
+            if org_totals is None:
+                org_totals = cls._seed(redis_client, organization_id, date)
+            totals[organization_id] = org_totals
+
+        cls.write_totals(date, totals)
+        if totals:
+            logger.info(f"Flushed API usage of {len(totals)} organizations for {date}")
+        return len(totals)
+
+    @staticmethod
+    def write_totals(date, totals):
+        """Upsert day totals {org_id: {read, write, export}} into APIUsageTracking"""
+        from .models import APIUsageTracking
+
+        if not totals:
+            return
+        existing = {
+            usage.organization_id: usage
+            for usage in APIUsageTracking.objects.filter(organization_id__in=list(totals), date=date).only(
+                "organization_id", *APIUsageTracking.LIMIT_FIELDS
+            )
+        }
+        rows = []
+        for organization_id, org_totals in totals.items():
+            # New instances (no pk), so the upsert conflicts on (organization, date)
+            usage = APIUsageTracking(organization_id=organization_id, date=date)
+            if organization_id in existing:
+                for field in APIUsageTracking.LIMIT_FIELDS:
+                    setattr(usage, field, getattr(existing[organization_id], field))
+            usage.set_requests(**org_totals)
+            rows.append(usage)
+
+        APIUsageTracking.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["organization", "date"],
+            update_fields=APIUsageTracking.COUNTER_FIELDS + ["updated_at"],
+        )
+
+    @staticmethod
+    def replay_increments(redis_client, organization_id, date, counts):
+        """
+        Add per-type counts to the day's hash and mark it dirty. An unseeded
+        hash still gets the database totals added when it is seeded.
+        """
+        key = _key(organization_id, date)
+        pipe = redis_client.pipeline(transaction=True)
+        for request_type, count in counts.items():
+            pipe.hincrby(key, request_type, count)
+        pipe.expire(key, API_USAGE_TTL)
+        pipe.sadd(_dirty_key(date), organization_id)
+        pipe.execute()
+
+    @staticmethod
+    def write_increments(organization_id, date, counts):
+        """Add per-type counts to the day's APIUsageTracking row with F() updates"""
+        from .models import APIUsageTracking
+
+        APIUsageTracking.objects.get_or_create(organization_id=organization_id, date=date)
+        updates = {"updated_at": timezone.now()}
+        for request_type, count in counts.items():
+            requests = F(f"{request_type}_requests") + count
+            updates[f"{request_type}_requests"] = requests
+            updates[f"{request_type}_overage"] = Greatest(requests - F(f"free_{request_type}_limit"), Value(0))
+        APIUsageTracking.objects.filter(organization_id=organization_id, date=date).update(**updates)
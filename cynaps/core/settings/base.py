@@ -665,6 +665,8 @@ TASK_LOCK_TTL = int(get_env("TASK_LOCK_TTL", default=86400))
 LABEL_STREAM_HISTORY_LIMIT = int(get_env("LABEL_STREAM_HISTORY_LIMIT", default=100))
 
 RANDOM_NEXT_TASK_SAMPLE_SIZE = int(get_env("RANDOM_NEXT_TASK_SAMPLE_SIZE", 50))
+# Random windows of RANDOM_NEXT_TASK_SAMPLE_SIZE tasks probed before giving up on random sampling
+RANDOM_NEXT_TASK_PROBES = int(get_env("RANDOM_NEXT_TASK_PROBES", 3))
 
 TASK_API_PAGE_SIZE_MAX = int(get_env("TASK_API_PAGE_SIZE_MAX", 0)) or None
 
@@ -747,6 +749,12 @@ REIMPORT_BATCH_SIZE = int(get_env("REIMPORT_BATCH_SIZE", 1000))
 IMPORT_BATCH_SIZE = int(get_env("IMPORT_BATCH_SIZE", 500))
 # Batch size for processing prediction imports to avoid memory issues with large datasets
 PREDICTION_IMPORT_BATCH_SIZE = int(get_env("PREDICTION_IMPORT_BATCH_SIZE", 500))
+# Threads fetching and serializing task batches during exports
+DATA_EXPORT_WORKERS = int(get_env("DATA_EXPORT_WORKERS", 4))
+# Sharded conversion of COCO/YOLO/VOC exports: tasks per shard, converting processes, image download threads
+EXPORT_CONVERTER_SHARD_SIZE = int(get_env("EXPORT_CONVERTER_SHARD_SIZE", 1000))
+EXPORT_CONVERTER_WORKERS = int(get_env("EXPORT_CONVERTER_WORKERS", 4))
+EXPORT_CONVERTER_DOWNLOAD_WORKERS = int(get_env("EXPORT_CONVERTER_DOWNLOAD_WORKERS", 8))
 PROJECT_TITLE_MIN_LEN = 3
 PROJECT_TITLE_MAX_LEN = 50
 LOGIN_REDIRECT_URL = "/"
@@ -865,6 +873,8 @@ COLLECT_VERSIONS = collect_versions_dummy
 
 WEBHOOK_TIMEOUT = float(get_env("WEBHOOK_TIMEOUT", 1.0))
 WEBHOOK_BATCH_SIZE = int(get_env("WEBHOOK_BATCH_SIZE", 5000))
+WEBHOOK_MAX_WORKERS = int(get_env("WEBHOOK_MAX_WORKERS", 8))
+WEBHOOK_MAX_ATTEMPTS = int(get_env("WEBHOOK_MAX_ATTEMPTS", 5))
 WEBHOOK_SERIALIZERS = {
     "project": "webhooks.serializers_for_hooks.ProjectWebhookSerializer",
     "task": "webhooks.serializers_for_hooks.TaskWebhookSerializer",
@@ -926,6 +936,9 @@ STORAGE_EXISTED_COUNT_BATCH_SIZE = int(
 
 USE_NGINX_FOR_EXPORT_DOWNLOADS = get_bool_env("USE_NGINX_FOR_EXPORT_DOWNLOADS", False)
 USE_NGINX_FOR_UPLOADS = get_bool_env("USE_NGINX_FOR_UPLOADS", False)  # Set to True in production with NGINX
+# Internal NGINX location aliased to MEDIA_ROOT (e.g. "/media_internal/"): media_response hands files
+# under MEDIA_ROOT to NGINX with X-Accel-Redirect instead of sending them from Python
+MEDIA_X_ACCEL_REDIRECT_PREFIX = get_env("MEDIA_X_ACCEL_REDIRECT_PREFIX", "")
 
 if get_env("MINIO_STORAGE_ENDPOINT") and not get_bool_env("MINIO_SKIP", False):
     CLOUD_FILE_STORAGE_ENABLED = True
@@ -1179,5 +1192,13 @@ SECURITY_WATERMARK_ENABLED = get_bool_env("SECURITY_WATERMARK_ENABLED", True)
 SECURITY_WATERMARK_POSITION = get_env("SECURITY_WATERMARK_POSITION", "tiled")
 # Enable invisible/steganographic watermarks for forensic tracing
 SECURITY_INVISIBLE_WATERMARK = get_bool_env("SECURITY_INVISIBLE_WATERMARK", True)
+# Cache of watermarked outputs (core.watermark_engine). Without it outputs stay in a
+# per-process LRU; point it at a Redis of its own, not the one rq uses.
+WATERMARK_CACHE_URL = get_env("WATERMARK_CACHE_URL", "")
+if WATERMARK_CACHE_URL:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "watermark": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": WATERMARK_CACHE_URL},
+    }
 # Default presign TTL for cloud storage URLs (in minutes)
 SECURITY_PRESIGN_TTL_MINUTES = int(get_env("SECURITY_PRESIGN_TTL_MINUTES", 15))
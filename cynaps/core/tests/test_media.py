@@ -0,0 +1,98 @@
+import io
+import os
+import tempfile
+import zipfile
+
+from core.utils.media import cache_control, media_response
+from data_import.extraction_cache import ZipMemberReader
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+DATA = bytes(range(256)) * 40
+
+
+class MediaResponseTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.path = os.path.join(self.media_root, 'video.mp4')
+        with open(self.path, 'wb') as f:
+            f.write(DATA)
+
+    def get(self, file=None, **headers):
+        request = self.factory.get('/media', headers=headers)
+        return media_response(request, file or open(self.path, 'rb'))
+
+    def body(self, response):
+        content = b''.join(response.streaming_content)
+        response.file_to_stream.close()
+        return content
+
+    def test_full_body_and_validators(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Content-Length'], str(len(DATA)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=86400')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(self.body(response), DATA)
+
+        not_modified = self.get(If_None_Match=f'"other", {response["ETag"]}')
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_byte_ranges(self):
+        for header, start, stop in (
+            ('bytes=100-199', 100, 200),
+            ('bytes=10000-', 10000, len(DATA)),
+            ('bytes=-24', len(DATA) - 24, len(DATA)),
+            ('bytes=10200-99999', 10200, len(DATA)),
+        ):
+            response = self.get(Range=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response['Content-Range'], f'bytes {start}-{stop - 1}/{len(DATA)}')
+            self.assertEqual(response['Content-Length'], str(stop - start))
+            self.assertEqual(self.body(response), DATA[start:stop], header)
+
+        # Only ranges running to the end are offered to the server's sendfile
+        tail = self.get(Range='bytes=10000-')
+        self.assertEqual(tail.file_to_stream.fileno(), tail.file_to_stream.file.fileno())
+        with self.assertRaises(io.UnsupportedOperation):
+            self.get(Range='bytes=0-9').file_to_stream.fileno()
+
+    def test_unsatisfiable_multi_and_stale_ranges(self):
+        response = self.get(Range=f'bytes={len(DATA)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(DATA)}')
+
+        self.assertEqual(self.get(Range='bytes=0-1,5-6').status_code, 200)
+        # A weak ETag can't validate If-Range: send the whole file
+        self.assertEqual(self.get(Range='bytes=0-1', If_Range='W/"stale"').status_code, 200)
+
+    def test_x_accel_redirect_for_media_root(self):
+        with override_settings(MEDIA_X_ACCEL_REDIRECT_PREFIX='/media_internal/'):
+            response = self.get(Range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/media_internal/video.mp4')
+        self.assertEqual(response.content, b'')
+
+    def test_zip_member_ranges(self):
+        archive = os.path.join(self.media_root, 'series.zip')
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr('IM1.dcm', DATA)
+
+        response = self.get(ZipMemberReader(archive, 'IM1.dcm'), Range='bytes=5000-5099')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Type'], 'application/dicom')
+        self.assertEqual(self.body(response), DATA[5000:5100])
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+    def test_cache_control_by_content_type(self):
+        self.assertEqual(cache_control('audio/mpeg'), 'private, max-age=86400')
+        self.assertEqual(cache_control('image/png; charset=binary'), 'private, max-age=3600, must-revalidate')
+        self.assertEqual(cache_control('application/json', default='no-store'), 'no-store')
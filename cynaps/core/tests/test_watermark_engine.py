@@ -0,0 +1,79 @@
+import io
+from datetime import datetime
+from unittest.mock import patch
+
+from core.watermark_engine import WatermarkEngine, local_cache
+from core.watermark_service import WatermarkService, _overlay_tile
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from PIL import Image
+
+
+def _image(size=(640, 480), format='JPEG', mode='RGB'):
+    output = io.BytesIO()
+    Image.new(mode, size, (200, 180, 160)).save(output, format=format)
+    return output.getvalue()
+
+
+class WatermarkEngineTests(SimpleTestCase):
+    def setUp(self):
+        patcher = patch('core.watermark_engine.shared_cache', lambda: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        local_cache.clear()
+        self.addCleanup(local_cache.clear)
+        self.timestamp = datetime(2026, 1, 1, 12, 30, 15)
+
+    def test_visible_only_keeps_jpeg(self):
+        data, content_type = WatermarkEngine.render(_image(), 'annotator@example.com', timestamp=self.timestamp)
+
+        self.assertEqual(content_type, 'image/jpeg')
+        image = Image.open(io.BytesIO(data))
+        self.assertEqual((image.format, image.size), ('JPEG', (640, 480)))
+        # Text pixels are darkened towards the watermark gray
+        self.assertLess(min(image.convert('L').getdata()), 175)
+
+    def test_invisible_watermark_is_png_and_extractable(self):
+        payload = {'u': '42', 'ts': self.timestamp.isoformat()}
+        data, content_type = WatermarkEngine.render(
+            _image(format='PNG', mode='RGBA'), 'annotator@example.com', timestamp=self.timestamp, payload=payload
+        )
+
+        self.assertEqual(content_type, 'image/png')
+        self.assertEqual(WatermarkService.extract_watermark(data), payload)
+
+    def test_tiles_and_outputs_are_cached(self):
+        image_data = _image()
+        _overlay_tile.cache_clear()
+
+        with patch.object(WatermarkEngine, '_render', wraps=WatermarkEngine._render) as render:
+            first = WatermarkEngine.render(image_data, 'a@example.com', timestamp=self.timestamp, payload={'ts': 1})
+            # Same minute, same user: served from the cache despite a new payload timestamp
+            second = WatermarkEngine.render(
+                image_data, 'a@example.com', timestamp=self.timestamp.replace(second=50), payload={'ts': 2}
+            )
+            self.assertEqual(first, second)
+            self.assertEqual(render.call_count, 1)
+
+            WatermarkEngine.render(image_data, 'b@example.com', timestamp=self.timestamp, payload={'ts': 3})
+            WatermarkEngine.render(_image((800, 600)), 'a@example.com', timestamp=self.timestamp, payload={'ts': 4})
+            self.assertEqual(render.call_count, 3)
+
+        # Both images share the font scale, so the user's tile is rendered once
+        self.assertEqual(_overlay_tile.cache_info().misses, 2)
+        self.assertEqual(_overlay_tile.cache_info().hits, 1)
+
+    def test_shared_output_cache(self):
+        cache = LocMemCache('watermark-test', {})
+        with patch('core.watermark_engine.shared_cache', lambda: cache):
+            first = WatermarkEngine.render(_image(), 'a@example.com', timestamp=self.timestamp)
+            with patch.object(WatermarkEngine, '_render') as render:
+                self.assertEqual(WatermarkEngine.render(_image(), 'a@example.com', timestamp=self.timestamp), first)
+            render.assert_not_called()
+            self.assertEqual(len(cache._cache), 1)
+
+            # Outputs over the entry cap are not cached at all
+            with patch('core.watermark_engine.WATERMARK_CACHE_MAX_ENTRY_BYTES', 10):
+                WatermarkEngine.render(_image((800, 600)), 'a@example.com', timestamp=self.timestamp)
+            self.assertEqual(len(cache._cache), 1)
+        self.assertEqual(len(local_cache._entries), 0)
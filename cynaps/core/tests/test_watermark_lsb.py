@@ -0,0 +1,76 @@
+import hashlib
+import io
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from core.watermark_service import WatermarkService
+from django.test import SimpleTestCase
+from PIL import Image
+
+
+def _photo(size=(97, 61)):
+    pixels = np.random.default_rng(1).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def _png(image):
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+def loop_embed(image, payload):
+    """The per-pixel embedding the NumPy version replaced"""
+    payload_bytes = WatermarkService.MAGIC_HEADER + json.dumps(payload, separators=(',', ':')).encode()
+    data = len(payload_bytes).to_bytes(4, 'big') + hashlib.md5(payload_bytes).digest()[:4] + payload_bytes
+    bits = ''.join(format(byte, '08b') for byte in data)
+    pixels = image.load()
+    bit_index = 0
+    for y in range(image.height):
+        for x in range(image.width):
+            channels = list(pixels[x, y])
+            for c in range(3):
+                if bit_index < len(bits):
+                    channels[c] = (channels[c] & 0xFE) | int(bits[bit_index])
+                    bit_index += 1
+            pixels[x, y] = tuple(channels)
+    return image
+
+
+class LSBWatermarkTests(SimpleTestCase):
+    payload = {'u': '42', 's': 'session-key', 'p': '7', 't': '1234', 'ts': '2026-01-01T12:00:00', 'v': 1}
+
+    def test_embedding_is_byte_compatible(self):
+        expected = np.asarray(loop_embed(_photo(), self.payload))
+        image = _photo()
+        WatermarkService.embed_invisible_watermark(image, self.payload)
+
+        np.testing.assert_array_equal(np.asarray(image), expected)
+        # Images watermarked before the change still extract
+        self.assertEqual(WatermarkService.extract_watermark(_png(Image.fromarray(expected))), self.payload)
+
+    def test_extract_rejects_unmarked_and_too_small_images(self):
+        self.assertIsNone(WatermarkService.extract_watermark(_png(_photo())))
+        tiny = _png(_photo((8, 8)))
+        self.assertEqual(WatermarkService.apply_invisible_watermark(tiny, self.payload), tiny)
+
+    def test_extract_from_rgba(self):
+        data = WatermarkService.apply_invisible_watermark(_png(_photo().convert('RGBA')), self.payload)
+        self.assertEqual(WatermarkService.extract_watermark(data), self.payload)
+
+    def test_scan_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            Path(directory, 'leak').mkdir()
+            Path(directory, 'leak', 'a.png').write_bytes(
+                WatermarkService.apply_invisible_watermark(_png(_photo()), self.payload)
+            )
+            Path(directory, 'b.png').write_bytes(_png(_photo()))
+            Path(directory, 'notes.txt').write_text('not an image')
+
+            results = WatermarkService.scan_for_watermarks(directory, workers=2)
+
+        self.assertEqual(
+            [(Path(r['path']).name, r['payload']) for r in results], [('b.png', None), ('a.png', self.payload)]
+        )
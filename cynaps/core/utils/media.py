@@ -0,0 +1,270 @@
+"""
+Media responses with byte ranges, conditional requests and zero-copy sends.
+
+Media views used to mix RangedFileResponse (which reads the whole file just to
+learn its size), plain FileResponse without Range support (DICOM and ZIP
+members) and ad-hoc ETag checks, so every seek in a large video, audio file
+or DICOM series downloaded the file again. media_response() serves them all:
+
+- A single byte range (bytes=a-b, bytes=a-, bytes=-n) gets a 206 with
+  Content-Range; an unsatisfiable one gets a 416. If-Range is honoured.
+  Multi-range requests get the full body.
+- A weak ETag (mtime + size unless the caller has a better one) is always
+  sent, and a matching If-None-Match returns 304 before any byte is read.
+- Cache-Control comes from MEDIA_CACHE_CONTROL by content type.
+- Python doesn't copy the bytes when it can be avoided. With
+  MEDIA_X_ACCEL_REDIRECT_PREFIX set, files under MEDIA_ROOT are handed to
+  nginx (an internal location aliased to MEDIA_ROOT), which also handles
+  the ranges. Otherwise the file is passed to the WSGI server's file_wrapper
+  (os.sendfile in gunicorn) for full bodies and ranges running to the end of
+  the file. Other ranges, and members read from inside archives, are read in
+  bounded blocks.
+
+The storage proxy (io_storages/proxy_api.py) keeps forwarding ranges to cloud
+storages through override_range_header and its RESOLVER_PROXY_CACHE_TIMEOUT
+Cache-Control, and uses etag_matches() from here.
+"""
+
+import io
+import logging
+import mimetypes
+import os
+from typing import Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+
+MEDIA_CACHE_CONTROL = getattr(
+    settings,
+    "MEDIA_CACHE_CONTROL",
+    {
+        "application/dicom": "private, max-age=86400",
+        "video/": "private, max-age=86400",
+        "audio/": "private, max-age=86400",
+        "image/": "private, max-age=3600, must-revalidate",
+    },
+)
+MEDIA_DEFAULT_CACHE_CONTROL = getattr(settings, "MEDIA_DEFAULT_CACHE_CONTROL", "private, max-age=0, must-revalidate")
+MEDIA_BLOCK_SIZE = getattr(settings, "MEDIA_BLOCK_SIZE", 512 * 1024)
+
+
+def cache_control(content_type: Optional[str], default: Optional[str] = None) -> str:
+    """Cache-Control for a content type: exact match first, then its family ("video/")"""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    family = content_type.split("/")[0] + "/"
+    value = MEDIA_CACHE_CONTROL.get(content_type) or MEDIA_CACHE_CONTROL.get(family)
+    return value or default or MEDIA_DEFAULT_CACHE_CONTROL
+
+
+def weak_etag(mtime_ns: int, size: int) -> str:
+    return f'W/"{mtime_ns:x}-{size:x}"'
+
+
+def etag_matches(header_value: Optional[str], etag: Optional[str]) -> bool:
+    """If-None-Match check (weak comparison, lists and "*")"""
+    if not header_value or not etag:
+        return False
+    candidates = [candidate.strip() for candidate in header_value.split(",") if candidate.strip()]
+    if "*" in candidates:
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.removeprefix("W/") == opaque for candidate in candidates)
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def requested_range(request, size: int, etag: Optional[str] = None, last_modified: Optional[float] = None):
+    """
+    The single byte range to serve, as (start, stop) with stop exclusive.
+
+    Returns:
+        None for the full body (no Range, multiple ranges, malformed or failed If-Range)
+
+    Raises:
+        RangeNotSatisfiable: The range starts beyond the end of the file
+    """
+    header = request.headers.get("Range")
+    if not header:
+        return None
+
+    if_range = request.headers.get("If-Range")
+    if if_range:
+        if if_range.startswith(('"', "W/")):
+            # If-Range needs a strong validator
+            if not etag or etag.startswith("W/") or if_range != etag:
+                return None
+        elif last_modified is None or parse_http_date_safe(if_range) != int(last_modified):
+            return None
+
+    units, _, ranges = header.partition("=")
+    if units.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if not first:
+            # bytes=-n: the last n bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size
+        start = int(first)
+        stop = min(int(last) + 1, size) if last else size
+    except ValueError:
+        return None
+    if start < 0 or stop <= start:
+        if start >= size:
+            raise RangeNotSatisfiable()
+        return None
+    return start, stop
+
+
+class _FileRange(io.RawIOBase):
+    """Reads [start, stop) of a file"""
+
+    def __init__(self, file, start, stop):
+        self.file = file
+        self.name = getattr(file, "name", "")
+        self.position = start
+        self.remaining = stop - start
+        file.seek(start)
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def readinto(self, buffer):
+        if self.remaining <= 0:
+            return 0
+        view = memoryview(buffer)[: self.remaining]
+        data = self.file.read(len(view))
+        view[: len(data)] = data
+        self.position += len(data)
+        self.remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+class _FileTail(_FileRange):
+    """A range running to the end of a real file: the WSGI server may sendfile() it from the offset"""
+
+    def fileno(self):
+        return self.file.fileno()
+
+
+def _stat(file):
+    """(size, mtime) of an open file, a Django File or a reader with size/mtime"""
+    try:
+        stat_result = os.fstat(file.fileno())
+        return stat_result.st_size, stat_result.st_mtime_ns
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    mtime = getattr(file, "mtime", None)
+    return file.size, int(mtime * 1_000_000_000) if mtime is not None else None
+
+
+def _local_path(file):
+    """Filesystem path of an open file (also inside a Django File), if any"""
+    for candidate in (file, getattr(file, "file", None)):
+        name = getattr(candidate, "name", None)
+        if isinstance(name, str) and os.path.isabs(name):
+            return name
+    return None
+
+
+def _accel_redirect(file):
+    """X-Accel-Redirect location for a file under MEDIA_ROOT, if configured"""
+    prefix = getattr(settings, "MEDIA_X_ACCEL_REDIRECT_PREFIX", "")
+    path = _local_path(file)
+    if not prefix or not path:
+        return None
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(path)
+    if not path.startswith(media_root + os.sep):
+        return None
+    return prefix.rstrip("/") + "/" + quote(os.path.relpath(path, media_root).replace(os.sep, "/"))
+
+
+def media_response(
+    request,
+    file,
+    content_type: Optional[str] = None,
+    etag: Optional[str] = None,
+    cache: Optional[str] = None,
+) -> HttpResponse:
+    """
+    Serve an open binary file with range, conditional and cache support.
+
+    Args:
+        request: The request (Range, If-Range, If-None-Match)
+        file: Open file, Django File, or seekable reader with size (and mtime)
+        content_type: Defaults to a guess from the file name
+        etag: Validator to use instead of the mtime + size weak ETag
+        cache: Cache-Control to use instead of MEDIA_CACHE_CONTROL
+
+    Returns:
+        200, 206, 304 or 416 response (the file is closed unless streamed)
+    """
+    size, mtime_ns = _stat(file)
+    mtime = mtime_ns / 1_000_000_000 if mtime_ns is not None else None
+    if etag is None and mtime_ns is not None:
+        etag = weak_etag(mtime_ns, size)
+    if content_type is None:
+        content_type = mimetypes.guess_type(getattr(file, "name", "") or "")[0] or "application/octet-stream"
+
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": cache or cache_control(content_type)}
+    if etag:
+        headers["ETag"] = etag
+    if mtime is not None:
+        headers["Last-Modified"] = http_date(mtime)
+
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        file.close()
+        return _with_headers(HttpResponseNotModified(), headers)
+
+    try:
+        byte_range = requested_range(request, size, etag, mtime)
+    except RangeNotSatisfiable:
+        file.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return _with_headers(response, headers)
+
+    location = _accel_redirect(file)
+    if location:
+        # nginx serves the body and answers the Range itself
+        file.close()
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = location
+        return _with_headers(response, headers)
+
+    start, stop = byte_range or (0, size)
+    tail = stop == size and _local_path(file) is not None
+    response = FileResponse(
+        (_FileTail if tail else _FileRange)(file, start, stop),
+        content_type=content_type,
+        status=206 if byte_range else 200,
+    )
+    response.block_size = MEDIA_BLOCK_SIZE
+    response["Content-Length"] = str(stop - start)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    return _with_headers(response, headers)
+
+
+def _with_headers(response, headers):
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -0,0 +1,228 @@
+"""
+Watermark rendering pipeline for the image proxies.
+
+SecureImageProxyMixin and UploadedFileResponse used to decode the image, draw
+the tiled text over a full-size RGBA overlay (loading the font every time),
+encode a PNG, decode it again for the invisible watermark and encode another
+PNG. A multi-megapixel JPEG came back as a PNG several times its size.
+
+WatermarkEngine.render() decodes the image once and:
+
+1. Applies the tiled text with one paste, using an overlay tile pre-rendered
+   per (text, font scale) (see WatermarkService._apply_tiled_watermark). The
+   font scales with the image size, so the text stays legible on large scans.
+2. Keeps the source format when only the visible watermark is applied (JPEG
+   and WebP stay lossy). The invisible watermark needs a lossless PNG.
+3. Caches the output per (file hash, user, minute, watermark context) for
+   WATERMARK_CACHE_TTL seconds: in the WATERMARK_CACHE_ALIAS cache when it is
+   configured (entries up to WATERMARK_CACHE_MAX_ENTRY_BYTES), otherwise in a
+   per-process LRU bounded to WATERMARK_LOCAL_CACHE_BYTES. Outputs never go
+   to the Redis used by rq: evicting them under memory pressure could evict
+   job data too, so the alias should point at a store of its own. The visible
+   text changes once a minute, so zooming or paging back to an image within
+   the minute skips the rendering. The forensic payload of a cached output
+   carries the time of its first rendering in that minute.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from core.watermark_service import WatermarkService
+from django.conf import settings
+from django.core.cache import caches
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+WATERMARK_CACHE_ENABLED = getattr(settings, "WATERMARK_CACHE_ENABLED", True)
+WATERMARK_CACHE_ALIAS = getattr(settings, "WATERMARK_CACHE_ALIAS", "watermark")
+WATERMARK_CACHE_KEY_PREFIX = getattr(settings, "WATERMARK_CACHE_KEY_PREFIX", "watermark")
+WATERMARK_CACHE_TTL = getattr(settings, "WATERMARK_CACHE_TTL", 120)  # seconds
+WATERMARK_CACHE_MAX_ENTRY_BYTES = getattr(settings, "WATERMARK_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024)
+WATERMARK_LOCAL_CACHE_BYTES = getattr(settings, "WATERMARK_LOCAL_CACHE_BYTES", 128 * 1024 * 1024)
+WATERMARK_JPEG_QUALITY = getattr(settings, "WATERMARK_JPEG_QUALITY", 90)
+WATERMARK_PNG_COMPRESS_LEVEL = getattr(settings, "WATERMARK_PNG_COMPRESS_LEVEL", 3)
+
+# Source formats kept as-is when no invisible watermark is embedded
+LOSSY_FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class LocalOutputCache:
+    """Per-process LRU of watermarked outputs, bounded by total bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {key: (expires_at, content_type, data)}
+        self._bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key, content_type, data, ttl):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, content_type, data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, data = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+local_cache = LocalOutputCache(WATERMARK_LOCAL_CACHE_BYTES)
+
+
+def shared_cache():
+    """The dedicated output cache, or None when WATERMARK_CACHE_ALIAS is not configured"""
+    if WATERMARK_CACHE_ALIAS not in getattr(settings, "CACHES", {}):
+        return None
+    return caches[WATERMARK_CACHE_ALIAS]
+
+
+class WatermarkEngine:
+    """Visible + invisible watermarking with one decode and cached outputs"""
+
+    @classmethod
+    def render(
+        cls,
+        image_data: bytes,
+        user_id: str,
+        session_id: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+        position: str = "tiled",
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[bytes, str]:
+        """
+        Watermark an image.
+
+        Args:
+            image_data: Source image bytes
+            user_id: User shown (masked) in the visible watermark
+            session_id: Optional session shown in the visible watermark
+            timestamp: Time shown in the visible watermark (defaults to now)
+            position: "tiled", "corner" or "center"
+            payload: Forensic payload to embed invisibly, or None
+
+        Returns:
+            (image bytes, content type)
+        """
+        timestamp = timestamp or datetime.now()
+        text = WatermarkService.watermark_text(user_id, session_id, timestamp)
+
+        key = None
+        if WATERMARK_CACHE_ENABLED:
+            key = cls.cache_key(image_data, user_id, timestamp, text, position, payload)
+            cached = cls._cache_get(key)
+            if cached:
+                return cached
+
+        result = cls._render(image_data, text, position, payload)
+        if key:
+            cls._cache_set(key, *result)
+        return result
+
+    @staticmethod
+    def cache_key(image_data, user_id, timestamp, text, position, payload):
+        # The payload timestamp changes every request; everything else fixes the output
+        context = json.dumps(
+            [text, position, {k: v for k, v in (payload or {}).items() if k != "ts"}, payload is not None],
+            sort_keys=True,
+            default=str,
+        )
+        return ":".join(
+            (
+                WATERMARK_CACHE_KEY_PREFIX,
+                file_hash(image_data),
+                hashlib.blake2b(str(user_id).encode(), digest_size=8).hexdigest(),
+                timestamp.strftime("%Y%m%d%H%M"),
+                hashlib.blake2b(context.encode(), digest_size=8).hexdigest(),
+            )
+        )
+
+    @classmethod
+    def _render(cls, image_data, text, position, payload):
+        image = Image.open(io.BytesIO(image_data))
+        source_format = image.format
+
+        if image.mode not in ("RGB", "RGBA"):
+            transparent = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if transparent else "RGB")
+
+        image = WatermarkService.draw_visible_watermark(image, text, position)
+
+        embedded = False
+        if payload is not None:
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            embedded = WatermarkService.embed_invisible_watermark(image, payload) is not None
+
+        output = io.BytesIO()
+        if not embedded and source_format in LOSSY_FORMATS and image.mode == "RGB":
+            image.save(output, format=source_format, quality=WATERMARK_JPEG_QUALITY)
+            content_type = LOSSY_FORMATS[source_format]
+        else:
+            image.save(output, format="PNG", compress_level=WATERMARK_PNG_COMPRESS_LEVEL)
+            content_type = "image/png"
+        return output.getvalue(), content_type
+
+    @staticmethod
+    def _cache_get(key):
+        cache = shared_cache()
+        if cache is not None:
+            try:
+                cached = cache.get(key)
+                if cached is not None:
+                    content_type, data = cached
+                    return data, content_type
+                return None
+            except Exception as e:
+                logger.error(f"Watermark cache unavailable: {e}")
+        cached = local_cache.get(key)
+        if cached:
+            content_type, data = cached
+            return data, content_type
+        return None
+
+    @staticmethod
+    def _cache_set(key, data, content_type):
+        cache = shared_cache()
+        if cache is not None:
+            if len(data) > WATERMARK_CACHE_MAX_ENTRY_BYTES:
+                return
+            try:
+                cache.set(key, (content_type, data), WATERMARK_CACHE_TTL)
+                return
+            except Exception as e:
+                logger.error(f"Watermark cache unavailable: {e}")
+        local_cache.set(key, content_type, data, WATERMARK_CACHE_TTL)
@@ -5,18 +5,29 @@ Provides visible and invisible watermarking for images to trace data leaks.
 """
 
 import base64
+import functools
 import hashlib
 import io
 import logging
 from datetime import datetime
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=16)
+def _load_font(size: int):
+    """Watermark font, loaded once per size"""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
 class WatermarkService:
     """
     Watermarking service for tracing data leaks.
@@ -46,9 +57,17 @@ class WatermarkService:
     WATERMARK_OPACITY = 40  # 0-255
     WATERMARK_COLOR = (128, 128, 128)  # Gray
 
+    # Font scale by the image's longest side, so the text stays legible on
+    # large scans: (longest side up to, scale); larger images use MAX_FONT_SCALE
+    FONT_SCALE_BUCKETS = ((2048, 1), (4096, 2), (8192, 3))
+    MAX_FONT_SCALE = 4
+
     # For invisible watermarking
     MAGIC_HEADER = b"SYN_WM_V1"
 
+    # Lossless formats that can still carry an invisible watermark
+    SCAN_EXTENSIONS = (".png", ".bmp", ".tif", ".tiff", ".webp")
+
     @classmethod
     def apply_visible_watermark(
         cls,
@@ -78,24 +97,8 @@ class WatermarkService:
             if image.mode != "RGBA":
                 image = image.convert("RGBA")
 
-            # Create watermark text
-            if timestamp is None:
-                timestamp = datetime.now()
-
-            # Mask user ID for privacy (show first 3 and last 2 chars)
-            masked_id = cls._mask_identifier(user_id)
-
-            watermark_text = f"{masked_id} | {timestamp.strftime('%Y-%m-%d %H:%M')}"
-            if session_id:
-                watermark_text += f" | {session_id[:8]}"
-
-            # Apply watermark based on position
-            if position == "tiled":
-                result = cls._apply_tiled_watermark(image, watermark_text)
-            elif position == "corner":
-                result = cls._apply_corner_watermark(image, watermark_text)
-            else:
-                result = cls._apply_center_watermark(image, watermark_text)
+            watermark_text = cls.watermark_text(user_id, session_id, timestamp)
+            result = cls.draw_visible_watermark(image, watermark_text, position)
 
             # Convert back to original format
             output = io.BytesIO()
@@ -124,57 +127,15 @@ class WatermarkService:
         Returns:
             Watermarked image bytes
         """
-        import json
-
         try:
             image = Image.open(io.BytesIO(image_data))
 
             if image.mode != "RGB":
                 image = image.convert("RGB")
 
-            # Prepare payload
-            payload_json = json.dumps(payload, separators=(",", ":"))
-            payload_bytes = cls.MAGIC_HEADER + payload_json.encode("utf-8")
-
-            # Add length prefix and checksum
-            length = len(payload_bytes)
-            checksum = hashlib.md5(payload_bytes).digest()[:4]
-            data_to_embed = length.to_bytes(4, "big") + checksum + payload_bytes
-
-            # Convert to bits
-            bits = "".join(format(byte, "08b") for byte in data_to_embed)
-
-            # Check if image can hold the data
-            pixels = image.load()
-            width, height = image.size
-            max_bits = width * height * 3  # 3 channels
-
-            if len(bits) > max_bits:
-                logger.warning("Image too small for steganographic watermark")
+            if cls.embed_invisible_watermark(image, payload) is None:
                 return image_data
 
-            # Embed bits in LSB
-            bit_index = 0
-            for y in range(height):
-                for x in range(width):
-                    if bit_index >= len(bits):
-                        break
-
-                    r, g, b = pixels[x, y]
-
-                    # Modify LSB of each channel
-                    if bit_index < len(bits):
-                        r = (r & 0xFE) | int(bits[bit_index])
-                        bit_index += 1
-                    if bit_index < len(bits):
-                        g = (g & 0xFE) | int(bits[bit_index])
-                        bit_index += 1
-                    if bit_index < len(bits):
-                        b = (b & 0xFE) | int(bits[bit_index])
-                        bit_index += 1
-
-                    pixels[x, y] = (r, g, b)
-
             # Save as PNG to preserve LSB data
             output = io.BytesIO()
             image.save(output, format="PNG")
@@ -184,6 +145,49 @@ class WatermarkService:
             logger.error(f"Failed to apply invisible watermark: {e}")
             return image_data
 
+    @classmethod
+    def embed_invisible_watermark(
+        cls, image: Image.Image, payload: Dict[str, Any]
+    ) -> Optional[Image.Image]:
+        """
+        Embed payload in the least significant bits of an RGB image, in place.
+
+        The image must be saved losslessly (PNG) to keep the payload.
+
+        Returns:
+            The image, or None if it is too small to hold the payload
+        """
+        import json
+
+        # Prepare payload
+        payload_json = json.dumps(payload, separators=(",", ":"))
+        payload_bytes = cls.MAGIC_HEADER + payload_json.encode("utf-8")
+
+        # Add length prefix and checksum
+        length = len(payload_bytes)
+        checksum = hashlib.md5(payload_bytes).digest()[:4]
+        data_to_embed = length.to_bytes(4, "big") + checksum + payload_bytes
+
+        # One bit per channel value, in row-major (y, x, channel) order
+        bits = np.unpackbits(np.frombuffer(data_to_embed, dtype=np.uint8))
+
+        # Check if image can hold the data
+        width, height = image.size
+        max_bits = width * height * 3  # 3 channels
+
+        if len(bits) > max_bits:
+            logger.warning("Image too small for steganographic watermark")
+            return None
+
+        # Embed bits in LSB of the rows that hold them
+        rows = -(-len(bits) // (width * 3))
+        region = np.array(image.crop((0, 0, width, rows)), dtype=np.uint8)
+        flat = region.reshape(-1)
+        flat[: len(bits)] = (flat[: len(bits)] & 0xFE) | bits
+        image.paste(Image.fromarray(region), (0, 0))
+
+        return image
+
     @classmethod
     def extract_watermark(cls, image_data: bytes) -> Optional[Dict[str, Any]]:
         """
@@ -199,33 +203,10 @@ class WatermarkService:
 
         try:
             image = Image.open(io.BytesIO(image_data))
-
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-
-            pixels = image.load()
             width, height = image.size
 
-            # Extract LSB bits
-            bits = []
-            for y in range(height):
-                for x in range(width):
-                    r, g, b = pixels[x, y]
-                    bits.extend([r & 1, g & 1, b & 1])
-
-                    # Stop once we have enough for header check
-                    if len(bits) >= 512:  # Enough for length + checksum + header
-                        break
-                if len(bits) >= 512:
-                    break
-
-            # Convert bits to bytes
-            extracted_bytes = bytes(
-                int("".join(str(b) for b in bits[i : i + 8]), 2)
-                for i in range(0, len(bits), 8)
-            )
-
             # Parse length and checksum
+            extracted_bytes = cls._read_lsb_bytes(image, 8)
             length = int.from_bytes(extracted_bytes[:4], "big")
             stored_checksum = extracted_bytes[4:8]
 
@@ -234,22 +215,7 @@ class WatermarkService:
                 return None
 
             # Extract full payload
-            bits = []
-            total_bytes_needed = 8 + length
-            for y in range(height):
-                for x in range(width):
-                    r, g, b = pixels[x, y]
-                    bits.extend([r & 1, g & 1, b & 1])
-                    if len(bits) >= total_bytes_needed * 8:
-                        break
-                if len(bits) >= total_bytes_needed * 8:
-                    break
-
-            extracted_bytes = bytes(
-                int("".join(str(b) for b in bits[i : i + 8]), 2)
-                for i in range(0, len(bits), 8)
-            )
-
+            extracted_bytes = cls._read_lsb_bytes(image, 8 + length)
             payload_bytes = extracted_bytes[8 : 8 + length]
 
             # Verify checksum
@@ -269,6 +235,47 @@ class WatermarkService:
             logger.debug(f"Failed to extract watermark: {e}")
             return None
 
+    @staticmethod
+    def _read_lsb_bytes(image: Image.Image, count: int) -> bytes:
+        """First `count` bytes stored in the LSBs of the image's RGB values"""
+        width, height = image.size
+        rows = min(height, -(-count * 8 // (width * 3)))
+        # Only the rows holding the bytes are decoded and converted
+        region = image.crop((0, 0, width, rows))
+        if region.mode != "RGB":
+            region = region.convert("RGB")
+        region = np.asarray(region, dtype=np.uint8)
+        bits = region.reshape(-1)[: count * 8] & 1
+        return np.packbits(bits).tobytes()
+
+    @classmethod
+    def scan_for_watermarks(cls, directory: str, workers: int = None) -> List[Dict[str, Any]]:
+        """
+        Extract invisible watermarks from every image under a directory,
+        in parallel processes (forensic batch mode for leaked data).
+
+        Args:
+            directory: Directory searched recursively
+            workers: Number of processes (defaults to the CPU count)
+
+        Returns:
+            [{"path": str, "payload": dict or None}] sorted by path
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from pathlib import Path
+
+        paths = sorted(
+            str(path)
+            for path in Path(directory).rglob("*")
+            if path.is_file() and path.suffix.lower() in cls.SCAN_EXTENSIONS
+        )
+        if not paths:
+            return []
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            payloads = executor.map(_extract_file, paths, chunksize=8)
+            return [{"path": path, "payload": payload} for path, payload in zip(paths, payloads)]
+
     @classmethod
     def _mask_identifier(cls, identifier: str) -> str:
         """Mask identifier for privacy"""
@@ -277,39 +284,63 @@ class WatermarkService:
         return identifier[:3] + "***" + identifier[-2:]
 
     @classmethod
-    def _apply_tiled_watermark(cls, image: Image.Image, text: str) -> Image.Image:
-        """Apply watermark in a diagonal tiled pattern"""
-        overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(overlay)
+    def watermark_text(
+        cls, user_id: str, session_id: str = None, timestamp: datetime = None
+    ) -> str:
+        """Visible watermark text: masked user, minute and session"""
+        if timestamp is None:
+            timestamp = datetime.now()
+
+        # Mask user ID for privacy (show first 3 and last 2 chars)
+        text = f"{cls._mask_identifier(user_id)} | {timestamp.strftime('%Y-%m-%d %H:%M')}"
+        if session_id:
+            text += f" | {session_id[:8]}"
+        return text
 
-        try:
-            font = ImageFont.truetype("arial.ttf", cls.FONT_SIZE)
-        except:
-            font = ImageFont.load_default()
+    @classmethod
+    def draw_visible_watermark(
+        cls, image: Image.Image, text: str, position: str = "tiled"
+    ) -> Image.Image:
+        """Apply the visible watermark to an RGB or RGBA image, keeping its mode"""
+        if position == "tiled":
+            return cls._apply_tiled_watermark(image, text)
+
+        mode = image.mode
+        rgba = image if mode == "RGBA" else image.convert("RGBA")
+        if position == "corner":
+            result = cls._apply_corner_watermark(rgba, text)
+        else:
+            result = cls._apply_center_watermark(rgba, text)
+        return result if mode == "RGBA" else result.convert(mode)
 
-        # Get text size
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
+    @classmethod
+    def font_scale(cls, size: Tuple[int, int]) -> int:
+        longest = max(size)
+        for limit, scale in cls.FONT_SCALE_BUCKETS:
+            if longest <= limit:
+                return scale
+        return cls.MAX_FONT_SCALE
+
+    @classmethod
+    def _apply_tiled_watermark(cls, image: Image.Image, text: str) -> Image.Image:
+        """
+        Apply watermark in a diagonal tiled pattern.
 
-        # Calculate spacing
-        spacing_x = text_width + 100
-        spacing_y = text_height + 80
+        The pattern is a cached seamless tile (see _overlay_tile) repeated over
+        the image and applied as one paste mask.
+        """
+        width, height = image.size
+        tile = np.asarray(_overlay_tile(text, cls.font_scale(image.size)))
+        reps = (-(-height // tile.shape[0]), -(-width // tile.shape[1]))
+        mask = Image.fromarray(np.ascontiguousarray(np.tile(tile, reps)[:height, :width]))
 
-        # Draw tiled pattern
-        for y in range(-text_height, image.height + text_height, spacing_y):
-            for x in range(-text_width, image.width + text_width, spacing_x):
-                # Offset every other row
-                offset = (spacing_x // 2) if (y // spacing_y) % 2 else 0
-                draw.text(
-                    (x + offset, y),
-                    text,
-                    font=font,
-                    fill=(*cls.WATERMARK_COLOR, cls.WATERMARK_OPACITY),
-                )
+        if image.mode == "RGBA":
+            overlay = Image.new("RGBA", image.size, (*cls.WATERMARK_COLOR, 0))
+            overlay.putalpha(mask)
+            return Image.alpha_composite(image, overlay)
 
-        # Composite
-        return Image.alpha_composite(image, overlay)
+        image.paste(cls.WATERMARK_COLOR, (0, 0, width, height), mask)
+        return image
 
     @classmethod
     def _apply_corner_watermark(cls, image: Image.Image, text: str) -> Image.Image:
@@ -317,10 +348,7 @@ class WatermarkService:
         overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
         draw = ImageDraw.Draw(overlay)
 
-        try:
-            font = ImageFont.truetype("arial.ttf", cls.FONT_SIZE)
-        except:
-            font = ImageFont.load_default()
+        font = _load_font(cls.FONT_SIZE)
 
         bbox = draw.textbbox((0, 0), text, font=font)
         text_width = bbox[2] - bbox[0]
@@ -341,10 +369,7 @@ class WatermarkService:
         overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
         draw = ImageDraw.Draw(overlay)
 
-        try:
-            font = ImageFont.truetype("arial.ttf", cls.FONT_SIZE * 2)
-        except:
-            font = ImageFont.load_default()
+        font = _load_font(cls.FONT_SIZE * 2)
 
         bbox = draw.textbbox((0, 0), text, font=font)
         text_width = bbox[2] - bbox[0]
@@ -390,3 +415,40 @@ class WatermarkService:
             "ts": datetime.utcnow().isoformat(),
             "v": 1,  # Watermark version
         }
+
+
+def _extract_file(path: str) -> Optional[Dict[str, Any]]:
+    """Process pool worker for WatermarkService.scan_for_watermarks"""
+    with open(path, "rb") as f:
+        return WatermarkService.extract_watermark(f.read())
+
+
+@functools.lru_cache(maxsize=getattr(settings, "WATERMARK_TILE_CACHE_SIZE", 256))
+def _overlay_tile(text: str, scale: int) -> Image.Image:
+    """
+    One period of the tiled watermark pattern as an "L" alpha mask.
+
+    Rows of text are spaced like the original full-size overlay, every other
+    row offset by half a column; text crossing the tile edge is drawn wrapped,
+    so repeated tiles join seamlessly.
+    """
+    font = _load_font(WatermarkService.FONT_SIZE * scale)
+    bbox = font.getbbox(text)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+
+    spacing_x = text_width + 100 * scale
+    spacing_y = text_height + 80 * scale
+    tile = Image.new("L", (spacing_x, 2 * spacing_y), 0)
+    draw = ImageDraw.Draw(tile)
+
+    for x, y in ((0, 0), (spacing_x // 2, spacing_y)):
+        for wrap_x in (-spacing_x, 0, spacing_x):
+            for wrap_y in (-tile.height, 0, tile.height):
+                draw.text(
+                    (x + wrap_x, y + wrap_y),
+                    text,
+                    font=font,
+                    fill=WatermarkService.WATERMARK_OPACITY,
+                )
+    return tile
@@ -584,7 +584,7 @@ class ProjectExportFilesAuthCheck(APIView):
     ),
 )
 class ExportListAPI(generics.ListCreateAPIView):
-    queryset = Export.objects.all().order_by("-created_at")
+    queryset = Export.objects.defer("task_id_ranges").order_by("-created_at")
     project_model = Project
     serializer_class = ExportSerializer
     permission_required = all_permissions.projects_change
@@ -663,6 +663,10 @@ class ExportListAPI(generics.ListCreateAPIView):
         #         )
         logger.info(f"Export snapshot credit deduction bypassed for {task_count} tasks.")
 
+        base_export = serializer.validated_data.get("base_export")
+        if base_export is not None and base_export.project_id != project.id:
+            raise ValidationError({"base_export": ["Base export belongs to another project"]})
+
         serializer.save(project=project, created_by=self.request.user)
         instance = serializer.instance
 
@@ -737,7 +741,7 @@ class ExportListAPI(generics.ListCreateAPIView):
     ),
 )
 class ExportDetailAPI(generics.RetrieveDestroyAPIView):
-    queryset = Export.objects.all()
+    queryset = Export.objects.defer("task_id_ranges")
     project_model = Project
     serializer_class = ExportSerializer
     lookup_url_kwarg = "export_pk"
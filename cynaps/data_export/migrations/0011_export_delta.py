@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_export', '0010_alter_convertedformat_export_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='base_export',
+            field=models.ForeignKey(blank=True, help_text='Export this one is a delta of: only tasks changed since it are exported', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='delta_exports', to='data_export.export'),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='deleted_task_ids',
+            field=models.JSONField(default=list, help_text='Tasks of the base export that were deleted or no longer match the filters', verbose_name='deleted task ids'),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='high_water_mark',
+            field=models.DateTimeField(default=None, help_text='Latest update of the project data included in this export', null=True, verbose_name='high-water mark'),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='task_id_ranges',
+            field=models.JSONField(default=list, help_text='Ids of the tasks in this snapshot as [first, last] runs', verbose_name='task id ranges'),
+        ),
+    ]
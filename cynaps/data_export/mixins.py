@@ -1,7 +1,7 @@
 import hashlib
 import io
-import json
 import logging
+import os
 import pathlib
 import shutil
 from datetime import datetime
@@ -10,9 +10,7 @@ from functools import reduce
 import django_rq
 from core.feature_flags import flag_set
 from core.redis import redis_connected
-from core.utils.common import batch
 from core.utils.io import (
-    SerializableGenerator,
     get_all_dirs_from_dir,
     get_all_files_from_dir,
     get_temp_dir,
@@ -21,16 +19,36 @@ from data_manager.models import View
 from django.conf import settings
 from django.core.files import File
 from django.core.files import temp as tempfile
-from django.db import transaction
-from django.db.models import Prefetch
+from django.db.models import Exists, OuterRef, Prefetch
 from django.db.models.query_utils import Q
 from django.utils import dateformat, timezone
 from cynaps_sdk.converter import Converter
+from cynaps_sdk.converter.sharded import ShardedConverter, is_sharded_format
 from tasks.models import Annotation, AnnotationDraft, Task
 
+from .delta import changed_since, get_high_water_mark, id_ranges, subtract_id_ranges, track_id_ranges
+from .streaming import (
+    JSON,
+    ExportWriter,
+    encode_tasks,
+    export_file_suffix,
+    iter_exported_tasks,
+    iter_keyset_batches,
+    map_ordered,
+    parse_export_name,
+)
+
 ONLY = 'only'
 EXCLUDE = 'exclude'
 
+EXPORT_CONVERTER_SHARD_SIZE = getattr(settings, 'EXPORT_CONVERTER_SHARD_SIZE', 1000)
+EXPORT_CONVERTER_WORKERS = getattr(settings, 'EXPORT_CONVERTER_WORKERS', 4)
+EXPORT_CONVERTER_DOWNLOAD_WORKERS = getattr(settings, 'EXPORT_CONVERTER_DOWNLOAD_WORKERS', 8)
+# shard state outlives the temp dir, so a retried conversion resumes where it stopped
+EXPORT_CONVERTER_WORK_DIR = getattr(
+    settings, 'EXPORT_CONVERTER_WORK_DIR', os.path.join(settings.EXPORT_DIR, 'convert')
+)
+
 
 logger = logging.getLogger(__name__)
 
@@ -209,48 +227,55 @@ class ExportMixin:
                 })
         })
         """
+        id_batches = iter_keyset_batches(self._get_export_tasks(task_filter_options), self._get_export_batch_size())
+        for tasks in self._export_batches(id_batches, annotation_filter_options, serialization_options):
+            yield from tasks
+
+    def _get_export_tasks(self, task_filter_options=None):
+        logger.debug('Tasks filtration')
+        tasks = self._get_filtered_tasks(self.project.tasks, task_filter_options=task_filter_options)
+        if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
+            tasks = tasks.filter(Exists(Annotation.objects.filter(task=OuterRef('pk'))))
+        return tasks.distinct()
+
+    def _get_export_batch_size(self):
+        if flag_set('fflag_fix_back_plt_807_batch_size_26062025_short', self.project.organization.created_by):
+            return self.project.get_task_batch_size()
+        return settings.BATCH_SIZE
+
+    def _export_batches(self, id_batches, annotation_filter_options=None, serialization_options=None, file_format=None):
+        """Serialized task batches in id_batches order, JSON-encoded by encode_tasks if file_format is set"""
         from .serializers import ExportDataSerializer
 
         logger.debug('Run get_task_queryset')
 
         start = datetime.now()
-        with transaction.atomic():
-            # TODO: make counters from queryset
-            # counters = Project.objects.with_counts().filter(id=self.project.id)[0].get_counters()
-            self.counters = {'task_number': 0}
-            all_tasks = self.project.tasks
-            logger.debug('Tasks filtration')
-            task_ids = list(
-                self._get_filtered_tasks(all_tasks, task_filter_options=task_filter_options)
-                .distinct()
-                .values_list('id', flat=True)
-            )
-            base_export_serializer_option = self._get_export_serializer_option(serialization_options)
-            i = 0
+        # TODO: make counters from queryset
+        # counters = Project.objects.with_counts().filter(id=self.project.id)[0].get_counters()
+        self.counters = {'task_number': 0}
+        base_export_serializer_option = self._get_export_serializer_option(serialization_options)
+        include_annotation_history = bool(serialization_options) and (
+            serialization_options.get('include_annotation_history') is True
+        )
+
+        def serialize(ids):
+            tasks = list(self.get_task_queryset(ids, annotation_filter_options))
+            export_serializer_option = base_export_serializer_option
+            if include_annotation_history:
+                annotation_ids = Annotation.objects.filter(task_id__in=ids).values_list('id', flat=True)
+                export_serializer_option = self.update_export_serializer_option(
+                    base_export_serializer_option, annotation_ids
+                )
+            data = ExportDataSerializer(tasks, many=True, **export_serializer_option).data
+            if file_format is not None:
+                return encode_tasks(data, file_format), len(data)
+            return data
+
+        for i, result in enumerate(map_ordered(serialize, id_batches), 1):
+            logger.debug(f'Batch: {i}')
+            self.counters['task_number'] += result[1] if file_format is not None else len(result)
+            yield result
 
-            if flag_set('fflag_fix_back_plt_807_batch_size_26062025_short', self.project.organization.created_by):
-                BATCH_SIZE = self.project.get_task_batch_size()
-            else:
-                BATCH_SIZE = settings.BATCH_SIZE
-
-            for ids in batch(task_ids, BATCH_SIZE):
-                i += 1
-                tasks = list(self.get_task_queryset(ids, annotation_filter_options))
-                logger.debug(f'Batch: {i*BATCH_SIZE}')
-                if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
-                    tasks = [task for task in tasks if task.annotations.exists()]
-
-                if serialization_options and serialization_options.get('include_annotation_history') is True:
-                    task_ids = [task.id for task in tasks]
-                    annotation_ids = Annotation.objects.filter(task_id__in=task_ids).values_list('id', flat=True)
-                    base_export_serializer_option = self.update_export_serializer_option(
-                        base_export_serializer_option, annotation_ids
-                    )
-
-                serializer = ExportDataSerializer(tasks, many=True, **base_export_serializer_option)
-                self.counters['task_number'] += len(tasks)
-                for task in serializer.data:
-                    yield task
         duration = datetime.now() - start
         logger.info(
             f'{self.counters["task_number"]} tasks from project {self.project_id} exported in {duration.total_seconds():.2f} seconds'
@@ -270,14 +295,16 @@ class ExportMixin:
         md5 = md5_object.hexdigest()
         return md5
 
-    def save_file(self, file, md5):
+    def save_file(self, file, md5, suffix='.json'):
         now = datetime.now()
-        file_name = f'project-{self.project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}-{md5[0:8]}.json'
+        file_name = f'project-{self.project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}-{md5[0:8]}{suffix}'
         file_path = f'{self.project.id}/{file_name}'  # finally file will be in settings.DELAYED_EXPORT_DIR/self.project.id/file_name
         file_ = File(file, name=file_path)
         self.file.save(file_path, file_)
         self.md5 = md5
-        self.save(update_fields=['file', 'md5', 'counters'])
+        self.save(
+            update_fields=['file', 'md5', 'counters', 'high_water_mark', 'task_id_ranges', 'deleted_task_ids']
+        )
 
     def export_to_file(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
         logger.debug(
@@ -287,23 +314,39 @@ class ExportMixin:
             f'serialization_options: {serialization_options}\n'
         )
         try:
-            iter_json = json.JSONEncoder(ensure_ascii=False).iterencode(
-                SerializableGenerator(
-                    self.get_export_data(
-                        task_filter_options=task_filter_options,
-                        annotation_filter_options=annotation_filter_options,
-                        serialization_options=serialization_options,
-                    )
-                )
-            )
-            with tempfile.NamedTemporaryFile(suffix='.export.json', dir=settings.FILE_UPLOAD_TEMP_DIR) as file:
-                for chunk in iter_json:
-                    encoded_chunk = chunk.encode('utf-8')
-                    file.write(encoded_chunk)
+            serialization_options = serialization_options or {}
+            file_format = serialization_options.get('file_format') or JSON
+            compression = serialization_options.get('compression')
+            suffix = export_file_suffix(file_format, compression)
+            batch_size = self._get_export_batch_size()
+            tasks = self._get_export_tasks(task_filter_options)
+            self.high_water_mark = get_high_water_mark(self.project)
+            base_export = self.base_export
+            if base_export is not None:
+                # the current task ids give the tombstones, then only the changed tasks are exported
+                self.task_id_ranges = id_ranges(iter_keyset_batches(tasks, batch_size))
+                self.deleted_task_ids = subtract_id_ranges(base_export.task_id_ranges, self.task_id_ranges)
+                tasks = tasks.filter(changed_since(self.project, base_export.high_water_mark))
+                id_batches = iter_keyset_batches(tasks, batch_size)
+            else:
+                self.task_id_ranges = []
+                id_batches = track_id_ranges(iter_keyset_batches(tasks, batch_size), self.task_id_ranges)
+
+            with tempfile.NamedTemporaryFile(suffix='.export' + suffix, dir=settings.FILE_UPLOAD_TEMP_DIR) as file:
+                writer = ExportWriter(file, file_format, compression)
+                for chunk, count in self._export_batches(
+                    id_batches,
+                    annotation_filter_options=annotation_filter_options,
+                    serialization_options=serialization_options,
+                    file_format=file_format,
+                ):
+                    writer.write_batch(chunk, count)
+                if base_export is not None:
+                    self.counters['deleted_task_number'] = len(self.deleted_task_ids)
+                md5 = writer.close()
                 file.seek(0)
 
-                md5 = self.eval_md5(file)
-                self.save_file(file, md5)
+                self.save_file(file, md5, suffix)
 
             self.status = self.Status.COMPLETED
             self.save(update_fields=['status'])
@@ -348,7 +391,7 @@ class ExportMixin:
             out_dir = pathlib.Path(tmp_dir) / OUT
             out_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
 
-            converter = Converter(
+            converter_kwargs = dict(
                 config=self.project.get_parsed_config(),
                 project_dir=None,
                 upload_dir=out_dir,
@@ -357,13 +400,33 @@ class ExportMixin:
                 access_token=self.project.organization.created_by.auth_token.key,
                 hostname=hostname,
             )
-            input_name = pathlib.Path(self.file.name).name
+            input_name, file_format, compression = parse_export_name(pathlib.Path(self.file.name).name)
+            input_name += '.json'
             input_file_path = pathlib.Path(tmp_dir) / input_name
 
-            with open(input_file_path, 'wb') as file_:
-                file_.write(self.file.open().read())
-
-            converter.convert(input_file_path, out_dir, to_format, is_dir=False)
+            # the converter reads plain JSON, so other export formats are rewritten to it
+            with open(input_file_path, 'wb') as file_, self.file.open('rb') as source:
+                if file_format == JSON and compression is None:
+                    shutil.copyfileobj(source, file_)
+                else:
+                    writer = ExportWriter(file_)
+                    for task in iter_exported_tasks(source, self.file.name):
+                        writer.write_batch(encode_tasks([task]), 1)
+                    writer.close()
+
+            if is_sharded_format(to_format):
+                # keyed by export, not ConvertedFormat: a retry creates a new ConvertedFormat
+                work_dir = os.path.join(EXPORT_CONVERTER_WORK_DIR, f'{self.id}-{to_format}')
+                ShardedConverter(
+                    converter_kwargs,
+                    work_dir,
+                    shard_size=EXPORT_CONVERTER_SHARD_SIZE,
+                    workers=EXPORT_CONVERTER_WORKERS,
+                    download_workers=EXPORT_CONVERTER_DOWNLOAD_WORKERS,
+                ).run(input_file_path, out_dir, to_format)
+                shutil.rmtree(work_dir, ignore_errors=True)
+            else:
+                Converter(**converter_kwargs).convert(input_file_path, out_dir, to_format, is_dir=False)
 
             files = get_all_files_from_dir(out_dir)
             dirs = get_all_dirs_from_dir(out_dir)
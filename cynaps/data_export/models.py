@@ -82,6 +82,30 @@ class Export(ExportMixin, models.Model):
         null=True,
         verbose_name=_('created by'),
     )
+    base_export = models.ForeignKey(
+        'self',
+        related_name='delta_exports',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        help_text='Export this one is a delta of: only tasks changed since it are exported',
+    )
+    high_water_mark = models.DateTimeField(
+        _('high-water mark'),
+        null=True,
+        default=None,
+        help_text='Latest update of the project data included in this export',
+    )
+    task_id_ranges = models.JSONField(
+        _('task id ranges'),
+        default=list,
+        help_text='Ids of the tasks in this snapshot as [first, last] runs',
+    )
+    deleted_task_ids = models.JSONField(
+        _('deleted task ids'),
+        default=list,
+        help_text='Tasks of the base export that were deleted or no longer match the filters',
+    )
 
 
 @receiver(post_save, sender=Export)
@@ -16,6 +16,7 @@ from users.models import User
 from users.serializers import UserSimpleSerializer
 
 from .models import ConvertedFormat, Export
+from .streaming import COMPRESSIONS, FILE_FORMATS, JSON, ZSTD, zstd_available
 
 
 class CompletedBySerializer(serializers.ModelSerializer):
@@ -139,8 +140,10 @@ class ExportSerializer(serializers.ModelSerializer):
             'md5',
             'counters',
             'converted_formats',
+            'high_water_mark',
+            'deleted_task_ids',
         ]
-        fields = ['title'] + read_only
+        fields = ['title', 'base_export'] + read_only
 
     created_by = UserSimpleSerializer(required=False)
     converted_formats = ConvertedFormatSerializer(many=True, required=False)
@@ -206,6 +209,24 @@ class SerializationOptionsSerializer(serializers.Serializer):
     interpolate_key_frames = serializers.BooleanField(
         default=settings.INTERPOLATE_KEY_FRAMES, help_text='Interpolate video key frames', required=False
     )
+    file_format = serializers.ChoiceField(
+        choices=FILE_FORMATS,
+        default=JSON,
+        required=False,
+        help_text='Export file format: a JSON array or JSON Lines (one task per line)',
+    )
+    compression = serializers.ChoiceField(
+        choices=COMPRESSIONS,
+        default=None,
+        allow_null=True,
+        required=False,
+        help_text='Compress the export file with gzip or zstd',
+    )
+
+    def validate_compression(self, value):
+        if value == ZSTD and not zstd_available():
+            raise serializers.ValidationError('zstd compression requires the zstandard package')
+        return value
 
 
 class ExportConvertSerializer(serializers.Serializer):
@@ -232,6 +253,11 @@ class ExportCreateSerializer(ExportSerializer):
     annotation_filter_options = AnnotationFilterOptionsSerializer(required=False, default=None)
     serialization_options = SerializationOptionsSerializer(required=False, default=None)
 
+    def validate_base_export(self, value):
+        if value is not None and (value.status != Export.Status.COMPLETED or value.high_water_mark is None):
+            raise serializers.ValidationError('Delta exports need a completed base export with a high-water mark')
+        return value
+
 
 class ExportParamSerializer(serializers.Serializer):
     interpolate_key_frames = serializers.BooleanField(
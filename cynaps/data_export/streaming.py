@@ -0,0 +1,195 @@
+"""
+Streaming export: keyset-paged batches, parallel serialization, one-pass writer.
+
+ExportMixin.get_export_data used to load every matching task id into a list
+before the first batch, serialized the batches on one thread, ran
+task.annotations.exists() per task for only_with_annotations, and
+export_to_file wrote the JSON to a temp file only to read it all back for
+the MD5.
+
+Now:
+- Task ids are paged with keyset pagination (id > last ORDER BY id LIMIT n),
+  so one page of ids is held at a time (iter_keyset_batches).
+- only_with_annotations is an EXISTS subquery in the task query.
+- Batches are fetched, serialized and JSON-encoded on DATA_EXPORT_WORKERS
+  threads and written in task id order, with at most two batches per worker
+  in flight (map_ordered). Inside a transaction the batches run inline,
+  since other threads can't see its uncommitted rows.
+- ExportWriter hashes the bytes as it writes them and can write JSON Lines
+  and gzip or zstd (needs the zstandard package) files. The default output
+  (a JSON array, uncompressed) is byte-identical to the previous one.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from core.current_request import CurrentContext
+from django.conf import settings
+from django.db import connection
+
+DATA_EXPORT_WORKERS = getattr(settings, 'DATA_EXPORT_WORKERS', 4)
+
+JSON = 'json'
+JSONL = 'jsonl'
+FILE_FORMATS = (JSON, JSONL)
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+COMPRESSIONS = (GZIP, ZSTD)
+COMPRESSION_EXTENSIONS = {GZIP: '.gz', ZSTD: '.zst'}
+
+_encoder = json.JSONEncoder(ensure_ascii=False)
+
+
+def zstd_available():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_keyset_batches(queryset, batch_size):
+    """Ids of a task queryset in pages of batch_size, ordered by id"""
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        ids = list(page.order_by('id').values_list('id', flat=True)[:batch_size])
+        if ids:
+            yield ids
+        if len(ids) < batch_size:
+            return
+        last_id = ids[-1]
+
+
+def map_ordered(func, items, workers=None):
+    """func(item) for items on a thread pool, results in input order"""
+    workers = DATA_EXPORT_WORKERS if workers is None else workers
+    if workers <= 1 or connection.in_atomic_block:
+        for item in items:
+            yield func(item)
+        return
+
+    context = dict(CurrentContext.get_job_data())
+
+    def run(item):
+        for key, value in context.items():
+            CurrentContext.set(key, value)
+        try:
+            return func(item)
+        finally:
+            CurrentContext.clear()
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export') as executor:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(run, item))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def encode_tasks(tasks, file_format=JSON):
+    """Encoded batch of serialized tasks, ready for ExportWriter.write_batch"""
+    if file_format == JSONL:
+        return ''.join(_encoder.encode(task) + '\n' for task in tasks).encode('utf-8')
+    return ', '.join(_encoder.encode(task) for task in tasks).encode('utf-8')
+
+
+def export_file_suffix(file_format=JSON, compression=None):
+    return f'.{file_format}' + COMPRESSION_EXTENSIONS.get(compression, '')
+
+
+def parse_export_name(name):
+    """(name without extensions, file format, compression) of an export file name"""
+    compression = None
+    for candidate, extension in COMPRESSION_EXTENSIONS.items():
+        if name.endswith(extension):
+            name, compression = name[: -len(extension)], candidate
+            break
+    for file_format in FILE_FORMATS:
+        if name.endswith(f'.{file_format}'):
+            return name[: -len(file_format) - 1], file_format, compression
+    return name, JSON, compression
+
+
+class _HashingFile(io.RawIOBase):
+    def __init__(self, file):
+        self.file = file
+        self.md5 = hashlib.md5()   # nosec
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.md5.update(data)
+        self.file.write(data)
+        return len(data)
+
+
+class ExportWriter:
+    """Writes encoded task batches as one JSON array or JSON Lines, optionally compressed.
+
+    The MD5 is computed from the bytes written to the file, so it matches a
+    checksum of the finished file.
+    """
+
+    def __init__(self, file, file_format=JSON, compression=None):
+        self.file_format = file_format
+        self.hashing = _HashingFile(file)
+        if compression == GZIP:
+            self.stream = gzip.GzipFile(fileobj=self.hashing, mode='wb', mtime=0)
+        elif compression == ZSTD:
+            import zstandard
+
+            self.stream = zstandard.ZstdCompressor().stream_writer(self.hashing, closefd=False)
+        else:
+            self.stream = self.hashing
+        self.count = 0
+        if file_format == JSON:
+            self.stream.write(b'[')
+
+    def write_batch(self, chunk, count):
+        """Write a batch encoded by encode_tasks with count tasks"""
+        if not count:
+            return
+        if self.file_format == JSON and self.count:
+            self.stream.write(b', ')
+        self.stream.write(chunk)
+        self.count += count
+
+    def close(self):
+        """Finish the file and return its MD5"""
+        if self.file_format == JSON:
+            self.stream.write(b']')
+        if self.stream is not self.hashing:
+            self.stream.close()
+        return self.hashing.md5.hexdigest()
+
+
+def iter_exported_tasks(file, name):
+    """Tasks of an export file written by ExportWriter, format detected by file name"""
+    _, file_format, compression = parse_export_name(name)
+    if compression == GZIP:
+        file = gzip.GzipFile(fileobj=file, mode='rb')
+    elif compression == ZSTD:
+        import zstandard
+
+        file = zstandard.ZstdDecompressor().stream_reader(file)
+
+    if file_format == JSONL:
+        for line in io.TextIOWrapper(file, encoding='utf-8'):
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from json.load(file)
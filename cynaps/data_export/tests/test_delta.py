@@ -0,0 +1,95 @@
+import io
+
+import pytest
+from data_export.delta import id_ranges, subtract_id_ranges
+from data_export.models import Export
+from data_export.streaming import iter_exported_tasks
+from projects.tests.factories import ProjectFactory
+from rest_framework.test import APIClient
+from tasks.tests.factories import AnnotationFactory, PredictionFactory, TaskFactory
+
+
+@pytest.fixture(autouse=True)
+def no_overlap(monkeypatch):
+    monkeypatch.setattr('data_export.delta.DELTA_EXPORT_OVERLAP', 0)
+
+
+def export(project, base_export=None, **task_filter_options):
+    snapshot = Export.objects.create(project=project, base_export=base_export)
+    snapshot.export_to_file(task_filter_options=task_filter_options or None)
+    snapshot.refresh_from_db()
+    assert snapshot.status == Export.Status.COMPLETED
+    return snapshot
+
+
+def exported_ids(snapshot):
+    content = io.BytesIO(snapshot.file.open('rb').read())
+    return [task['id'] for task in iter_exported_tasks(content, snapshot.file.name)]
+
+
+def test_id_ranges():
+    assert id_ranges([[1, 2, 3], [5, 7, 8], [9]]) == [[1, 3], [5, 5], [7, 9]]
+    assert id_ranges([]) == []
+    assert subtract_id_ranges([[1, 10], [20, 22]], [[2, 3], [5, 5], [9, 21]]) == [1, 4, 6, 7, 8, 22]
+    assert subtract_id_ranges([[1, 3]], []) == [1, 2, 3]
+    assert subtract_id_ranges([[1, 3]], [[0, 5]]) == []
+
+
+@pytest.mark.django_db
+def test_delta_export():
+    project = ProjectFactory()
+    tasks = [TaskFactory(project=project) for _ in range(6)]
+    annotation = AnnotationFactory(task=tasks[1], result=[])
+    deleted_annotation = AnnotationFactory(task=tasks[4], result=[])
+
+    base = export(project)
+    assert exported_ids(base) == [task.id for task in tasks]
+    assert base.high_water_mark is not None
+    assert base.task_id_ranges == id_ranges([[task.id for task in tasks]])
+
+    annotation.result = [{'changed': True}]
+    annotation.save()
+    PredictionFactory(task=tasks[3], project=project, result=[])
+    deleted_task_id = tasks[2].id
+    tasks[2].delete()
+    deleted_annotation.delete()
+    new_task = TaskFactory(project=project)
+
+    delta = export(project, base_export=base)
+    assert exported_ids(delta) == [tasks[1].id, tasks[3].id, tasks[4].id, new_task.id]
+    assert delta.deleted_task_ids == [deleted_task_id]
+    assert delta.counters == {'task_number': 4, 'deleted_task_number': 1}
+
+    # deltas chain: nothing changed since the previous one
+    assert exported_ids(export(project, base_export=delta)) == []
+
+    # tasks that stop matching the filters are tombstoned too
+    filtered = export(project, base_export=delta, only_with_annotations=True)
+    assert exported_ids(filtered) == []
+    assert filtered.deleted_task_ids == [tasks[0].id, tasks[3].id, tasks[4].id, tasks[5].id, new_task.id]
+
+
+@pytest.mark.django_db
+def test_create_delta_export_api():
+    project = ProjectFactory()
+    TaskFactory(project=project)
+    client = APIClient()
+    client.force_authenticate(project.created_by)
+    url = f'/api/projects/{project.id}/exports'
+
+    response = client.post(url, {}, format='json')
+    assert response.status_code == 201, response.content
+    base_id = response.json()['id']
+    assert Export.objects.get(id=base_id).status == Export.Status.COMPLETED
+
+    response = client.post(url, {'base_export': base_id}, format='json')
+    assert response.status_code == 201, response.content
+    delta = Export.objects.get(id=response.json()['id'])
+    assert delta.base_export_id == base_id
+    assert client.get(f'{url}/{delta.id}').json()['base_export'] == base_id
+
+    in_progress = Export.objects.create(project=project, status=Export.Status.IN_PROGRESS)
+    assert client.post(url, {'base_export': in_progress.id}, format='json').status_code == 400
+    other = Export.objects.create(project=ProjectFactory(), status=Export.Status.COMPLETED)
+    Export.objects.filter(id=other.id).update(high_water_mark=delta.high_water_mark)
+    assert client.post(url, {'base_export': other.id}, format='json').status_code == 400
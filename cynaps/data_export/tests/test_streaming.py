@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import io
+import json
+import zipfile
+
+import pytest
+from data_export.models import Export
+from data_export.streaming import (
+    GZIP,
+    JSON,
+    JSONL,
+    ExportWriter,
+    encode_tasks,
+    iter_exported_tasks,
+    iter_keyset_batches,
+    map_ordered,
+    parse_export_name,
+)
+from projects.tests.factories import ProjectFactory
+from tasks.models import Task
+from tasks.tests.factories import AnnotationFactory, TaskFactory
+
+TASKS = [{'id': i, 'data': {'text': f'тест {i}'}, 'annotations': []} for i in range(7)]
+
+
+def write(tasks, file_format=JSON, compression=None, batch_size=3):
+    file = io.BytesIO()
+    writer = ExportWriter(file, file_format, compression)
+    for start in range(0, len(tasks), batch_size):
+        chunk = tasks[start : start + batch_size]
+        writer.write_batch(encode_tasks(chunk, file_format), len(chunk))
+    md5 = writer.close()
+    return file.getvalue(), md5
+
+
+def test_json_output_is_unchanged():
+    for tasks in (TASKS, []):
+        content, md5 = write(tasks)
+        legacy = ''.join(json.JSONEncoder(ensure_ascii=False).iterencode(tasks)).encode('utf-8')
+        assert content == legacy
+        assert md5 == hashlib.md5(legacy).hexdigest()
+
+
+@pytest.mark.parametrize(
+    'name, file_format, compression',
+    [
+        ('export.json', JSON, None),
+        ('export.jsonl', JSONL, None),
+        ('export.json.gz', JSON, GZIP),
+        ('export.jsonl.gz', JSONL, GZIP),
+    ],
+)
+def test_round_trip(name, file_format, compression):
+    content, md5 = write(TASKS, file_format, compression)
+    assert md5 == hashlib.md5(content).hexdigest()
+    assert parse_export_name(name) == ('export', file_format, compression)
+    assert list(iter_exported_tasks(io.BytesIO(content), name)) == TASKS
+
+
+def test_gzip_output_is_reproducible():
+    content, _ = write(TASKS, JSONL, GZIP)
+    assert content == write(TASKS, JSONL, GZIP, batch_size=5)[0]
+    assert gzip.decompress(content).decode().splitlines()[1] == json.dumps(TASKS[1], ensure_ascii=False)
+
+
+def test_map_ordered_keeps_order():
+    assert list(map_ordered(lambda x: x * 2, range(50), workers=4)) == [x * 2 for x in range(50)]
+    assert list(map_ordered(lambda x: x * 2, range(5), workers=1)) == [0, 2, 4, 6, 8]
+
+
+@pytest.mark.django_db
+def test_keyset_batches():
+    project = ProjectFactory()
+    ids = [TaskFactory(project=project).id for _ in range(5)]
+    batches = list(iter_keyset_batches(Task.objects.filter(project=project), 2))
+    assert batches == [ids[0:2], ids[2:4], ids[4:5]]
+    assert list(iter_keyset_batches(Task.objects.filter(project=project), 5)) == [ids]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('file_format, compression', [(JSON, None), (JSONL, GZIP)])
+def test_export_to_file(file_format, compression, settings):
+    settings.BATCH_SIZE = 2
+    project = ProjectFactory()
+    tasks = [TaskFactory(project=project) for _ in range(5)]
+    for task in tasks[1:4]:
+        AnnotationFactory(task=task, result=[])
+        AnnotationFactory(task=task, result=[], was_cancelled=True)
+
+    export = Export.objects.create(project=project)
+    export.export_to_file(
+        task_filter_options={'only_with_annotations': True},
+        serialization_options={'file_format': file_format, 'compression': compression},
+    )
+    export.refresh_from_db()
+
+    assert export.status == Export.Status.COMPLETED
+    assert export.counters == {'task_number': 3}
+    assert export.file.name.endswith('.json' if file_format == JSON else '.jsonl.gz')
+    content = export.file.open('rb').read()
+    assert export.md5 == hashlib.md5(content).hexdigest()
+    exported = list(iter_exported_tasks(io.BytesIO(content), export.file.name))
+    assert [task['id'] for task in exported] == [task.id for task in tasks[1:4]]
+    assert [len(task['annotations']) for task in exported] == [2, 2, 2]
+
+
+@pytest.mark.django_db
+def test_convert_compressed_export():
+    project = ProjectFactory(label_config='<View><Text name="text" value="$text"/></View>')
+    TaskFactory(project=project, data={'text': 'first'})
+    TaskFactory(project=project, data={'text': 'second'})
+    export = Export.objects.create(project=project)
+    export.export_to_file(serialization_options={'file_format': JSONL, 'compression': GZIP})
+    export.refresh_from_db()
+
+    converted = export.convert_file('CSV')
+    assert converted.name.endswith('.csv')
+    assert converted.read().decode().count('\n') == 3
+
+
+@pytest.mark.django_db
+def test_convert_export_in_shards(monkeypatch, tmp_path):
+    monkeypatch.setattr('data_export.mixins.EXPORT_CONVERTER_WORK_DIR', str(tmp_path))
+    monkeypatch.setattr('data_export.mixins.EXPORT_CONVERTER_SHARD_SIZE', 2)
+    monkeypatch.setattr('data_export.mixins.EXPORT_CONVERTER_WORKERS', 1)
+    project = ProjectFactory(
+        label_config="""
+        <View>
+          <Image name="image" value="$image"/>
+          <RectangleLabels name="label" toName="image"><Label value="cat"/></RectangleLabels>
+        </View>
+        """
+    )
+    region = {
+        'from_name': 'label',
+        'to_name': 'image',
+        'type': 'rectanglelabels',
+        'original_width': 100,
+        'original_height': 50,
+        'value': {'x': 10, 'y': 20, 'width': 30, 'height': 40, 'rectanglelabels': ['cat']},
+    }
+    for i in range(5):
+        task = TaskFactory(project=project, data={'image': f'/data/upload/{i}.png'})
+        AnnotationFactory(task=task, result=[region])
+    export = Export.objects.create(project=project)
+    export.export_to_file()
+    export.refresh_from_db()
+
+    converted = export.convert_file('COCO')
+    with zipfile.ZipFile(converted) as archive:
+        coco = json.loads(archive.read('result.json'))
+    assert [image['id'] for image in coco['images']] == list(range(5))
+    assert [annotation['id'] for annotation in coco['annotations']] == list(range(5))
+    # the shard state is dropped once the conversion succeeded
+    assert list(tmp_path.iterdir()) == []
@@ -13,6 +13,7 @@ from core.feature_flags import flag_set
 from core.permissions import ViewClassPermission, all_permissions
 from core.redis import start_job_async_or_sync
 from core.utils.common import retry_database_locked, timeit
+from core.utils.media import media_response
 from core.utils.params import bool_from_request, list_of_strings_from_request
 from csp.decorators import csp
 from django.conf import settings
@@ -23,7 +24,6 @@ from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 from cynaps_sdk.cynaps_interface import LabelInterface
 from projects.models import Project, ProjectImport, ProjectReimport
-from ranged_fileresponse import RangedFileResponse
 from rest_framework import generics, status
 from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
@@ -1277,31 +1277,25 @@ class UploadedFileResponse(generics.RetrieveAPIView):
             return False
         return any(ct in content_type.lower() for ct in self.WATERMARK_CONTENT_TYPES)
 
-    def _apply_watermarks(self, image_data: bytes, request) -> bytes:
+    def _apply_watermarks(self, image_data: bytes, request, content_type: str):
         """
         Apply both visible and invisible watermarks to image.
 
         Visible: Shows user email + timestamp (tiled pattern)
         Invisible: Embeds forensic data for leak tracing
+
+        Returns:
+            (image bytes, content type); the original image if watermarking fails
         """
         try:
-            from core.watermark_service import WatermarkService
+            from core.watermark_engine import WatermarkEngine
 
             user = request.user
             user_id = getattr(user, "email", str(user.id))
             session_id = request.session.session_key or "no-session"
             timestamp = datetime.now()
 
-            # Apply visible watermark
-            watermarked = WatermarkService.apply_visible_watermark(
-                image_data,
-                user_id=user_id,
-                session_id=session_id,
-                timestamp=timestamp,
-                position="tiled",  # tiled, corner, or center
-            )
-
-            # Apply invisible (forensic) watermark for tracing
+            # Forensic data for tracing, embedded invisibly
             forensic_payload = {
                 "u": user_id,  # User ID/email
                 "s": session_id[:16] if session_id else "",  # Session (truncated)
@@ -1309,8 +1303,13 @@ class UploadedFileResponse(generics.RetrieveAPIView):
                 "ip": request.META.get("REMOTE_ADDR", ""),  # IP address
             }
 
-            watermarked = WatermarkService.apply_invisible_watermark(
-                watermarked, payload=forensic_payload
+            watermarked = WatermarkEngine.render(
+                image_data,
+                user_id=user_id,
+                session_id=session_id,
+                timestamp=timestamp,
+                position="tiled",  # tiled, corner, or center
+                payload=forensic_payload,
             )
 
             logger.debug(f"Applied watermarks for user {user_id} on image request")
@@ -1319,7 +1318,7 @@ class UploadedFileResponse(generics.RetrieveAPIView):
         except Exception as e:
             logger.error(f"Failed to apply watermarks: {e}")
             # Return original if watermarking fails
-            return image_data
+            return image_data, content_type
 
     @override_report_only_csp
     @csp(SANDBOX=[])
@@ -1353,13 +1352,12 @@ class UploadedFileResponse(generics.RetrieveAPIView):
                     image_data = f.read()
 
                 # Apply watermarks
-                watermarked_data = self._apply_watermarks(image_data, request)
+                watermarked_data, content_type = self._apply_watermarks(
+                    image_data, request, content_type
+                )
 
                 # Return watermarked image
-                response = HttpResponse(
-                    watermarked_data,
-                    content_type="image/png",  # Watermarked images are always PNG
-                )
+                response = HttpResponse(watermarked_data, content_type=content_type)
                 response["Content-Length"] = len(watermarked_data)
                 response["Cache-Control"] = (
                     "no-store, no-cache, must-revalidate, private"
@@ -1368,9 +1366,7 @@ class UploadedFileResponse(generics.RetrieveAPIView):
                 return response
             else:
                 # Non-image files: serve normally
-                return RangedFileResponse(
-                    request, file.open(mode="rb"), content_type=content_type
-                )
+                return media_response(request, file.open(mode="rb"), content_type=content_type)
 
         return Response(status=status.HTTP_404_NOT_FOUND)
 
@@ -1395,7 +1391,7 @@ class DownloadStorageData(APIView):
     - **Benefits**: Reduces Django server load, better performance for large files
 
     ### 2. Direct Mode (USE_NGINX_FOR_UPLOADS=False)
-    - **Direct Serving**: Django serves files using RangedFileResponse
+    - **Direct Serving**: Django serves files using media_response (core.utils.media)
     - **How it works**:
       1. Validates user permissions and file access
       2. Opens file from storage and streams it with range request support
@@ -1454,9 +1450,7 @@ class DownloadStorageData(APIView):
         else:
             content_type, _ = mimetypes.guess_type(filepath)
             content_type = content_type or "application/octet-stream"
-            response = RangedFileResponse(
-                request, file_obj.open(mode="rb"), content_type=content_type
-            )
+            response = media_response(request, file_obj.open(mode="rb"), content_type=content_type)
             response["Content-Disposition"] = f'inline; filename="{filepath}"'
             response["filename"] = filepath
             response["Cross-Origin-Resource-Policy"] = "cross-origin"
@@ -1471,15 +1465,11 @@ class DicomImportAPI(APIView):
 
     def get(self, request):
         from urllib.parse import parse_qs, urlparse, unquote
-        import hashlib
         import zipfile
-        import os
-        import glob
-        import shutil
-        import tempfile
         from django.core.files.storage import default_storage
         from django.conf import settings
-        
+        from data_import.extraction_cache import dicom_cache, source_hash
+
         url = request.GET.get("url")
         if not url:
             return Response({"error": "url parameter is required"}, status=400)
@@ -1509,102 +1499,40 @@ class DicomImportAPI(APIView):
              if not default_storage.exists(file_path):
                 return Response({"error": f"File not found: {file_path}"}, status=404)
 
-        # Create cache directory
-        file_hash = hashlib.md5(file_path.encode('utf-8')).hexdigest()
-        cache_dir = os.path.join(settings.MEDIA_ROOT, "dicom_cache", file_hash)
-        
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir, exist_ok=True)
-            
-            try:
-                # Download/Open file and extract
-                # We use a temp file to ensure zipfile can handle it (S3 streams might not be seekable)
-                # On Windows, we must close the file before opening with ZipFile, so delete=False
-                tmp_path = None
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                        tmp_path = tmp.name
-                        with default_storage.open(file_path, 'rb') as f:
-                            shutil.copyfileobj(f, tmp)
-                    
-                    # File is closed now, safe to open with ZipFile
-                    with zipfile.ZipFile(tmp_path, 'r') as zip_ref:
-                        zip_ref.extractall(cache_dir)
-                finally:
-                    if tmp_path and os.path.exists(tmp_path):
-                        os.unlink(tmp_path)
-                        
-            except zipfile.BadZipFile:
-                # Clean up empty dir
-                shutil.rmtree(cache_dir, ignore_errors=True)
-                return Response({"error": "Invalid ZIP file"}, status=400)
-            except Exception as e:
-                shutil.rmtree(cache_dir, ignore_errors=True)
-                return Response({"error": f"Error processing file: {str(e)}"}, status=500)
-
-        # List all extracted files
-        image_urls = []
-        # Recursively find files
-        for root, dirs, files in os.walk(cache_dir):
-            for file in files:
-                if file.lower().endswith('.dcm') or file.lower().endswith('.ima') or '.' not in file:
-                     # Construct Relative Path from cache_dir
-                     # root is absolute, cache_dir is absolute
-                     rel_dir = os.path.relpath(root, cache_dir)
-                     if rel_dir == '.':
-                         rel_path = file
-                     else:
-                         rel_path = os.path.join(rel_dir, file)
-                     
-                     # Ensure forward slashes for URL
-                     rel_path = rel_path.replace(os.sep, '/')
-                     
-                     # Use the Serving API
-                     serve_url = f"/api/import/dicom-serve/{file_hash}/{rel_path}"
-                     image_urls.append(serve_url)
-    
-        # Sort URLs
+        # Extract (once, across workers) into the bounded DICOM cache
+        file_hash = source_hash(file_path)
         try:
-            image_urls.sort(key=lambda x: int(''.join(filter(str.isdigit, x)) or 0))
-        except:
-            image_urls.sort()
+            members = dicom_cache.members(file_hash, file_path)
+        except zipfile.BadZipFile:
+            return Response({"error": "Invalid ZIP file"}, status=400)
+        except Exception as e:
+            return Response({"error": f"Error processing file: {str(e)}"}, status=500)
 
+        # The manifest keeps the members in slice order
+        image_urls = [f"/api/import/dicom-serve/{file_hash}/{member}" for member in members]
         return Response({"imageIds": image_urls})
 
 
 class DicomServeAPI(APIView):
     """
-    Serves extracted DICOM files from the local cache.
+    Serves DICOM files from the local extraction cache.
     """
     permission_classes = (IsAuthenticated,)
     
     @override_report_only_csp
     @csp(SANDBOX=[], IMG_SRC=["'self'", "data:", "blob:"])
     def get(self, request, file_hash, filename):
-        import os
-        from django.conf import settings
-        from django.http import HttpResponse, FileResponse, Http404
-        
-        # Security check: Ensure we are only reading from the dedicated cache directory
-        cache_root = os.path.join(settings.MEDIA_ROOT, "dicom_cache", file_hash)
-        file_path = os.path.join(cache_root, filename)
-        
-        # Normalize and check for traversal
-        try:
-            full_path = os.path.realpath(file_path)
-            cache_root_real = os.path.realpath(cache_root)
-        except ValueError:
-             raise Http404("Invalid path")
+        from django.http import Http404
+        from data_import.extraction_cache import dicom_cache
 
-        if not full_path.startswith(cache_root_real):
-            return Response(status=403) # Forbidden
-            
-        if not os.path.exists(full_path):
+        # Only members of the cached archive are served (no path traversal);
+        # an entry evicted since the listing is rebuilt from its source
+        member = dicom_cache.open(file_hash, filename)
+        if member is None:
             raise Http404("File not found")
-            
-        # Serve the file
-        # Check content type? DICOM is application/dicom usually
-        response = FileResponse(open(full_path, 'rb'), content_type="application/dicom")
+
+        # Ranges and ETags let the viewer re-read slices without downloading them again
+        response = media_response(request, member, content_type="application/dicom")
         # Necessary for SharedArrayBuffer when COOP/COEP are enabled
         response["Cross-Origin-Resource-Policy"] = "cross-origin"
         return response
@@ -1612,8 +1540,8 @@ class DicomServeAPI(APIView):
 
 class ZipServeAPI(APIView):
     """
-    Serves extracted files from ZIP archives.
-    Files are extracted to: MEDIA_ROOT/zip_extracted/{project_id}/{file_hash}/{filename}
+    Serves files from ZIP archives.
+    Archives are cached in: MEDIA_ROOT/zip_extracted/{project_id}/{file_hash}/ (see extraction_cache)
     """
     permission_classes = (IsAuthenticated,)
     
@@ -1622,28 +1550,17 @@ class ZipServeAPI(APIView):
     def get(self, request, project_id, file_hash, filename):
         import os
         import mimetypes
-        from django.conf import settings
-        from django.http import FileResponse, Http404
-        
-        # Security check: Ensure we are only reading from the dedicated cache directory
-        cache_root = os.path.join(settings.MEDIA_ROOT, "zip_extracted", str(project_id), file_hash)
-        file_path = os.path.join(cache_root, filename)
-        
-        # Normalize and check for path traversal attacks
-        try:
-            full_path = os.path.realpath(file_path)
-            cache_root_real = os.path.realpath(cache_root)
-        except ValueError:
-            raise Http404("Invalid path")
+        from django.http import Http404
+        from data_import.extraction_cache import zip_cache
 
-        if not full_path.startswith(cache_root_real):
-            return Response({"error": "Access denied"}, status=403)
-            
-        if not os.path.exists(full_path):
+        # Only members of the cached archive are served (no path traversal);
+        # an evicted entry is rebuilt from its source
+        member = zip_cache.open(f"{project_id}/{file_hash}", filename)
+        if member is None:
             raise Http404("File not found")
-        
+
         # Determine content type
-        content_type, _ = mimetypes.guess_type(full_path)
+        content_type, _ = mimetypes.guess_type(filename)
         if not content_type:
             # Default based on common extensions
             ext = os.path.splitext(filename.lower())[1]
@@ -1666,8 +1583,8 @@ class ZipServeAPI(APIView):
             }
             content_type = content_type_map.get(ext, 'application/octet-stream')
         
-        # Serve the file
-        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        # Serve the file (with ranges for audio/video seeking)
+        response = media_response(request, member, content_type=content_type)
         response["Cross-Origin-Resource-Policy"] = "cross-origin"
         response["Content-Disposition"] = f'inline; filename="{os.path.basename(filename)}"'
         return response
@@ -0,0 +1,414 @@
+"""
+Managed on-disk cache of extracted ZIP uploads.
+
+DicomImportAPI (MEDIA_ROOT/dicom_cache) and ZIP imports served by
+ZipServeAPI (MEDIA_ROOT/zip_extracted) used to extract archives without any
+size limit, raced on the first extraction of an archive, and os.walk'ed the
+extracted tree on every listing. Each of them is now an ExtractionCache:
+
+    <root>/<entry>/manifest.json  {"source", "mode", "members", "bytes", "state"}
+    <root>/<entry>/files/...      extracted members ("extracted" mode)
+    <root>/<entry>/archive.zip    the archive itself ("lazy" mode)
+    <root>/<entry>/lock           held while the entry is built or evicted
+
+- ensure() builds an entry under an exclusive file lock, so concurrent first
+  requests wait for one extraction instead of racing it. The manifest is
+  written last (atomically), so an entry with a "ready" manifest is complete.
+- The manifest stores the members listed by the cache's filter, already
+  sorted, so listings never walk the tree.
+- Entries count their bytes against DATA_IMPORT_EXTRACTION_CACHE_MAX_BYTES
+  per cache. When a new entry pushes the total over the budget, the least
+  recently used entries (manifest mtime, touched on every read) have their
+  content deleted. The manifest stays behind as an "evicted" stub that
+  remembers the source, so a later request rebuilds the entry.
+- In lazy mode (DATA_IMPORT_EXTRACTION_CACHE_LAZY) the archive is only
+  downloaded; members are served straight from it through ZipMemberReader.
+
+Cache directories from before the manifest existed are still served as they
+are (outside the budget), and rebuilt into managed entries when their archive
+is listed or imported again.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are still atomic, but may run twice
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+DATA_IMPORT_EXTRACTION_CACHE_MAX_BYTES = getattr(
+    settings, "DATA_IMPORT_EXTRACTION_CACHE_MAX_BYTES", 20 * 1024**3
+)
+DATA_IMPORT_EXTRACTION_CACHE_LAZY = getattr(settings, "DATA_IMPORT_EXTRACTION_CACHE_LAZY", False)
+
+MANIFEST = "manifest.json"
+FILES_DIR = "files"
+ARCHIVE = "archive.zip"
+LOCK = "lock"
+
+EXTRACTED = "extracted"
+LAZY = "lazy"
+
+READY = "ready"
+EVICTED = "evicted"
+
+
+def source_hash(path):
+    """Entry name of a storage path, as used in the serve URLs"""
+    return hashlib.md5(path.encode("utf-8")).hexdigest()
+
+
+class ZipMemberReader(io.RawIOBase):
+    """
+    Seekable read-only file over one member of a ZIP archive.
+
+    Seeking only moves a position; the member is decompressed up to it on the
+    next read. Size probes (seek to the end and back, as FileResponse does)
+    cost nothing.
+    """
+
+    def __init__(self, archive_path, member):
+        self._zip = zipfile.ZipFile(archive_path)
+        try:
+            info = self._zip.getinfo(member)
+            self._member = self._zip.open(info)
+        except Exception:
+            self._zip.close()
+            raise
+        self.name = member
+        self.size = info.file_size
+        self.mtime = os.stat(archive_path).st_mtime
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._member.tell() != self._pos:
+            self._member.seek(self._pos)
+        read = self._member.readinto(buffer)
+        self._pos += read
+        return read
+
+    def close(self):
+        if not self.closed:
+            self._member.close()
+            self._zip.close()
+        super().close()
+
+
+class ExtractionCache:
+    """Bounded, LRU-evicted cache of ZIP archives extracted under MEDIA_ROOT"""
+
+    def __init__(self, name, depth, member_filter, sort_key=None, max_bytes=None, lazy=None):
+        """
+        Args:
+            name: Directory under MEDIA_ROOT
+            depth: Path components in an entry name (e.g. 2 for "<project>/<hash>")
+            member_filter: Which archive members are listed in the manifest
+            sort_key: Order of listed members
+            max_bytes: Budget for all entries (default DATA_IMPORT_EXTRACTION_CACHE_MAX_BYTES)
+            lazy: Serve members from the archive (default DATA_IMPORT_EXTRACTION_CACHE_LAZY)
+        """
+        self.name = name
+        self.depth = depth
+        self.member_filter = member_filter
+        self.sort_key = sort_key
+        self.max_bytes = max_bytes
+        self.lazy = lazy
+
+    @property
+    def root(self):
+        return Path(settings.MEDIA_ROOT) / self.name
+
+    @property
+    def mode(self):
+        lazy = DATA_IMPORT_EXTRACTION_CACHE_LAZY if self.lazy is None else self.lazy
+        return LAZY if lazy else EXTRACTED
+
+    def entry_dir(self, entry):
+        return self.root / entry
+
+    # ------------------------------------------------------------------
+    # Manifests and locks
+    # ------------------------------------------------------------------
+
+    def read_manifest(self, entry):
+        try:
+            with open(self.entry_dir(entry) / MANIFEST) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, entry, manifest):
+        path = self.entry_dir(entry) / MANIFEST
+        tmp_path = path.with_name(f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def touch(self, entry):
+        """Mark an entry as recently used"""
+        try:
+            os.utime(self.entry_dir(entry) / MANIFEST)
+        except OSError:
+            pass
+
+    @contextmanager
+    def _lock(self, entry, blocking=True):
+        """Exclusive lock on an entry; yields False if non-blocking and taken"""
+        entry_dir = self.entry_dir(entry)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        with open(entry_dir / LOCK, "a") as lock_file:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Building entries
+    # ------------------------------------------------------------------
+
+    def ensure(self, entry, source):
+        """
+        Ready entry for an archive in default_storage, built if needed.
+
+        Returns:
+            The entry's manifest
+
+        Raises:
+            zipfile.BadZipFile: The source is not a ZIP archive
+        """
+        manifest = self.read_manifest(entry)
+        if self._usable(manifest):
+            self.touch(entry)
+            return manifest
+
+        with self._lock(entry):
+            # Another worker may have built it while we waited
+            manifest = self.read_manifest(entry)
+            if self._usable(manifest):
+                self.touch(entry)
+                return manifest
+            manifest = self._build(entry, source)
+
+        self.evict(keep=entry)
+        return manifest
+
+    def _usable(self, manifest):
+        return bool(manifest) and manifest["state"] == READY and manifest["mode"] == self.mode
+
+    def _build(self, entry, source):
+        from django.core.files.storage import default_storage
+
+        entry_dir = self.entry_dir(entry)
+        self._clear(entry_dir)
+        archive = entry_dir / ARCHIVE
+        tmp_archive = entry_dir / f"{ARCHIVE}.tmp"
+        started = time.monotonic()
+        try:
+            with open(tmp_archive, "wb") as tmp, default_storage.open(source, "rb") as f:
+                shutil.copyfileobj(f, tmp)
+
+            with zipfile.ZipFile(tmp_archive) as zip_file:
+                infos = [info for info in zip_file.infolist() if not info.is_dir()]
+                if self.mode == EXTRACTED:
+                    tmp_files = entry_dir / f"{FILES_DIR}.tmp"
+                    zip_file.extractall(tmp_files)
+                    os.replace(tmp_files, entry_dir / FILES_DIR)
+                    size = sum(info.file_size for info in infos)
+
+            if self.mode == EXTRACTED:
+                tmp_archive.unlink()
+            else:
+                os.replace(tmp_archive, archive)
+                size = archive.stat().st_size
+        except Exception:
+            self._clear(entry_dir)
+            raise
+
+        members = [info.filename for info in infos if self.member_filter(info.filename)]
+        members.sort(key=self.sort_key)
+        manifest = {"source": source, "mode": self.mode, "members": members, "bytes": size, "state": READY}
+        self._write_manifest(entry, manifest)
+        logger.info(
+            f"Built {self.name}/{entry} ({self.mode}): {len(members)} members, {size} bytes "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        return manifest
+
+    @staticmethod
+    def _clear(entry_dir):
+        """Remove an entry's content (including a legacy extraction), keeping the lock"""
+        for path in entry_dir.iterdir():
+            if path.name in (LOCK, MANIFEST):
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def members(self, entry, source):
+        """Sorted, filtered member names of an archive"""
+        return self.ensure(entry, source)["members"]
+
+    def open(self, entry, member):
+        """
+        Open a member of a cached archive, rebuilding an evicted entry.
+
+        Returns:
+            A binary file object, or None if the member (or entry) doesn't exist
+        """
+        manifest = self.read_manifest(entry)
+        if not manifest:
+            return self._open_file(self.entry_dir(entry), member)
+        if not self._usable(manifest):
+            manifest = self.ensure(entry, manifest["source"])
+        else:
+            self.touch(entry)
+
+        entry_dir = self.entry_dir(entry)
+        if manifest["mode"] == LAZY:
+            try:
+                return ZipMemberReader(entry_dir / ARCHIVE, member)
+            except KeyError:
+                return None
+
+        return self._open_file(entry_dir / FILES_DIR, member)
+
+    @staticmethod
+    def _open_file(directory, member):
+        directory = os.path.realpath(directory)
+        path = os.path.realpath(os.path.join(directory, member))
+        if not path.startswith(directory + os.sep) or not os.path.isfile(path):
+            return None
+        return open(path, "rb")
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+
+    def entries(self):
+        """[(entry, manifest, last used)] of ready entries"""
+        pattern = "/".join(["*"] * self.depth + [MANIFEST])
+        result = []
+        for path in self.root.glob(pattern):
+            entry = path.parent.relative_to(self.root).as_posix()
+            manifest = self.read_manifest(entry)
+            if manifest and manifest["state"] == READY:
+                try:
+                    result.append((entry, manifest, path.stat().st_mtime))
+                except OSError:
+                    pass
+        return result
+
+    def evict(self, keep=None):
+        """
+        Drop least recently used entries until the cache fits its budget.
+
+        Entries being built or read under lock by another worker are skipped.
+
+        Returns:
+            Evicted entry names
+        """
+        max_bytes = DATA_IMPORT_EXTRACTION_CACHE_MAX_BYTES if self.max_bytes is None else self.max_bytes
+        entries = self.entries()
+        total = sum(manifest["bytes"] for _, manifest, _ in entries)
+        if total <= max_bytes:
+            return []
+
+        evicted = []
+        for entry, manifest, _ in sorted(entries, key=lambda item: item[2]):
+            if total <= max_bytes:
+                break
+            if entry == keep:
+                continue
+            with self._lock(entry, blocking=False) as locked:
+                if not locked:
+                    continue
+                self._clear(self.entry_dir(entry))
+                self._write_manifest(entry, {"source": manifest["source"], "state": EVICTED, "bytes": 0})
+            total -= manifest["bytes"]
+            evicted.append(entry)
+
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} entries from {self.name}, {total} bytes remain")
+        return evicted
+
+
+# ======================================================================
+# Caches
+# ======================================================================
+
+ZIP_TASK_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg", ".webp", ".tiff", ".tif",  # Images
+    ".wav", ".mp3", ".flac", ".m4a", ".ogg",  # Audio
+    ".mp4", ".webm", ".mov", ".avi", ".mkv",  # Video
+    ".txt",  # Text
+    ".pdf",  # PDF
+    ".html", ".htm", ".xml",  # Hypertext
+    ".dcm", ".dicom", ".ima",  # DICOM
+}
+
+
+def is_dicom_member(name):
+    filename = name.rsplit("/", 1)[-1]
+    return filename.lower().endswith((".dcm", ".ima")) or "." not in filename
+
+
+def dicom_sort_key(name):
+    # Slice order: by the digits in the path, as the viewer expects
+    return int("".join(filter(str.isdigit, name)) or 0), name
+
+
+def is_zip_task_member(name):
+    parts = name.split("/")
+    # Skip __MACOSX, hidden directories and hidden/system files
+    if any(part.startswith(".") or part == "__MACOSX" for part in parts[:-1]):
+        return False
+    filename = parts[-1]
+    if filename.startswith(".") or filename.startswith("__"):
+        return False
+    ext = os.path.splitext(filename.lower())[1]
+    return ext in ZIP_TASK_EXTENSIONS or ext == ""
+
+
+dicom_cache = ExtractionCache("dicom_cache", 1, is_dicom_member, sort_key=dicom_sort_key)
+zip_cache = ExtractionCache("zip_extracted", 2, is_zip_task_member)
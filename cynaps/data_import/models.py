@@ -251,80 +251,23 @@ class FileUpload(models.Model):
             list: List of task dictionaries with data pointing to extracted files.
         """
         import zipfile
-        import tempfile
-        import shutil
-        import hashlib
-        from django.core.files.storage import default_storage
-        
+        from data_import.extraction_cache import source_hash, zip_cache
+
         logger.debug(f'Reading tasks from ZIP file {self.filepath}')
-        
+
         tasks = []
-        
-        # Supported file extensions for task creation
-        supported_extensions = {
-            '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp', '.tiff', '.tif',  # Images
-            '.wav', '.mp3', '.flac', '.m4a', '.ogg',  # Audio
-            '.mp4', '.webm', '.mov', '.avi', '.mkv',  # Video
-            '.txt',  # Text
-            '.pdf',  # PDF
-            '.html', '.htm', '.xml',  # Hypertext
-            '.dcm', '.dicom', '.ima',  # DICOM
-        }
-        
+
         try:
-            # Create a cache directory for extracted files
-            file_hash = hashlib.md5(self.filepath.encode('utf-8')).hexdigest()
-            cache_dir = os.path.join(settings.MEDIA_ROOT, 'zip_extracted', str(self.project.id), file_hash)
-            
-            # Check if already extracted
-            if not os.path.exists(cache_dir):
-                os.makedirs(cache_dir, exist_ok=True)
-                
-                # Download and extract ZIP
-                tmp_path = None
-                try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp:
-                        tmp_path = tmp.name
-                        with default_storage.open(self.filepath, 'rb') as f:
-                            shutil.copyfileobj(f, tmp)
-                    
-                    # Extract ZIP
-                    with zipfile.ZipFile(tmp_path, 'r') as zip_ref:
-                        zip_ref.extractall(cache_dir)
-                        
-                finally:
-                    if tmp_path and os.path.exists(tmp_path):
-                        os.unlink(tmp_path)
-            
-            # Walk through extracted files and create tasks
-            for root, dirs, files in os.walk(cache_dir):
-                # Skip __MACOSX and hidden directories
-                dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__MACOSX']
-                
-                for filename in files:
-                    # Skip hidden files and system files
-                    if filename.startswith('.') or filename.startswith('__'):
-                        continue
-                    
-                    ext = os.path.splitext(filename.lower())[1]
-                    
-                    # Check if file is supported or has no extension (could be DICOM)
-                    if ext in supported_extensions or (ext == '' and '.' not in filename):
-                        # Get relative path from cache_dir
-                        full_path = os.path.join(root, filename)
-                        rel_path = os.path.relpath(full_path, cache_dir)
-                        
-                        # Create URL for the extracted file
-                        # Use the zip-serve endpoint to serve files
-                        serve_url = f'/api/import/zip-serve/{self.project.id}/{file_hash}/{rel_path.replace(os.sep, "/")}'
-                        
-                        tasks.append({
-                            'data': {settings.DATA_UNDEFINED_NAME: serve_url}
-                        })
-            
-            # Sort tasks by filename for consistent ordering
-            tasks.sort(key=lambda t: t['data'].get(settings.DATA_UNDEFINED_NAME, ''))
-            
+            # Extract (or, in lazy mode, only download) into the bounded ZIP cache;
+            # the manifest lists the supported members sorted by path
+            file_hash = source_hash(self.filepath)
+            members = zip_cache.members(f'{self.project.id}/{file_hash}', self.filepath)
+
+            # Use the zip-serve endpoint to serve files
+            for member in members:
+                serve_url = f'/api/import/zip-serve/{self.project.id}/{file_hash}/{member}'
+                tasks.append({'data': {settings.DATA_UNDEFINED_NAME: serve_url}})
+
             logger.info(f'Extracted {len(tasks)} tasks from ZIP file {self.filepath}')
             
         except zipfile.BadZipFile:
@@ -0,0 +1,123 @@
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from unittest.mock import patch
+
+from data_import.extraction_cache import (
+    EVICTED,
+    ExtractionCache,
+    ZipMemberReader,
+    dicom_cache,
+    is_zip_task_member,
+)
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+
+
+def _zip(members, compression=zipfile.ZIP_DEFLATED):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', compression) as zip_file:
+        for name, data in members.items():
+            zip_file.writestr(name, data)
+    return output.getvalue()
+
+
+class ExtractionCacheTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def upload(self, name, members):
+        return default_storage.save(f'upload/{name}', ContentFile(_zip(members)))
+
+    def cache(self, **kwargs):
+        return ExtractionCache('test_cache', 1, is_zip_task_member, **kwargs)
+
+    def test_manifest_lists_sorted_members_once(self):
+        source = self.upload(
+            'series.zip',
+            {'IM10': b'b', 'IM9': b'a', 'notes.txt': b'c', 'scan/IM2.dcm': b'd'},
+        )
+        self.assertEqual(dicom_cache.members('entry', source), ['scan/IM2.dcm', 'IM9', 'IM10'])
+
+        # Listing again reads the manifest; the source is not opened
+        with patch.object(default_storage, 'open', side_effect=AssertionError):
+            self.assertEqual(dicom_cache.members('entry', source), ['scan/IM2.dcm', 'IM9', 'IM10'])
+        with dicom_cache.open('entry', 'IM10') as f:
+            self.assertEqual(f.read(), b'b')
+        self.assertIsNone(dicom_cache.open('entry', '../entry/manifest.json'))
+        self.assertIsNone(dicom_cache.open('missing', 'IM10'))
+
+    def test_concurrent_requests_extract_once(self):
+        source = self.upload('a.zip', {'a.png': b'x' * 1000})
+        cache = self.cache()
+        extract = zipfile.ZipFile.extractall
+        calls = []
+
+        def slow_extract(zip_file, path):
+            calls.append(path)
+            threading.Event().wait(0.2)
+            extract(zip_file, path)
+
+        with patch.object(zipfile.ZipFile, 'extractall', slow_extract):
+            threads = [threading.Thread(target=cache.members, args=('a', source)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.members('a', source), ['a.png'])
+
+    def test_evicts_least_recently_used_and_rebuilds(self):
+        cache = self.cache(max_bytes=2500)
+        sources = {name: self.upload(f'{name}.zip', {f'{name}.png': b'x' * 1000}) for name in 'abc'}
+        cache.members('a', sources['a'])
+        cache.members('b', sources['b'])
+        os.utime(cache.entry_dir('a') / 'manifest.json', (1, 1))
+        os.utime(cache.entry_dir('b') / 'manifest.json', (2, 2))
+        cache.open('a', 'a.png').close()  # a is now the most recently used
+
+        cache.members('c', sources['c'])
+        self.assertEqual(cache.read_manifest('b')['state'], EVICTED)
+        self.assertFalse((cache.entry_dir('b') / 'files').exists())
+        self.assertEqual(sum(manifest['bytes'] for _, manifest, _ in cache.entries()), 2000)
+
+        # Serving an evicted member rebuilds the entry from its source
+        with cache.open('b', 'b.png') as f:
+            self.assertEqual(f.read(), b'x' * 1000)
+
+    def test_lazy_mode_serves_from_archive(self):
+        source = self.upload('lazy.zip', {'img/a.png': b'0123456789' * 100, 'b.txt': b'text'})
+        cache = self.cache(lazy=True)
+        self.assertEqual(cache.members('lazy', source), ['b.txt', 'img/a.png'])
+        self.assertFalse((cache.entry_dir('lazy') / 'files').exists())
+
+        with cache.open('lazy', 'img/a.png') as f:
+            self.assertIsInstance(f, ZipMemberReader)
+            self.assertEqual(f.seek(0, io.SEEK_END), 1000)
+            f.seek(995)
+            self.assertEqual(f.read(), b'56789')
+            f.seek(10)
+            self.assertEqual(f.read(5), b'01234')
+        self.assertIsNone(cache.open('lazy', 'missing.png'))
+
+    def test_legacy_extraction_is_still_served(self):
+        legacy = os.path.join(default_storage.location, 'test_cache', 'old', 'dir')
+        os.makedirs(legacy)
+        with open(os.path.join(legacy, 'a.png'), 'wb') as f:
+            f.write(b'legacy')
+        with self.cache().open('old', 'dir/a.png') as f:
+            self.assertEqual(f.read(), b'legacy')
+
+    def test_bad_zip_leaves_no_entry(self):
+        source = default_storage.save('upload/bad.zip', ContentFile(b'not a zip'))
+        with self.assertRaises(zipfile.BadZipFile):
+            self.cache().members('bad', source)
+        self.assertIsNone(self.cache().read_manifest('bad'))
+        self.assertEqual(os.listdir(self.cache().entry_dir('bad')), ['lock'])
@@ -10,6 +10,7 @@ from core.utils.common import load_func
 from data_manager.actions import DataManagerAction
 from data_manager.functions import evaluate_predictions
 from django.conf import settings
+from django.utils import timezone
 from projects.models import Project
 from tasks.functions import update_tasks_counters
 from tasks.models import Annotation, AnnotationDraft, Prediction, Task
@@ -109,7 +110,7 @@ def delete_tasks_annotations(project, queryset, **kwargs):
     tasks = Task.objects.filter(id__in=real_task_ids)
     tasks.update(updated_at=datetime.now(), updated_by=request.user)
     # Update tasks counter and is_labeled. It should be a single operation as counters affect bulk is_labeled update
-    project.update_tasks_counters_and_is_labeled(tasks_queryset=real_task_ids)
+    project.update_tasks_counters_and_is_labeled(tasks_queryset=real_task_ids, sync_fsm_states=True)
 
     # LSE postprocess
     postprocess = load_func(settings.DELETE_TASKS_ANNOTATIONS_POSTPROCESS)
@@ -158,6 +159,8 @@ def delete_tasks_predictions(project, queryset, **kwargs):
         real_task_ids = set(list(predictions.values_list('task_id', flat=True)))
 
     count = predictions.count()
+    # touch the tasks so delta exports pick up the removed predictions
+    Task.objects.filter(id__in=real_task_ids).update(updated_at=timezone.now())
     predictions.delete()
     start_job_async_or_sync(update_tasks_counters, Task.objects.filter(id__in=real_task_ids))
     return {'processed_items': count, 'detail': 'Deleted ' + str(count) + ' predictions'}
@@ -50,7 +50,7 @@ def propagate_annotations(project, queryset, **kwargs):
     db_annotations = Annotation.objects.bulk_create(db_annotations, batch_size=settings.BATCH_SIZE)
     TaskSerializerBulk.post_process_annotations(user, db_annotations, 'propagated_annotation')
     # Update counters for tasks and is_labeled. It should be a single operation as counters affect bulk is_labeled update
-    project.update_tasks_counters_and_is_labeled(tasks_queryset=Task.objects.filter(id__in=tasks))
+    project.update_tasks_counters_and_is_labeled(tasks_queryset=Task.objects.filter(id__in=tasks), sync_fsm_states=True)
     return {
         'response_code': 200,
         'detail': f'Created {len(db_annotations)} annotations',
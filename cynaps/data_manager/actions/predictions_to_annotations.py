@@ -58,7 +58,7 @@ def predictions_to_annotations(project, queryset, **kwargs):
             user.active_organization, project, WebhookAction.ANNOTATIONS_CREATED, db_annotations
         )
         # Update counters for tasks and is_labeled. It should be a single operation as counters affect bulk is_labeled update
-        project.update_tasks_counters_and_is_labeled(Task.objects.filter(id__in=tasks_ids))
+        project.update_tasks_counters_and_is_labeled(Task.objects.filter(id__in=tasks_ids), sync_fsm_states=True)
 
         try:
             from stats.functions.stats import recalculate_stats_async_or_sync
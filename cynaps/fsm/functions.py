@@ -14,9 +14,14 @@ def backfill_fsm_states_for_tasks(storage_id, tasks_created, link_class):
     """
     Backfill initial FSM states for tasks created during storage sync.
 
-    This function creates initial CREATED state records for all tasks that were
-    created during a storage sync operation. It's designed to be called after
-    tasks have been successfully created and linked to storage.
+    This function creates initial state records (inferred from the task data,
+    usually CREATED) for all tasks that were created during a storage sync
+    operation. It's designed to be called after tasks have been successfully
+    created and linked to storage.
+
+    Tasks are grouped by inferred state and each group is written with one
+    StateManager.bulk_transition() call, so a sync of N tasks costs one state
+    lookup query and one bulk INSERT per group instead of N transitions.
 
     Args:
         storage_id: The ID of the storage that created the tasks
@@ -25,14 +30,20 @@ def backfill_fsm_states_for_tasks(storage_id, tasks_created, link_class):
 
     Note:
         - CurrentContext must be available before calling this function
-        - This function is safe to call in both LSO and LSE environments
         - Failures are logged but don't propagate to prevent breaking storage sync
     """
     if tasks_created <= 0:
         return
 
+    from core.current_request import CurrentContext
+    from fsm.state_manager import get_state_manager
+    from fsm.utils import _get_initialization_transition_name, infer_entity_state_from_data, is_fsm_enabled
+
+    user = CurrentContext.get_user()
+    if not is_fsm_enabled(user=user):
+        return
+
     try:
-        from lse_fsm.state_inference import backfill_state_for_entity
         from tasks.models import Task
 
         # Get tasks created in this sync
@@ -42,23 +53,84 @@ def backfill_fsm_states_for_tasks(storage_id, tasks_created, link_class):
             .values_list('task_id', flat=True)
         )
 
-        tasks = Task.objects.filter(id__in=task_ids)
-
         logger.info(f'Storage sync: creating initial FSM states for {len(task_ids)} tasks')
 
-        # Backfill initial CREATED state for each task
-        for task in tasks:
-            backfill_state_for_entity(task, 'task', create_record=True)
+        tasks_by_state = {}
+        for task in Task.objects.filter(id__in=task_ids):
+            tasks_by_state.setdefault(infer_entity_state_from_data(task), []).append(task)
+
+        StateManager = get_state_manager()
+        for state, tasks in tasks_by_state.items():
+            transition_name = _get_initialization_transition_name('task', state)
+            if transition_name:
+                StateManager.bulk_transition(tasks, transition_name, user=user)
 
         logger.info(f'Storage sync: FSM states created for {len(task_ids)} tasks')
-    except ImportError:
-        # LSE not available (OSS), skip FSM sync
-        logger.debug('LSE not available, skipping FSM state backfill for storage sync')
     except Exception as e:
         # Don't fail storage sync if FSM sync fails
         logger.error(f'FSM sync after storage sync failed: {e}', exc_info=True)
 
 
+def update_task_states_after_bulk_change(project, task_ids, user=None):
+    """
+    Update task FSM states after a bulk change of their labeled status.
+
+    Bulk counterpart of update_task_state_after_annotation_deletion() for data
+    manager actions (deleting annotations, propagating annotations, converting
+    predictions): the current states of all tasks are read at once, the tasks
+    whose state doesn't match is_labeled are moved with one bulk transition per
+    target state, and the project state is updated once.
+
+    Args:
+        project: The Project instance containing the tasks
+        task_ids: IDs of the changed tasks
+        user: User who made the change (defaults to CurrentContext user)
+
+    Note:
+        - Must run after is_labeled has been recalculated for the tasks
+        - Failures are logged but don't propagate to prevent breaking the action
+    """
+    from core.current_request import CurrentContext
+    from fsm.project_transitions import update_project_state_after_task_change
+    from fsm.state_choices import TaskStateChoices
+    from fsm.state_manager import get_state_manager
+    from fsm.utils import is_fsm_enabled
+
+    if user is None:
+        user = CurrentContext.get_user()
+
+    if not task_ids or not is_fsm_enabled(user=user):
+        return
+
+    try:
+        from tasks.models import Task
+
+        StateManager = get_state_manager()
+        tasks = list(Task.objects.filter(project=project, id__in=task_ids).only('id', 'project_id', 'is_labeled'))
+        current_states = StateManager.get_current_state_values(tasks)
+
+        to_completed, to_in_progress = [], []
+        for task in tasks:
+            expected_state = TaskStateChoices.COMPLETED if task.is_labeled else TaskStateChoices.IN_PROGRESS
+            if current_states.get(task.id) != expected_state:
+                (to_completed if task.is_labeled else to_in_progress).append(task)
+
+        if not to_completed and not to_in_progress:
+            return
+
+        StateManager.bulk_transition(to_completed, 'task_completed', user=user)
+        StateManager.bulk_transition(to_in_progress, 'task_in_progress', user=user)
+        # Update project state based on task changes
+        update_project_state_after_task_change(project, user=user)
+
+    except Exception as e:
+        # Final safety net - log but don't break the bulk action
+        logger.warning(
+            f'FSM state update failed after bulk task change: {str(e)}',
+            extra={'task_count': len(task_ids), 'project_id': project.id},
+        )
+
+
 def update_task_state_after_annotation_deletion(task, project):
     """
     Update task FSM state after an annotation has been deleted.
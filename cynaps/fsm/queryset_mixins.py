@@ -33,6 +33,19 @@ from fsm.registry import get_state_model
 logger = logging.getLogger(__name__)
 
 
+def current_state_subquery(state_model, outer_ref='pk'):
+    """
+    Subquery selecting the latest state of the entity referenced by `outer_ref`.
+
+    This is extremely efficient because:
+    1. UUID7 provides natural time ordering (latest = highest ID)
+    2. We only fetch the state column, not the entire record
+    3. Django optimizes this into a single JOIN or lateral subquery
+    """
+    fk_field = f'{state_model._get_entity_field_name()}_id'
+    return Subquery(state_model.objects.filter(**{fk_field: OuterRef(outer_ref)}).order_by('-id').values('state')[:1])
+
+
 class FSMStateQuerySetMixin:
     """
     Mixin for Django QuerySets to efficiently annotate FSM state.
@@ -110,22 +123,8 @@ class FSMStateQuerySetMixin:
             logger.debug(f'No state model registered for {entity_name}, skipping annotation')
             return self
 
-        # Get the foreign key field name on the state model
-        # e.g., 'task_id' for TaskState
-        entity_field_name = state_model._get_entity_field_name()
-        fk_field = f'{entity_field_name}_id'
-
-        # Create subquery to get current state using UUID7 natural ordering
-        # This is extremely efficient because:
-        # 1. UUID7 provides natural time ordering (latest = highest ID)
-        # 2. We only fetch the state column, not the entire record
-        # 3. Django optimizes this into a single JOIN or lateral subquery
-        current_state_subquery = Subquery(
-            state_model.objects.filter(**{fk_field: OuterRef('pk')}).order_by('-id').values('state')[:1]
-        )
-
-        # Annotate the queryset with the current state
-        return self.annotate(current_state=current_state_subquery)
+        # Annotate the queryset with the current state using UUID7 natural ordering
+        return self.annotate(current_state=current_state_subquery(state_model))
 
 
 
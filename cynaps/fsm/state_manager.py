@@ -13,10 +13,13 @@ from core.current_request import CurrentContext
 from core.feature_flags import flag_set
 from django.conf import settings
 from django.core.cache import cache, caches
+from django.db import transaction
 from django.db.models import Model, QuerySet
-from fsm.registry import get_state_model_for_entity
+from fsm.queryset_mixins import current_state_subquery
+from fsm.registry import get_state_model_for_entity, transition_registry
 from fsm.state_models import BaseState
 from fsm.transition_executor import execute_transition_with_state_manager
+from fsm.transitions import TransitionContext
 
 logger = logging.getLogger(__name__)
 
@@ -80,6 +83,7 @@ class StateManager:
 
     CACHE_TTL = getattr(settings, 'FSM_CACHE_TTL', 300)  # 5 minutes default
     CACHE_PREFIX = 'fsm:current'
+    BULK_BATCH_SIZE = getattr(settings, 'FSM_BULK_BATCH_SIZE', 1000)
 
     @classmethod
     def clear_fsm_cache(cls):
@@ -189,6 +193,79 @@ class StateManager:
             )
             raise StateManagerError(f'Error getting current state: {e}') from e
 
+    @classmethod
+    def get_current_state_values(cls, entities: List[Model]) -> Dict[Any, Optional[str]]:
+        """
+        Get current states of many entities with one cache round trip.
+
+        Cached states are read with one get_many; the misses are resolved with one
+        "latest state per entity" query per BULK_BATCH_SIZE entities (the with_state()
+        subquery) and cached with one set_many.
+
+        Args:
+            entities: Entities of one model
+
+        Returns:
+            {entity pk: current state}, None for entities without a state record
+
+        Raises:
+            StateManagerError: If no state model found or the entities are of different models
+        """
+        if not entities or not cls._is_fsm_enabled():
+            return {}
+
+        model = entities[0]._meta.concrete_model
+        if any(entity._meta.concrete_model is not model for entity in entities):
+            raise StateManagerError('Bulk state operations expect entities of one model')
+        state_model = get_state_model_for_entity(entities[0])
+        if not state_model:
+            raise StateManagerError(f'No state model found for {model._meta.model_name} when getting current states')
+
+        fsm_cache = get_fsm_cache()
+        keys = {cls.get_cache_key(entity): entity.pk for entity in entities}
+        cached = fsm_cache.get_many(list(keys))
+        states = {keys[key]: state for key, state in cached.items()}
+        missing = [pk for key, pk in keys.items() if key not in cached]
+
+        try:
+            for start in range(0, len(missing), cls.BULK_BATCH_SIZE):
+                batch = missing[start : start + cls.BULK_BATCH_SIZE]
+                found = dict(
+                    model._base_manager.filter(pk__in=batch)
+                    .annotate(current_state=current_state_subquery(state_model))
+                    .values_list('pk', 'current_state')
+                )
+                states.update({pk: found.get(pk) for pk in batch})
+        except Exception as e:
+            logger.error(
+                'FSM: Error getting current states',
+                extra={
+                    'event': 'fsm.get_states_error',
+                    'entity_type': model._meta.label_lower,
+                    'entity_count': len(entities),
+                    'organization_id': CurrentContext.get_organization_id(),
+                    'error': str(e),
+                },
+                exc_info=True,
+            )
+            raise StateManagerError(f'Error getting current states: {e}') from e
+
+        cache_updates = {key: states[pk] for key, pk in keys.items() if key not in cached and states[pk] is not None}
+        if cache_updates:
+            fsm_cache.set_many(cache_updates, cls.CACHE_TTL)
+
+        logger.info(
+            'FSM: Bulk state lookup',
+            extra={
+                'event': 'fsm.bulk_state_lookup',
+                'entity_type': model._meta.label_lower,
+                'entity_count': len(keys),
+                'cache_hits': len(cached),
+                'organization_id': CurrentContext.get_organization_id(),
+            },
+        )
+        return states
+
     @classmethod
     def get_current_state_object(cls, entity: Model) -> BaseState:
         """
@@ -486,28 +563,22 @@ class StateManager:
         """
         Warm cache with current states for a list of entities.
 
-        Basic implementation that can be optimized by Enterprise with
-        bulk queries and advanced caching strategies.
+        One get_many for the states already cached, then one query and one set_many
+        for the rest (see get_current_state_values).
         """
-        cache_updates = {}
-        organization_id = CurrentContext.get_organization_id()
-        for entity in entities:
-            current_state = cls.get_current_state_value(entity)
-            if current_state:
-                cache_key = cls.get_cache_key(entity)
-                cache_updates[cache_key] = current_state
+        if not entities:
+            return
 
-        if cache_updates:
-            fsm_cache = get_fsm_cache()
-            fsm_cache.set_many(cache_updates, cls.CACHE_TTL)
-            logger.info(
-                'FSM: Cache warmed',
-                extra={
-                    'event': 'fsm.cache_warmed',
-                    'entity_count': len(cache_updates),
-                    **{'organization_id': organization_id if organization_id else None},
-                },
-            )
+        states = cls.get_current_state_values(entities)
+        organization_id = CurrentContext.get_organization_id()
+        logger.info(
+            'FSM: Cache warmed',
+            extra={
+                'event': 'fsm.cache_warmed',
+                'entity_count': sum(1 for state in states.values() if state is not None),
+                **{'organization_id': organization_id if organization_id else None},
+            },
+        )
 
     @classmethod
     def execute_transition(
@@ -544,6 +615,146 @@ class StateManager:
         )
 
 
+    @classmethod
+    def bulk_transition(
+        cls,
+        entities: List[Model],
+        transition_name: str,
+        transition_data: Dict[str, Any] = None,
+        user=None,
+        organization_id=None,
+        **context_kwargs,
+    ) -> List[BaseState]:
+        """
+        Execute a registered transition for many entities of one model.
+
+        Equivalent to execute_transition() for each entity, but the current states
+        come from one get_current_state_values() call, the state records are written
+        with bulk_create in one transaction and the cache is updated with one
+        set_many. Differences from the single-entity path:
+        - No per-entity cache locks (state records are INSERT-only)
+        - The transition context has current_state but no current_state_object
+        - Side-effect only transitions (no target state) are not supported
+
+        Entities already in the target state are skipped unless the transition
+        forces a state record.
+
+        Args:
+            entities: Entities of one model
+            transition_name: Name of the registered transition
+            transition_data: Data for the transition (validated by Pydantic)
+            user: User executing the transition
+            organization_id: Organization ID (defaults to the current context)
+            **context_kwargs: Additional context data
+
+        Returns:
+            The created state records
+
+        Raises:
+            ValueError: If the transition is not found or has no target state
+            TransitionValidationError: If the transition fails validation for an entity
+            StateManagerError: If writing the state records fails
+        """
+        if not entities or not cls._is_fsm_enabled(user=user):
+            return []
+
+        entity_name = entities[0]._meta.model_name.lower()
+        transition_class = transition_registry.get_transition(entity_name, transition_name)
+        if not transition_class:
+            raise ValueError(f"Transition '{transition_name}' not found for entity '{entity_name}'")
+        state_model = get_state_model_for_entity(entities[0])
+        if not state_model:
+            raise StateManagerError(f'No state model found for {entity_name} when transitioning states')
+
+        current_states = cls.get_current_state_values(entities)
+        if organization_id is None:
+            organization_id = CurrentContext.get_organization_id()
+        if organization_id is None and user and getattr(user, 'active_organization_id', None):
+            organization_id = user.active_organization_id
+        entity_field_name = state_model._get_entity_field_name()
+
+        pending = []  # [(transition, context, state record)]
+        for entity in entities:
+            transition = transition_class(**(transition_data or {}))
+            entity_organization_id = organization_id or getattr(entity, 'organization_id', None)
+            current_state = current_states.get(entity.pk)
+            target_state = transition.get_target_state(
+                TransitionContext(entity=entity, current_user=user, organization_id=entity_organization_id)
+            )
+            if target_state is None:
+                raise ValueError(f"Side-effect only transition '{transition_name}' can't run in bulk")
+            if current_state == target_state and not getattr(transition, '_force_state_record', False):
+                continue
+
+            context = TransitionContext(
+                entity=entity,
+                current_user=user,
+                current_state=current_state,
+                target_state=target_state,
+                organization_id=entity_organization_id,
+                **context_kwargs,
+            )
+            transition_context_data = transition.prepare_and_validate(context)
+            record = state_model(
+                **{entity_field_name: entity},
+                state=target_state,
+                previous_state=current_state,
+                transition_name=transition.transition_name,
+                triggered_by=user,
+                context_data=transition_context_data or {},
+                reason=transition.get_reason(context),
+                organization_id=entity_organization_id,
+                **state_model.get_denormalized_fields(entity),
+            )
+            pending.append((transition, context, record))
+
+        if not pending:
+            return []
+
+        fsm_cache = get_fsm_cache()
+        records = [record for _, _, record in pending]
+        try:
+            with transaction.atomic():
+                state_model.objects.bulk_create(records, batch_size=cls.BULK_BATCH_SIZE)
+        except Exception as e:
+            fsm_cache.delete_many([cls.get_cache_key(context.entity) for _, context, _ in pending])
+            logger.error(
+                'FSM: Bulk state transition failed',
+                extra={
+                    'event': 'fsm.bulk_transition_failed',
+                    'entity_type': entity_name,
+                    'entity_count': len(records),
+                    'transition_name': transition_name,
+                    'organization_id': organization_id,
+                    'error': str(e),
+                },
+                exc_info=True,
+            )
+            raise StateManagerError(f'Failed to transition states: {e}') from e
+
+        # Write-through cache, once for the whole batch
+        fsm_cache.set_many(
+            {cls.get_cache_key(context.entity): record.state for _, context, record in pending}, cls.CACHE_TTL
+        )
+
+        for transition, context, record in pending:
+            transition.finalize(context, record)
+
+        logger.info(
+            'FSM: Bulk state transition successful',
+            extra={
+                'event': 'fsm.bulk_transition_success',
+                'entity_type': entity_name,
+                'entity_count': len(records),
+                'skipped_count': len(entities) - len(records),
+                'transition_name': transition_name,
+                'user_id': user.id if user else None,
+                'organization_id': organization_id,
+            },
+        )
+        return records
+
+
 # Allow runtime configuration of which StateManager to use
 # Enterprise can set this to their extended implementation
 DEFAULT_STATE_MANAGER = StateManager
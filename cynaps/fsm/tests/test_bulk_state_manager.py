@@ -0,0 +1,113 @@
+"""
+Tests for bulk FSM state operations.
+
+Covers StateManager.get_current_state_values(), warm_cache() and
+bulk_transition(), and the callers that backfill or fix many task states at
+once.
+"""
+
+import pytest
+from core.current_request import CurrentContext
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from fsm.functions import update_task_states_after_bulk_change
+from fsm.state_choices import TaskStateChoices
+from fsm.state_manager import StateManager, StateManagerError
+from fsm.state_models import TaskState
+from organizations.tests.factories import OrganizationFactory
+from projects.tests.factories import ProjectFactory
+from tasks.models import Task
+from tasks.tests.factories import TaskFactory
+from users.tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestBulkStateManager:
+    @pytest.fixture(autouse=True)
+    def setup_test_data(self):
+        cache.clear()
+        self.org = OrganizationFactory()
+        self.user = UserFactory()
+        CurrentContext.set_user(self.user)
+        CurrentContext.set_organization_id(self.org.id)
+        self.project = ProjectFactory(organization=self.org)
+        yield
+        cache.clear()
+        CurrentContext.clear()
+
+    def _tasks(self, count):
+        tasks = [TaskFactory(project=self.project) for _ in range(count)]
+        cache.clear()
+        return tasks
+
+    def test_states_of_uncached_entities_in_one_query(self):
+        tasks = self._tasks(5)
+
+        with CaptureQueriesContext(connection) as queries:
+            states = StateManager.get_current_state_values(tasks)
+
+        assert states == {task.pk: TaskStateChoices.CREATED for task in tasks}
+        assert len(queries) == 1
+
+        # Now cached: no queries at all
+        with CaptureQueriesContext(connection) as queries:
+            assert StateManager.get_current_state_values(tasks) == states
+        assert len(queries) == 0
+
+    def test_entities_without_state_are_none_and_not_cached(self):
+        tasks = self._tasks(2)
+        TaskState.objects.filter(task=tasks[0]).delete()
+
+        states = StateManager.get_current_state_values(tasks)
+
+        assert states == {tasks[0].pk: None, tasks[1].pk: TaskStateChoices.CREATED}
+        assert cache.get(StateManager.get_cache_key(tasks[0])) is None
+
+    def test_mixed_models_rejected(self):
+        task = self._tasks(1)[0]
+        with pytest.raises(StateManagerError):
+            StateManager.get_current_state_values([task, self.project])
+
+    def test_warm_cache(self):
+        tasks = self._tasks(3)
+        StateManager.warm_cache(tasks)
+        assert all(cache.get(StateManager.get_cache_key(task)) == TaskStateChoices.CREATED for task in tasks)
+
+    def test_bulk_transition(self):
+        tasks = self._tasks(4)
+        StateManager.execute_transition(entity=tasks[0], transition_name='task_completed', user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            records = StateManager.bulk_transition(tasks, 'task_completed', user=self.user)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+
+        # tasks[0] is already completed
+        assert {record.task_id for record in records} == {task.id for task in tasks[1:]}
+        assert len(inserts) == 1
+        for task in tasks:
+            assert cache.get(StateManager.get_cache_key(task)) == TaskStateChoices.COMPLETED
+            assert TaskState.get_current_state_value(task) == TaskStateChoices.COMPLETED
+        record = TaskState.objects.filter(task=tasks[1]).order_by('-id').first()
+        assert record.previous_state == TaskStateChoices.CREATED
+        assert record.transition_name == 'task_completed'
+        assert record.triggered_by == self.user
+        assert record.organization_id == self.org.id
+        assert record.project_id == self.project.id
+
+    def test_bulk_transition_unknown_transition(self):
+        with pytest.raises(ValueError):
+            StateManager.bulk_transition(self._tasks(1), 'no_such_transition')
+
+    def test_update_task_states_after_bulk_change(self):
+        tasks = self._tasks(3)
+        Task.objects.filter(id__in=[tasks[0].id, tasks[1].id]).update(is_labeled=True)
+
+        update_task_states_after_bulk_change(self.project, [task.id for task in tasks])
+
+        states = StateManager.get_current_state_values(list(Task.objects.filter(project=self.project)))
+        assert states == {
+            tasks[0].id: TaskStateChoices.COMPLETED,
+            tasks[1].id: TaskStateChoices.COMPLETED,
+            tasks[2].id: TaskStateChoices.IN_PROGRESS,
+        }
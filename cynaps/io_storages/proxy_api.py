@@ -5,6 +5,7 @@ from typing import Union
 from urllib.parse import unquote
 
 from core.feature_flags import flag_set
+from core.utils.media import etag_matches
 from django.conf import settings
 from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from drf_spectacular.utils import extend_schema
@@ -266,8 +267,16 @@ class ResolveStorageUriAPIMixin:
 
             # Process cached requests using ETag - with range-aware handling
             if settings.RESOLVER_PROXY_ENABLE_ETAG_CACHE and 'Range' not in request.headers:
-                if request.headers.get('If-None-Match') == response.headers.get('ETag'):
-                    return HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                if etag_matches(request.headers.get('If-None-Match'), response.headers.get('ETag')):
+                    # Release the storage connection instead of leaving the stream unread
+                    try:
+                        stream.close()
+                    except Exception as e:
+                        logger.debug(f"Couldn't close stream: {e}")
+                    not_modified = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                    not_modified['ETag'] = response.headers['ETag']
+                    not_modified['Cache-Control'] = response.headers['Cache-Control']
+                    return not_modified
 
             return response
 
@@ -12,7 +12,7 @@ import base64
 import io
 import logging
 import time
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from urllib.parse import unquote
 
 from django.conf import settings
@@ -26,6 +26,7 @@ from rest_framework.views import APIView
 from tasks.models import Task
 
 from core.feature_flags import flag_set
+from core.watermark_engine import WatermarkEngine
 from core.watermark_service import WatermarkService
 from cynaps.io_storages.functions import get_storage_by_url
 
@@ -75,7 +76,8 @@ def apply_dynamic_watermark(
     user,
     project_id: Optional[str] = None,
     task_id: Optional[str] = None,
-) -> bytes:
+    content_type: Optional[str] = None,
+) -> Tuple[bytes, Optional[str]]:
     """
     Apply both visible and invisible watermarks to image data.
 
@@ -84,30 +86,24 @@ def apply_dynamic_watermark(
         user: Django user object
         project_id: Optional project identifier
         task_id: Optional task identifier
+        content_type: MIME type of image_data
 
     Returns:
-        Watermarked image bytes
+        (watermarked image bytes, their MIME type)
     """
     config = get_watermark_settings()
 
     if not config["enabled"]:
-        return image_data
+        return image_data, content_type
 
     try:
         # Get user identifiers
         user_id = str(user.id) if user and hasattr(user, "id") else "unknown"
         user_email = getattr(user, "email", user_id)
-        session_id = getattr(user, "session_key", None) or str(int(time.time()))
+        # Fallback fixed within a minute, so rendered outputs can be reused
+        session_id = getattr(user, "session_key", None) or str(int(time.time()) // 60 * 60)
 
-        # Apply visible watermark
-        watermarked = WatermarkService.apply_visible_watermark(
-            image_data,
-            user_id=user_email,
-            session_id=session_id,
-            position=config["position"],
-        )
-
-        # Apply invisible (steganographic) watermark if enabled
+        payload = None
         if config["include_invisible"]:
             payload = WatermarkService.create_forensic_watermark(
                 user_id=user_id,
@@ -115,16 +111,18 @@ def apply_dynamic_watermark(
                 project_id=project_id,
                 task_id=task_id,
             )
-            watermarked = WatermarkService.apply_invisible_watermark(
-                watermarked,
-                payload=payload,
-            )
 
-        return watermarked
+        return WatermarkEngine.render(
+            image_data,
+            user_id=user_email,
+            session_id=session_id,
+            position=config["position"],
+            payload=payload,
+        )
 
     except Exception as e:
         logger.error(f"Failed to apply dynamic watermark: {e}")
-        return image_data
+        return image_data, content_type
 
 
 def add_security_headers(response: HttpResponse) -> HttpResponse:
@@ -177,14 +175,13 @@ class SecureImageProxyMixin:
 
         # Apply watermark for non-admin users
         if should_apply_watermark(user):
-            watermarked_data = apply_dynamic_watermark(
+            watermarked_data, content_type = apply_dynamic_watermark(
                 image_data,
                 user,
                 project_id=project_id,
                 task_id=task_id,
+                content_type=content_type,
             )
-            # Watermarked images are always PNG
-            content_type = "image/png"
         else:
             watermarked_data = image_data
 
@@ -5,6 +5,7 @@ from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 import pytest
+from django.http import HttpResponse
 from io_storages.proxy_api import (
     ProjectResolveStorageUri,
     ResolveStorageUriAPIMixin,
@@ -182,6 +183,13 @@ class TestResolveStorageUriAPIMixin(unittest.TestCase):
             self.assertEqual(result, mock_response)
             self.assertTrue('ETag' in mock_response.headers)
 
+    def test_prepare_headers_cache_control_uses_proxy_timeout(self):
+        response = HttpResponse(content_type='video/mp4')
+        with patch('io_storages.proxy_api.settings') as mock_settings:
+            mock_settings.RESOLVER_PROXY_CACHE_TIMEOUT = 600
+            result = self.mixin.prepare_headers(response, {}, self.request, self.project)
+        assert result.headers['Cache-Control'] == 'private, max-age=600, must-revalidate'
+
     def test_proxy_data_from_storage_no_data(self):
         mock_storage = MagicMock()
         # Return three-tuple with empty metadata when no data is available
@@ -1,4 +1,5 @@
 import logging
+import random
 from collections import Counter
 from typing import List, Tuple, Union
 
@@ -13,6 +14,7 @@ from django.db.models import (
     Exists,
     F,
     Max,
+    Min,
     OuterRef,
     Q,
     QuerySet,
@@ -48,18 +50,63 @@ def get_next_task_logging_level(user: User) -> int:
     return level
 
 
+def _random_id_window(task_query: QuerySet[Task], size: int, exclude_ids=()) -> List[int]:
+    """
+    Random sample of up to `size` task ids without ORDER BY random().
+
+    A random pivot between the smallest and largest id selects a window of
+    consecutive ids in primary key order, wrapping around to the start of the
+    queryset. The window is shuffled, so every task inside it is equally likely
+    to be tried first. Costs two index range scans instead of sorting the whole
+    filtered set.
+    """
+    task_query = task_query.order_by()
+    if exclude_ids:
+        task_query = task_query.exclude(id__in=exclude_ids)
+
+    bounds = task_query.aggregate(min_id=Min("id"), max_id=Max("id"))
+    if bounds["min_id"] is None:
+        return []
+
+    pivot = random.randint(bounds["min_id"], bounds["max_id"])
+    window = list(
+        task_query.filter(id__gte=pivot)
+        .order_by("id")
+        .values_list("id", flat=True)[:size]
+    )
+    if len(window) < size:
+        window += list(
+            task_query.filter(id__lt=pivot)
+            .order_by("id")
+            .values_list("id", flat=True)[: size - len(window)]
+        )
+    # joins (e.g. predictions) can repeat an id
+    window = list(dict.fromkeys(window))
+    random.shuffle(window)
+    return window
+
+
 def _get_random_unlocked(
-    task_query: QuerySet[Task], user: User, upper_limit=None
+    task_query: QuerySet[Task], user: User, upper_limit=None, project: Project = None
 ) -> Union[Task, None]:
-    for task in task_query.order_by("?").only("id")[
-        : settings.RANDOM_NEXT_TASK_SAMPLE_SIZE
-    ]:
-        try:
-            task = Task.objects.select_for_update(skip_locked=True).get(pk=task.id)
-            if not task.has_lock(user):
-                return task
-        except Task.DoesNotExist:
-            logger.debug("Task with id {} locked".format(task.id))
+    size = settings.RANDOM_NEXT_TASK_SAMPLE_SIZE
+    tried = []
+    for _ in range(settings.RANDOM_NEXT_TASK_PROBES):
+        window = _random_id_window(task_query, size, exclude_ids=tried)
+        if not window:
+            return None
+        tried += window
+
+        if project is None:
+            project = Project.objects.get(tasks__id=window[0])
+        # Count locks for the whole window at once, then confirm the pick
+        for task_id in Task.filter_unlocked_ids(window, user, project):
+            try:
+                task = Task.objects.select_for_update(skip_locked=True).get(pk=task_id)
+                if not task.has_lock(user):
+                    return task
+            except Task.DoesNotExist:
+                logger.debug("Task with id {} locked".format(task_id))
 
 
 def _get_first_unlocked(tasks_query: QuerySet[Task], user) -> Union[Task, None]:
@@ -85,7 +132,9 @@ def _try_ground_truth(
     if not_solved_tasks_with_ground_truths.exists():
         if project.sampling == project.SEQUENCE:
             return _get_first_unlocked(not_solved_tasks_with_ground_truths, user)
-        return _get_random_unlocked(not_solved_tasks_with_ground_truths, user)
+        return _get_random_unlocked(
+            not_solved_tasks_with_ground_truths, user, project=project
+        )
 
 
 def _try_tasks_with_overlap(
@@ -134,7 +183,7 @@ def _try_breadth_first(
     if not_solved_tasks_labeling_with_max_annotations.exists():
         # try to complete tasks that are already in progress
         return _get_random_unlocked(
-            not_solved_tasks_labeling_with_max_annotations, user
+            not_solved_tasks_labeling_with_max_annotations, user, project=project
         )
 
 
@@ -187,6 +236,7 @@ def _try_uncertainty_sampling(
                 possible_next_tasks,
                 user,
                 upper_limit=min(num_annotators + 1, num_tasks_with_current_predictions),
+                project=project,
             )
         else:
             next_task = _get_first_unlocked(possible_next_tasks, user)
@@ -196,7 +246,7 @@ def _try_uncertainty_sampling(
             f"Uncertainty sampling fallbacks to random sampling "
             f"(current project.model_version={str(project.model_version)})"
         )
-        next_task = _get_random_unlocked(tasks, user)
+        next_task = _get_random_unlocked(tasks, user, project=project)
     return next_task
 
 
@@ -455,7 +505,7 @@ def get_task_from_qs_with_sampling(
 
     elif project.sampling == project.UNIFORM:
         logger.debug(f"User={user} tries random sampling from prepared tasks")
-        next_task = _get_random_unlocked(not_solved_tasks, user)
+        next_task = _get_random_unlocked(not_solved_tasks, user, project=project)
         if next_task:
             queue_info += (" & " if queue_info else "") + "Uniform random queue"
 
@@ -16,11 +16,12 @@ class ProjectMixin:
         """
         start_job_async_or_sync(self._rearrange_overlap_cohort)
 
-    def update_tasks_counters_and_is_labeled(self, tasks_queryset, from_scratch=True):
+    def update_tasks_counters_and_is_labeled(self, tasks_queryset, from_scratch=True, sync_fsm_states=False):
         """
         Async start updating tasks counters and than is_labeled
         :param tasks_queryset: Tasks to update queryset
         :param from_scratch: Skip calculated tasks
+        :param sync_fsm_states: Bring task FSM states in line with the new is_labeled afterwards
         """
         # get only id from queryset to decrease data size in job
         task_ids = get_unique_ids_list(tasks_queryset)
@@ -28,6 +29,7 @@ class ProjectMixin:
             self._update_tasks_counters_and_is_labeled,
             task_ids,
             from_scratch=from_scratch,
+            sync_fsm_states=sync_fsm_states,
         )
 
     def update_tasks_counters_and_task_states(
@@ -1405,11 +1405,12 @@ class Project(ProjectMixin, FsmHistoryStateModel):
                 "presign_ttl": storage.presign_ttl,
             }
 
-    def _update_tasks_counters_and_is_labeled(self, task_ids, from_scratch=True):
+    def _update_tasks_counters_and_is_labeled(self, task_ids, from_scratch=True, sync_fsm_states=False):
         """
         Update tasks counters and is_labeled in batches of size settings.BATCH_SIZE.
         :param task_ids: List of task ids to be updated
         :param from_scratch: Skip calculated tasks
+        :param sync_fsm_states: Bring task FSM states in line with the new is_labeled afterwards
         :return: Count of updated tasks
         """
         from tasks.functions import update_tasks_counters
@@ -1427,6 +1428,11 @@ class Project(ProjectMixin, FsmHistoryStateModel):
                 num_tasks_updated += update_tasks_counters(queryset, from_scratch)
                 bulk_update_stats_project_tasks(queryset, self)
             page_idx += 1
+
+        if sync_fsm_states:
+            from fsm.functions import update_task_states_after_bulk_change
+
+            update_task_states_after_bulk_change(self, task_ids)
         return num_tasks_updated
 
     def _update_tasks_counters_and_task_states(
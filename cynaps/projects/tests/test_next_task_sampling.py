@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from projects.functions.next_task import _get_random_unlocked, _random_id_window
+from projects.tests.factories import ProjectFactory
+from tasks.models import Annotation, Task, TaskLock
+from tasks.tests.factories import AnnotationFactory
+from users.tests.factories import UserFactory
+
+
+@pytest.mark.django_db
+class TestRandomNextTaskSampling(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = ProjectFactory()
+        cls.user = UserFactory()
+        cls.other = UserFactory()
+        Task.objects.bulk_create([Task(project=cls.project, data={'i': i}, overlap=1) for i in range(30)])
+        cls.task_ids = list(Task.objects.filter(project=cls.project).order_by('id').values_list('id', flat=True))
+
+    def test_window_samples_without_random_sort(self):
+        tasks = Task.objects.filter(project=self.project)
+        seen = set()
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(20):
+                window = _random_id_window(tasks, 5)
+                self.assertEqual(len(window), 5)
+                self.assertEqual(len(set(window)), 5)
+                seen.update(window)
+
+        self.assertGreater(len(seen), 10)
+        self.assertFalse(any('RANDOM()' in q['sql'].upper() for q in queries.captured_queries))
+
+    def test_window_wraps_around_and_excludes(self):
+        tasks = Task.objects.filter(project=self.project)
+        window = _random_id_window(tasks, 100, exclude_ids=self.task_ids[:10])
+        self.assertEqual(sorted(window), self.task_ids[10:])
+        self.assertEqual(_random_id_window(tasks.none(), 5), [])
+
+    def test_filter_unlocked_ids_matches_has_lock(self):
+        locked, annotated, free = self.task_ids[:3]
+        TaskLock.objects.create(
+            task_id=locked, user=self.other, expire_at=timezone.now() + timedelta(hours=1)
+        )
+        AnnotationFactory(task=Task.objects.get(id=annotated), completed_by=self.other)
+
+        ids = [locked, annotated, free]
+        with self.assertNumQueries(1):
+            unlocked = Task.filter_unlocked_ids(ids, self.user, self.project)
+
+        self.assertEqual(unlocked, [free])
+        self.assertEqual(
+            unlocked, [task_id for task_id in ids if not Task.objects.get(id=task_id).has_lock(self.user)]
+        )
+
+    def test_get_random_unlocked_skips_locked_tasks(self):
+        expire_at = timezone.now() + timedelta(hours=1)
+        TaskLock.objects.bulk_create(
+            [TaskLock(task_id=task_id, user=self.other, expire_at=expire_at) for task_id in self.task_ids[:-1]]
+        )
+        with self.settings(RANDOM_NEXT_TASK_SAMPLE_SIZE=10, RANDOM_NEXT_TASK_PROBES=3):
+            task = _get_random_unlocked(Task.objects.filter(project=self.project), self.user, project=self.project)
+        self.assertEqual(task.id, self.task_ids[-1])
+
+        Annotation.objects.create(task=task, project=self.project, completed_by=self.other, result=[])
+        task = _get_random_unlocked(Task.objects.filter(project=self.project), self.user)
+        self.assertIsNone(task)
@@ -0,0 +1,30 @@
+from core.migration_helpers import make_sql_migration
+from django.db import migrations
+
+# Used by delta exports to find the rows changed since a high-water mark
+INDEXES = [
+    ('task_project_updated_at_idx', 'task (project_id, updated_at)'),
+    ('task_completion_project_updated_at_idx', 'task_completion (project_id, updated_at)'),
+    ('prediction_project_updated_at_idx', 'prediction (project_id, updated_at)'),
+    ('tasks_annotationdraft_updated_at_idx', 'tasks_annotationdraft (updated_at)'),
+]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0063_remove_failedprediction_model_version'),
+    ]
+    operations = [
+        migrations.RunPython(
+            *make_sql_migration(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {columns};',
+                f'DROP INDEX CONCURRENTLY IF EXISTS {name};',
+                apply_on_sqlite=False,
+                execute_immediately=False,
+                migration_name=f'{__name__}.{name}',
+            )
+        )
+        for name, columns in INDEXES
+    ]
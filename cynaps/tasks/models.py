@@ -29,7 +29,8 @@ from data_import.models import FileUpload
 from data_manager.managers import PreparedTaskManager, TaskManager
 from django.conf import settings
 from django.db import OperationalError, models, transaction
-from django.db.models import CheckConstraint, F, JSONField, Q
+from django.db.models import CheckConstraint, Count, Exists, F, JSONField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.db.models.lookups import GreaterThanOrEqual
 from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import Signal, receiver
@@ -405,6 +406,55 @@ class Task(TaskMixin, FsmHistoryStateModel):
     def num_locks_user(self, user):
         return self.locks.filter(expire_at__gt=now()).exclude(user=user).count()
 
+    @classmethod
+    def filter_unlocked_ids(cls, task_ids, user, project):
+        """
+        Batched counterpart of has_lock(): return the subset of task_ids that are
+        not locked for the user, counting locks and annotations of every task in
+        one query.
+
+        Used to pre-filter a window of candidates; the picked task is still
+        confirmed with has_lock(). Projects with an agreement threshold may allow
+        extra annotators per task, which can't be counted here, so all ids are
+        returned for them.
+        """
+        task_ids = list(task_ids)
+        lse_project = getattr(project, "lse_project", None)
+        if not task_ids or (lse_project and lse_project.agreement_threshold is not None):
+            return task_ids
+
+        exclude_q = cls(project=project).get_lock_exclude_query(user)
+        num_locks = (
+            TaskLock.objects.filter(task=OuterRef("pk"), expire_at__gt=now())
+            .exclude(user=user)
+            .values("task")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        num_annotations = (
+            Annotation.objects.filter(task=OuterRef("pk"))
+            .exclude(exclude_q)
+            .values("task")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        queryset = cls.objects.filter(id__in=task_ids).annotate(
+            num_takes=Coalesce(Subquery(num_locks), 0)
+            + Coalesce(Subquery(num_annotations), 0)
+        )
+        unlocked = Q(num_takes__lt=F("overlap"))
+        if project.show_ground_truth_first:
+            # ground truth tasks ignore overlap in onboarding mode, see has_lock()
+            queryset = queryset.annotate(
+                has_ground_truth=Exists(
+                    Annotation.objects.filter(task=OuterRef("pk"), ground_truth=True)
+                )
+            )
+            unlocked |= Q(has_ground_truth=True)
+
+        unlocked_ids = set(queryset.filter(unlocked).values_list("id", flat=True))
+        return [task_id for task_id in task_ids if task_id in unlocked_ids]
+
     def get_storage_filename(self):
         for link_name in settings.IO_STORAGES_IMPORT_LINK_NAMES:
             if hasattr(self, link_name):
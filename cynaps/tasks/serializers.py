@@ -1029,16 +1029,13 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
         Backfill FSM states for tasks created via bulk_create().
 
         bulk_create() bypasses the model's save() method, so FSM transitions
-        don't fire automatically. This sets initial CREATED state for newly imported tasks.
+        don't fire automatically. This sets initial CREATED state for newly imported tasks
+        with one bulk INSERT.
         """
         if not tasks or not is_fsm_enabled(user=None):
             return
 
-        StateManager = get_state_manager()
-        for task in tasks:
-            StateManager.execute_transition(
-                entity=task, transition_name="task_created", user=None
-            )
+        get_state_manager().bulk_transition(tasks, "task_created", user=None)
 
     @staticmethod
     def post_process_annotations(user, db_annotations, action):
@@ -0,0 +1,187 @@
+"""
+Buffered telemetry ingest.
+
+TelemetryIngestAPI used to validate the task and project of every event with
+its own EXISTS query, then bulk_create the batch and save the user's risk
+profile inside the request. Now the API validates all ids of a batch with one
+id__in query per model and pushes the events onto a bounded Redis list:
+
+    telemetry_ingest:queue -> [json event, ...]
+
+A background writer (telemetry.tasks.flush_telemetry_events_job) drains the
+list in large bulk_create batches and touches the risk profiles of the batch's
+users with one UPDATE. The flush is scheduled at most once per
+TELEMETRY_INGEST_FLUSH_DELAY seconds, so bursts of requests share one job.
+
+Overload is shed by value: once the list holds TELEMETRY_INGEST_SHED_RATIO of
+TELEMETRY_INGEST_QUEUE_LIMIT events, low-value types (mouse_entropy, scroll)
+are dropped; at the limit every event is dropped until the writer catches up.
+Events popped by a writer that crashes before bulk_create are lost, which is
+accepted for telemetry.
+
+Without Redis (or with TELEMETRY_INGEST_ASYNC disabled) events are written
+synchronously.
+"""
+
+import json
+import logging
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from core.redis import redis_connected, start_job_async_or_sync
+from django.conf import settings
+from django.utils import timezone
+from django_rq import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+TELEMETRY_INGEST_ASYNC = getattr(settings, "TELEMETRY_INGEST_ASYNC", True)
+TELEMETRY_INGEST_KEY_PREFIX = getattr(settings, "TELEMETRY_INGEST_REDIS_KEY_PREFIX", "telemetry_ingest")
+TELEMETRY_INGEST_QUEUE_LIMIT = getattr(settings, "TELEMETRY_INGEST_QUEUE_LIMIT", 200000)
+TELEMETRY_INGEST_SHED_RATIO = getattr(settings, "TELEMETRY_INGEST_SHED_RATIO", 0.8)
+TELEMETRY_INGEST_BATCH_SIZE = getattr(settings, "TELEMETRY_INGEST_BATCH_SIZE", 2000)
+TELEMETRY_INGEST_FLUSH_DELAY = getattr(settings, "TELEMETRY_INGEST_FLUSH_DELAY", 2)  # seconds
+
+# Dropped first when the buffer is under pressure
+LOW_VALUE_EVENT_TYPES = frozenset({"mouse_entropy", "scroll"})
+
+# Event fields carried through the buffer
+EVENT_FIELDS = (
+    "user_id",
+    "event_type",
+    "value",
+    "ip_address",
+    "user_agent",
+    "session_id",
+    "project_id",
+    "task_id",
+)
+
+
+def _queue_key():
+    return f"{TELEMETRY_INGEST_KEY_PREFIX}:queue"
+
+
+def _flush_key():
+    return f"{TELEMETRY_INGEST_KEY_PREFIX}:flush_scheduled"
+
+
+def valid_ids(model, raw_ids):
+    """
+    Existing primary keys among raw client-supplied ids, with one query.
+
+    Non-integer ids are ignored.
+    """
+    ids = {int(raw) for raw in raw_ids if raw and str(raw).isdigit()}
+    if not ids:
+        return set()
+    return set(model.objects.filter(id__in=ids).values_list("id", flat=True))
+
+
+def serialize_event(event):
+    data = {field: getattr(event, field) for field in EVENT_FIELDS}
+    data["timestamp"] = event.timestamp.timestamp()
+    return json.dumps(data)
+
+
+def deserialize_event(raw):
+    from .models import TelemetryEvent
+
+    data = json.loads(raw)
+    data["timestamp"] = datetime.fromtimestamp(data["timestamp"], tz=dt_timezone.utc)
+    return TelemetryEvent(**data)
+
+
+class TelemetryIngestBuffer:
+    """Bounded buffer between the ingest endpoint and the TelemetryEvent table"""
+
+    @classmethod
+    def push(cls, events):
+        """
+        Queue events for writing.
+
+        Returns:
+            Number of events dropped because the buffer is under pressure
+        """
+        events = list(events)
+        if not events:
+            return 0
+
+        if not (TELEMETRY_INGEST_ASYNC and redis_connected()):
+            cls.write(events)
+            return 0
+
+        try:
+            redis_client = get_connection()
+            kept = cls.shed(events, redis_client.llen(_queue_key()))
+            if kept:
+                redis_client.rpush(_queue_key(), *[serialize_event(event) for event in kept])
+                cls.schedule_flush(redis_client)
+            return len(events) - len(kept)
+        except Exception as e:
+            logger.error(f"Telemetry buffer unavailable, writing {len(events)} events inline: {e}")
+            cls.write(events)
+            return 0
+
+    @staticmethod
+    def shed(events, queued):
+        """Events to keep given the current buffer length"""
+        if queued >= TELEMETRY_INGEST_QUEUE_LIMIT:
+            return []
+        if queued >= TELEMETRY_INGEST_QUEUE_LIMIT * TELEMETRY_INGEST_SHED_RATIO:
+            return [event for event in events if event.event_type not in LOW_VALUE_EVENT_TYPES]
+        return events
+
+    @staticmethod
+    def schedule_flush(redis_client):
+        """Start the writer unless a flush is already scheduled"""
+        from .tasks import flush_telemetry_events_job
+
+        if redis_client.set(_flush_key(), 1, nx=True, ex=TELEMETRY_INGEST_FLUSH_DELAY + 60):
+            start_job_async_or_sync(
+                flush_telemetry_events_job, in_seconds=TELEMETRY_INGEST_FLUSH_DELAY, queue_name="low"
+            )
+
+    @staticmethod
+    def write(events):
+        """Persist events and touch their users' risk profiles"""
+        from .models import TelemetryEvent, UserRiskProfile
+
+        TelemetryEvent.objects.bulk_create(events, batch_size=TELEMETRY_INGEST_BATCH_SIZE)
+
+        user_ids = {event.user_id for event in events}
+        UserRiskProfile.objects.bulk_create(
+            [UserRiskProfile(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+        )
+        UserRiskProfile.objects.filter(user_id__in=user_ids).update(last_event_at=timezone.now())
+
+    @classmethod
+    def flush(cls, batch_size=None, max_batches=None):
+        """
+        Drain the buffer into the database.
+
+        Returns:
+            {"written": int, "batches": int}
+        """
+        batch_size = batch_size or TELEMETRY_INGEST_BATCH_SIZE
+        redis_client = get_connection()
+        # Events pushed from now on schedule another flush
+        redis_client.delete(_flush_key())
+
+        stats = {"written": 0, "batches": 0}
+        while max_batches is None or stats["batches"] < max_batches:
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.lrange(_queue_key(), 0, batch_size - 1)
+            pipe.ltrim(_queue_key(), batch_size, -1)
+            raw_events, _ = pipe.execute()
+            if not raw_events:
+                break
+
+            cls.write([deserialize_event(raw) for raw in raw_events])
+            stats["written"] += len(raw_events)
+            stats["batches"] += 1
+
+        if stats["written"]:
+            logger.info(f"Flushed {stats['written']} telemetry events in {stats['batches']} batches")
+        return stats
@@ -0,0 +1,83 @@
+"""
+Management command for telemetry storage upkeep.
+
+Rolls raw events up into per-minute counts, creates the upcoming daily
+partitions of telemetry_event and removes events past the retention period.
+Should be run periodically (e.g., every 10 minutes via cron).
+
+The one-time conversion to a partitioned table (PostgreSQL only) locks
+telemetry_event while it runs; schedule it in a maintenance window.
+
+Usage:
+    python manage.py telemetry_maintenance
+    python manage.py telemetry_maintenance --rollup-since 2026-01-01
+    python manage.py telemetry_maintenance --retention-days 14 --dry-run
+    python manage.py telemetry_maintenance --convert-partitions
+"""
+
+import logging
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Roll up telemetry events, manage daily partitions and apply retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rollup-since',
+            type=str,
+            help='Recompute rollups from this date (YYYY-MM-DD, UTC) to now',
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            help='Days of raw events to keep (default: TELEMETRY_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--convert-partitions',
+            action='store_true',
+            help='Convert telemetry_event into a table partitioned by day (PostgreSQL)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report expired events without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        from telemetry.retention import TelemetryPartitions, TelemetryRollups, purge_expired_events
+
+        if options.get('convert_partitions'):
+            if not TelemetryPartitions.supported():
+                raise CommandError('Telemetry partitioning requires PostgreSQL')
+            converted = TelemetryPartitions.convert()
+            self.stdout.write(
+                'Converted telemetry_event to daily partitions' if converted else 'telemetry_event is already partitioned'
+            )
+
+        rollup_since = None
+        if options.get('rollup_since'):
+            try:
+                rollup_since = datetime.strptime(options['rollup_since'], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+            except ValueError:
+                raise CommandError('--rollup-since must be a date in YYYY-MM-DD format')
+
+        dry_run = options.get('dry_run')
+        rollups = 0 if dry_run else TelemetryRollups.rollup(start=rollup_since)
+        created = [] if dry_run else TelemetryPartitions.ensure()
+        purged = purge_expired_events(retention_days=options.get('retention_days'), dry_run=dry_run)
+        rollups_purged = 0 if dry_run else TelemetryRollups.purge()
+
+        verb = 'would be removed' if dry_run else 'removed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Telemetry: {rollups} rollup rows written, {len(created)} partitions created, "
+                f"{len(purged['partitions_dropped'])} partitions and {purged['rows_deleted']} events {verb}, "
+                f"{rollups_purged} old rollups removed"
+            )
+        )
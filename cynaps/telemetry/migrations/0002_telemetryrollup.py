@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telemetry', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelemetryRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField(help_text='Start of the minute (UTC)')),
+                ('event_type', models.CharField(help_text='Type of behavior event', max_length=50)),
+                ('count', models.IntegerField(default=0, help_text='Events of this type in the minute')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'telemetry_rollup',
+                'indexes': [models.Index(fields=['minute'], name='telemetry_r_minute_22423d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'minute', 'event_type'), name='telemetry_rollup_unique_minute')],
+            },
+        ),
+    ]
@@ -4,6 +4,7 @@ Telemetry Models - Behavioral Surveillance System
 Models for storing:
 - TelemetryEvent: Individual behavior signals from browser
 - UserRiskProfile: Cumulative risk scores per user
+- TelemetryRollup: Per-minute event counts, kept after raw events expire
 - RuleViolation: Record of triggered rules
 - AuditLog: Encrypted evidence storage
 """
@@ -18,7 +19,8 @@ class TelemetryEvent(models.Model):
     """
     Stores individual behavior signals collected from the browser.
 
-    High-throughput table - consider partitioning for production.
+    High-throughput table. On PostgreSQL it can be partitioned by day so expired
+    days are dropped whole (see telemetry.retention).
     """
 
     # Event types
@@ -114,6 +116,42 @@ class TelemetryEvent(models.Model):
         return f"{self.user_id}:{self.event_type}@{self.timestamp}"
 
 
+class TelemetryRollup(models.Model):
+    """
+    Per-user, per-minute event counts by type.
+
+    Filled from TelemetryEvent by a periodic job (telemetry.retention), and
+    kept much longer than raw events, so dashboards and rule back-testing don't
+    need the raw rows once their partitions are dropped.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="telemetry_rollups",
+    )
+
+    minute = models.DateTimeField(help_text="Start of the minute (UTC)")
+
+    event_type = models.CharField(max_length=50, help_text="Type of behavior event")
+
+    count = models.IntegerField(default=0, help_text="Events of this type in the minute")
+
+    class Meta:
+        db_table = "telemetry_rollup"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "minute", "event_type"], name="telemetry_rollup_unique_minute"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["minute"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.event_type}@{self.minute}={self.count}"
+
+
 class UserRiskProfile(models.Model):
     """
     Tracks cumulative risk score for each user.
@@ -180,16 +218,30 @@ class UserRiskProfile(models.Model):
     def __str__(self):
         return f"{self.user_id}: {self.risk_level} ({self.risk_score})"
 
+    # (level, minimum score), highest first
+    RISK_LEVEL_THRESHOLDS = (("critical", 100), ("high", 75), ("medium", 50))
+
+    @classmethod
+    def risk_level_expression(cls, score):
+        """SQL CASE mapping a score expression to its risk level, as update_risk_level does"""
+        from django.db.models.lookups import GreaterThanOrEqual
+
+        return models.Case(
+            *[
+                models.When(GreaterThanOrEqual(score, minimum), then=models.Value(level))
+                for level, minimum in cls.RISK_LEVEL_THRESHOLDS
+            ],
+            default=models.Value("low"),
+            output_field=models.CharField(),
+        )
+
     def update_risk_level(self):
         """Update risk level based on score"""
-        if self.risk_score >= 100:
-            self.risk_level = "critical"
-        elif self.risk_score >= 75:
-            self.risk_level = "high"
-        elif self.risk_score >= 50:
-            self.risk_level = "medium"
-        else:
-            self.risk_level = "low"
+        for level, minimum in self.RISK_LEVEL_THRESHOLDS:
+            if self.risk_score >= minimum:
+                self.risk_level = level
+                return
+        self.risk_level = "low"
 
     def add_risk(self, points: int, rule_name: str):
         """Add risk points and record the triggering rule"""
@@ -0,0 +1,331 @@
+"""
+Telemetry rollups, daily partitions and retention.
+
+TelemetryEvent gets one row per click, scroll, zoom and dwell, so it grows
+without bound. Three pieces keep it in check:
+
+Rollups
+    TelemetryRollups.rollup() aggregates raw events into TelemetryRollup rows
+    (user, minute, event_type, count). Each run recomputes the last
+    TELEMETRY_ROLLUP_LOOKBACK_MINUTES of completed minutes and upserts them, so
+    runs are idempotent and pick up events the ingest buffer wrote late. Events
+    arriving later than that are only counted by a backfill
+    (`telemetry_maintenance --rollup-since`). Risk dashboards and rule
+    back-testing read rollups, never raw events.
+
+Partitions (PostgreSQL)
+    TelemetryPartitions.convert() turns telemetry_event into a table
+    partitioned by RANGE("timestamp"), one partition per UTC day:
+
+        telemetry_event_legacy     existing rows, up to the end of the conversion day
+        telemetry_event_pYYYYMMDD  one per day, created TELEMETRY_PARTITION_DAYS_AHEAD ahead
+        telemetry_event_default    rows outside every partition (late stragglers)
+
+    The conversion locks the table and attaches the old rows as one partition
+    (a validation scan, no copy); run it once in a maintenance window. Django
+    still sees `id` as the primary key, the database key is (id, timestamp).
+
+Retention
+    Expired days are dropped whole on a partitioned table. Otherwise (SQLite,
+    or PostgreSQL before conversion) expired rows are deleted in id batches.
+    Raw events are kept TELEMETRY_RETENTION_DAYS, rollups
+    TELEMETRY_ROLLUP_RETENTION_DAYS.
+"""
+
+import logging
+import re
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMinute
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+TELEMETRY_RETENTION_DAYS = getattr(settings, "TELEMETRY_RETENTION_DAYS", 30)
+TELEMETRY_ROLLUP_RETENTION_DAYS = getattr(settings, "TELEMETRY_ROLLUP_RETENTION_DAYS", 365)
+TELEMETRY_ROLLUP_LOOKBACK_MINUTES = getattr(settings, "TELEMETRY_ROLLUP_LOOKBACK_MINUTES", 60)
+TELEMETRY_PARTITION_DAYS_AHEAD = getattr(settings, "TELEMETRY_PARTITION_DAYS_AHEAD", 3)
+TELEMETRY_RETENTION_BATCH_SIZE = getattr(settings, "TELEMETRY_RETENTION_BATCH_SIZE", 10000)
+
+EVENT_TABLE = "telemetry_event"
+LEGACY_PARTITION = f"{EVENT_TABLE}_legacy"
+DEFAULT_PARTITION = f"{EVENT_TABLE}_default"
+DAILY_PARTITION_RE = re.compile(rf"^{EVENT_TABLE}_p(\d{{8}})$")
+UPPER_BOUND_RE = re.compile(r"TO \('(\d{4}-\d{2}-\d{2})")
+
+
+def _floor_minute(moment):
+    return moment.replace(second=0, microsecond=0)
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def _bound(day):
+    return f"'{day.isoformat()} 00:00:00+00'"
+
+
+def _delete_in_batches(queryset, batch_size):
+    """Delete a queryset by id batches, so no single statement holds long locks"""
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += queryset.model.objects.filter(id__in=ids).delete()[0]
+
+
+class TelemetryRollups:
+    """Per-minute event counts computed from raw events"""
+
+    @staticmethod
+    def rollup(start=None, end=None):
+        """
+        Recompute rollups for the completed minutes in [start, end).
+
+        Returns:
+            Number of rollup rows written
+        """
+        from .models import TelemetryEvent, TelemetryRollup
+
+        end = _floor_minute(end or timezone.now())
+        start = _floor_minute(start or end - timedelta(minutes=TELEMETRY_ROLLUP_LOOKBACK_MINUTES))
+
+        rows = (
+            TelemetryEvent.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            .annotate(minute=TruncMinute("timestamp", tzinfo=dt_timezone.utc))
+            .values("user_id", "minute", "event_type")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        rollups = [TelemetryRollup(**row) for row in rows]
+        TelemetryRollup.objects.bulk_create(
+            rollups,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["user", "minute", "event_type"],
+            update_fields=["count"],
+        )
+        logger.info(f"Rolled up telemetry from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}: {len(rollups)} rows")
+        return len(rollups)
+
+    @staticmethod
+    def counts(user_id, start, end=None):
+        """Event counts by type for a user in [start, end), from rollups"""
+        from .models import TelemetryRollup
+
+        rollups = TelemetryRollup.objects.filter(user_id=user_id, minute__gte=start)
+        if end is not None:
+            rollups = rollups.filter(minute__lt=end)
+        return dict(
+            rollups.values("event_type").annotate(total=Sum("count")).values_list("event_type", "total")
+        )
+
+    @staticmethod
+    def purge(retention_days=None):
+        from .models import TelemetryRollup
+
+        retention_days = retention_days or TELEMETRY_ROLLUP_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=retention_days)
+        return _delete_in_batches(
+            TelemetryRollup.objects.filter(minute__lt=cutoff), TELEMETRY_RETENTION_BATCH_SIZE
+        )
+
+
+class TelemetryPartitions:
+    """Daily RANGE partitions of telemetry_event on PostgreSQL"""
+
+    @staticmethod
+    def supported():
+        return connection.vendor == "postgresql"
+
+    @classmethod
+    def is_partitioned(cls):
+        if not cls.supported():
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [EVENT_TABLE]
+            )
+            row = cursor.fetchone()
+        return bool(row) and row[0] == "p"
+
+    @staticmethod
+    def partition_name(day):
+        return f"{EVENT_TABLE}_p{day:%Y%m%d}"
+
+    @classmethod
+    def partitions(cls):
+        """{partition name: upper bound date or None (default partition)}"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(%s)
+                """,
+                [EVENT_TABLE],
+            )
+            rows = cursor.fetchall()
+
+        partitions = {}
+        for name, bound in rows:
+            match = UPPER_BOUND_RE.search(bound or "")
+            partitions[name] = datetime.strptime(match.group(1), "%Y-%m-%d").date() if match else None
+        return partitions
+
+    @classmethod
+    def ensure(cls, days_ahead=None):
+        """Create the partitions from today to `days_ahead` days from now"""
+        if not cls.is_partitioned():
+            return []
+        days_ahead = TELEMETRY_PARTITION_DAYS_AHEAD if days_ahead is None else days_ahead
+        existing = cls.partitions()
+        # The legacy partition covers everything up to its upper bound
+        covered_until = max((upper for upper in existing.values() if upper), default=None)
+
+        created = []
+        today = timezone.now().astimezone(dt_timezone.utc).date()
+        with connection.cursor() as cursor:
+            for offset in range(days_ahead + 1):
+                day = today + timedelta(days=offset)
+                name = cls.partition_name(day)
+                if name in existing or (covered_until and day < covered_until):
+                    continue
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{EVENT_TABLE}" '
+                    f"FOR VALUES FROM ({_bound(day)}) TO ({_bound(day + timedelta(days=1))})"
+                )
+                created.append(name)
+        if created:
+            logger.info(f"Created telemetry partitions: {', '.join(created)}")
+        return created
+
+    @classmethod
+    def drop_expired(cls, retention_days=None, dry_run=False):
+        """Drop partitions whose whole range is older than the retention period"""
+        retention_days = retention_days or TELEMETRY_RETENTION_DAYS
+        cutoff = (timezone.now() - timedelta(days=retention_days)).astimezone(dt_timezone.utc).date()
+
+        expired = [
+            name for name, upper in cls.partitions().items() if upper is not None and upper <= cutoff
+        ]
+        if not dry_run:
+            with connection.cursor() as cursor:
+                for name in expired:
+                    cursor.execute(f'DROP TABLE "{name}"')
+                # Stragglers in the default partition are few: delete them row-wise
+                cursor.execute(
+                    f'DELETE FROM "{DEFAULT_PARTITION}" WHERE "timestamp" < %s', [_day_start(cutoff)]
+                )
+            if expired:
+                logger.info(f"Dropped expired telemetry partitions: {', '.join(expired)}")
+        return expired
+
+    @classmethod
+    def convert(cls):
+        """
+        One-time conversion of telemetry_event into a partitioned table.
+
+        The existing table becomes the legacy partition, indexes and foreign
+        keys are recreated on the partitioned parent under their original
+        names, and the id sequence continues after the current maximum.
+        """
+        if not cls.supported():
+            raise RuntimeError("Telemetry partitioning requires PostgreSQL")
+        if cls.is_partitioned():
+            return False
+
+        tomorrow = timezone.now().astimezone(dt_timezone.utc).date() + timedelta(days=1)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE "{EVENT_TABLE}" IN ACCESS EXCLUSIVE MODE')
+
+            cursor.execute(
+                """
+                SELECT i.relname, pg_get_indexdef(i.oid), x.indisprimary
+                FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+                WHERE x.indrelid = to_regclass(%s)
+                """,
+                [EVENT_TABLE],
+            )
+            indexes = cursor.fetchall()
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+                [EVENT_TABLE],
+            )
+            foreign_keys = cursor.fetchall()
+            cursor.execute(
+                "SELECT attidentity FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = 'id'",
+                [EVENT_TABLE],
+            )
+            is_identity = cursor.fetchone()[0] != ""
+            cursor.execute(f'SELECT pg_get_serial_sequence(%s, %s), COALESCE(MAX(id), 0) FROM "{EVENT_TABLE}"', [EVENT_TABLE, "id"])
+            sequence, max_id = cursor.fetchone()
+
+            # Move the existing table (and its index names) out of the way
+            cursor.execute(f'ALTER TABLE "{EVENT_TABLE}" RENAME TO "{LEGACY_PARTITION}"')
+            for name, _, _ in indexes:
+                cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:55]}_legacy"')
+            if is_identity:
+                # Partitions can't own identity columns; the parent gets a plain sequence
+                cursor.execute(f'ALTER TABLE "{LEGACY_PARTITION}" ALTER COLUMN id DROP IDENTITY')
+                sequence = f"{EVENT_TABLE}_id_seq"
+
+            cursor.execute(
+                f'CREATE TABLE "{EVENT_TABLE}" (LIKE "{LEGACY_PARTITION}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+                'PARTITION BY RANGE ("timestamp")'
+            )
+            if is_identity:
+                cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{EVENT_TABLE}".id')
+                cursor.execute(f"ALTER TABLE \"{EVENT_TABLE}\" ALTER COLUMN id SET DEFAULT nextval('\"{sequence}\"')")
+            else:
+                cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{EVENT_TABLE}".id')
+            cursor.execute("SELECT setval(%s, %s)", [sequence, max_id + 1])
+
+            # The partition key must be part of the primary key
+            cursor.execute(f'ALTER TABLE "{EVENT_TABLE}" ADD CONSTRAINT "{EVENT_TABLE}_pkey" PRIMARY KEY (id, "timestamp")')
+            for name, definition, primary in indexes:
+                if not primary:
+                    cursor.execute(definition)
+            for name, definition in foreign_keys:
+                cursor.execute(f'ALTER TABLE "{EVENT_TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+            cursor.execute(
+                f'ALTER TABLE "{EVENT_TABLE}" ATTACH PARTITION "{LEGACY_PARTITION}" '
+                f"FOR VALUES FROM (MINVALUE) TO ({_bound(tomorrow)})"
+            )
+            cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{EVENT_TABLE}" DEFAULT')
+
+        logger.info(f"Converted {EVENT_TABLE} to daily partitions (legacy rows up to {tomorrow})")
+        cls.ensure()
+        return True
+
+
+def purge_expired_events(retention_days=None, dry_run=False):
+    """
+    Remove raw events older than the retention period.
+
+    Returns:
+        {"partitions_dropped": [...], "rows_deleted": int}
+    """
+    from .models import TelemetryEvent
+
+    retention_days = retention_days or TELEMETRY_RETENTION_DAYS
+    if TelemetryPartitions.is_partitioned():
+        dropped = TelemetryPartitions.drop_expired(retention_days, dry_run=dry_run)
+        return {"partitions_dropped": dropped, "rows_deleted": 0}
+
+    expired = TelemetryEvent.objects.filter(timestamp__lt=timezone.now() - timedelta(days=retention_days))
+    if dry_run:
+        return {"partitions_dropped": [], "rows_deleted": expired.count()}
+    return {
+        "partitions_dropped": [],
+        "rows_deleted": _delete_in_batches(expired, TELEMETRY_RETENTION_BATCH_SIZE),
+    }
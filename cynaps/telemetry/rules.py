@@ -2,17 +2,15 @@
 Rule Engine - Pattern Detection for Behavioral Surveillance
 
 Defines rules that detect suspicious behavior patterns and assign risk points.
-Rules are evaluated against recent telemetry events.
+Rules are evaluated against sliding-window counters of recent telemetry events
+(see telemetry.windows), not against the TelemetryEvent table.
 """
 
 import logging
+import time
 from dataclasses import dataclass
-from datetime import timedelta
 from typing import List, Optional, Callable
 
-from django.db.models import Count, Avg
-from django.utils import timezone
-
 logger = logging.getLogger(__name__)
 
 
@@ -23,7 +21,7 @@ class Rule:
     name: str
     description: str
     risk_points: int
-    check_function: Callable
+    check_function: Callable  # (WindowSnapshot, lookback seconds) -> Optional[dict]
     cooldown_minutes: int = 5  # Don't trigger same rule within this period
 
 
@@ -33,6 +31,7 @@ class RuleEngine:
 
     Usage:
         engine = RuleEngine()
+        engine.record_events(user_id, events)
         violations = engine.evaluate_user(user_id)
         for violation in violations:
             print(f"Rule: {violation['rule']}, Points: {violation['points']}")
@@ -116,45 +115,47 @@ class RuleEngine:
             ),
         ]
 
+    def record_events(self, user_id: int, events) -> None:
+        """
+        Add ingested events to the user's sliding-window counters.
+
+        Args:
+            user_id: User who generated the events
+            events: TelemetryEvent instances (saved or not)
+        """
+        from .windows import get_store
+
+        get_store().record(user_id, events, time.time())
+
     def evaluate_user(self, user_id: int, window_minutes: int = 10) -> List[dict]:
         """
-        Evaluate all rules for a user based on recent events.
+        Evaluate all rules for a user from the sliding-window counters.
+
+        Reads the counters and cooldowns once (no TelemetryEvent queries) and
+        starts the cooldown of every rule that triggers.
 
         Args:
             user_id: User to evaluate
-            window_minutes: Time window to consider
+            window_minutes: How far back dwell times and flag events count
 
         Returns:
             List of violations: [{'rule': name, 'points': int, 'data': dict}]
         """
-        from .models import TelemetryEvent, RuleViolation
-
-        violations = []
-        cutoff = timezone.now() - timedelta(minutes=window_minutes)
-
-        # Get recent events for this user
-        events = TelemetryEvent.objects.filter(
-            user_id=user_id, timestamp__gte=cutoff
-        ).order_by("-timestamp")
+        from .windows import get_store
 
-        if not events.exists():
-            return violations
+        store = get_store()
+        window = store.snapshot(user_id, [rule.name for rule in self.rules], time.time())
+        lookback = window_minutes * 60
 
+        violations = []
         for rule in self.rules:
             # Check cooldown - don't trigger if recently triggered
-            recent_violation = RuleViolation.objects.filter(
-                user_id=user_id,
-                rule_name=rule.name,
-                timestamp__gte=timezone.now()
-                - timedelta(minutes=rule.cooldown_minutes),
-            ).exists()
-
-            if recent_violation:
+            if rule.name in window.cooling_down:
                 continue
 
             # Evaluate the rule
             try:
-                result = rule.check_function(events, user_id)
+                result = rule.check_function(window, lookback)
                 if result:
                     violations.append(
                         {
@@ -167,124 +168,141 @@ class RuleEngine:
             except Exception as e:
                 logger.error(f"Error evaluating rule {rule.name}: {e}")
 
+        if violations:
+            cooldowns = {rule.name: rule.cooldown_minutes * 60 for rule in self.rules}
+            store.start_cooldowns(
+                user_id, {v["rule"]: cooldowns[v["rule"]] for v in violations}
+            )
+
+        return violations
+
+    def backtest(self, user_id: int, start, end, window_minutes: int = 10) -> List[dict]:
+        """
+        Replay the rules minute by minute over [start, end) from rollups.
+
+        Meant for tuning thresholds on history whose raw events may already be
+        dropped; see RollupSnapshot for what per-minute counts can't show.
+
+        Returns:
+            List of violations: [{'rule': name, 'points': int, 'data': dict, 'minute': datetime}]
+        """
+        from datetime import datetime, timedelta, timezone
+
+        from .models import TelemetryRollup
+        from .windows import RollupSnapshot
+
+        lookback = window_minutes * 60
+        minutes = {}
+        rollups = TelemetryRollup.objects.filter(
+            user_id=user_id, minute__gte=start - timedelta(seconds=lookback), minute__lt=end
+        ).values_list("minute", "event_type", "count")
+        for minute, event_type, count in rollups:
+            minutes.setdefault(int(minute.timestamp()), {})[event_type] = count
+
+        cooldown_until = {}
+        violations = []
+        now = int(start.timestamp()) // 60 * 60 + 60
+        while now <= end.timestamp():
+            cooling_down = {name for name, until in cooldown_until.items() if until > now}
+            window = RollupSnapshot(now, minutes, cooling_down)
+            for rule in self.rules:
+                if rule.name in cooling_down:
+                    continue
+                result = rule.check_function(window, lookback)
+                if result:
+                    violations.append(
+                        {
+                            "rule": rule.name,
+                            "points": rule.risk_points,
+                            "data": result if isinstance(result, dict) else {},
+                            "minute": datetime.fromtimestamp(now, tz=timezone.utc),
+                        }
+                    )
+                    cooldown_until[rule.name] = now + rule.cooldown_minutes * 60
+            now += 60
+
         return violations
 
     # ========== Rule Check Functions ==========
 
-    def _check_fast_navigation(self, events, user_id) -> Optional[dict]:
+    def _check_fast_navigation(self, window, lookback) -> Optional[dict]:
         """Check if user is viewing images too fast (>50 per minute)"""
-        one_minute_ago = timezone.now() - timedelta(minutes=1)
-
-        view_count = events.filter(
-            event_type="dwell", timestamp__gte=one_minute_ago
-        ).count()
+        view_count = window.count("dwell", 60)
 
         if view_count > 50:
             return {"views_per_minute": view_count}
         return None
 
-    def _check_excessive_zoom(self, events, user_id) -> Optional[dict]:
+    def _check_excessive_zoom(self, window, lookback) -> Optional[dict]:
         """Check for excessive zoom events (>30 in 10 seconds)"""
-        ten_seconds_ago = timezone.now() - timedelta(seconds=10)
-
-        zoom_count = events.filter(
-            event_type="zoom", timestamp__gte=ten_seconds_ago
-        ).count()
+        zoom_count = window.count("zoom", 10)
 
         if zoom_count > 30:
             return {"zooms_in_10s": zoom_count}
         return None
 
-    def _check_bot_behavior(self, events, user_id) -> Optional[dict]:
+    def _check_bot_behavior(self, window, lookback) -> Optional[dict]:
         """Check for inhuman dwell times (<200ms repeatedly)"""
-        dwell_events = events.filter(event_type="dwell")[:20]
-
-        short_dwells = 0
-        for event in dwell_events:
-            dwell_ms = event.value.get("duration_ms", 1000)
-            if dwell_ms < 200:
-                short_dwells += 1
+        dwells = window.dwell_durations(lookback)
+        short_dwells = sum(1 for duration_ms in dwells if duration_ms < 200)
 
         # If more than 80% of recent dwells are too short
-        if dwell_events.count() >= 10 and short_dwells / dwell_events.count() > 0.8:
-            return {"short_dwell_ratio": short_dwells / dwell_events.count()}
+        if len(dwells) >= 10 and short_dwells / len(dwells) > 0.8:
+            return {"short_dwell_ratio": short_dwells / len(dwells)}
         return None
 
-    def _check_devtools_copy(self, events, user_id) -> Optional[dict]:
+    def _check_devtools_copy(self, window, lookback) -> Optional[dict]:
         """Check for DevTools + copy attempt combination"""
-        five_minutes_ago = timezone.now() - timedelta(minutes=5)
-
-        devtools_open = events.filter(
-            event_type="devtools", timestamp__gte=five_minutes_ago
-        ).exists()
-
-        copy_attempts = events.filter(
-            event_type="copy", timestamp__gte=five_minutes_ago
-        ).count()
+        devtools_open = window.count("devtools", 300) > 0
+        copy_attempts = window.count("copy", 300)
 
         if devtools_open and copy_attempts > 0:
             return {"devtools": True, "copy_attempts": copy_attempts}
         return None
 
-    def _check_vm_detected(self, events, user_id) -> Optional[dict]:
+    def _check_vm_detected(self, window, lookback) -> Optional[dict]:
         """Check if VM/RDP was detected"""
-        vm_events = events.filter(event_type="vm_detected")[:1]
+        value = window.last("vm_detected", lookback)
 
-        if vm_events.exists():
-            return {"vm_detected": True, "data": vm_events[0].value}
+        if value is not None:
+            return {"vm_detected": True, "data": value}
         return None
 
-    def _check_screenshot_attempt(self, events, user_id) -> Optional[dict]:
+    def _check_screenshot_attempt(self, window, lookback) -> Optional[dict]:
         """Check for print screen key presses"""
-        one_minute_ago = timezone.now() - timedelta(minutes=1)
-
-        screenshot_count = events.filter(
-            event_type="printscreen", timestamp__gte=one_minute_ago
-        ).count()
+        screenshot_count = window.count("printscreen", 60)
 
         if screenshot_count > 0:
             return {"screenshot_attempts": screenshot_count}
         return None
 
-    def _check_copy_attempts(self, events, user_id) -> Optional[dict]:
+    def _check_copy_attempts(self, window, lookback) -> Optional[dict]:
         """Check for multiple copy attempts"""
-        five_minutes_ago = timezone.now() - timedelta(minutes=5)
-
-        copy_count = events.filter(
-            event_type="copy", timestamp__gte=five_minutes_ago
-        ).count()
+        copy_count = window.count("copy", 300)
 
         if copy_count >= 5:
             return {"copy_attempts": copy_count}
         return None
 
-    def _check_context_menu_spam(self, events, user_id) -> Optional[dict]:
+    def _check_context_menu_spam(self, window, lookback) -> Optional[dict]:
         """Check for repeated right-click attempts"""
-        one_minute_ago = timezone.now() - timedelta(minutes=1)
-
-        context_count = events.filter(
-            event_type="contextmenu", timestamp__gte=one_minute_ago
-        ).count()
+        context_count = window.count("contextmenu", 60)
 
         if context_count >= 10:
             return {"context_menu_attempts": context_count}
         return None
 
-    def _check_headless_browser(self, events, user_id) -> Optional[dict]:
+    def _check_headless_browser(self, window, lookback) -> Optional[dict]:
         """Check if headless browser was detected"""
-        headless_events = events.filter(event_type="headless")[:1]
+        value = window.last("headless", lookback)
 
-        if headless_events.exists():
-            return {"headless": True, "data": headless_events[0].value}
+        if value is not None:
+            return {"headless": True, "data": value}
         return None
 
-    def _check_tab_switching(self, events, user_id) -> Optional[dict]:
+    def _check_tab_switching(self, window, lookback) -> Optional[dict]:
         """Check for frequent tab switching"""
-        one_minute_ago = timezone.now() - timedelta(minutes=1)
-
-        blur_count = events.filter(
-            event_type="blur", timestamp__gte=one_minute_ago
-        ).count()
+        blur_count = window.count("blur", 60)
 
         if blur_count >= 20:
             return {"tab_switches": blur_count}
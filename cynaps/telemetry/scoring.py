@@ -114,35 +114,58 @@ class RiskScorer:
 
         return profile
 
-    def decay_risks(self, hours_since_last_event: float = 1.0):
+    def decay_risks(self, hours_since_last_event: float = 1.0) -> dict:
         """
         Decay risk scores for users who have been inactive.
 
+        Scores and levels are recomputed by a single UPDATE (the level with a
+        CASE over UserRiskProfile.RISK_LEVEL_THRESHOLDS), with the same result
+        as decay_risk() + save() on every profile.
+
         Call this periodically (e.g., every hour via cron/celery)
+
+        Returns:
+            {"decayed": int, "transitions": {"<old level>-><new level>": count}}
         """
+        from django.db.models import Count, F, Value
+        from django.db.models.functions import Greatest
+
         from .models import UserRiskProfile
 
+        stats = {"decayed": 0, "transitions": {}}
         decay_points = int(self.DECAY_RATE_PER_HOUR * hours_since_last_event)
         if decay_points < 1:
-            return
+            return stats
 
         # Find profiles that haven't had events recently
         cutoff = timezone.now() - timedelta(hours=hours_since_last_event)
+        new_score = Greatest(F("risk_score") - decay_points, Value(0))
+        new_level = UserRiskProfile.risk_level_expression(new_score)
 
-        profiles = UserRiskProfile.objects.filter(
-            risk_score__gt=0, last_event_at__lt=cutoff
-        )
-
-        decayed_count = 0
-        for profile in profiles:
-            profile.decay_risk(decay_points)
-            profile.save()
-            decayed_count += 1
+        with transaction.atomic():
+            profiles = UserRiskProfile.objects.filter(risk_score__gt=0, last_event_at__lt=cutoff)
+            # Counted just before the UPDATE; a violation landing in between
+            # can make the reported transitions slightly off, never the scores
+            transitions = (
+                profiles.annotate(new_level=new_level)
+                .exclude(risk_level=F("new_level"))
+                .values_list("risk_level", "new_level")
+                .annotate(count=Count("user_id"))
+                .order_by()
+            )
+            stats["transitions"] = {
+                f"{old_level}->{level}": count for old_level, level, count in transitions
+            }
+            stats["decayed"] = profiles.update(
+                risk_score=new_score, risk_level=new_level, updated_at=timezone.now()
+            )
 
-        if decayed_count > 0:
+        if stats["decayed"] > 0:
             logger.info(
-                f"Decayed risk for {decayed_count} users by {decay_points} points"
+                f"Decayed risk for {stats['decayed']} users by {decay_points} points, "
+                f"level changes: {stats['transitions']}"
             )
+        return stats
 
     def get_high_risk_users(self, min_level: str = "high") -> List["UserRiskProfile"]:
         """Get all users at or above a risk level"""
@@ -160,16 +183,18 @@ class RiskScorer:
 
     def get_user_risk_summary(self, user_id: int) -> dict:
         """Get a summary of user's risk status"""
+        from django.db.models import Count
+
         from .models import RuleViolation
+        from .retention import TelemetryRollups
 
         profile = self.get_or_create_profile(user_id)
+        since = timezone.now() - timedelta(hours=24)
 
         recent_violations = (
-            RuleViolation.objects.filter(
-                user_id=user_id, timestamp__gte=timezone.now() - timedelta(hours=24)
-            )
+            RuleViolation.objects.filter(user_id=user_id, timestamp__gte=since)
             .values("rule_name")
-            .annotate(count=models.Count("id"))
+            .annotate(count=Count("id"))
         )
 
         return {
@@ -180,6 +205,8 @@ class RiskScorer:
             "triggered_rules": profile.triggered_rules,
             "last_violation": profile.last_violation_at,
             "recent_violations": list(recent_violations),
+            # Event counts by type, from per-minute rollups
+            "recent_activity": TelemetryRollups.counts(user_id, since),
         }
 
 
@@ -0,0 +1,63 @@
+"""
+Background tasks for telemetry using django-rq
+
+These tasks handle:
+- Flushing buffered telemetry events to the database
+- Rolling events up per minute, creating partitions and applying retention
+"""
+
+import logging
+
+from django_rq import job
+
+logger = logging.getLogger(__name__)
+
+
+@job("low", timeout=600)
+def flush_telemetry_events_job(batch_size=None):
+    """
+    Write buffered telemetry events in large bulk_create batches.
+
+    Scheduled by TelemetryIngestBuffer after events are pushed; safe to run
+    concurrently, since each batch is popped atomically.
+
+    Args:
+        batch_size: Events written per bulk_create
+    """
+    from telemetry.ingest import TelemetryIngestBuffer
+
+    try:
+        stats = TelemetryIngestBuffer.flush(batch_size=batch_size)
+        return {"success": True, **stats}
+    except Exception as e:
+        logger.exception(f"Error flushing telemetry events: {e}")
+        return {"success": False, "error": str(e)}
+
+
+@job("low", timeout=1800)
+def telemetry_maintenance_job(rollup_since=None, retention_days=None):
+    """
+    Periodic telemetry upkeep: per-minute rollups, upcoming daily partitions
+    and retention of raw events and rollups.
+
+    Args:
+        rollup_since: Recompute rollups from this datetime (default: recent minutes)
+        retention_days: Days of raw events to keep
+    """
+    from telemetry.retention import TelemetryPartitions, TelemetryRollups, purge_expired_events
+
+    try:
+        rollups = TelemetryRollups.rollup(start=rollup_since)
+        partitions = TelemetryPartitions.ensure()
+        purged = purge_expired_events(retention_days=retention_days)
+        rollups_purged = TelemetryRollups.purge()
+        return {
+            "success": True,
+            "rollups": rollups,
+            "partitions_created": partitions,
+            "rollups_purged": rollups_purged,
+            **purged,
+        }
+    except Exception as e:
+        logger.exception(f"Error in telemetry maintenance: {e}")
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,91 @@
+import json
+from unittest.mock import patch
+
+from django.test import TestCase
+from fakeredis import FakeRedis
+from projects.tests.factories import ProjectFactory
+from rest_framework.test import APIRequestFactory, force_authenticate
+from tasks.tests.factories import TaskFactory
+from telemetry.api import TelemetryIngestAPI
+from telemetry.ingest import LOW_VALUE_EVENT_TYPES, TelemetryIngestBuffer
+from telemetry.models import TelemetryEvent, UserRiskProfile
+from telemetry.windows import local_store
+
+
+class TelemetryIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = ProjectFactory()
+        cls.task = TaskFactory(project=cls.project)
+        cls.user = cls.project.created_by
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        for module in ('telemetry.ingest', 'telemetry.windows'):
+            for name, value in (('redis_connected', lambda: True), ('get_connection', lambda: self.redis)):
+                patcher = patch(f'{module}.{name}', value)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+        self.jobs = []
+        patcher = patch('telemetry.ingest.start_job_async_or_sync', lambda job, **kwargs: self.jobs.append(job))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(local_store.clear)
+
+    def _post(self, events):
+        request = APIRequestFactory().post('/api/telemetry', {'events': events}, format='json')
+        force_authenticate(request, user=self.user)
+        return TelemetryIngestAPI.as_view(throttle_classes=[])(request)
+
+    def test_post_validates_ids_in_batch_and_buffers(self):
+        events = [
+            {'type': 'click', 'task_id': self.task.id, 'project_id': self.project.id},
+            {'type': 'zoom', 'task_id': 999999, 'project_id': 'abc', 'value': {'level': 2}},
+            {'type': 'not-an-event'},
+        ] + [{'type': 'scroll', 'task_id': self.task.id}] * 20
+
+        # Task and project ids are checked with one query each, nothing is written inline
+        with self.assertNumQueries(2):
+            response = self._post(events)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['received'], 22)
+        self.assertEqual(TelemetryEvent.objects.count(), 0)
+        self.assertEqual(len(self.jobs), 1)
+
+        # A second request shares the already scheduled flush
+        self._post([{'type': 'click'}])
+        self.assertEqual(len(self.jobs), 1)
+
+        stats = TelemetryIngestBuffer.flush(batch_size=10)
+        self.assertEqual(stats, {'written': 23, 'batches': 3})
+
+        click = TelemetryEvent.objects.filter(event_type='click', task__isnull=False).get()
+        self.assertEqual((click.task_id, click.project_id), (self.task.id, self.project.id))
+        zoom = TelemetryEvent.objects.get(event_type='zoom')
+        self.assertIsNone(zoom.task_id)
+        self.assertEqual(zoom.value, {'level': 2, 'skipped_task_id': 999999, 'skipped_project_id': 'abc'})
+        self.assertIsNotNone(UserRiskProfile.objects.get(user=self.user).last_event_at)
+
+    def test_overload_sheds_low_value_events_first(self):
+        events = [TelemetryEvent(user_id=self.user.id, event_type=t) for t in ('scroll', 'mouse_entropy', 'copy')]
+
+        with patch('telemetry.ingest.TELEMETRY_INGEST_QUEUE_LIMIT', 10):
+            self.assertEqual(TelemetryIngestBuffer.shed(events, 7), events)
+            kept = TelemetryIngestBuffer.shed(events, 8)
+            self.assertEqual([event.event_type for event in kept], ['copy'])
+            self.assertEqual(TelemetryIngestBuffer.shed(events, 10), [])
+
+            self.redis.rpush('telemetry_ingest:queue', *['{}'] * 9)
+            self.assertEqual(TelemetryIngestBuffer.push(events), 2)
+        queued = [json.loads(raw) for raw in self.redis.lrange('telemetry_ingest:queue', 9, -1)]
+        self.assertEqual([event['event_type'] for event in queued], ['copy'])
+        self.assertTrue(LOW_VALUE_EVENT_TYPES.isdisjoint(event['event_type'] for event in queued))
+
+    def test_writes_inline_without_redis(self):
+        with patch('telemetry.ingest.redis_connected', lambda: False):
+            response = self._post([{'type': 'copy'}, {'type': 'blur'}])
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(TelemetryEvent.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.jobs, [])
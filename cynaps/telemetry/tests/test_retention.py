@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from telemetry.models import TelemetryEvent, TelemetryRollup
+from telemetry.retention import TelemetryPartitions, TelemetryRollups, purge_expired_events
+from telemetry.rules import rule_engine
+from telemetry.scoring import risk_scorer
+from users.tests.factories import UserFactory
+
+
+class TelemetryRetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def _events(self, event_type, count, ago):
+        timestamp = timezone.now() - ago
+        TelemetryEvent.objects.bulk_create(
+            [TelemetryEvent(user=self.user, event_type=event_type, timestamp=timestamp) for _ in range(count)]
+        )
+
+    def test_rollup_is_idempotent_and_picks_up_late_events(self):
+        self._events('click', 3, timedelta(minutes=5))
+        self._events('zoom', 2, timedelta(minutes=5))
+        self._events('click', 1, timedelta(minutes=2))
+        # The current minute is incomplete and left for the next run
+        self._events('click', 1, timedelta(seconds=0))
+
+        self.assertEqual(TelemetryRollups.rollup(), 3)
+        self.assertEqual(TelemetryRollups.rollup(), 3)
+        self.assertEqual(TelemetryRollup.objects.count(), 3)
+
+        self._events('zoom', 4, timedelta(minutes=5))
+        TelemetryRollups.rollup()
+        since = timezone.now() - timedelta(hours=1)
+        self.assertEqual(TelemetryRollups.counts(self.user.id, since), {'click': 4, 'zoom': 6})
+        self.assertEqual(risk_scorer.get_user_risk_summary(self.user.id)['recent_activity'], {'click': 4, 'zoom': 6})
+
+    def test_purge_expired_events_in_batches(self):
+        self.assertFalse(TelemetryPartitions.is_partitioned())
+        self._events('click', 5, timedelta(days=40))
+        self._events('click', 2, timedelta(days=1))
+        TelemetryRollup.objects.create(
+            user=self.user, minute=timezone.now() - timedelta(days=400), event_type='click', count=1
+        )
+
+        self.assertEqual(purge_expired_events(dry_run=True), {'partitions_dropped': [], 'rows_deleted': 5})
+        self.assertEqual(TelemetryEvent.objects.count(), 7)
+
+        with patch('telemetry.retention.TELEMETRY_RETENTION_BATCH_SIZE', 2):
+            self.assertEqual(purge_expired_events(), {'partitions_dropped': [], 'rows_deleted': 5})
+        self.assertEqual(TelemetryEvent.objects.count(), 2)
+        self.assertEqual(TelemetryRollups.purge(), 1)
+
+    def test_maintenance_command(self):
+        self._events('copy', 2, timedelta(days=3))
+        self._events('copy', 1, timedelta(days=45))
+
+        since = (timezone.now() - timedelta(days=4)).strftime('%Y-%m-%d')
+        call_command('telemetry_maintenance', '--rollup-since', since, stdout=StringIO())
+
+        self.assertEqual(TelemetryEvent.objects.count(), 2)
+        self.assertEqual(sum(TelemetryRollup.objects.values_list('count', flat=True)), 2)
+
+    def test_backtest_replays_rules_from_rollups(self):
+        start = (timezone.now() - timedelta(hours=2)).replace(second=0, microsecond=0)
+        minute = start + timedelta(minutes=30)
+        TelemetryRollup.objects.bulk_create(
+            [
+                TelemetryRollup(user=self.user, minute=minute, event_type='blur', count=25),
+                TelemetryRollup(user=self.user, minute=minute, event_type='copy', count=3),
+                TelemetryRollup(user=self.user, minute=minute + timedelta(minutes=1), event_type='copy', count=3),
+            ]
+        )
+
+        violations = rule_engine.backtest(self.user.id, start, start + timedelta(hours=1))
+
+        rules = [(v['rule'], v['minute'] - start) for v in violations]
+        self.assertEqual(
+            rules,
+            [('tab_switching', timedelta(minutes=31)), ('copy_attempts', timedelta(minutes=32))],
+        )
+        self.assertEqual(violations[1]['data'], {'copy_attempts': 6})
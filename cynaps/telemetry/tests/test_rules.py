@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from fakeredis import FakeRedis
+from telemetry.models import TelemetryEvent
+from telemetry.rules import RuleEngine
+from telemetry.windows import local_store
+
+
+def _events(event_type, count, seconds_ago=0, value=None):
+    timestamp = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+    return [TelemetryEvent(event_type=event_type, value=value or {}, timestamp=timestamp) for _ in range(count)]
+
+
+class RuleEngineWindowTests(SimpleTestCase):
+    """Rules evaluated from sliding-window counters in Redis"""
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        for target, value in (
+            ('telemetry.windows.redis_connected', lambda: True),
+            ('telemetry.windows.get_connection', lambda: self.redis),
+        ):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.engine = RuleEngine()
+
+    def _rules(self, user_id=1):
+        return {violation['rule']: violation for violation in self.engine.evaluate_user(user_id)}
+
+    def test_counts_respect_windows(self):
+        self.engine.record_events(1, _events('zoom', 31, seconds_ago=30) + _events('blur', 20, seconds_ago=30))
+        rules = self._rules()
+        # zooms are older than the 10s window, tab switches within the minute
+        self.assertNotIn('excessive_zoom', rules)
+        self.assertEqual(rules['tab_switching']['data'], {'tab_switches': 20})
+
+        self.engine.record_events(2, _events('zoom', 31) + _events('blur', 20, seconds_ago=90))
+        rules = self._rules(2)
+        self.assertEqual(rules['excessive_zoom']['data'], {'zooms_in_10s': 31})
+        self.assertNotIn('tab_switching', rules)
+
+    def test_rules_do_not_query_events(self):
+        self.engine.record_events(
+            1,
+            _events('devtools', 1, seconds_ago=120)
+            + _events('copy', 5)
+            + _events('headless', 1, value={'webdriver': True})
+            + _events('dwell', 12, value={'duration_ms': 50}),
+        )
+        # SimpleTestCase fails on any database query
+        rules = self._rules()
+
+        self.assertEqual(rules['devtools_copy']['data'], {'devtools': True, 'copy_attempts': 5})
+        self.assertEqual(rules['copy_attempts']['points'], 25)
+        self.assertEqual(rules['headless_browser']['data'], {'headless': True, 'data': {'webdriver': True}})
+        self.assertEqual(rules['bot_behavior']['data'], {'short_dwell_ratio': 1.0})
+
+    def test_cooldown_suppresses_repeat(self):
+        self.engine.record_events(1, _events('printscreen', 1))
+        self.assertIn('screenshot_attempt', self._rules())
+        self.engine.record_events(1, _events('printscreen', 1))
+        self.assertNotIn('screenshot_attempt', self._rules())
+
+        self.redis.delete('telemetry_window:1:cooldown:screenshot_attempt')
+        self.assertEqual(self._rules()['screenshot_attempt']['data'], {'screenshot_attempts': 2})
+
+    def test_local_store_without_redis(self):
+        local_store.clear()
+        self.addCleanup(local_store.clear)
+        with patch('telemetry.windows.redis_connected', lambda: False):
+            self.engine.record_events(1, _events('contextmenu', 10) + _events('vm_detected', 1, value={'rdp': 1}))
+            rules = self._rules()
+            self.assertEqual(rules['context_menu_spam']['data'], {'context_menu_attempts': 10})
+            self.assertEqual(rules['vm_detected']['data'], {'vm_detected': True, 'data': {'rdp': 1}})
+            self.assertEqual(self._rules(), {})
+        self.assertEqual(self.redis.keys(), [])
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from telemetry.models import UserRiskProfile
+from telemetry.scoring import RiskScorer
+from users.tests.factories import UserFactory
+
+
+class RiskDecayTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        # (score, stored level, last event): crossings of every threshold, a
+        # stale stored level, an active user and one already at zero
+        rows = [
+            (0, 'low', now - timedelta(hours=3)),
+            (3, 'low', now - timedelta(hours=3)),
+            (49, 'low', now - timedelta(hours=3)),
+            (53, 'medium', now - timedelta(hours=3)),
+            (77, 'high', now - timedelta(hours=3)),
+            (102, 'critical', now - timedelta(hours=3)),
+            (150, 'critical', now - timedelta(hours=3)),
+            (80, 'low', now - timedelta(hours=3)),
+            (120, 'critical', now),
+            (60, 'medium', None),
+        ]
+        for score, level, last_event_at in rows:
+            UserRiskProfile.objects.create(
+                user=UserFactory(), risk_score=score, risk_level=level, last_event_at=last_event_at
+            )
+
+    def test_set_based_decay_matches_per_row_path(self):
+        cutoff = timezone.now() - timedelta(hours=1)
+        expected = {}
+        for profile in UserRiskProfile.objects.all():
+            if profile.risk_score > 0 and profile.last_event_at and profile.last_event_at < cutoff:
+                profile.decay_risk(5)
+            expected[profile.user_id] = (profile.risk_score, profile.risk_level)
+
+        # Transition counts and one UPDATE, inside a savepoint
+        with self.assertNumQueries(4):
+            stats = RiskScorer().decay_risks(hours_since_last_event=1.0)
+
+        actual = {p.user_id: (p.risk_score, p.risk_level) for p in UserRiskProfile.objects.all()}
+        self.assertEqual(actual, expected)
+        self.assertEqual(stats['decayed'], 7)
+        self.assertEqual(
+            stats['transitions'], {'medium->low': 1, 'high->medium': 1, 'critical->high': 1, 'low->high': 1}
+        )
+
+    def test_no_decay_below_one_point(self):
+        self.assertEqual(RiskScorer().decay_risks(hours_since_last_event=0.1), {'decayed': 0, 'transitions': {}})
+        self.assertEqual(UserRiskProfile.objects.get(risk_score=3).risk_score, 3)
@@ -0,0 +1,284 @@
+"""
+Sliding-window counters for the telemetry rule engine.
+
+Rules used to query TelemetryEvent on every ingest: a cooldown EXISTS and one
+or more COUNTs per rule, 20+ queries per batch. Instead, ingest records what
+the rules need in time-bucketed counters, and evaluating every rule reads them
+back with one pipelined Redis round trip. TelemetryEvent stays the append-only
+audit log and is never read by the rules.
+
+Event counts are kept in ring buffers of buckets at two resolutions:
+
+    telemetry_window:<user_id>:1:<bucket>   -> {event_type: count}   1s buckets, last 10s
+    telemetry_window:<user_id>:10:<bucket>  -> {event_type: count}  10s buckets, last 5min
+
+Bucket keys expire once they fall out of the ring. A window count sums the
+buckets it covers, so it is exact up to one bucket at the window's far edge.
+The rules also read:
+
+    telemetry_window:<user_id>:dwell            -> ["<ts>:<duration_ms>", ...] latest dwells
+    telemetry_window:<user_id>:last             -> {event_type: {"ts", "value"}} flag events
+    telemetry_window:<user_id>:cooldown:<rule>  -> 1, expiring with the rule's cooldown
+
+Without Redis the same data is kept in an in-process store, which is only
+accurate while a user's telemetry is handled by a single worker process.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from core.redis import redis_connected
+from django.conf import settings
+from django_rq import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+TELEMETRY_WINDOW_KEY_PREFIX = getattr(settings, "TELEMETRY_WINDOW_REDIS_KEY_PREFIX", "telemetry_window")
+
+# (bucket seconds, ring length in seconds)
+RESOLUTIONS = ((1, 10), (10, 300))
+
+# Latest dwell events kept for the bot-behaviour rule
+DWELL_HISTORY = 20
+
+# Events whose latest occurrence (with its value) is kept
+FLAG_EVENT_TYPES = ("vm_detected", "headless")
+
+# Dwell history and flag events are kept this long
+LOOKBACK_SECONDS = 600
+
+
+def _bucket_key(user_id, resolution, bucket):
+    return f"{TELEMETRY_WINDOW_KEY_PREFIX}:{user_id}:{resolution}:{bucket}"
+
+
+def _dwell_key(user_id):
+    return f"{TELEMETRY_WINDOW_KEY_PREFIX}:{user_id}:dwell"
+
+
+def _last_key(user_id):
+    return f"{TELEMETRY_WINDOW_KEY_PREFIX}:{user_id}:last"
+
+
+def _cooldown_key(user_id, rule_name):
+    return f"{TELEMETRY_WINDOW_KEY_PREFIX}:{user_id}:cooldown:{rule_name}"
+
+
+def _resolution_for(seconds):
+    """Finest resolution whose ring covers the window"""
+    for resolution, ring in RESOLUTIONS:
+        if seconds <= ring:
+            return resolution, ring
+    raise ValueError(f"Window of {seconds}s exceeds the longest ring ({RESOLUTIONS[-1][1]}s)")
+
+
+def _window_buckets(resolution, ring, now):
+    current = int(now // resolution)
+    return range(current - ring // resolution + 1, current + 1)
+
+
+def _event_entries(events, now):
+    """(epoch seconds, event_type, value) per event, oldest first, timestamps capped at now"""
+    entries = []
+    for event in events:
+        timestamp = event.timestamp.timestamp() if event.timestamp else now
+        entries.append((min(timestamp, now), event.event_type, event.value or {}))
+    entries.sort(key=lambda entry: entry[0])
+    return entries
+
+
+class WindowSnapshot:
+    """Counters of one user at one instant, as read by the rules"""
+
+    def __init__(self, now, buckets, dwells, last, cooling_down):
+        self.now = now
+        self._buckets = buckets  # {(resolution, bucket): {event_type: count}}
+        self._dwells = dwells  # [(ts, duration_ms)], newest first
+        self._last = last  # {event_type: {"ts", "value"}}
+        self.cooling_down = cooling_down  # {rule_name}
+
+    def count(self, event_type, seconds):
+        """Events of a type in the last `seconds`"""
+        resolution, _ = _resolution_for(seconds)
+        return sum(
+            self._buckets.get((resolution, bucket), {}).get(event_type, 0)
+            for bucket in _window_buckets(resolution, seconds, self.now)
+        )
+
+    def dwell_durations(self, seconds=LOOKBACK_SECONDS):
+        """Durations (ms) of the latest dwell events in the last `seconds`, newest first"""
+        cutoff = self.now - seconds
+        return [duration for ts, duration in self._dwells if ts >= cutoff]
+
+    def last(self, event_type, seconds=LOOKBACK_SECONDS):
+        """Value of the latest event of a flag type in the last `seconds`, or None"""
+        entry = self._last.get(event_type)
+        if entry and entry["ts"] >= self.now - seconds:
+            return entry["value"]
+        return None
+
+
+class RollupSnapshot:
+    """
+    Counters rebuilt from per-minute rollups, for back-testing rules.
+
+    Windows are rounded up to whole minutes, dwell durations are not kept in
+    rollups (the bot-behaviour rule never triggers) and flag events carry no
+    value.
+    """
+
+    def __init__(self, now, minutes, cooling_down):
+        self.now = now  # end of a minute, epoch seconds
+        self._minutes = minutes  # {minute epoch seconds: {event_type: count}}
+        self.cooling_down = cooling_down
+
+    def count(self, event_type, seconds):
+        start = self.now - -(-seconds // 60) * 60
+        return sum(
+            self._minutes.get(minute, {}).get(event_type, 0) for minute in range(int(start), int(self.now), 60)
+        )
+
+    def dwell_durations(self, seconds=LOOKBACK_SECONDS):
+        return []
+
+    def last(self, event_type, seconds=LOOKBACK_SECONDS):
+        return {} if self.count(event_type, seconds) else None
+
+
+class RedisWindowStore:
+    """Window counters in Redis"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+    def record(self, user_id, events, now):
+        counts = Counter()
+        pipe = self.redis.pipeline(transaction=False)
+        for timestamp, event_type, value in _event_entries(events, now):
+            for resolution, ring in RESOLUTIONS:
+                if now - timestamp < ring:
+                    counts[(resolution, int(timestamp // resolution), event_type)] += 1
+            if event_type == "dwell":
+                pipe.lpush(_dwell_key(user_id), f"{timestamp}:{value.get('duration_ms', 1000)}")
+            elif event_type in FLAG_EVENT_TYPES:
+                pipe.hset(_last_key(user_id), event_type, json.dumps({"ts": timestamp, "value": value}))
+
+        for (resolution, bucket, event_type), count in counts.items():
+            key = _bucket_key(user_id, resolution, bucket)
+            pipe.hincrby(key, event_type, count)
+            pipe.expire(key, dict(RESOLUTIONS)[resolution] + resolution)
+        pipe.ltrim(_dwell_key(user_id), 0, DWELL_HISTORY - 1)
+        pipe.expire(_dwell_key(user_id), LOOKBACK_SECONDS)
+        pipe.expire(_last_key(user_id), LOOKBACK_SECONDS)
+        pipe.execute()
+
+    def snapshot(self, user_id, rule_names, now):
+        bucket_ids = [
+            (resolution, bucket)
+            for resolution, ring in RESOLUTIONS
+            for bucket in _window_buckets(resolution, ring, now)
+        ]
+        rule_names = list(rule_names)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for resolution, bucket in bucket_ids:
+            pipe.hgetall(_bucket_key(user_id, resolution, bucket))
+        pipe.lrange(_dwell_key(user_id), 0, DWELL_HISTORY - 1)
+        pipe.hgetall(_last_key(user_id))
+        pipe.mget([_cooldown_key(user_id, name) for name in rule_names])
+        *raw_buckets, raw_dwells, raw_last, raw_cooldowns = pipe.execute()
+
+        buckets = {
+            bucket_id: {field.decode(): int(count) for field, count in raw.items()}
+            for bucket_id, raw in zip(bucket_ids, raw_buckets)
+            if raw
+        }
+        dwells = []
+        for entry in raw_dwells:
+            ts, duration = entry.decode().split(":", 1)
+            dwells.append((float(ts), float(duration)))
+        last = {field.decode(): json.loads(raw) for field, raw in raw_last.items()}
+        cooling_down = {name for name, raw in zip(rule_names, raw_cooldowns) if raw is not None}
+        return WindowSnapshot(now, buckets, dwells, last, cooling_down)
+
+    def start_cooldowns(self, user_id, cooldowns):
+        pipe = self.redis.pipeline(transaction=False)
+        for rule_name, seconds in cooldowns.items():
+            pipe.set(_cooldown_key(user_id, rule_name), 1, ex=max(int(seconds), 1))
+        pipe.execute()
+
+
+class LocalWindowStore:
+    """Window counters in process memory, used when Redis is unavailable"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = defaultdict(self._empty)
+
+    @staticmethod
+    def _empty():
+        return {
+            "buckets": defaultdict(Counter),
+            "dwells": deque(maxlen=DWELL_HISTORY),
+            "last": {},
+            "cooldowns": {},
+        }
+
+    def _prune(self, state, now):
+        for resolution, bucket in list(state["buckets"]):
+            if (int(now // resolution) - bucket) * resolution >= dict(RESOLUTIONS)[resolution]:
+                del state["buckets"][(resolution, bucket)]
+        state["cooldowns"] = {name: until for name, until in state["cooldowns"].items() if until > now}
+
+    def record(self, user_id, events, now):
+        with self._lock:
+            state = self._users[user_id]
+            for timestamp, event_type, value in _event_entries(events, now):
+                for resolution, ring in RESOLUTIONS:
+                    if now - timestamp < ring:
+                        state["buckets"][(resolution, int(timestamp // resolution))][event_type] += 1
+                if event_type == "dwell":
+                    state["dwells"].appendleft((timestamp, float(value.get("duration_ms", 1000))))
+                elif event_type in FLAG_EVENT_TYPES:
+                    state["last"][event_type] = {"ts": timestamp, "value": value}
+            self._prune(state, now)
+
+    def snapshot(self, user_id, rule_names, now):
+        with self._lock:
+            state = self._users[user_id]
+            self._prune(state, now)
+            return WindowSnapshot(
+                now,
+                {bucket_id: dict(counts) for bucket_id, counts in state["buckets"].items()},
+                list(state["dwells"]),
+                dict(state["last"]),
+                set(state["cooldowns"]) & set(rule_names),
+            )
+
+    def start_cooldowns(self, user_id, cooldowns):
+        now = time.time()
+        with self._lock:
+            state = self._users[user_id]
+            for rule_name, seconds in cooldowns.items():
+                state["cooldowns"][rule_name] = now + seconds
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+local_store = LocalWindowStore()
+
+
+def get_store():
+    """Redis store when connected, otherwise the in-process store"""
+    if redis_connected():
+        try:
+            return RedisWindowStore(get_connection())
+        except Exception as e:
+            logger.error(f"Telemetry window store unavailable, using process memory: {e}")
+    return local_store
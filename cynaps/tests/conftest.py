@@ -333,6 +333,16 @@ def redis_client():
         yield
 
 
+@pytest.fixture(autouse=True)
+def webhook_routes():
+    """Routes cached in this process can outlive the rolled back rows of a previous test"""
+    from webhooks.routing import clear_routes
+
+    clear_routes()
+    yield
+    clear_routes()
+
+
 @pytest.fixture
 def ml_backend_for_test_predict(ml_backend):
     # ML backend with single prediction per task
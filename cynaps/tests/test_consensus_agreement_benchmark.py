@@ -0,0 +1,107 @@
+"""
+Benchmark for pairwise agreement in consensus consolidation.
+
+Compares the previous per-pair loop (pairs, then every ordered peer pair again,
+then each annotation against the consolidated result) with AgreementMatrix,
+which computes every unordered pair once. Runs bounding-box and NER annotations
+with overlap 3, 5 and 10.
+
+Run with:
+    pytest tests/test_consensus_agreement_benchmark.py -s
+"""
+
+import random
+import time
+from itertools import combinations
+
+import pytest
+from annotators.consensus_service import AgreementMatrix, BoundingBoxConsolidation, NERConsolidation
+
+REGIONS = 100
+
+
+class CountingStrategy:
+    """Wraps a strategy and counts calculate_agreement calls"""
+
+    def __init__(self, strategy):
+        self.strategy = strategy
+        self.calls = 0
+
+    def calculate_agreement(self, ann1, ann2):
+        self.calls += 1
+        return self.strategy.calculate_agreement(ann1, ann2)
+
+
+def make_boxes(rng):
+    return [
+        {
+            'type': 'rectanglelabels',
+            'value': {
+                'x': rng.uniform(0, 90),
+                'y': rng.uniform(0, 90),
+                'width': rng.uniform(2, 10),
+                'height': rng.uniform(2, 10),
+                'rectanglelabels': [rng.choice(['car', 'person'])],
+            },
+        }
+        for _ in range(REGIONS)
+    ]
+
+
+def make_entities(rng):
+    entities = []
+    for i in range(REGIONS):
+        start = i * 10 + rng.randint(0, 3)
+        entities.append(
+            {
+                'type': 'labels',
+                'value': {'start': start, 'end': start + 5, 'labels': [rng.choice(['PER', 'ORG'])]},
+            }
+        )
+    return entities
+
+
+def per_pair_agreement(strategy, annotations, consolidated):
+    """The loop AgreementMatrix replaces"""
+    for ann1, ann2 in combinations(annotations, 2):
+        strategy.calculate_agreement(ann1['result'], ann2['result'])
+    for ann in annotations:
+        strategy.calculate_agreement(ann['result'], consolidated)
+        for other in annotations:
+            if other is not ann:
+                strategy.calculate_agreement(ann['result'], other['result'])
+
+
+def matrix_agreement(strategy, annotations, consolidated):
+    matrix = AgreementMatrix(strategy, annotations)
+    matrix.individual_agreements(consolidated)
+    for index in range(len(annotations)):
+        matrix.peer_average(index)
+
+
+@pytest.mark.parametrize('strategy,make_result', [(BoundingBoxConsolidation, make_boxes), (NERConsolidation, make_entities)])
+@pytest.mark.parametrize('overlap', [3, 5, 10])
+def test_agreement_matrix_benchmark(strategy, make_result, overlap):
+    rng = random.Random(overlap)
+    annotations = [{'assignment': None, 'result': make_result(rng)} for _ in range(overlap)]
+    consolidated = annotations[0]['result']
+
+    timings = {}
+    calls = {}
+    for name, run in (('per_pair', per_pair_agreement), ('matrix', matrix_agreement)):
+        counting = CountingStrategy(strategy)
+        started = time.perf_counter()
+        run(counting, annotations, consolidated)
+        timings[name] = time.perf_counter() - started
+        calls[name] = counting.calls
+
+    pairs = overlap * (overlap - 1) // 2
+    assert calls['per_pair'] == pairs + overlap + overlap * (overlap - 1)
+    assert calls['matrix'] == pairs + overlap
+
+    print(
+        f'\n{strategy.__name__} overlap={overlap} regions={REGIONS}: '
+        f'per-pair {calls["per_pair"]} calls {timings["per_pair"] * 1000:.1f}ms, '
+        f'matrix {calls["matrix"]} calls {timings["matrix"] * 1000:.1f}ms '
+        f'({timings["per_pair"] / max(timings["matrix"], 1e-9):.1f}x)'
+    )
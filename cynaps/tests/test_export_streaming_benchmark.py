@@ -0,0 +1,110 @@
+"""
+Benchmark for the streaming export engine.
+
+Builds a project of BENCHMARK_EXPORT_TASKS tasks (half of them annotated) and
+exports it with only_with_annotations, once with the previous implementation
+(full task id list, per-task annotations.exists(), single-threaded
+serialization, temp file re-read for the MD5) and once with
+Export.export_to_file. Reports wall time and peak Python heap (tracemalloc)
+of each.
+
+Run with:
+    pytest tests/test_export_streaming_benchmark.py -s
+For the 1M-task figures:
+    BENCHMARK_EXPORT_TASKS=1000000 pytest tests/test_export_streaming_benchmark.py -s
+"""
+
+import hashlib
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+from core.utils.common import batch
+from core.utils.io import SerializableGenerator
+from data_export.models import Export
+from data_export.serializers import ExportDataSerializer
+from django.conf import settings
+from django.core.files import temp as tempfile
+from projects.tests.factories import ProjectFactory
+from tasks.models import Annotation, Task
+
+TASKS = int(os.environ.get('BENCHMARK_EXPORT_TASKS', 5000))
+INSERT_BATCH_SIZE = 10000
+
+
+def create_tasks(project):
+    for ids in batch(range(TASKS), INSERT_BATCH_SIZE):
+        tasks = Task.objects.bulk_create(
+            [Task(project=project, data={'text': f'task {i} ' + 'x' * 200}) for i in ids]
+        )
+        Annotation.objects.bulk_create(
+            [
+                Annotation(task=task, project=project, completed_by=project.created_by, result=[])
+                for task in tasks[::2]
+            ]
+        )
+
+
+def legacy_export_to_file(export, task_filter_options, serialization_options):
+    """Export.export_to_file before the streaming engine"""
+
+    def get_export_data():
+        task_ids = list(export.project.tasks.distinct().values_list('id', flat=True))
+        options = export._get_export_serializer_option(serialization_options)
+        for ids in batch(task_ids, settings.BATCH_SIZE):
+            tasks = list(export.get_task_queryset(ids, None))
+            if task_filter_options.get('only_with_annotations'):
+                tasks = [task for task in tasks if task.annotations.exists()]
+            yield from ExportDataSerializer(tasks, many=True, **options).data
+
+    iter_json = json.JSONEncoder(ensure_ascii=False).iterencode(SerializableGenerator(get_export_data()))
+    with tempfile.NamedTemporaryFile(suffix='.export.json', dir=settings.FILE_UPLOAD_TEMP_DIR) as file:
+        for chunk in iter_json:
+            file.write(chunk.encode('utf-8'))
+        file.seek(0)
+        md5 = export.eval_md5(file)
+        file.seek(0)
+        export.save_file(file, md5)
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_streaming():
+    project = ProjectFactory()
+    create_tasks(project)
+    task_filter_options = {'only_with_annotations': True}
+    serialization_options = {}
+
+    legacy = Export.objects.create(project=project)
+    legacy_time, legacy_peak = measure(
+        lambda: legacy_export_to_file(legacy, task_filter_options, serialization_options)
+    )
+    export = Export.objects.create(project=project)
+    stream_time, stream_peak = measure(
+        lambda: export.export_to_file(
+            task_filter_options=task_filter_options, serialization_options=serialization_options
+        )
+    )
+    export.refresh_from_db()
+
+    print(
+        f'\n{TASKS} tasks, {TASKS - TASKS // 2} annotated, only_with_annotations\n'
+        f'  previous export:  {legacy_time:8.1f} s, peak {legacy_peak:8.1f} MiB\n'
+        f'  streaming export: {stream_time:8.1f} s, peak {stream_peak:8.1f} MiB '
+        f'({legacy_time / stream_time:.1f}x faster)'
+    )
+    assert export.status == Export.Status.COMPLETED
+    assert export.counters['task_number'] == TASKS - TASKS // 2
+    assert export.md5 == hashlib.md5(export.file.open('rb').read()).hexdigest()   # nosec
+    assert stream_time < legacy_time
@@ -0,0 +1,80 @@
+"""
+Benchmark for random next-task sampling.
+
+Compares the previous ORDER BY random() sampling, with a has_lock() check per
+candidate, against the keyset window used by _get_random_unlocked, which
+probes a random id range and checks locks for the whole window in one query.
+Runs projects with 1k, 10k and 100k tasks where most tasks are locked by
+other annotators.
+
+Run with:
+    pytest tests/test_next_task_sampling_benchmark.py -s
+"""
+
+import time
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from projects.functions.next_task import _get_random_unlocked
+from projects.tests.factories import ProjectFactory
+from tasks.models import Task, TaskLock
+from users.tests.factories import UserFactory
+
+ROUNDS = 5
+LOCKED_SHARE = 0.9
+
+
+def order_by_random_unlocked(task_query, user):
+    """The sampling _get_random_unlocked replaces"""
+    for task in task_query.order_by('?').only('id')[: settings.RANDOM_NEXT_TASK_SAMPLE_SIZE]:
+        try:
+            task = Task.objects.select_for_update(skip_locked=True).get(pk=task.id)
+            if not task.has_lock(user):
+                return task
+        except Task.DoesNotExist:
+            pass
+
+
+def measure(run):
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(ROUNDS):
+            assert run() is not None
+    return (time.perf_counter() - started) / ROUNDS, len(queries.captured_queries) / ROUNDS
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', [1000, 10000, 100000])
+def test_next_task_sampling_benchmark(size):
+    project = ProjectFactory()
+    user, other = UserFactory(), UserFactory()
+    Task.objects.bulk_create(
+        [Task(project=project, data={'i': i}, overlap=1) for i in range(size)], batch_size=5000
+    )
+    expire_at = timezone.now() + timedelta(hours=1)
+    task_ids = list(Task.objects.filter(project=project).values_list('id', flat=True))
+    TaskLock.objects.bulk_create(
+        [
+            TaskLock(task_id=task_id, user=other, expire_at=expire_at)
+            for index, task_id in enumerate(task_ids)
+            if index % 10 < LOCKED_SHARE * 10
+        ],
+        batch_size=5000,
+    )
+    tasks = Task.objects.filter(project=project)
+
+    legacy_time, legacy_queries = measure(lambda: order_by_random_unlocked(tasks, user))
+    window_time, window_queries = measure(lambda: _get_random_unlocked(tasks, user, project=project))
+
+    assert window_queries < legacy_queries
+
+    print(
+        f'\nnext task, {size} tasks ({LOCKED_SHARE:.0%} locked): '
+        f'ORDER BY random() {legacy_time * 1000:.1f}ms {legacy_queries:.0f} queries, '
+        f'keyset window {window_time * 1000:.1f}ms {window_queries:.0f} queries '
+        f'({legacy_time / max(window_time, 1e-9):.1f}x)'
+    )
@@ -0,0 +1,91 @@
+"""
+Benchmark for webhook delivery.
+
+Sends events to a local stub receiver that answers after a fixed latency, the
+way a real receiver does its own work. Compares the previous loop (one
+requests.post per hook, new connection and JSON encoding each time, hooks one
+after another) against webhooks.delivery.deliver (body encoded once, pooled
+keep-alive connections, hooks sent concurrently). Reports deliveries per
+second and connections opened.
+
+Run with:
+    pytest tests/test_webhook_delivery_benchmark.py -s
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from django.conf import settings
+from webhooks import delivery
+from webhooks.models import Webhook
+
+HOOKS = 8
+EVENTS = 20
+LATENCY = 0.02
+PAYLOAD = {'tasks': [{'id': i, 'data': {'text': 'x' * 200}} for i in range(200)]}
+
+
+class StubReceiver(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(LATENCY)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def receiver():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubReceiver)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def legacy_deliver(webhooks, action, payload):
+    """The loop deliver() replaces"""
+    for webhook in webhooks:
+        data = {'action': action}
+        if webhook.send_payload and payload:
+            data.update(payload)
+        requests.post(webhook.url, headers=webhook.headers, json=data, timeout=settings.WEBHOOK_TIMEOUT)
+
+
+def measure(send, webhooks):
+    StubReceiver.connections = 0
+    start = time.perf_counter()
+    for _ in range(EVENTS):
+        send(webhooks, 'TASKS_CREATED', PAYLOAD)
+    elapsed = time.perf_counter() - start
+    return len(webhooks) * EVENTS / elapsed, StubReceiver.connections
+
+
+def test_webhook_delivery_throughput(receiver):
+    webhooks = [Webhook(url=f'{receiver}/hook/{i}', headers={}, send_payload=True) for i in range(HOOKS)]
+
+    legacy_rate, legacy_connections = measure(legacy_deliver, webhooks)
+    rate, connections = measure(delivery.deliver, webhooks)
+
+    print(
+        f'\n{HOOKS} hooks x {EVENTS} events, receiver latency {LATENCY * 1000:.0f} ms\n'
+        f'  requests.post loop: {legacy_rate:8.1f} deliveries/s, {legacy_connections} connections\n'
+        f'  deliver():          {rate:8.1f} deliveries/s, {connections} connections ({rate / legacy_rate:.1f}x)'
+    )
+    assert rate > legacy_rate
+    assert connections < legacy_connections
@@ -0,0 +1,119 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+import requests
+import requests_mock
+from django.utils import timezone
+from organizations.tests.factories import OrganizationFactory
+from webhooks import delivery
+from webhooks.models import Webhook, WebhookAction, WebhookDelivery
+
+URL = 'http://receiver.test/hook'
+
+
+@pytest.fixture(autouse=True)
+def no_redis():
+    with patch('webhooks.delivery.redis_connected', return_value=False):
+        yield
+
+
+@pytest.fixture
+def organization():
+    return OrganizationFactory()
+
+
+def make_webhook(organization, url=URL, **kwargs):
+    return Webhook.objects.create(organization=organization, project=None, url=url, **kwargs)
+
+
+@pytest.mark.django_db
+def test_deliver_to_all_hooks(organization):
+    hooks = [
+        make_webhook(organization, url=f'http://receiver{i}.test/hook', headers={'X-Token': str(i)}) for i in range(3)
+    ]
+    hooks.append(make_webhook(organization, url='http://receiver3.test/hook', send_payload=False))
+
+    with requests_mock.Mocker() as m:
+        for hook in hooks:
+            m.post(hook.url)
+        with patch('webhooks.delivery.encode_body', wraps=delivery.encode_body) as encode_body:
+            responses = delivery.deliver(hooks, WebhookAction.PROJECT_CREATED, {'data': 'test'})
+
+    # One body with the payload, one for the send_payload=False hook
+    assert encode_body.call_count == 2
+    assert [response.status_code for response in responses] == [200] * 4
+    by_url = {request.url: request for request in m.request_history}
+    assert by_url[hooks[1].url].json() == {'action': WebhookAction.PROJECT_CREATED, 'data': 'test'}
+    assert by_url[hooks[1].url].headers['X-Token'] == '1'
+    assert by_url[hooks[1].url].headers['Content-Type'] == 'application/json'
+    assert by_url[hooks[3].url].json() == {'action': WebhookAction.PROJECT_CREATED}
+    assert not WebhookDelivery.objects.exists()
+
+
+def test_session_per_host():
+    assert delivery.get_session('http://a.test/one') is delivery.get_session('http://a.test/two')
+    assert delivery.get_session('http://a.test/one') is not delivery.get_session('https://a.test/one')
+
+
+@pytest.mark.django_db
+def test_failed_deliveries_are_stored(organization):
+    retryable = make_webhook(organization, url='http://down.test/hook')
+    rejected = make_webhook(organization, url='http://rejects.test/hook')
+    unreachable = make_webhook(organization, url='http://unreachable.test/hook')
+
+    with requests_mock.Mocker() as m:
+        m.post(retryable.url, status_code=503)
+        m.post(rejected.url, status_code=404)
+        m.post(unreachable.url, exc=requests.exceptions.ConnectTimeout)
+        before = timezone.now()
+        delivery.deliver([retryable, rejected, unreachable], WebhookAction.PROJECT_CREATED, {'data': 'test'})
+
+    stored = {row.webhook_id: row for row in WebhookDelivery.objects.all()}
+    assert stored[retryable.id].status == WebhookDelivery.RETRYING
+    assert stored[retryable.id].last_status_code == 503
+    assert stored[retryable.id].next_attempt_at >= before + timedelta(seconds=delivery.WEBHOOK_RETRY_BASE_DELAY)
+    assert json.loads(stored[retryable.id].body) == {'action': WebhookAction.PROJECT_CREATED, 'data': 'test'}
+    assert stored[rejected.id].status == WebhookDelivery.DEAD
+    assert stored[rejected.id].next_attempt_at is None
+    assert stored[unreachable.id].status == WebhookDelivery.RETRYING
+    assert stored[unreachable.id].last_status_code is None
+
+
+@pytest.mark.django_db
+def test_retry_backoff_and_dead_letter(organization):
+    recovers = make_webhook(organization, url='http://recovers.test/hook')
+    stays_down = make_webhook(organization, url='http://down.test/hook')
+    disabled = make_webhook(organization, url='http://disabled.test/hook')
+    past = timezone.now() - timedelta(seconds=1)
+    for hook in (recovers, stays_down, disabled):
+        WebhookDelivery.objects.create(webhook=hook, action='PROJECT_CREATED', body='{}', next_attempt_at=past)
+    Webhook.objects.filter(id=disabled.id).update(is_active=False)
+
+    with requests_mock.Mocker() as m:
+        m.post(recovers.url)
+        m.post(stays_down.url, status_code=500)
+        assert delivery.retry_webhook_deliveries() == 1
+
+        down = WebhookDelivery.objects.get(webhook=stays_down)
+        assert down.attempts == 2
+        assert down.status == WebhookDelivery.RETRYING
+        assert down.next_attempt_at > timezone.now() + timedelta(seconds=delivery.retry_delay(1))
+
+        # Not due yet
+        assert delivery.retry_webhook_deliveries() == 0
+        assert m.call_count == 2
+
+        WebhookDelivery.objects.filter(id=down.id).update(attempts=delivery.WEBHOOK_MAX_ATTEMPTS - 1, next_attempt_at=past)
+        delivery.retry_webhook_deliveries()
+
+    assert WebhookDelivery.objects.get(webhook=recovers).status == WebhookDelivery.DELIVERED
+    assert WebhookDelivery.objects.get(webhook=stays_down).status == WebhookDelivery.DEAD
+    assert WebhookDelivery.objects.get(webhook=disabled).status == WebhookDelivery.DEAD
+
+
+def test_retry_delay():
+    assert delivery.retry_delay(1) == delivery.WEBHOOK_RETRY_BASE_DELAY
+    assert delivery.retry_delay(3) == delivery.WEBHOOK_RETRY_BASE_DELAY * 4
+    assert delivery.retry_delay(100) == delivery.WEBHOOK_RETRY_MAX_DELAY
@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+import pytest
+from fakeredis import FakeRedis
+from organizations.tests.factories import OrganizationFactory
+from projects.tests.factories import ProjectFactory
+from webhooks import routing
+from webhooks.models import Webhook, WebhookAction
+from webhooks.utils import emit_webhooks_for_instance, get_active_webhooks
+
+
+@pytest.fixture(autouse=True)
+def routes():
+    routing.clear_routes()
+    yield
+    routing.clear_routes()
+
+
+@pytest.fixture
+def redis():
+    redis = FakeRedis()
+    with patch('webhooks.routing.redis_connected', return_value=True), patch(
+        'django_rq.get_connection', return_value=redis
+    ):
+        yield redis
+
+
+@pytest.fixture
+def project():
+    return ProjectFactory(organization=OrganizationFactory())
+
+
+def urls(organization, project, action):
+    return [webhook.url for webhook in get_active_webhooks(organization, project, action)]
+
+
+@pytest.mark.django_db
+def test_no_webhooks_without_queries(project, django_assert_num_queries):
+    organization = project.organization
+    assert urls(organization, project, WebhookAction.ANNOTATION_CREATED) == []
+
+    with django_assert_num_queries(0), patch('webhooks.utils.start_job_async_or_sync') as start_job:
+        emit_webhooks_for_instance(organization, project, WebhookAction.ANNOTATION_CREATED, instance=[1])
+    start_job.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_routes_are_cached_and_invalidated(project, django_assert_num_queries):
+    organization = project.organization
+    org_hook = Webhook.objects.create(organization=organization, url='http://org.test/')
+    project_hook = Webhook.objects.create(
+        organization=organization, project=project, url='http://project.test/', send_for_all_actions=False
+    )
+    project_hook.set_actions([WebhookAction.ANNOTATION_UPDATED])
+
+    assert urls(organization, project, WebhookAction.ANNOTATION_CREATED) == [org_hook.url]
+    with django_assert_num_queries(0):
+        hooks = get_active_webhooks(organization, project, WebhookAction.ANNOTATION_CREATED)
+    assert hooks[0].pk == org_hook.pk and hooks[0].headers == {} and hooks[0].send_payload
+
+    # WebhookAction changes
+    project_hook.set_actions([WebhookAction.ANNOTATION_CREATED])
+    assert urls(organization, project, WebhookAction.ANNOTATION_CREATED) == [org_hook.url, project_hook.url]
+
+    # Webhook changes
+    org_hook.is_active = False
+    org_hook.save()
+    assert urls(organization, project, WebhookAction.ANNOTATION_CREATED) == [project_hook.url]
+    project_hook.delete()
+    assert urls(organization, project, WebhookAction.ANNOTATION_CREATED) == []
+
+    # Other organizations keep their routes
+    other = ProjectFactory(organization=OrganizationFactory())
+    Webhook.objects.create(organization=other.organization, url='http://other.test/')
+    with django_assert_num_queries(0):
+        assert urls(organization, project, WebhookAction.ANNOTATION_CREATED) == []
+
+
+@pytest.mark.django_db
+def test_redis_layer(project, redis, django_assert_num_queries):
+    organization = project.organization
+    hook = Webhook.objects.create(organization=organization, url='http://org.test/')
+
+    assert urls(organization, None, WebhookAction.PROJECT_CREATED) == [hook.url]
+    # Another process: nothing cached locally, one Redis round trip and no query
+    routing.clear_routes()
+    with django_assert_num_queries(0):
+        assert urls(organization, None, WebhookAction.PROJECT_CREATED) == [hook.url]
+
+    # Routes stored under an older generation are ignored
+    routing.clear_routes()
+    redis.incr(routing._generation_key(organization.id))
+    with django_assert_num_queries(1):
+        assert urls(organization, None, WebhookAction.PROJECT_CREATED) == [hook.url]
+
+    hook.url = 'http://moved.test/'
+    hook.save()
+    assert not redis.exists(routing._routes_key(organization.id))
+    routing.clear_routes()
+    assert urls(organization, None, WebhookAction.PROJECT_CREATED) == ['http://moved.test/']
@@ -0,0 +1,274 @@
+"""
+Webhook delivery: pooled connections, concurrent sends and retries.
+
+run_webhook_sync used to call requests.post for every delivery, so each one
+opened a new TCP/TLS connection; the hooks of an event were sent one after
+another, so a slow receiver held the worker for WEBHOOK_TIMEOUT per hook; the
+payload was JSON-encoded again for every hook; and a failed delivery was only
+logged.
+
+deliver() sends one event to a list of webhooks:
+- The body is encoded once per event and shared by the hooks (one body with
+  the payload, one with only the action for send_payload=False hooks).
+- Hooks are sent concurrently on up to WEBHOOK_MAX_WORKERS threads.
+- Each receiver host (scheme://host:port) gets one requests.Session per
+  process with a pool of WEBHOOK_POOL_SIZE keep-alive connections and no
+  cookie jar, so hooks and batches sent to the same host reuse connections.
+
+Failed deliveries (connection errors, timeouts, 408, 429 and 5xx) are stored
+as WebhookDelivery rows and retried with exponential backoff
+(WEBHOOK_RETRY_BASE_DELAY * 2^(attempts - 1), capped at
+WEBHOOK_RETRY_MAX_DELAY) until WEBHOOK_MAX_ATTEMPTS, then marked DEAD. Other
+4xx responses are DEAD straight away. Successful deliveries cost no write.
+
+retry_webhook_deliveries() sends the due retries. With Redis it is scheduled
+on the low queue, one pending job at a time (Redis key
+webhook:retry:scheduled); without Redis run `manage.py retry_webhooks` from
+cron.
+"""
+
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from core.redis import redis_connected, start_job_async_or_sync
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .models import WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+
+WEBHOOK_MAX_WORKERS = getattr(settings, 'WEBHOOK_MAX_WORKERS', 8)
+WEBHOOK_POOL_SIZE = getattr(settings, 'WEBHOOK_POOL_SIZE', 10)
+WEBHOOK_MAX_ATTEMPTS = getattr(settings, 'WEBHOOK_MAX_ATTEMPTS', 5)
+WEBHOOK_RETRY_BASE_DELAY = getattr(settings, 'WEBHOOK_RETRY_BASE_DELAY', 30)
+WEBHOOK_RETRY_MAX_DELAY = getattr(settings, 'WEBHOOK_RETRY_MAX_DELAY', 3600)
+WEBHOOK_RETRY_BATCH_SIZE = getattr(settings, 'WEBHOOK_RETRY_BATCH_SIZE', 100)
+
+RETRY_SCHEDULED_KEY = 'webhook:retry:scheduled'
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url):
+    """Pooled session for the receiver host of url"""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WEBHOOK_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                # Receivers on one host must not see each other's cookies
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                _sessions[key] = session
+    return session
+
+
+def encode_body(action, payload=None):
+    data = {'action': action}
+    if payload:
+        data.update(payload)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def send(url, headers, body):
+    """POST an encoded body. Returns (response, error) and never raises"""
+    try:
+        logger.debug(f'Send webhook to {url}')
+        response = get_session(url).post(
+            url,
+            data=body,
+            headers={'Content-Type': 'application/json', **(headers or {})},
+            timeout=settings.WEBHOOK_TIMEOUT,
+        )
+        return response, None
+    except requests.RequestException as exc:
+        logger.error(exc, exc_info=True)
+        return None, exc
+
+
+def _send_all(requests_to_send):
+    """Send [(url, headers, body)] concurrently, results in the same order"""
+    if len(requests_to_send) <= 1 or WEBHOOK_MAX_WORKERS <= 1:
+        return [send(*request) for request in requests_to_send]
+    with ThreadPoolExecutor(max_workers=min(WEBHOOK_MAX_WORKERS, len(requests_to_send))) as executor:
+        return list(executor.map(lambda request: send(*request), requests_to_send))
+
+
+def _outcome(response, error):
+    """(status, status code, error text) of one attempt"""
+    if error is not None:
+        return WebhookDelivery.RETRYING, None, str(error) or error.__class__.__name__
+    code = response.status_code
+    if code in (408, 429) or code >= 500:
+        return WebhookDelivery.RETRYING, code, f'HTTP {code}'
+    if code >= 400:
+        return WebhookDelivery.DEAD, code, f'HTTP {code}'
+    return WebhookDelivery.DELIVERED, code, ''
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the given number of failed attempts"""
+    return min(WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempts - 1), WEBHOOK_RETRY_MAX_DELAY)
+
+
+def _apply_outcome(delivery, status, code, error, now):
+    delivery.status = status
+    delivery.last_status_code = code
+    delivery.last_error = error
+    delivery.next_attempt_at = None
+    if status == WebhookDelivery.RETRYING:
+        if delivery.attempts >= WEBHOOK_MAX_ATTEMPTS:
+            delivery.status = WebhookDelivery.DEAD
+        else:
+            delivery.next_attempt_at = now + timedelta(seconds=retry_delay(delivery.attempts))
+    if delivery.status == WebhookDelivery.DEAD:
+        logger.warning(
+            f'Webhook {delivery.webhook_id} delivery for {delivery.action} is dead after '
+            f'{delivery.attempts} attempt(s): {error}'
+        )
+
+
+def deliver(webhooks, action, payload=None):
+    """Send one event to webhooks and store the failed deliveries for retries.
+
+    :param webhooks: Webhooks to send to (list or queryset)
+    :param action: Action name
+    :param payload: Payload, sent to webhooks with send_payload
+    :return: Responses in webhook order, None for deliveries without response
+    """
+    webhooks = list(webhooks)
+    if not webhooks:
+        return []
+
+    bodies = {}
+    requests_to_send = []
+    for webhook in webhooks:
+        with_payload = bool(webhook.send_payload and payload)
+        if with_payload not in bodies:
+            bodies[with_payload] = encode_body(action, payload if with_payload else None)
+        requests_to_send.append((webhook.url, webhook.headers, bodies[with_payload]))
+
+    results = _send_all(requests_to_send)
+
+    now = timezone.now()
+    failed = []
+    for webhook, (_, _, body), (response, error) in zip(webhooks, requests_to_send, results):
+        status, code, error_text = _outcome(response, error)
+        if status == WebhookDelivery.DELIVERED or webhook.pk is None:
+            continue
+        delivery = WebhookDelivery(webhook=webhook, action=action, body=body.decode())
+        _apply_outcome(delivery, status, code, error_text, now)
+        failed.append(delivery)
+
+    if failed:
+        try:
+            WebhookDelivery.objects.bulk_create(failed)
+            retrying = [delivery for delivery in failed if delivery.status == WebhookDelivery.RETRYING]
+            if retrying:
+                schedule_retries(min(delivery.next_attempt_at for delivery in retrying))
+        except Exception as exc:
+            logger.error(f'Failed to store {len(failed)} failed webhook deliveries: {exc}', exc_info=True)
+
+    return [response for response, _ in results]
+
+
+def schedule_retries(at):
+    """Start the retry job for the given time unless one is already pending"""
+    if not redis_connected():
+        # start_job_async_or_sync would run it right away; retry_webhooks runs from cron instead
+        return
+    from django_rq import get_connection
+
+    delay = max(int((at - timezone.now()).total_seconds()), 1)
+    if get_connection().set(RETRY_SCHEDULED_KEY, 1, nx=True, ex=delay + 60):
+        start_job_async_or_sync(retry_webhook_deliveries, in_seconds=delay, queue_name='low')
+
+
+def retry_webhook_deliveries(batch_size=None):
+    """Retry the due failed deliveries.
+
+    Due rows are claimed by moving next_attempt_at forward before sending, so
+    concurrent runs don't send a delivery twice.
+
+    :param batch_size: Number of deliveries to send at once
+    :return: Number of deliveries delivered
+    """
+    if redis_connected():
+        from django_rq import get_connection
+
+        get_connection().delete(RETRY_SCHEDULED_KEY)
+
+    batch_size = batch_size or WEBHOOK_RETRY_BATCH_SIZE
+    delivered = 0
+    while True:
+        now = timezone.now()
+        due_ids = list(
+            WebhookDelivery.objects.filter(status=WebhookDelivery.RETRYING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        lease = now + timedelta(seconds=WEBHOOK_RETRY_MAX_DELAY)
+        claimed = WebhookDelivery.objects.filter(
+            id__in=due_ids, status=WebhookDelivery.RETRYING, next_attempt_at__lte=now
+        ).update(next_attempt_at=lease)
+        if not claimed:
+            break
+        deliveries = list(
+            WebhookDelivery.objects.filter(id__in=due_ids, next_attempt_at=lease).select_related('webhook')
+        )
+
+        to_send = []
+        now = timezone.now()
+        for delivery in deliveries:
+            if not delivery.webhook.is_active:
+                delivery.status = WebhookDelivery.DEAD
+                delivery.next_attempt_at = None
+                delivery.last_error = 'Webhook is disabled'
+            else:
+                to_send.append(delivery)
+
+        results = _send_all(
+            [(delivery.webhook.url, delivery.webhook.headers, delivery.body.encode()) for delivery in to_send]
+        )
+        for delivery, (response, error) in zip(to_send, results):
+            delivery.attempts += 1
+            status, code, error_text = _outcome(response, error)
+            _apply_outcome(delivery, status, code, error_text, now)
+            if status == WebhookDelivery.DELIVERED:
+                delivered += 1
+
+        for delivery in deliveries:
+            delivery.updated_at = now
+        WebhookDelivery.objects.bulk_update(
+            deliveries,
+            ['status', 'attempts', 'next_attempt_at', 'last_status_code', 'last_error', 'updated_at'],
+        )
+
+        if len(due_ids) < batch_size:
+            break
+
+    upcoming = (
+        WebhookDelivery.objects.filter(status=WebhookDelivery.RETRYING)
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )
+    if upcoming:
+        schedule_retries(upcoming)
+    return delivered
@@ -0,0 +1,37 @@
+"""
+Management command to retry failed webhook deliveries.
+
+Failed deliveries are retried by an rq job scheduled on the low queue. This
+command sends the due retries directly: needed without Redis, and it also
+picks up retries whose job was lost. Should be run periodically (e.g., every
+minute via cron).
+
+Usage:
+    python manage.py retry_webhooks
+    python manage.py retry_webhooks --batch-size 500
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Retry due failed webhook deliveries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Number of deliveries to send at once',
+        )
+
+    def handle(self, *args, **options):
+        from webhooks.delivery import retry_webhook_deliveries
+        from webhooks.models import WebhookDelivery
+
+        delivered = retry_webhook_deliveries(batch_size=options['batch_size'])
+        retrying = WebhookDelivery.objects.filter(status=WebhookDelivery.RETRYING).count()
+        dead = WebhookDelivery.objects.filter(status=WebhookDelivery.DEAD).count()
+        self.stdout.write(
+            self.style.SUCCESS(f'Webhooks: {delivered} delivered, {retrying} still retrying, {dead} dead')
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0004_auto_20221221_1101'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(help_text='Action value', max_length=128, verbose_name='action of webhook')),
+                ('body', models.TextField(help_text='JSON request body', verbose_name='request body')),
+                ('status', models.CharField(choices=[('RETRYING', 'Retrying'), ('DELIVERED', 'Delivered'), ('DEAD', 'Dead')], default='RETRYING', max_length=16, verbose_name='delivery status')),
+                ('attempts', models.PositiveIntegerField(default=1, help_text='Number of attempts made', verbose_name='attempts')),
+                ('next_attempt_at', models.DateTimeField(blank=True, help_text='Time of the next retry', null=True, verbose_name='next attempt at')),
+                ('last_status_code', models.PositiveIntegerField(blank=True, help_text='HTTP status of the last attempt', null=True, verbose_name='last status code')),
+                ('last_error', models.TextField(blank=True, default='', help_text='Error of the last attempt', verbose_name='last error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Creation time', verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Last update time', verbose_name='updated at')),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='webhooks.webhook')),
+            ],
+            options={
+                'db_table': 'webhook_delivery',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='webhook_delivery_due_idx')],
+            },
+        ),
+    ]
@@ -3,6 +3,8 @@ from core.validators import JSONSchemaValidator
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from labels_manager.models import LabelLink
 from projects.models import Project
@@ -267,3 +269,67 @@ class WebhookAction(models.Model):
 
 
 
+
+
+class WebhookDelivery(models.Model):
+    """Failed webhook delivery, kept for retries.
+
+    Successful deliveries are not stored. A failed one is retried with exponential
+    backoff while status is RETRYING and ends as DELIVERED or DEAD (dead letter).
+    """
+
+    RETRYING = 'RETRYING'
+    DELIVERED = 'DELIVERED'
+    DEAD = 'DEAD'
+
+    STATUS_CHOICES = [
+        (RETRYING, _('Retrying')),
+        (DELIVERED, _('Delivered')),
+        (DEAD, _('Dead')),
+    ]
+
+    webhook = models.ForeignKey(Webhook, on_delete=models.CASCADE, related_name='deliveries')
+
+    action = models.CharField(_('action of webhook'), max_length=128, help_text=_('Action value'))
+
+    body = models.TextField(_('request body'), help_text=_('JSON request body'))
+
+    status = models.CharField(_('delivery status'), max_length=16, choices=STATUS_CHOICES, default=RETRYING)
+
+    attempts = models.PositiveIntegerField(_('attempts'), default=1, help_text=_('Number of attempts made'))
+
+    next_attempt_at = models.DateTimeField(
+        _('next attempt at'), null=True, blank=True, help_text=_('Time of the next retry')
+    )
+
+    last_status_code = models.PositiveIntegerField(
+        _('last status code'), null=True, blank=True, help_text=_('HTTP status of the last attempt')
+    )
+
+    last_error = models.TextField(_('last error'), blank=True, default='', help_text=_('Error of the last attempt'))
+
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text=_('Creation time'))
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True, help_text=_('Last update time'))
+
+    class Meta:
+        db_table = 'webhook_delivery'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_delivery_due_idx'),
+        ]
+
+
+@receiver([post_save, post_delete], sender=Webhook)
+def invalidate_webhook_routes(sender, instance, **kwargs):
+    from .routing import invalidate_routes
+
+    invalidate_routes(instance.organization_id)
+
+
+@receiver([post_save, post_delete], sender=WebhookAction)
+def invalidate_webhook_action_routes(sender, instance, **kwargs):
+    from .routing import invalidate_routes
+
+    # On cascade deletes the webhook is already gone and invalidates by itself
+    organization_id = Webhook.objects.filter(id=instance.webhook_id).values_list('organization_id', flat=True).first()
+    if organization_id is not None:
+        invalidate_routes(organization_id)
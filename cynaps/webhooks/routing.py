@@ -0,0 +1,164 @@
+"""
+Cached webhook routing table.
+
+get_active_webhooks used to run a DISTINCT query over webhooks with a
+WebhookAction subquery every time an action fired, and every annotation
+create, update or delete fires one, even in organizations without webhooks.
+
+Routes are now resolved from two cache layers, keyed by (organization,
+project, action):
+- In-process: a dict entry per route, trusted for WEBHOOK_ROUTING_LOCAL_TTL
+  seconds. Signals on Webhook and WebhookAction clear the organization's
+  entries in the process that made the change right away.
+- Redis: one hash per organization, webhook:routes:<org>, with a field per
+  "<project>:<action>" holding the routed webhooks (id, url, headers,
+  send_payload) as JSON. The same signals bump the generation counter
+  webhook:routes:gen:<org> after the change is committed; entries written
+  under an older generation are ignored, so a lookup that raced with a change
+  can't store stale routes. A lookup is one pipelined GET + HGET.
+
+So "no webhooks" resolves with no database query, and the common case with one
+local hit or one Redis round trip. Only a miss on both layers queries the
+database. Without Redis only the in-process layer is used and other
+processes see changes within WEBHOOK_ROUTING_LOCAL_TTL.
+"""
+
+import json
+import logging
+import threading
+import time
+
+from core.redis import redis_connected
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Webhook, WebhookAction
+
+logger = logging.getLogger(__name__)
+
+
+WEBHOOK_ROUTING_LOCAL_TTL = getattr(settings, 'WEBHOOK_ROUTING_LOCAL_TTL', 5)
+WEBHOOK_ROUTING_REDIS_TTL = getattr(settings, 'WEBHOOK_ROUTING_REDIS_TTL', 24 * 60 * 60)
+
+ROUTE_FIELDS = ('id', 'organization_id', 'project_id', 'url', 'headers', 'send_payload')
+
+_local_routes = {}  # {(organization_id, project_id, action): (expires_at, routes)}
+_local_lock = threading.Lock()
+
+
+def _routes_key(organization_id):
+    return f'webhook:routes:{organization_id}'
+
+
+def _generation_key(organization_id):
+    return f'webhook:routes:gen:{organization_id}'
+
+
+def _route_field(project_id, action):
+    return f'{project_id or 0}:{action}'
+
+
+def _redis():
+    if not redis_connected():
+        return None
+    from django_rq import get_connection
+
+    return get_connection()
+
+
+def query_routes(organization_id, project_id, action):
+    """Active webhooks of an organization (and project) for an action, from the database"""
+    return list(
+        Webhook.objects.filter(
+            Q(organization_id=organization_id)
+            & (Q(project_id=project_id) | Q(project=None))
+            & Q(is_active=True)
+            & (
+                Q(send_for_all_actions=True)
+                | Q(
+                    id__in=WebhookAction.objects.filter(
+                        webhook__organization_id=organization_id, action=action
+                    ).values_list('webhook_id', flat=True)
+                )
+            )
+        )
+        .distinct()
+        .order_by('id')
+        .values(*ROUTE_FIELDS)
+    )
+
+
+def get_routes(organization_id, project_id, action):
+    """Routed webhooks as dicts with ROUTE_FIELDS"""
+    key = (organization_id, project_id, action)
+    cached = _local_routes.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    routes = None
+    redis, generation = _redis(), None
+    if redis is not None:
+        try:
+            generation, stored = (
+                redis.pipeline()
+                .get(_generation_key(organization_id))
+                .hget(_routes_key(organization_id), _route_field(project_id, action))
+                .execute()
+            )
+            if stored is not None:
+                stored = json.loads(stored)
+                if stored['generation'] == _decode(generation):
+                    routes = stored['routes']
+        except Exception as exc:
+            logger.warning(f'Webhook routing cache read failed: {exc}')
+            redis = None
+
+    if routes is None:
+        routes = query_routes(organization_id, project_id, action)
+        if redis is not None:
+            try:
+                routes_key = _routes_key(organization_id)
+                redis.pipeline().hset(
+                    routes_key,
+                    _route_field(project_id, action),
+                    json.dumps({'generation': _decode(generation), 'routes': routes}),
+                ).expire(routes_key, WEBHOOK_ROUTING_REDIS_TTL).execute()
+            except Exception as exc:
+                logger.warning(f'Webhook routing cache write failed: {exc}')
+
+    with _local_lock:
+        _local_routes[key] = (time.monotonic() + WEBHOOK_ROUTING_LOCAL_TTL, routes)
+    return routes
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _clear_local(organization_id=None):
+    with _local_lock:
+        for key in [key for key in _local_routes if organization_id is None or key[0] == organization_id]:
+            del _local_routes[key]
+
+
+def _bump_generation(organization_id):
+    _clear_local(organization_id)
+    redis = _redis()
+    if redis is None:
+        return
+    try:
+        redis.pipeline().incr(_generation_key(organization_id)).delete(_routes_key(organization_id)).execute()
+    except Exception as exc:
+        logger.warning(f'Webhook routing cache invalidation failed for organization {organization_id}: {exc}')
+
+
+def invalidate_routes(organization_id):
+    """Drop the cached routes of an organization, now and again after the current transaction commits"""
+    _bump_generation(organization_id)
+    transaction.on_commit(lambda: _bump_generation(organization_id))
+
+
+def clear_routes():
+    """Drop all cached routes of this process"""
+    _clear_local()
@@ -1,15 +1,15 @@
 import logging
 from functools import wraps
 
-import requests
 from core.feature_flags import flag_set
 from core.redis import start_job_async_or_sync
 from core.utils.common import load_func
 from django.conf import settings
-from django.db.models import Q
 from django.db.models.query import QuerySet
 
+from .delivery import deliver
 from .models import Webhook, WebhookAction
+from .routing import get_routes
 
 logger = logging.getLogger(__name__)
 
@@ -20,24 +20,25 @@ def get_active_webhooks(organization, project, action):
     If project is None - function return only organization hooks
     else project is not None - function return project and organization hooks
     Organization hooks are global hooks.
+
+    Webhooks are resolved from the cached routing table (see webhooks.routing)
+    and only carry the fields needed for delivery.
     """
     action_meta = WebhookAction.ACTIONS[action]
     if project and action_meta.get('organization-only'):
         raise ValueError('There is no project webhooks for organization-only action')
 
-    return Webhook.objects.filter(
-        Q(organization=organization)
-        & (Q(project=project) | Q(project=None))
-        & Q(is_active=True)
-        & (
-            Q(send_for_all_actions=True)
-            | Q(
-                id__in=WebhookAction.objects.filter(webhook__organization=organization, action=action).values_list(
-                    'webhook_id', flat=True
-                )
-            )
-        )
-    ).distinct()
+    if organization is None:
+        return []
+    routes = get_routes(organization.id, project.id if project else None, action)
+    return [Webhook(is_active=True, **route) for route in routes]
+
+
+def has_active_webhooks(organization, project, action):
+    """Check the routing table before a job is started for the action"""
+    if organization is None:
+        return False
+    return bool(get_routes(organization.id, project.id if project else None, action))
 
 
 def run_webhook_sync(webhook, action, payload=None):
@@ -45,22 +46,8 @@ def run_webhook_sync(webhook, action, payload=None):
 
     This function must not raise any exceptions.
     """
-    data = {
-        'action': action,
-    }
-    if webhook.send_payload and payload:
-        data.update(payload)
-    try:
-        logging.debug('Run webhook %s for action %s', webhook.id, action)
-        return requests.post(
-            webhook.url,
-            headers=webhook.headers,
-            json=data,
-            timeout=settings.WEBHOOK_TIMEOUT,
-        )
-    except requests.RequestException as exc:
-        logging.error(exc, exc_info=True)
-        return
+    logging.debug('Run webhook %s for action %s', webhook.id, action)
+    return deliver([webhook], action, payload)[0]
 
 
 def emit_webhooks_sync(organization, project, action, payload):
@@ -68,10 +55,9 @@ def emit_webhooks_sync(organization, project, action, payload):
     Run all active webhooks for the action.
     """
     webhooks = get_active_webhooks(organization, project, action)
-    if project and payload and webhooks.filter(send_payload=True).exists():
+    if project and payload and any(wh.send_payload for wh in webhooks):
         payload['project'] = load_func(settings.WEBHOOK_SERIALIZERS['project'])(instance=project).data
-    for wh in webhooks:
-        run_webhook_sync(wh, action, payload)
+    deliver(webhooks, action, payload)
 
 
 def _process_webhook_batch(webhooks, project, action, batch, action_meta):
@@ -86,7 +72,7 @@ def _process_webhook_batch(webhooks, project, action, batch, action_meta):
     """
     payload = {}
 
-    if batch and webhooks.filter(send_payload=True).exists():
+    if batch and any(wh.send_payload for wh in webhooks):
         serializer_class = action_meta.get('serializer')
         if serializer_class:
             payload[action_meta['key']] = serializer_class(instance=batch, many=action_meta['many']).data
@@ -98,8 +84,7 @@ def _process_webhook_batch(webhooks, project, action, batch, action_meta):
                     instance=get_nested_field(batch, value['field']), many=value['many']
                 ).data
 
-    for wh in webhooks:
-        run_webhook_sync(wh, action, payload)
+    deliver(webhooks, action, payload)
 
 
 def emit_webhooks_for_instance_sync(organization, project, action, instance=None):
@@ -108,7 +93,7 @@ def emit_webhooks_for_instance_sync(organization, project, action, instance=None
     Be sure WebhookAction.ACTIONS contains all required fields.
     """
     webhooks = get_active_webhooks(organization, project, action)
-    if not webhooks.exists():
+    if not webhooks:
         return
 
     action_meta = WebhookAction.ACTIONS[action]
@@ -172,6 +157,8 @@ def emit_webhooks_for_instance(organization, project, action, instance=None):
 
     Will run all selected webhooks in an RQ worker.
     """
+    if not has_active_webhooks(organization, project, action):
+        return
     if flag_set('fflag_fix_back_lsdv_4604_excess_sql_queries_in_api_short'):
         start_job_async_or_sync(emit_webhooks_for_instance_sync, organization, project, action, instance)
     else:
@@ -184,6 +171,8 @@ def emit_webhooks(organization, project, action, payload):
 
     Will run all selected webhooks in an RQ worker.
     """
+    if not has_active_webhooks(organization, project, action):
+        return
     if flag_set('fflag_fix_back_lsdv_4604_excess_sql_queries_in_api_short'):
         start_job_async_or_sync(emit_webhooks_sync, organization, project, action, payload)
     else: